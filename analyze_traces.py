@@ -0,0 +1,129 @@
+# analyze_traces.py
+# ANALISADOR DE TRACES - ONDE FOI O TEMPO DE CADA CICLO (BUSCA, FILTRO, GERAÇÃO, POSTAGEM, SLEEP) E CAMINHO DE UM TWEET
+
+import argparse
+import glob
+import gzip
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from tracing import DEFAULT_TRACE_FILE, SPAN_CYCLE, SPAN_FETCH, SPAN_FILTER, SPAN_GENERATE, SPAN_POST, SPAN_SLEEP
+
+STEPS = [SPAN_FETCH, SPAN_FILTER, SPAN_GENERATE, SPAN_POST, SPAN_SLEEP]
+OTHER = "outro"   # Tempo do ciclo fora de qualquer span (não instrumentado)
+
+
+def trace_files(path: str) -> List[str]:
+    """Arquivo atual e cópias rodadas (traces.jsonl.N.gz), da mais antiga para a atual"""
+    rotated = sorted(glob.glob(f"{path}.*.gz"), key=lambda name: int(name.rsplit(".", 2)[1]), reverse=True)
+    return rotated + glob.glob(path)
+
+
+def load_spans(paths: Iterable[str]) -> List[Dict]:
+    spans = []
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            spans.extend(json.loads(line) for line in f if line.strip())
+    return spans
+
+
+def cycle_breakdown(spans: List[Dict]) -> List[Dict]:
+    """
+    Para cada ciclo, o tempo exclusivo de cada span (duração menos a dos
+    filhos) somado por nome: as parcelas fecham a duração do ciclo, então
+    mostram o caminho crítico de um loop sequencial.
+    """
+    by_trace = defaultdict(list)
+    for span in spans:
+        by_trace[span["trace"]].append(span)
+
+    cycles = []
+    for members in by_trace.values():
+        root = next((s for s in members if s["parent"] is None), None)
+        if root is None or root["name"] != SPAN_CYCLE:
+            continue
+        children_ms = defaultdict(float)
+        for span in members:
+            if span["parent"] is not None:
+                children_ms[span["parent"]] += span["dur_ms"]
+
+        steps = defaultdict(float)
+        for span in members:
+            exclusive = max(0.0, span["dur_ms"] - children_ms[span["span"]])
+            steps[OTHER if span is root or span["name"] not in STEPS else span["name"]] += exclusive
+        cycles.append({
+            "trace": root["trace"],
+            "bot": root.get("bot", "?"),
+            "start": root["start"],
+            "total_ms": root["dur_ms"],
+            "steps": dict(steps),
+            "tweets": len({s["tweet_id"] for s in members if s.get("tweet_id") is not None}),
+            "errors": sum(1 for s in members if "error" in s)
+        })
+    return sorted(cycles, key=lambda cycle: cycle["start"])
+
+
+def tweet_path(spans: List[Dict], tweet_id: str) -> List[Dict]:
+    """Todos os spans de um tweet (leitor do stream, fila, geração, postagem), em ordem"""
+    return sorted((s for s in spans if str(s.get("tweet_id")) == str(tweet_id)), key=lambda s: s["start"])
+
+
+def format_seconds(ms: float) -> str:
+    return f"{ms / 1000:.1f}s" if ms >= 1000 else f"{ms:.0f}ms"
+
+
+def print_cycles(cycles: List[Dict]):
+    columns = STEPS + [OTHER]
+    print(f"{'início':<19} | {'bot':<13} | {'total':>7} | " + " | ".join(f"{c:>8}" for c in columns)
+          + f" | {'tweets':>6} | {'erros':>5}")
+    print("-" * (70 + 11 * len(columns)))
+    for cycle in cycles:
+        started = datetime.fromtimestamp(cycle["start"]).strftime("%Y-%m-%d %H:%M:%S")
+        shares = " | ".join(f"{format_seconds(cycle['steps'].get(c, 0)):>8}" for c in columns)
+        print(f"{started:<19} | {cycle['bot']:<13} | {format_seconds(cycle['total_ms']):>7} | {shares}"
+              f" | {cycle['tweets']:>6} | {cycle['errors']:>5}")
+
+    total = sum(cycle["total_ms"] for cycle in cycles)
+    if total:
+        print("-" * (70 + 11 * len(columns)))
+        shares = {c: sum(cycle["steps"].get(c, 0) for cycle in cycles) / total for c in columns}
+        print("🎯 Parcela do tempo: " + ", ".join(f"{c} {share:.1%}" for c, share in shares.items()))
+        awake = {c: share for c, share in shares.items() if c != SPAN_SLEEP}
+        if awake:
+            bottleneck = max(awake, key=awake.get)
+            print(f"🐢 Maior parcela fora do sleep: {bottleneck} ({awake[bottleneck]:.1%} do tempo dos ciclos)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumo por ciclo dos spans gravados por tracing.py")
+    parser.add_argument("path", nargs="?", default=DEFAULT_TRACE_FILE)
+    parser.add_argument("--last", type=int, default=20, help="Quantos ciclos mostrar (0 = todos)")
+    parser.add_argument("--bot", help="Só os ciclos deste bot")
+    parser.add_argument("--tweet", help="Mostra o caminho completo de um tweet")
+    args = parser.parse_args()
+
+    files = trace_files(args.path)
+    if not files:
+        print(f"❌ Nenhum trace em {args.path} (ative tracing_enabled no BOT_CONFIG)")
+        return
+    spans = load_spans(files)
+
+    if args.tweet:
+        path = tweet_path(spans, args.tweet)
+        print(f"🧵 Tweet {args.tweet}: {len(path)} spans")
+        for span in path:
+            started = datetime.fromtimestamp(span["start"]).strftime("%H:%M:%S.%f")[:-3]
+            extras = {k: v for k, v in span.items() if k not in ("trace", "span", "parent", "name", "start", "dur_ms")}
+            print(f"  {started}  {span['name']:<9} {format_seconds(span['dur_ms']):>7}  trace={span['trace']}  {extras}")
+        return
+
+    cycles = [c for c in cycle_breakdown(spans) if not args.bot or c["bot"] == args.bot]
+    print(f"📊 {len(cycles)} ciclos em {len(files)} arquivo(s), {len(spans)} spans")
+    print_cycles(cycles[-args.last:] if args.last else cycles)
+
+
+if __name__ == "__main__":
+    main()
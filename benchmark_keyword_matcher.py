@@ -0,0 +1,77 @@
+# benchmark_keyword_matcher.py
+# BENCHMARK: LOOP DE SUBSTRING vs AUTÔMATO AHO-CORASICK CONFORME A LISTA DE ALIASES CRESCE
+
+import random
+import string
+import time
+
+from keyword_matcher import KeywordMatcher
+from keyword_prompts_improved import prompts_com_aliases
+
+SAMPLE_TWEETS = [
+    "O governo Lula anunciou hoje novos dados sobre a inflação e o desemprego no país",
+    "Bolsonaro volta a atacar as urnas eletrônicas sem apresentar nenhuma prova ao TSE",
+    "Bom dia a todos! Hoje o dia está lindo aqui em Brasília, aproveitem o fim de semana",
+    "STF decide sobre investigação da PF envolvendo corrupção em contratos do ministério",
+    "Novo estudo mostra queda no desmatamento da Amazônia segundo dados do INPE e IBAMA",
+]
+
+
+def synthetic_prompts(total_aliases: int, seed: int = 42) -> dict:
+    """Amplia prompts_com_aliases com aliases aleatórios até atingir o tamanho pedido"""
+    rng = random.Random(seed)
+    prompts = dict(prompts_com_aliases)
+    existing = sum(len(keywords) for keywords in prompts)
+    group = []
+
+    while existing < total_aliases:
+        alias = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12)))
+        group.append(alias)
+        existing += 1
+        if len(group) == 10:
+            prompts[tuple(group)] = {"prompt": "'{tweet_text}'", "priority": "low"}
+            group = []
+    if group:
+        prompts[tuple(group)] = {"prompt": "'{tweet_text}'", "priority": "low"}
+    return prompts
+
+
+def naive_match(keyword_prompts: dict, text: str):
+    """Implementação antiga: um `in` por alias"""
+    for keyword in keyword_prompts:
+        if keyword in text.lower():
+            return keyword
+    return None
+
+
+def time_per_tweet(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for tweet in SAMPLE_TWEETS:
+            func(tweet)
+    return (time.perf_counter() - start) / (rounds * len(SAMPLE_TWEETS)) * 1e6
+
+
+def main():
+    print("📊 BENCHMARK DO DETECTOR DE PALAVRAS-CHAVE (µs por tweet)")
+    print("=" * 60)
+    print(f"{'aliases':>8} | {'loop substring':>15} | {'aho-corasick':>13}")
+    print("-" * 60)
+
+    for size in (50, 200, 1000, 2500, 5000):
+        prompts = synthetic_prompts(size)
+        keyword_prompts = {k.lower(): data for keywords, data in prompts.items() for k in keywords}
+        matcher = KeywordMatcher(prompts)
+
+        # Tweets sem palavra-chave são o pior caso do loop antigo (varre tudo)
+        naive_us = time_per_tweet(lambda text: naive_match(keyword_prompts, text), rounds=50)
+        matcher_us = time_per_tweet(matcher.best_match, rounds=200)
+
+        print(f"{len(matcher):>8} | {naive_us:>15.1f} | {matcher_us:>13.1f}")
+
+    print("-" * 60)
+    print("O custo do autômato depende do tamanho do tweet, não do número de aliases.")
+
+
+if __name__ == "__main__":
+    main()
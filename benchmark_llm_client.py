@@ -0,0 +1,132 @@
+# benchmark_llm_client.py
+# BENCHMARK: requests.post AVULSO (NOVA CONEXÃO TLS POR CHAMADA) vs LLMProvider COM SESSÃO KEEP-ALIVE
+
+import json
+import os
+import shutil
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from llm_client import LLMProvider
+
+CALLS = 200
+FAIL_FIRST = 2  # O stub responde 429 nas primeiras chamadas do teste de retry
+
+
+class StubChatHandler(BaseHTTPRequestHandler):
+    """Imita /v1/chat/completions com usage no formato da OpenAI"""
+    protocol_version = "HTTP/1.1"  # Necessário para keep-alive
+    disable_nagle_algorithm = True  # Evita os ~40ms de delayed ACK entre cabeçalho e corpo
+    failures_left = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if StubChatHandler.failures_left > 0:
+            StubChatHandler.failures_left -= 1
+            self._send(429, {"error": "rate limited"}, {"Retry-After": "0"})
+            return
+        self._send(200, {
+            "model": body["model"],
+            "choices": [{"message": {"role": "assistant", "content": "Comentário de teste."}}],
+            "usage": {"prompt_tokens": 42, "completion_tokens": 8, "total_tokens": 50}
+        })
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def self_signed_cert(directory: str):
+    """Certificado para 127.0.0.1 via openssl; None se o openssl não estiver disponível"""
+    if not shutil.which("openssl"):
+        return None
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", key, "-out", cert, "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=IP:127.0.0.1,DNS:localhost"],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+def start_stub(cert_pair):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubChatHandler)
+    scheme = "http"
+    if cert_pair:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*cert_pair)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def measure(call) -> list:
+    latencies = []
+    for _ in range(CALLS):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: list):
+    latencies.sort()
+    print(f"{name:<30} | {statistics.mean(latencies):>8.2f} | "
+          f"{latencies[len(latencies) // 2]:>8.2f} | {latencies[int(len(latencies) * 0.95)]:>8.2f}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        cert_pair = self_signed_cert(directory)
+        server, base_url = start_stub(cert_pair)
+        verify = cert_pair[0] if cert_pair else True
+        messages = [{"role": "user", "content": "Comente: a inflação caiu."}]
+        payload = {"model": "grok-1", "messages": messages, "max_tokens": 60, "temperature": 0.7}
+
+        def bare_post():
+            # Padrão antigo: requests.post cria e descarta uma conexão a cada chamada
+            response = requests.post(f"{base_url}/chat/completions", json=payload,
+                                     headers={"Authorization": "Bearer teste"}, timeout=30, verify=verify)
+            response.raise_for_status()
+            return response.json()["choices"][0]["message"]["content"]
+
+        provider = LLMProvider("stub", base_url, "teste", verify=verify)
+
+        print(f"📊 LATÊNCIA POR CHAMADA ({CALLS} chamadas, stub local {base_url.split(':')[0].upper()}, ms)")
+        print("=" * 66)
+        print(f"{'cliente':<30} | {'média':>8} | {'p50':>8} | {'p95':>8}")
+        print("-" * 66)
+        report("requests.post avulso", measure(bare_post))
+        report("LLMProvider (keep-alive)", measure(lambda: provider.chat(messages, "grok-1")))
+        print("-" * 66)
+
+        # Retry com jitter: o stub recusa as primeiras chamadas com 429
+        StubChatHandler.failures_left = FAIL_FIRST
+        response = provider.chat(messages, "grok-1")
+        print(f"🔁 Retry: resposta após {response.attempts} tentativas, "
+              f"uso real {response.total_tokens} tokens (estimado={response.usage_estimated})")
+
+        provider.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# benchmark_logging.py
+# BENCHMARK: CUSTO POR CHAMADA DE LOG NA THREAD DO BOT - FileHandler SÍNCRONO + f-string vs FILA + JSON LINES + FORMATAÇÃO PREGUIÇOSA
+
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import tempfile
+import time
+
+from log_setup import CONSOLE_FORMAT, LazyQueueHandler, rotating_file_handler
+
+TWEET = {"id": "1800000000000000001", "author_id": "1004511711251099653", "keyword": "inflação",
+         "model": "gpt-4o-mini", "latency_ms": 812}
+STATS = {"checked": 1532, "dropped": 211, "drops_by_reason": {"reply_settings": 180, "forbidden_conversation": 31}}
+
+
+class SlowDiskFileHandler(logging.FileHandler):
+    """FileHandler que simula disco lento (rede, cartão SD, fsync) com uma espera por escrita"""
+
+    def __init__(self, path: str, delay_seconds: float):
+        super().__init__(path, encoding="utf-8")
+        self.delay_seconds = delay_seconds
+
+    def emit(self, record):
+        super().emit(record)
+        time.sleep(self.delay_seconds)
+
+
+def make_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.handlers[:] = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def old_info(logger):
+    logger.info(f"🎯 Palavra-chave '{TWEET['keyword']}' encontrada em tweet {TWEET['id']} de {TWEET['author_id']}")
+
+
+def new_info(logger):
+    logger.info("🎯 Palavra-chave '%s' encontrada em tweet %s de %s", TWEET["keyword"], TWEET["id"],
+                TWEET["author_id"], extra={"tweet_id": TWEET["id"], "user_id": TWEET["author_id"],
+                                           "keyword": TWEET["keyword"]})
+
+
+def old_debug(logger):
+    logger.debug(f"🔒 Portão de resposta: {STATS}")
+
+
+def new_debug(logger):
+    logger.debug("🔒 Portão de resposta: %s", STATS)
+
+
+def per_call_us(logger, call, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        call(logger)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def run(calls: int, slow_disk_ms: float) -> list:
+    directory = tempfile.mkdtemp()
+    rows = []
+    try:
+        scenarios = [("disco local", None)]
+        if slow_disk_ms:
+            scenarios.append((f"disco lento ({slow_disk_ms:g} ms/escrita)", slow_disk_ms / 1000))
+
+        for disk, delay in scenarios:
+            n = calls if delay is None else max(50, int(0.5 / delay))   # Disco lento: ~0,5 s por cenário
+
+            # Antes: basicConfig com FileHandler síncrono e f-string
+            path = os.path.join(directory, f"antes_{len(rows)}.log")
+            handler = SlowDiskFileHandler(path, delay) if delay else logging.FileHandler(path, encoding="utf-8")
+            handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+            logger = make_logger(f"antes_{len(rows)}", handler)
+            before_info = per_call_us(logger, old_info, n)
+            before_debug = per_call_us(logger, old_debug, n)
+            handler.close()
+
+            # Depois: QueueHandler preguiçoso; arquivo JSON com rotação na thread do listener
+            path = os.path.join(directory, f"depois_{len(rows)}.log")
+            target = rotating_file_handler(path)
+            if delay:
+                slow_emit = target.emit
+                target.emit = lambda record: (slow_emit(record), time.sleep(delay))
+            log_queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(log_queue, target)
+            listener.start()
+            logger = make_logger(f"depois_{len(rows)}", LazyQueueHandler(log_queue))
+            after_info = per_call_us(logger, new_info, n)
+            after_debug = per_call_us(logger, new_debug, n)
+            drain_started = time.perf_counter()
+            listener.stop()
+            drain = time.perf_counter() - drain_started
+            target.close()
+
+            rows.append((disk, n, before_info, after_info, before_debug, after_debug, drain))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo por chamada de log na thread que loga")
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--slow-disk-ms", type=float, default=2.0, help="0 desativa o cenário de disco lento")
+    args = parser.parse_args()
+
+    print("📊 CUSTO POR CHAMADA NA THREAD DO BOT (µs)")
+    print("=" * 96)
+    print(f"{'cenário':<28} | {'chamadas':>8} | {'INFO antes':>10} | {'INFO depois':>11} | "
+          f"{'DEBUG antes':>11} | {'DEBUG depois':>12} | {'drenagem':>8}")
+    print("-" * 96)
+    for disk, n, before_info, after_info, before_debug, after_debug, drain in run(args.calls, args.slow_disk_ms):
+        print(f"{disk:<28} | {n:>8} | {before_info:>10.2f} | {after_info:>11.2f} | "
+              f"{before_debug:>11.2f} | {after_debug:>12.2f} | {drain:>7.2f}s")
+    print("-" * 96)
+    print("INFO: gravado (antes: texto + FileHandler na própria thread; depois: JSON lines pelo listener).")
+    print("DEBUG: nível desligado (antes a f-string é montada mesmo assim; depois só os argumentos são passados).")
+    print("drenagem: tempo para o listener gravar o que ficou na fila ao parar.")
+
+
+if __name__ == "__main__":
+    main()
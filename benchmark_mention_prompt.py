@@ -0,0 +1,149 @@
+# benchmark_mention_prompt.py
+# BENCHMARK: PROMPT DE MENÇÃO MONTADO POR CHAMADA vs PREFIXO DE SISTEMA ESTÁTICO PRÉ-COMPILADO
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from mention_bot import MentionBot, PROVIDER_PERSONAS
+import token_ledger
+from token_ledger import count_tokens
+
+# Lote reproduzido: (autor, menção, contexto da thread)
+MENTIONS = [
+    ("@ana_lima (Ana Lima)", "@{me} o desemprego caiu mesmo ou é maquiagem do IBGE?", ""),
+    ("@joao_p (João P.)", "@{me} qual sua opinião sobre a reforma tributária?", ""),
+    ("@maria (Maria S.)", "@{me} isso aí é fake, cadê a fonte?", "Tweet original: 'Inflação de 2024 foi a menor da década'"),
+    ("@carlos_econ (Carlos)", "@{me} os dados do Caged contradizem você", ""),
+    ("@bia (Bia)", "@{me} kkkk concordo demais", "Tweet original: 'Debate de ontem foi fraco'"),
+    ("@pedro (Pedro H.)", "@{me} você defende o STF em tudo?", ""),
+    ("@lu_santos (Lu)", "@{me} e a dívida pública, vai explodir?", ""),
+    ("@rafa (Rafael)", "@{me} me explica o arcabouço fiscal em 1 tweet", ""),
+] * 25
+
+ORIGINAL_SYSTEM_PROMPTS = {
+    "chatgpt": "Você é um assistente especializado em responder menções no X de forma inteligente e contextual.",
+    "xai": "Você é Grok, respondendo menções de forma inteligente e com personalidade única."
+}
+
+
+def legacy_messages(bot: MentionBot, mention: str, author: str, thread: str, choice: str = "chatgpt"):
+    """Layout anterior: bloco estático remontado a cada menção dentro da mensagem do usuário"""
+    config = bot.prompt_config
+    prompt = f"""
+Você é um assistente inteligente que representa @{bot.my_username} no X (Twitter).
+
+PERSONALIDADE E TOM:
+- Tom: {config['base_personality']['tone']}
+- Estilo: {config['base_personality']['style']}
+- Emoção: {config['base_personality']['emotion']}
+
+VALORES FUNDAMENTAIS:
+{chr(10).join(f"• {belief}" for belief in config['core_beliefs'])}
+
+DIRETRIZES DE RESPOSTA:
+{chr(10).join(f"• {guideline}" for guideline in config['response_guidelines'])}
+
+INSTRUÇÕES ESPECIAIS:
+{config['custom_instructions']}
+
+CONTEXTO DO TWEET:
+Autor: {author}
+Tweet que me mencionou: "{mention}"
+{f"Contexto da conversa: {thread}" if thread else ""}
+
+TAREFA:
+Responda à menção de forma {config['base_personality']['tone']}, seguindo suas diretrizes.
+Máximo de {config['base_personality']['max_length']} caracteres.
+Seja relevante ao contexto e mantenha sua personalidade consistente.
+""".strip()
+    return [{"role": "system", "content": ORIGINAL_SYSTEM_PROMPTS[choice]},
+            {"role": "user", "content": prompt}]
+
+
+def prefixed_messages(bot: MentionBot, mention: str, author: str, thread: str, choice: str = "chatgpt"):
+    """Layout novo: prefixo de sistema compilado + parte variável"""
+    return [{"role": "system", "content": bot.system_prefix(choice)},
+            {"role": "user", "content": bot.build_context_prompt(mention, author, thread)}]
+
+
+def serialize(messages) -> str:
+    return "".join(f"<{m['role']}>{m['content']}" for m in messages)
+
+
+def common_prefix_tokens(a: str, b: str) -> int:
+    """Tokens do maior prefixo comum (o que o cache de prefixo do provedor pode reaproveitar)"""
+    size = len(os.path.commonprefix([a, b]))
+    return count_tokens(a[:size]) if size else 0
+
+
+def replay(bot: MentionBot, build):
+    batch = [(mention.format(me=bot.my_username), author, thread) for author, mention, thread in MENTIONS]
+
+    start = time.perf_counter()
+    requests_ = [build(bot, mention, author, thread) for mention, author, thread in batch]
+    build_us = (time.perf_counter() - start) / len(batch) * 1_000_000
+
+    serialized = [serialize(messages) for messages in requests_]
+    input_tokens = [count_tokens(text) for text in serialized]
+    shared = [common_prefix_tokens(serialized[i - 1], serialized[i]) for i in range(1, len(serialized))]
+    return {
+        "build_us": build_us,
+        "input_tokens": statistics.mean(input_tokens),
+        "shared_prefix_tokens": statistics.mean(shared),
+        "requests": requests_,
+    }
+
+
+def live(requests_, model: str):
+    """Envia o lote ao provedor real e mede latência e tokens servidos pelo cache"""
+    from llm_client import chat_completion
+    latencies, cached = [], []
+    for messages in requests_:
+        response = chat_completion(model, messages, max_tokens=100, temperature=0.7, bot="benchmark")
+        latencies.append(response.latency * 1000)
+        cached.append(response.cached_tokens)
+    latencies.sort()
+    return statistics.mean(latencies), latencies[int(len(latencies) * 0.95)], statistics.mean(cached)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", metavar="MODELO", help="Também envia o lote ao provedor (consome tokens)")
+    parser.add_argument("--live-calls", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)  # Configuração padrão do prompt criada no diretório temporário
+        bot = MentionBot.__new__(MentionBot)
+        bot.my_username = "meuuser"
+        bot._system_prefixes, bot._prompt_config_mtime = {}, None
+        bot.load_prompt_config()
+
+        results = {"montado por menção": replay(bot, legacy_messages),
+                   "prefixo pré-compilado": replay(bot, prefixed_messages)}
+
+        print(f"📊 PROMPT DE MENÇÃO ({len(MENTIONS)} menções reproduzidas)")
+        print("=" * 78)
+        print(f"{'layout':<24} | {'montagem (µs)':>13} | {'tokens entrada':>14} | {'prefixo comum (tokens)':>22}")
+        print("-" * 78)
+        for name, result in results.items():
+            print(f"{name:<24} | {result['build_us']:>13.1f} | {result['input_tokens']:>14.1f} | "
+                  f"{result['shared_prefix_tokens']:>22.1f}")
+        print("-" * 78)
+        prefix_tokens = count_tokens(bot.system_prefix("chatgpt"))
+        print(f"🧩 Prefixo de sistema: {prefix_tokens} tokens ({', '.join(PROVIDER_PERSONAS)})")
+        if token_ledger.tiktoken is None:
+            print("ℹ️ tiktoken não instalado: tokens estimados (~4 caracteres por token)")
+
+        if args.live:
+            print(f"\n⏱️ Latência no provedor ({args.live}, {args.live_calls} chamadas por layout)")
+            for name, result in results.items():
+                mean, p95, cached = live(result["requests"][:args.live_calls], args.live)
+                print(f"{name:<24} | média {mean:>7.0f} ms | p95 {p95:>7.0f} ms | cache {cached:>6.1f} tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmark_reply_gate.py
+# REPLAY DE UM DIA DE TRÁFEGO: CHAMADAS AO LLM E TOKENS EVITADOS PELO PORTÃO DE RESPOSTA (reply_settings + CACHE DE 403)
+
+import argparse
+import json
+import random
+from types import SimpleNamespace
+
+from keyword_prompts import prompts_com_aliases
+from reply_gate import ReplyGate
+from token_ledger import count_tokens
+from tweet_filter import TweetFilter
+
+ACCOUNTS = 19
+REPLY_MAX_TOKENS = 60   # max_tokens do SmartXBot (completion estimada no teto)
+SYSTEM_PROMPT = ("Você é um assistente especialista em gerar comentários concisos e inteligentes para X/Twitter. "
+                 "Seja natural, relevante e dentro do limite de caracteres.")
+
+# Premissas do tráfego sintético (substitua por um trace gravado com --trace)
+REPLY_SETTINGS_MIX = [("everyone", 0.80), ("mentionedUsers", 0.12), ("following", 0.08)]
+THREAD_CONTINUATION = 0.3   # Chance de o tweet continuar a conversa anterior do autor
+BLOCKING_ACCOUNTS = 2       # Contas que bloquearam o bot: toda resposta volta 403
+
+TEMPLATES = [
+    "Hoje falei sobre {kw} e a resposta do governo foi decepcionante para todos",
+    "Mais uma vez o debate sobre {kw} mostra como o país está dividido",
+    "Quem ainda defende {kw} precisa olhar os números desta semana com atenção",
+    "Nota oficial sobre {kw}: seguiremos trabalhando pelo Brasil",
+    "Bom dia a todos! Agenda cheia hoje em Brasília, depois conto as novidades",
+]
+
+
+def synthetic_day(seed: int = 11) -> list:
+    """Um dia de tweets das contas monitoradas, com reply_settings e conversas"""
+    rng = random.Random(seed)
+    keywords = [keyword for group in prompts_com_aliases for keyword in group]
+    settings, weights = zip(*REPLY_SETTINGS_MIX)
+    blocked = set(rng.sample(range(ACCOUNTS), BLOCKING_ACCOUNTS))
+    trace, next_id = [], 1_800_000_000_000_000_000
+
+    for account in range(ACCOUNTS):
+        conversation = None
+        for _ in range(int(10 ** rng.uniform(0, 1.6))):   # 1 a 40 tweets no dia
+            next_id += rng.randint(1, 10 ** 12)
+            if conversation is None or rng.random() > THREAD_CONTINUATION:
+                conversation = {"id": str(next_id), "reply_settings": rng.choices(settings, weights)[0]}
+            trace.append({
+                "id": str(next_id),
+                "author_id": str(account),
+                "conversation_id": conversation["id"],
+                "reply_settings": conversation["reply_settings"],
+                "text": rng.choice(TEMPLATES).format(kw=rng.choice(keywords)),
+                "forbidden": account in blocked
+            })
+    trace.sort(key=lambda tweet: int(tweet["id"]))
+    return trace
+
+
+def load_trace(path: str) -> list:
+    """Trace gravado: uma linha JSON por tweet com os campos de REPLY_TWEET_FIELDS e o texto"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def would_be_forbidden(tweet) -> bool:
+    """O que a API responderia ao create_tweet: 403 em conversa restrita ou autor que bloqueou"""
+    return tweet.forbidden or tweet.reply_settings not in (None, "everyone")
+
+
+def replay(trace: list, gate: ReplyGate = None) -> dict:
+    tweet_filter = TweetFilter(prompts_com_aliases)
+    result = {"llm_calls": 0, "tokens": 0, "forbidden": 0, "posted": 0}
+    for record in trace:
+        tweet = SimpleNamespace(**{"forbidden": False, "reply_settings": None, **record})
+        verdict = tweet_filter.evaluate(tweet.text)
+        if not verdict.accepted:
+            continue
+        if gate is not None and not gate.allows(tweet):
+            continue
+
+        prompt = verdict.best_match.prompt.format(tweet_text=tweet.text)
+        result["llm_calls"] += 1
+        result["tokens"] += count_tokens(SYSTEM_PROMPT) + count_tokens(prompt) + REPLY_MAX_TOKENS
+
+        if would_be_forbidden(tweet):
+            result["forbidden"] += 1
+            if gate is not None:
+                gate.record_forbidden(tweet)
+        else:
+            result["posted"] += 1
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens evitados pelo portão de resposta num dia reproduzido")
+    parser.add_argument("--trace", help="Trace JSONL gravado (padrão: dia sintético)")
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace) if args.trace else synthetic_day()
+    gate = ReplyGate()
+    results = {"sem portão": replay(trace), "com portão": replay(trace, gate)}
+
+    print(f"📊 PORTÃO DE RESPOSTA: {len(trace)} tweets reproduzidos ({'trace' if args.trace else 'dia sintético'})")
+    print("=" * 72)
+    print(f"{'pipeline':<12} | {'chamadas LLM':>12} | {'tokens':>8} | {'403 após gerar':>14} | {'postadas':>8}")
+    print("-" * 72)
+    for name, r in results.items():
+        print(f"{name:<12} | {r['llm_calls']:>12} | {r['tokens']:>8} | {r['forbidden']:>14} | {r['posted']:>8}")
+    print("-" * 72)
+    before, after = results["sem portão"], results["com portão"]
+    saved_calls = before["llm_calls"] - after["llm_calls"]
+    saved_tokens = before["tokens"] - after["tokens"]
+    print(f"🎯 Evitadas: {saved_calls} chamadas ({saved_calls / max(before['llm_calls'], 1):.0%}), "
+          f"{saved_tokens} tokens ({saved_tokens / max(before['tokens'], 1):.0%})")
+    print(f"🔒 Descartes por motivo: {gate.get_stats()['drops_by_reason']}")
+    assert after["posted"] == before["posted"], "o portão não pode descartar respostas possíveis"
+
+
+if __name__ == "__main__":
+    main()
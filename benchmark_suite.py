@@ -0,0 +1,310 @@
+# benchmark_suite.py
+# BENCHMARK DE PONTA A PONTA: SmartXBot, OptimizedXBot E MentionBot CONTRA STAND-INS LOCAIS DO X E DOS LLMs (fake_api.py)
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from cassette import SERVICE_X
+from fake_api import (BENCH_USER, CassetteServer, FakeLLMServer, FakeXServer, ServerProfile, monitored_keywords,
+                      route_to_local)
+
+# bot -> (módulo, classe, método de um ciclo sem o sleep do loop principal, prompts cujas palavras-chave o stand-in usa)
+BOTS = {
+    "smart_bot": ("bot_improved", "SmartXBot", "check_and_reply_smart", "keyword_prompts"),
+    "optimized_bot": ("bot_optimized", "OptimizedXBot", "run_optimized_cycle", "keyword_prompts_improved"),
+    "mention_bot": ("mention_bot", "MentionBot", "check_mentions", "keyword_prompts_improved"),
+}
+
+# A cota real da conta pararia a geração no 15º post; para medir o pipeline
+# os tetos sobem (--real-quota mantém os do BOT_CONFIG)
+THROUGHPUT_OVERRIDES = {
+    "max_responses_per_hour": 10 ** 6,
+    "max_responses_per_day": 10 ** 6,
+    "max_posts_per_month": 10 ** 6,
+    "max_tokens_per_day": 10 ** 9
+}
+
+RESULT_MARKER = "BENCH_RESULT "
+
+# Métricas comparadas com --compare: (chave, True se maior é melhor)
+COMPARED_METRICS = [
+    ("tweets_per_second", True),
+    ("cycle_p50_ms", False),
+    ("cycle_p99_ms", False),
+    ("rss_peak_mb", False),
+    ("tokens_per_post", False),
+]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def peak_rss_mb() -> float:
+    """Pico de memória residente do processo (ru_maxrss é KB no Linux e bytes no macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# ----------------------------------------------------------------------
+# Processo de um bot: cada bot roda isolado, num diretório temporário, para
+# que singletons (state store, cota, caches) e o pico de memória sejam só dele
+# ----------------------------------------------------------------------
+
+def run_worker(args) -> Dict:
+    route_to_local(args.x_url, args.llm_url)
+
+    from keyword_prompts_improved import BOT_CONFIG
+    BOT_CONFIG.update(metrics_ports={}, tracing_enabled=args.tracing, ingestion_mode=args.ingestion)
+    if args.record:
+        BOT_CONFIG.update(cassette_record_file=os.path.join(args.record, f"{args.worker}.jsonl.gz"))
+    if not args.real_quota:
+        BOT_CONFIG.update(THROUGHPUT_OVERRIDES)
+
+    module_name, class_name, cycle_method, _ = BOTS[args.worker]
+    started = time.perf_counter()
+    bot_class = getattr(importlib.import_module(module_name), class_name)
+    bot = bot_class(BENCH_USER["username"]) if args.worker == "mention_bot" else bot_class()
+    init_seconds = time.perf_counter() - started
+    rss_init = peak_rss_mb()
+
+    run_cycle = getattr(bot, cycle_method)
+    durations = []
+    for _ in range(args.cycles):
+        cycle_started = time.perf_counter()
+        run_cycle()
+        durations.append(time.perf_counter() - cycle_started)
+
+    from metrics import STAGE_FETCHED, STAGE_FILTERED, STAGE_GENERATED, STAGE_POSTED, get_metrics
+    from request_scheduler import get_request_scheduler
+    from token_ledger import get_token_ledger
+
+    counter = get_metrics().tweets
+    funnel = {stage: int(counter.value(bot=args.worker, stage=stage))
+              for stage in (STAGE_FETCHED, STAGE_FILTERED, STAGE_GENERATED, STAGE_POSTED)}
+    tokens = get_token_ledger().summarize()["totals"]
+    busy_seconds = sum(durations)
+
+    return {
+        "cycles": len(durations),
+        "init_seconds": round(init_seconds, 3),
+        "busy_seconds": round(busy_seconds, 3),
+        "cycle_mean_ms": round(busy_seconds / len(durations) * 1000, 2),
+        "cycle_p50_ms": round(percentile(durations, 0.5) * 1000, 2),
+        "cycle_p99_ms": round(percentile(durations, 0.99) * 1000, 2),
+        "cycle_max_ms": round(max(durations) * 1000, 2),
+        "tweets": funnel,
+        "tweets_per_second": round(funnel[STAGE_FETCHED] / busy_seconds, 2) if busy_seconds else 0.0,
+        "posts_per_second": round(funnel[STAGE_POSTED] / busy_seconds, 3) if busy_seconds else 0.0,
+        "llm_calls": tokens["calls"],
+        "prompt_tokens": tokens["prompt_tokens"],
+        "completion_tokens": tokens["completion_tokens"],
+        "total_tokens": tokens["total_tokens"],
+        "tokens_per_post": round(tokens["total_tokens"] / funnel[STAGE_POSTED], 1) if funnel[STAGE_POSTED] else None,
+        "rss_init_mb": round(rss_init, 1),
+        "rss_peak_mb": round(peak_rss_mb(), 1),
+        "scheduler_waited_seconds": get_request_scheduler().get_stats()["total_waited_seconds"]
+    }
+
+
+def worker_command(bot: str, args, x_url: str, llm_url: str) -> List[str]:
+    command = [sys.executable, os.path.abspath(__file__), "--worker", bot, "--x-url", x_url,
+               "--llm-url", llm_url, "--cycles", str(args.cycles), "--ingestion", args.ingestion]
+    if args.tracing:
+        command.append("--tracing")
+    if args.real_quota:
+        command.append("--real-quota")
+    if args.record:
+        command.extend(["--record", os.path.abspath(args.record)])
+    return command
+
+
+def start_servers(bot: str, args) -> Dict[str, object]:
+    """Stand-ins novos por bot (janelas e contadores zerados): sintéticos ou o replay de um cassete"""
+    if args.cassette:
+        replay = CassetteServer(args.cassette, args.speed).start()
+        return {"replay": replay}
+    return {
+        "x_api": FakeXServer(
+            ServerProfile(args.x_latency_ms, args.x_jitter_ms, args.x_error_rate, args.x_rate_limit,
+                          args.x_window_seconds),
+            keywords=monitored_keywords(BOTS[bot][3]), tweets_per_page=args.tweets_per_page,
+            keyword_ratio=args.keyword_ratio, seed=args.seed
+        ).start(),
+        "llm_api": FakeLLMServer(
+            ServerProfile(args.llm_latency_ms, args.llm_jitter_ms, args.llm_error_rate, args.llm_rate_limit, 60),
+            seed=args.seed
+        ).start()
+    }
+
+
+def run_bot(bot: str, args) -> Dict:
+    """Roda o bot num subprocesso contra os stand-ins e junta as medidas dos dois lados"""
+    servers = start_servers(bot, args)
+    x_server = servers.get("x_api") or servers["replay"]
+    llm_server = servers.get("llm_api") or servers["replay"]
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            stderr_path = os.path.join(workdir, "worker.stderr")
+            with open(stderr_path, "w", encoding="utf-8") as stderr:
+                process = subprocess.run(worker_command(bot, args, x_server.url, llm_server.url), cwd=workdir,
+                                         stdout=subprocess.PIPE, stderr=stderr, text=True, timeout=args.timeout)
+            lines = [line for line in process.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+            if process.returncode != 0 or not lines:
+                with open(stderr_path, encoding="utf-8", errors="replace") as f:
+                    tail = f.read()[-3000:]
+                raise RuntimeError(f"{bot} terminou com código {process.returncode}:\n{tail}")
+            result = json.loads(lines[-1][len(RESULT_MARKER):])
+    finally:
+        for server in servers.values():
+            server.stop()
+
+    for name, server in servers.items():
+        result[name] = server.get_stats()
+    if "replay" in result:
+        result["x_requests"] = result["replay"]["by_service"].get(SERVICE_X, 0)
+    else:
+        result["x_requests"] = result["x_api"]["requests"]
+    result["x_requests_per_cycle"] = round(result["x_requests"] / max(result["cycles"], 1), 2)
+    return result
+
+
+# ----------------------------------------------------------------------
+# Relatório e comparação
+# ----------------------------------------------------------------------
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_results(results: Dict[str, Dict]):
+    print(f"{'bot':<14} | {'ciclos':>6} | {'p50 ms':>8} | {'p99 ms':>8} | {'tweets/s':>8} | "
+          f"{'buscados':>8} | {'postados':>8} | {'tokens':>7} | {'tok/post':>8} | {'RSS MB':>7} | {'req X':>5}")
+    print("-" * 118)
+    for bot, result in results.items():
+        print(f"{bot:<14} | {result['cycles']:>6} | {result['cycle_p50_ms']:>8.1f} | {result['cycle_p99_ms']:>8.1f} | "
+              f"{result['tweets_per_second']:>8.2f} | {result['tweets']['fetched']:>8} | "
+              f"{result['tweets']['posted']:>8} | {result['total_tokens']:>7} | "
+              f"{result['tokens_per_post'] if result['tokens_per_post'] is not None else '-':>8} | "
+              f"{result['rss_peak_mb']:>7.1f} | {result['x_requests']:>5}")
+
+
+def compare(results: Dict[str, Dict], baseline_path: str, tolerance: float) -> List[str]:
+    """Imprime a variação contra um resultado anterior e devolve as regressões acima da tolerância"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n🔬 Comparação com {baseline_path} (commit {baseline['meta'].get('git_commit')}, "
+          f"tolerância {tolerance:.0%})")
+    regressions = []
+    for bot, result in results.items():
+        before = baseline["results"].get(bot)
+        if not before:
+            print(f"  {bot}: sem referência")
+            continue
+        for key, higher_is_better in COMPARED_METRICS:
+            old, new = before.get(key), result.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "🔴" if worse > tolerance else ("🟢" if worse < -tolerance else "⚪")
+            print(f"  {flag} {bot:<14} {key:<18} {old:>10} → {new:<10} ({change:+.1%})")
+            if worse > tolerance:
+                regressions.append(f"{bot}.{key}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos bots contra stand-ins locais (sem gastar cota)")
+    parser.add_argument("--bots", nargs="+", choices=list(BOTS), default=list(BOTS))
+    parser.add_argument("--cycles", type=int, default=10)
+    parser.add_argument("--ingestion", choices=["search", "per_user"], default="search")
+    parser.add_argument("--tracing", action="store_true", help="Liga tracing.py durante a medição")
+    parser.add_argument("--real-quota", action="store_true", help="Mantém os limites de postagem do BOT_CONFIG")
+    parser.add_argument("--x-latency-ms", type=float, default=80)
+    parser.add_argument("--x-jitter-ms", type=float, default=40)
+    parser.add_argument("--x-error-rate", type=float, default=0.0)
+    parser.add_argument("--x-rate-limit", type=int, default=10000, help="Chamadas por janela e endpoint")
+    parser.add_argument("--x-window-seconds", type=float, default=900)
+    parser.add_argument("--tweets-per-page", type=int, default=10)
+    parser.add_argument("--keyword-ratio", type=float, default=0.5, help="Fração dos tweets com palavra-chave")
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-rate-limit", type=int, default=10000, help="Completions por minuto")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cassette", help="Reproduz um cassete gravado (cassette.py) em vez dos stand-ins sintéticos")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="Replay: 1 = tempo da gravação, 10 = 10x mais rápido, 0 = o mais rápido possível")
+    parser.add_argument("--record", help="Grava o tráfego de cada bot em DIR/<bot>.jsonl.gz (para --cassette depois)")
+    parser.add_argument("--timeout", type=float, default=900, help="Segundos por bot")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="Resultado anterior para detectar regressões")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    # Uso interno: processo de um bot
+    parser.add_argument("--worker", choices=list(BOTS), help=argparse.SUPPRESS)
+    parser.add_argument("--x-url", help=argparse.SUPPRESS)
+    parser.add_argument("--llm-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(RESULT_MARKER + json.dumps(run_worker(args)), flush=True)
+        return
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+
+    if args.cassette:
+        print(f"📊 BENCHMARK DE PONTA A PONTA ({args.cycles} ciclos por bot, replay de {args.cassette} "
+              f"{'o mais rápido possível' if args.speed <= 0 else f'a {args.speed:g}x'})")
+    else:
+        print(f"📊 BENCHMARK DE PONTA A PONTA ({args.cycles} ciclos por bot, X {args.x_latency_ms:g}±"
+              f"{args.x_jitter_ms:g} ms, LLM {args.llm_latency_ms:g}±{args.llm_jitter_ms:g} ms)")
+    results = {}
+    for bot in args.bots:
+        print(f"▶️  {bot}...", flush=True)
+        results[bot] = run_bot(bot, args)
+    print("=" * 118)
+    print_results(results)
+
+    scenario = {key: value for key, value in vars(args).items()
+                if key not in ("worker", "x_url", "llm_url", "output", "compare", "tolerance", "timeout")}
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scenario": scenario
+        },
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultados em {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"❌ Regressões: {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ Sem regressões acima da tolerância")
+
+
+if __name__ == "__main__":
+    main()
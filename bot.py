@@ -2,27 +2,42 @@
 # VERSÃO 3.0 - USANDO A API DE STREAMING PARA EFICIÊNCIA MÁXIMA
 
 import tweepy
-import openai
 import time
 import os
 import json
-import requests
 
 # 1. IMPORTAÇÕES E CONFIGURAÇÕES
 from keys import *
 from keyword_prompts import prompts_com_aliases, TARGET_USER_IDS, USER_ID_TO_NAME_MAP
+from tweet_filter import TweetFilter
+from completion_cache import get_completion_cache
+from llm_client import chat_completion
+from rate_limit_registry import install_rate_limit_hook
+from metrics import STAGE_FETCHED, STAGE_FILTERED, STAGE_GENERATED, STAGE_POSTED, get_metrics, install_metrics_hook, start_metrics_server
+from cassette import install_cassette_hook
+from model_router import get_model_router
+from posting_quota import QuotaExceeded, get_posting_quota
+from reply_gate import account_identity, get_reply_gate
+from request_scheduler import get_request_scheduler
+from state_store import get_state_store
+from stream_manager import StreamManager
+from tracing import SPAN_FILTER, SPAN_GENERATE, SPAN_POST, get_tracer
+from work_queue import WorkerPool, work_queue_from_config
+from keyword_prompts_improved import BOT_CONFIG
 
 print("Iniciando o bot com a API de Streaming...")
 
 # Clientes das APIs
 try:
-    openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
     # O cliente do Tweepy precisa de todas as chaves para poder postar respostas
     tweepy_client_for_posting = tweepy.Client(
         bearer_token=X_BEARER_TOKEN, consumer_key=X_API_KEY,
         consumer_secret=X_API_SECRET, access_token=X_ACCESS_TOKEN,
         access_token_secret=X_ACCESS_TOKEN_SECRET
     )
+    install_rate_limit_hook(tweepy_client_for_posting)
+    install_metrics_hook(tweepy_client_for_posting)
+    install_cassette_hook(tweepy_client_for_posting)
     print("Clientes de API inicializados com sucesso.")
 except Exception as e:
     print(f"ERRO CRÍTICO na inicialização: {e}")
@@ -33,107 +48,156 @@ keyword_prompts = {}
 for keywords_tuple, prompt_data in prompts_com_aliases.items():
     for keyword in keywords_tuple:
         keyword_prompts[keyword.lower()] = prompt_data
+tweet_filter = TweetFilter(prompts_com_aliases)
+completion_cache = get_completion_cache()
+model_router = get_model_router()
+posting_quota = get_posting_quota()
+reply_gate = get_reply_gate(*account_identity(tweepy_client_for_posting))
+# Fila limitada entre o leitor do stream e os workers de geração/postagem
+work_queue = work_queue_from_config()
+metrics = get_metrics()
+tracer = get_tracer()
 print(f"Configuração de prompts carregada. {len(keyword_prompts)} gatilhos ativos.")
 
 # 2. FUNÇÃO DE GERAÇÃO DE COMENTÁRIO (Não muda)
-def generate_comment(tweet_text, prompt_template):
-    # Alterna o modelo de forma simples (pode ser aprimorado)
-    model_name = "gpt-4o" if time.time() % 20 > 10 else "grok-1"
+def generate_comment(tweet_text, prompt_template, keyword=None):
+    # Modelo escolhido por orçamento diário, saúde dos provedores e prioridade do tema
+    route = model_router.choose(tweet_text, keyword)
+    model_name = route.model
     print(f"   -> Usando modelo: {model_name}")
+    cached = completion_cache.get(tweet_text, prompt_template, model_name, 0.75)
+    if cached:
+        print("   -> Comentário reaproveitado do cache")
+        return cached
+    if model_name.startswith("gpt"):
+        system_prompt = "Você é um assistente especialista em gerar comentários para a rede social X. Responda de forma concisa e natural."
+    else:
+        system_prompt = "Você é Grok. Gere comentários para o X que sejam concisos, inteligentes e com um toque de humor, conforme instruído."
     try:
-        if model_name.startswith("gpt"):
-            response = openai_client.chat.completions.create(
-                model=model_name, 
-                messages=[
-                    {"role": "system", "content": "Você é um assistente especialista em gerar comentários para a rede social X. Responda de forma concisa e natural."}, 
-                    {"role": "user", "content": prompt_template.format(tweet_text=tweet_text)}
-                ], 
-                max_tokens=70, 
-                temperature=0.75
-            )
-            return response.choices[0].message.content.strip()
-        else:
-            headers = {"Authorization": f"Bearer {XAI_API_KEY}", "Content-Type": "application/json"}
-            payload = {
-                "model": model_name, 
-                "messages": [
-                    {"role": "system", "content": "Você é Grok. Gere comentários para o X que sejam concisos, inteligentes e com um toque de humor, conforme instruído."}, 
-                    {"role": "user", "content": prompt_template.format(tweet_text=tweet_text)}
-                ], 
-                "max_tokens": 70, 
-                "temperature": 0.75
-            }
-            response = requests.post("https://api.x.ai/v1/chat/completions", headers=headers, json=payload, timeout=30)
-            response.raise_for_status()
-            return response.json()["choices"][0]["message"]["content"].strip()
+        response = chat_completion(
+            model_name,
+            [
+                {"role": "system", "content": system_prompt}, 
+                {"role": "user", "content": prompt_template.format(tweet_text=tweet_text)}
+            ], 
+            max_tokens=70, 
+            temperature=0.75,
+            bot="stream_bot",
+            keyword=keyword,
+            route=route.reason
+        )
+        completion_cache.put(tweet_text, prompt_template, model_name, 0.75, response.content, response.total_tokens)
+        return response.content
     except Exception as e:
         print(f"   ERRO: Falha ao gerar comentário com o modelo {model_name}. Detalhes: {e}")
         return None
 
-# 3. A CLASSE DO STREAMING (O NOVO CORAÇÃO DO BOT)
-class BotStreamer(tweepy.StreamingClient):
-    def on_connect(self):
-        print("Conectado com sucesso ao Stream do Twitter/X!")
+# 3. LEITOR DO STREAM: SÓ FILTRA E ENFILEIRA (NUNCA ESPERA POR LLM OU POSTAGEM)
+def handle_tweet(tweet):
+    """
+    Chamada pelo StreamManager uma única vez para cada tweet
+    que corresponde às nossas regras.
+    """
+    author_id = tweet.author_id
+    username = USER_ID_TO_NAME_MAP.get(str(author_id), f"ID {author_id}")
+    
+    print("\n--- NOVO TWEET RECEBIDO ---")
+    print(f"De: {username} (ID: {author_id})")
+    print(f"Texto: {tweet.text}")
+    metrics.count_tweets("stream_bot", STAGE_FETCHED)
 
-    def on_error(self, status_code):
-        print(f"Erro no Stream: {status_code}")
-        # Desconecta se for um erro de autenticação
-        if status_code == 401:
-            return False
+    # Pré-filtro: conteúdo, blacklist e palavras-chave em uma única passada
+    with tracer.span(SPAN_FILTER, tweet_id=tweet.id, user_id=author_id):
+        verdict = tweet_filter.evaluate(tweet.text)
+    if not verdict.accepted:
+        print(f"   -> Tweet descartado pelo pré-filtro ({verdict.reason})")
+        metrics.count_tweets("stream_bot", STAGE_FILTERED)
+        return
+    
+    # A conta pode responder? (reply_settings e conversas que já deram 403)
+    drop_reason = reply_gate.check(tweet)
+    if drop_reason:
+        print(f"   -> Tweet não aceita nossa resposta ({drop_reason})")
+        metrics.count_tweets("stream_bot", STAGE_FILTERED)
+        return
+    
+    match = verdict.best_match
+    if match:
+        print(f"   -> Palavra-chave '{match.keyword}' encontrada!")
+        if not work_queue.put((tweet, match), match.priority):
+            print(f"   -> Fila cheia: tweet {tweet.id} descartado ({work_queue.drop_policy})")
 
-    def on_tweet(self, tweet):
-        """
-        Esta função é chamada AUTOMATICAMENTE toda vez que um tweet
-        que corresponde às nossas regras é postado.
-        """
-        author_id = tweet.author_id
-        username = USER_ID_TO_NAME_MAP.get(str(author_id), f"ID {author_id}")
-        
-        print("\n--- NOVO TWEET RECEBIDO ---")
-        print(f"De: {username} (ID: {author_id})")
-        print(f"Texto: {tweet.text}")
+# 4. WORKERS: GERAÇÃO E POSTAGEM FORA DA THREAD DO STREAM
+def process_tweet(item):
+    started = time.time()
+    try:
+        # Um trace por item da fila; o tweet_id liga ao span de filtro do leitor
+        with tracer.cycle("stream_bot", tweet_id=item[0].id):
+            reply_to(*item)
+    finally:
+        metrics.observe_cycle("stream_bot", time.time() - started)
 
-        # Verifica se alguma palavra-chave está no tweet
-        for keyword, data in keyword_prompts.items():
-            if keyword in tweet.text.lower():
-                print(f"   -> Palavra-chave '{keyword}' encontrada!")
-                
-                comment = generate_comment(tweet.text, data["prompt"])
-                
-                if comment:
-                    print(f"      Modelo gerou: '{comment}'")
-                    try:
-                        # Usa o cliente que criamos para postar a resposta
-                        tweepy_client_for_posting.create_tweet(text=comment, in_reply_to_tweet_id=tweet.id)
-                        print(f"      SUCESSO: Resposta postada ao tweet {tweet.id}!")
-                    except tweepy.errors.TweepyException as e:
-                        print(f"      ERRO: Falha ao postar a resposta no X. Detalhes: {e}")
-                break # Para de procurar outras keywords no mesmo tweet
+def reply_to(tweet, match):
+    # A conversa pode ter dado 403 enquanto o tweet esperava na fila
+    if reply_gate.check(tweet):
+        metrics.count_tweets("stream_bot", STAGE_FILTERED)
+        return
+    
+    with tracer.span(SPAN_GENERATE, tweet_id=tweet.id, keyword=match.keyword):
+        comment = generate_comment(tweet.text, match.prompt, match.keyword)
+    
+    if comment:
+        print(f"      Modelo gerou: '{comment}'")
+        metrics.count_tweets("stream_bot", STAGE_GENERATED)
+        try:
+            # Usa o cliente que criamos para postar a resposta
+            with tracer.span(SPAN_POST, tweet_id=tweet.id):
+                posting_quota.post(tweepy_client_for_posting.create_tweet, text=comment,
+                                   in_reply_to_tweet_id=tweet.id, bot="stream_bot")
+            print(f"      SUCESSO: Resposta postada ao tweet {tweet.id}!")
+            metrics.count_tweets("stream_bot", STAGE_POSTED)
+        except QuotaExceeded as e:
+            print(f"      COTA: Resposta não enviada. {e}")
+        except tweepy.errors.Forbidden as e:
+            print(f"      PROIBIDO: Conversa não aceita nossa resposta. Detalhes: {e}")
+            reply_gate.record_forbidden(tweet)
+        except tweepy.errors.TweepyException as e:
+            print(f"      ERRO: Falha ao postar a resposta no X. Detalhes: {e}")
 
-# 4. LÓGICA PRINCIPAL DE EXECUÇÃO
+# 5. LÓGICA PRINCIPAL DE EXECUÇÃO
 if __name__ == "__main__":
-    # Inicializa o nosso streamer. Ele precisa do Bearer Token para ouvir o stream.
-    streamer = BotStreamer(X_BEARER_TOKEN)
+    # Regras divididas no limite de tamanho; só a diferença para as instaladas é aplicada.
+    # Quedas reconectam com backoff e a lacuna é preenchida a partir do último ID entregue.
+    manager = StreamManager(
+        X_BEARER_TOKEN, handle_tweet,
+        keywords=keyword_prompts.keys(), user_ids=TARGET_USER_IDS,
+        search_client=tweepy_client_for_posting, api_call=get_request_scheduler().call,
+        state_store=get_state_store(), scope="stream_bot"
+    )
+    print(f"\n{len(manager.rules)} regra(s) do stream:")
+    for rule in manager.rules:
+        print(f"-> {rule}")
 
-    # Limpa as regras antigas para garantir que estamos começando do zero
-    rules = streamer.get_rules().data
-    if rules:
-        rule_ids = [rule.id for rule in rules]
-        streamer.delete_rules(rule_ids)
-        print("Regras antigas do stream foram limpas.")
+    # Profundidade e atraso da fila lidos a cada scrape
+    queue_depth = metrics.gauge("work_queue_depth", "Itens aguardando geração/postagem")
+    queue_lag = metrics.gauge("work_queue_lag_seconds", "Atraso na fila (p95 recente) e idade do item mais antigo")
+    def collect_queue():
+        stats = work_queue.get_stats()
+        queue_depth.set(stats["depth"], bot="stream_bot")
+        queue_lag.set(stats["lag_p95_seconds"], bot="stream_bot", quantile="p95")
+        queue_lag.set(stats["oldest_age_seconds"], bot="stream_bot", quantile="oldest")
+    metrics.add_collector(collect_queue)
+    start_metrics_server(BOT_CONFIG.get("metrics_ports", {}).get("stream_bot", 0))
 
-    # Constrói a nova regra de filtragem
-    # Formato: (palavra1 OR palavra2) (from:usuario1 OR from:usuario2)
-    keyword_rule = f"({' OR '.join(keyword_prompts.keys())})"
-    user_rule = f"({' OR '.join([f'from:{user_id}' for user_id in TARGET_USER_IDS])})"
-    
-    final_rule = f"{keyword_rule} {user_rule}"
-    
-    # Adiciona a nova regra ao stream do Twitter
-    streamer.add_rules(tweepy.StreamRule(value=final_rule, tag="regra_principal"))
-    print("\nNova regra do stream configurada:")
-    print(f"-> {final_rule}")
+    workers = WorkerPool(work_queue, process_tweet, BOT_CONFIG.get("work_queue_workers", 2), name="stream_bot").start()
 
-    # Inicia o filtro. O código ficará aqui, ouvindo indefinidamente.
+    # O código ficará aqui, ouvindo indefinidamente.
     print("\nOuvindo o stream de tweets... (Pressione Ctrl+C para parar)")
-    streamer.filter(tweet_fields=["author_id"])
\ No newline at end of file
+    try:
+        manager.run()
+    except KeyboardInterrupt:
+        manager.stop()
+    print(f"Stream encerrado: {manager.get_stats()}")
+    print("Aguardando os workers terminarem a fila...")
+    workers.stop(timeout=120)
+    print(f"Fila: {workers.get_stats()}")
@@ -2,45 +2,73 @@
 # VERSÃO 4.0 - BOT INTELIGENTE COM ECONOMIA DE TOKENS E MELHOR PERFORMANCE
 
 import tweepy
-import openai
-import requests
 import time
 import os
-import json
-import hashlib
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Set
 import logging
+from log_setup import setup_logging
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configuração de logging: fila + JSON lines com rotação (log_setup.py)
+setup_logging('bot.log')
 logger = logging.getLogger(__name__)
 
 # Importações locais
 from keys import *
 from keyword_prompts import prompts_com_aliases, TARGET_USER_IDS, USER_ID_TO_NAME_MAP
+from state_store import get_state_store
+from dedup_cache import ProcessedIdCache
+from tweet_filter import TweetFilter
+from timeline_ingest import SearchTimelineIngestor
+from poll_scheduler import PollScheduler, tweet_times
+from completion_cache import get_completion_cache
+from llm_client import chat_completion
+from token_ledger import count_tokens
+from rate_limit_registry import install_rate_limit_hook
+from metrics import STAGE_FETCHED, STAGE_FILTERED, STAGE_GENERATED, STAGE_POSTED, get_metrics, install_metrics_hook, start_metrics_server
+from cassette import install_cassette_hook
+from request_scheduler import get_request_scheduler
+from posting_quota import QuotaExceeded, Reservation, get_posting_quota
+from reply_gate import REPLY_TWEET_FIELDS, account_identity, get_reply_gate
+from stream_manager import DELIVERY_DEFERRED, StreamManager
+from tracing import SPAN_FETCH, SPAN_FILTER, SPAN_GENERATE, SPAN_POST, SPAN_SLEEP, get_tracer
+from model_router import get_model_router
+from work_queue import DROP_EXPIRED, WorkerPool, work_queue_from_config
+from keyword_prompts_improved import BOT_CONFIG
+
+STATE_SCOPE = "smart_bot"
+REPLY_MAX_TOKENS = 60  # Reduzido para economizar
+
+# Watermark compartilhado da busca em lote (convive com os IDs por usuário)
+SEARCH_WATERMARK_KEY = "__search__"
 
 class SmartXBot:
     def __init__(self):
         self.setup_clients()
         self.setup_prompts()
         self.load_state()
-        self.response_cache = {}  # Cache para evitar respostas duplicadas
+        # Espera exata por endpoint, pelo saldo informado nos cabeçalhos da API
+        self.request_scheduler = get_request_scheduler()
+        self.posting_quota = get_posting_quota()
+        self.reply_gate = get_reply_gate(*account_identity(self.twitter_client))
+        self.timeline_ingestor = SearchTimelineIngestor(
+            self.twitter_client,
+            TARGET_USER_IDS,
+            max_query_length=BOT_CONFIG.get("search_query_max_length", 512),
+            api_call=self.request_scheduler.call
+        )
+        # Agenda de polling por conta, com o ritmo aprendido em execuções anteriores
+        self.poll_scheduler = PollScheduler(TARGET_USER_IDS)
+        self.poll_scheduler.restore(self.state_store.load_document(STATE_SCOPE, "poll_scheduler"))
+        self.completion_cache = get_completion_cache()
+        self.model_router = get_model_router()
+        self.metrics = get_metrics()
+        self.tracer = get_tracer()
         self.rate_limit_tracker = {}
         
     def setup_clients(self):
         """Inicializa clientes das APIs com tratamento de erro robusto"""
         try:
-            # Cliente OpenAI
-            self.openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-            
             # Cliente X/Twitter para posting (v2)
             self.twitter_client = tweepy.Client(
                 bearer_token=X_BEARER_TOKEN,
@@ -50,6 +78,9 @@ class SmartXBot:
                 access_token_secret=X_ACCESS_TOKEN_SECRET,
                 wait_on_rate_limit=True  # Aguarda automaticamente quando atinge rate limit
             )
+            install_rate_limit_hook(self.twitter_client)
+            install_metrics_hook(self.twitter_client)
+            install_cassette_hook(self.twitter_client)
             
             logger.info("✅ Clientes de API inicializados com sucesso")
             
@@ -64,29 +95,24 @@ class SmartXBot:
             for keyword in keywords_tuple:
                 self.keyword_prompts[keyword.lower()] = prompt_data
         
+        # Pré-filtro compilado uma vez: conteúdo e palavras-chave em uma passada
+        self.tweet_filter = TweetFilter(prompts_com_aliases)
+        
         logger.info(f"📝 {len(self.keyword_prompts)} prompts carregados para {len(TARGET_USER_IDS)} usuários")
     
     def load_state(self):
         """Carrega estado persistente do bot"""
+        self.state_store = get_state_store()
+        
         # IDs dos últimos tweets vistos
-        try:
-            with open("last_seen_ids.json", "r") as f:
-                self.last_seen_ids = json.load(f)
-        except FileNotFoundError:
-            self.last_seen_ids = {}
+        self.last_seen_ids = self.state_store.load_watermarks(STATE_SCOPE)
         
         # Cache de tweets já processados (evita duplicatas)
-        try:
-            with open("processed_tweets.json", "r") as f:
-                self.processed_tweets = set(json.load(f))
-        except FileNotFoundError:
-            self.processed_tweets = set()
+        self.processed_tweets = ProcessedIdCache.from_state_store(self.state_store, STATE_SCOPE)
         
         # Estatísticas do bot
-        try:
-            with open("bot_stats.json", "r") as f:
-                self.stats = json.load(f)
-        except FileNotFoundError:
+        self.stats = self.state_store.load_counters(STATE_SCOPE)
+        if not self.stats:
             self.stats = {
                 "tweets_processed": 0,
                 "responses_sent": 0,
@@ -95,49 +121,27 @@ class SmartXBot:
             }
     
     def save_state(self):
-        """Salva estado persistente"""
-        with open("last_seen_ids.json", "w") as f:
-            json.dump(self.last_seen_ids, f, indent=2)
-        
-        with open("processed_tweets.json", "w") as f:
-            json.dump(list(self.processed_tweets), f)
-        
-        with open("bot_stats.json", "w") as f:
-            json.dump(self.stats, f, indent=2)
+        """Salva estado persistente (upserts incrementais no SQLite)"""
+        with self.state_store.transaction():
+            self.state_store.save_watermarks(STATE_SCOPE, self.last_seen_ids)
+            self.state_store.save_counters(STATE_SCOPE, self.stats)
+            self.state_store.save_document(STATE_SCOPE, "poll_scheduler", self.poll_scheduler.snapshot())
+            self.state_store.flush()
+    
+    def mark_processed(self, tweet_id):
+        """Marca tweet como processado (gravado no próximo save_state)"""
+        self.processed_tweets.add(tweet_id)
     
     def is_worth_responding(self, tweet_text: str, user_id: str) -> bool:
         """
         INTELIGÊNCIA PARA ECONOMIZAR TOKENS
         Decide se vale a pena gastar tokens respondendo a um tweet
-        """
-        # Filtros básicos para economizar tokens
         
-        # 1. Tweet muito curto (provavelmente não tem conteúdo substancial)
-        if len(tweet_text.strip()) < 20:
-            return False
-        
-        # 2. Tweet é apenas RT sem comentário
-        if tweet_text.startswith("RT @") and len(tweet_text.split(":")) < 2:
-            return False
-        
-        # 3. Tweet tem muitas hashtags (provavelmente spam)
-        hashtag_count = tweet_text.count("#")
-        if hashtag_count > 5:
-            return False
-        
-        # 4. Tweet tem muitas menções (provavelmente conversa privada)
-        mention_count = tweet_text.count("@")
-        if mention_count > 3:
-            return False
-        
-        # 5. Tweet é muito similar a outros recentes (evita spam)
-        tweet_hash = hashlib.md5(tweet_text.lower().encode()).hexdigest()
-        if tweet_hash in self.response_cache:
-            cache_time = self.response_cache[tweet_hash]
-            if datetime.now() - cache_time < timedelta(hours=6):
-                return False
-        
-        # 6. Verifica se o usuário não está postando demais
+        Os filtros de conteúdo (tamanho, RT, hashtags, menções, blacklist e
+        palavras-chave) já foram aplicados pelo TweetFilter; aqui ficam apenas
+        os filtros que dependem do estado do bot.
+        """
+        # Verifica se o usuário não está postando demais
         user_posts_today = self.get_user_post_count_today(user_id)
         if user_posts_today > 10:  # Limite de respostas por usuário por dia
             return False
@@ -158,107 +162,145 @@ class SmartXBot:
             self.stats["daily_responses"] = {}
         self.stats["daily_responses"][key] = self.stats["daily_responses"].get(key, 0) + 1
     
-    def generate_smart_comment(self, tweet_text: str, prompt_template: str, user_id: str) -> Optional[str]:
+    def generate_smart_comment(self, tweet_text: str, prompt_template: str, user_id: str,
+                               keyword: Optional[str] = None) -> Optional[str]:
         """
         Geração inteligente de comentários com alternância de modelos e cache
         """
-        # Verifica cache primeiro
-        cache_key = hashlib.md5(f"{tweet_text}{prompt_template}".encode()).hexdigest()
+        # Escolhe modelo por orçamento, saúde dos provedores e prioridade do tema
+        route = self.model_router.choose(tweet_text, keyword)
+        model_name = route.model
         
-        # Escolhe modelo baseado em critérios inteligentes
-        model_name = self.choose_optimal_model(tweet_text, user_id)
+        # Verifica cache primeiro (mesmo texto, template, modelo e temperatura)
+        cached = self.completion_cache.get(tweet_text, prompt_template, model_name, 0.7)
+        if cached:
+            return cached
+        
+        if model_name.startswith("gpt"):
+            system_prompt = "Você é um assistente especialista em gerar comentários concisos e inteligentes para X/Twitter. Seja natural, relevante e dentro do limite de caracteres."
+        else:  # Grok
+            system_prompt = "Você é Grok. Gere comentários concisos e inteligentes para X com seu toque característico de humor."
         
         try:
-            if model_name.startswith("gpt"):
-                response = self.openai_client.chat.completions.create(
-                    model=model_name,
-                    messages=[
-                        {
-                            "role": "system", 
-                            "content": "Você é um assistente especialista em gerar comentários concisos e inteligentes para X/Twitter. Seja natural, relevante e dentro do limite de caracteres."
-                        },
-                        {
-                            "role": "user", 
-                            "content": prompt_template.format(tweet_text=tweet_text)
-                        }
-                    ],
-                    max_tokens=60,  # Reduzido para economizar
-                    temperature=0.7
-                )
-                comment = response.choices[0].message.content.strip()
-                self.stats["tokens_used"] += response.usage.total_tokens
-                
-            else:  # Grok
-                headers = {
-                    "Authorization": f"Bearer {XAI_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-                payload = {
-                    "model": model_name,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "Você é Grok. Gere comentários concisos e inteligentes para X com seu toque característico de humor."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt_template.format(tweet_text=tweet_text)
-                        }
-                    ],
-                    "max_tokens": 60,
-                    "temperature": 0.7
-                }
-                
-                response = requests.post(
-                    "https://api.x.ai/v1/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=30
-                )
-                response.raise_for_status()
-                comment = response.json()["choices"][0]["message"]["content"].strip()
-                self.stats["tokens_used"] += 60  # Estimativa para Grok
+            response = chat_completion(
+                model_name,
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt_template.format(tweet_text=tweet_text)}
+                ],
+                max_tokens=REPLY_MAX_TOKENS,
+                temperature=0.7,
+                bot=STATE_SCOPE,
+                keyword=keyword,
+                route=route.reason
+            )
+            comment = response.content
+            tokens_used = response.total_tokens
+            
+            self.stats["tokens_used"] += tokens_used
             
             # Adiciona ao cache
-            self.response_cache[cache_key] = datetime.now()
+            self.completion_cache.put(tweet_text, prompt_template, model_name, 0.7, comment, tokens_used)
             
-            logger.info(f"💬 Comentário gerado com {model_name}: '{comment[:50]}...'")
+            logger.info("💬 Comentário gerado com %s: '%.50s...'", model_name, comment,
+                        extra={"user_id": user_id, "keyword": keyword, "model": model_name,
+                               "latency_ms": round(response.latency * 1000)})
             return comment
             
         except Exception as e:
             logger.error(f"❌ Erro ao gerar comentário com {model_name}: {e}")
             return None
     
-    def choose_optimal_model(self, tweet_text: str, user_id: str) -> str:
+    def check_and_reply_smart(self, user_ids: Optional[List[str]] = None):
         """
-        Escolhe o modelo mais adequado baseado no contexto
+        Versão inteligente da verificação e resposta
+        
+        `user_ids` são as contas vencidas no agendador (padrão: todas).
         """
-        # Critérios para escolha do modelo:
+        user_ids = user_ids or TARGET_USER_IDS
+        logger.info(f"🔍 Iniciando verificação inteligente ({len(user_ids)} contas)...")
+        cycle_start = time.time()
         
-        # 1. Para tweets políticos complexos, usa GPT-4
-        political_keywords = ["governo", "política", "eleição", "democracia", "congresso"]
-        if any(keyword in tweet_text.lower() for keyword in political_keywords):
-            return "gpt-4o"
+        if BOT_CONFIG.get("ingestion_mode") == "search":
+            self.check_timelines_batched(user_ids)
+        else:
+            self.check_timelines_per_user(user_ids)
         
-        # 2. Para tweets mais casuais ou humorísticos, usa Grok
-        casual_indicators = ["kkkk", "haha", "😂", "🤣", "meme"]
-        if any(indicator in tweet_text.lower() for indicator in casual_indicators):
-            return "grok-1"
+        # Salva estado após cada ciclo
+        self.save_state()
+        self.cleanup_old_data()
+        self.metrics.observe_cycle(STATE_SCOPE, time.time() - cycle_start)
         
-        # 3. Alternância baseada no tempo para distribuir carga
-        hour = datetime.now().hour
-        if hour % 2 == 0:
-            return "gpt-4o"
-        else:
-            return "grok-1"
+        logger.info(f"✅ Ciclo completo. Stats: {self.stats['responses_sent']} respostas enviadas, {self.stats['tokens_used']} tokens usados")
+        logger.info(f"🧹 Pré-filtro: {self.tweet_filter.get_stats()}")
+        logger.info(f"♻️  Cache de completions: {self.completion_cache.get_stats()}")
+        logger.info(f"🎟️ Cota de postagens: {self.posting_quota.get_status()}")
+        logger.info(f"🔒 Portão de resposta: {self.reply_gate.get_stats()}")
     
-    def check_and_reply_smart(self):
+    def check_timelines_batched(self, user_ids: List[str]):
         """
-        Versão inteligente da verificação e resposta
+        Busca as contas com poucas queries de search_recent_tweets
+        (vários from: por query) e um since_id compartilhado
         """
-        logger.info("🔍 Iniciando verificação inteligente...")
+        shared_since_id = self.last_seen_ids.get(SEARCH_WATERMARK_KEY)
+        full_scan = set(user_ids) >= set(TARGET_USER_IDS)
+        if full_scan:
+            since_id = shared_since_id
+        else:
+            # O mais antigo entre os watermarks das contas consultadas
+            since_id = min(
+                (self.last_seen_ids.get(user_id) or shared_since_id or 0 for user_id in user_ids),
+                default=0
+            ) or None
+        
+        requests_before = self.timeline_ingestor.requests_made
+        try:
+            with self.tracer.span(SPAN_FETCH, method="search_recent_tweets", accounts=len(user_ids)):
+                tweets_by_author = self.timeline_ingestor.fetch(
+                    since_id=since_id,
+                    user_ids=None if full_scan else user_ids
+                )
+        except tweepy.TooManyRequests:
+            logger.warning("⚠️  Rate limit atingido na busca em lote")
+            return
+        finally:
+            self.poll_scheduler.record_requests(self.timeline_ingestor.requests_made - requests_before)
+        
+        # Até onde a busca cobriu sem buracos (não avança se foi truncada)
+        covered_id = self.timeline_ingestor.watermark(tweets_by_author, since_id)
         
-        for user_id in TARGET_USER_IDS:
+        now = time.time()
+        for user_id in user_ids:
+            tweets = tweets_by_author.get(user_id, [])
+            self.poll_scheduler.record_poll(user_id, tweet_times(tweets, now), now)
+        
+        if not tweets_by_author:
+            logger.info("📭 Nenhum tweet novo das contas consultadas")
+        
+        for user_id, tweets in tweets_by_author.items():
+            username = USER_ID_TO_NAME_MAP.get(user_id, f"ID:{user_id}")
+            try:
+                self.process_user_tweets(user_id, tweets)
+            except Exception as e:
+                logger.error(f"❌ Erro ao processar {username}: {e}")
+        
+        # Só avança sobre o que foi tratado: tweets recusados pela cota ou
+        # pelo limite por ciclo seguram o watermark logo abaixo deles
+        settled_id = self.timeline_ingestor.settled_watermark(covered_id, tweets_by_author, self.last_seen_ids)
+        if settled_id and full_scan:
+            self.last_seen_ids[SEARCH_WATERMARK_KEY] = max(int(since_id or 0), settled_id)
+        
+        if covered_id:
+            for user_id in user_ids:
+                # A busca cobriu a conta até covered_id, mesmo que ela não tenha postado
+                pending = [tweet for tweet in tweets_by_author.get(user_id, [])
+                           if int(tweet.id) > self.last_seen_ids.get(user_id, 0)]
+                if not pending:
+                    self.advance_watermark(user_id, covered_id)
+    
+    def check_timelines_per_user(self, user_ids: List[str]):
+        """Modo antigo: um get_users_tweets por conta monitorada"""
+        for user_id in user_ids:
             username = USER_ID_TO_NAME_MAP.get(user_id, f"ID:{user_id}")
             
             try:
@@ -270,71 +312,23 @@ class SmartXBot:
                 last_id = self.last_seen_ids.get(user_id)
                 
                 # Busca tweets mais recentes
-                response = self.twitter_client.get_users_tweets(
-                    id=user_id,
-                    since_id=last_id,
-                    max_results=10,  # Aumentado para capturar mais tweets
-                    tweet_fields=["created_at", "text", "public_metrics"],
-                    exclude=["retweets", "replies"]  # Exclui RTs e replies para focar em conteúdo original
-                )
+                self.poll_scheduler.record_requests(1)
+                with self.tracer.span(SPAN_FETCH, method="get_users_tweets", user_id=user_id):
+                    response = self.request_scheduler.call(
+                        self.twitter_client.get_users_tweets,
+                        id=user_id,
+                        since_id=last_id,
+                        max_results=10,  # Aumentado para capturar mais tweets
+                        tweet_fields=REPLY_TWEET_FIELDS,
+                        exclude=["retweets", "replies"]  # Exclui RTs e replies para focar em conteúdo original
+                    )
+                self.poll_scheduler.record_poll(user_id, tweet_times(response.data or [], time.time()))
                 
                 if not response.data:
                     logger.info(f"📭 Nenhum tweet novo de {username}")
                     continue
                 
-                # Processa tweets em ordem cronológica
-                tweets = sorted(response.data, key=lambda x: x.created_at)
-                processed_count = 0
-                
-                for tweet in tweets:
-                    # Atualiza último ID visto
-                    self.last_seen_ids[user_id] = max(
-                        self.last_seen_ids.get(user_id, 0), 
-                        int(tweet.id)
-                    )
-                    
-                    # Verifica se já processamos este tweet
-                    if tweet.id in self.processed_tweets:
-                        continue
-                    
-                    # Filtro inteligente para economizar tokens
-                    if not self.is_worth_responding(tweet.text, user_id):
-                        logger.info(f"⏭️  Tweet {tweet.id} filtrado (não vale a pena responder)")
-                        self.processed_tweets.add(tweet.id)
-                        continue
-                    
-                    # Procura palavras-chave
-                    keyword_found = None
-                    for keyword, prompt_data in self.keyword_prompts.items():
-                        if keyword in tweet.text.lower():
-                            keyword_found = keyword
-                            break
-                    
-                    if keyword_found:
-                        logger.info(f"🎯 Palavra-chave '{keyword_found}' encontrada em tweet de {username}")
-                        
-                        # Gera e posta resposta
-                        comment = self.generate_smart_comment(
-                            tweet.text, 
-                            self.keyword_prompts[keyword_found]["prompt"],
-                            user_id
-                        )
-                        
-                        if comment and self.post_reply(tweet.id, comment):
-                            processed_count += 1
-                            self.increment_user_post_count(user_id)
-                            self.stats["responses_sent"] += 1
-                            
-                            # Limite de respostas por ciclo para evitar spam
-                            if processed_count >= 2:
-                                logger.info(f"🛑 Limite de respostas por ciclo atingido para {username}")
-                                break
-                    
-                    self.processed_tweets.add(tweet.id)
-                    self.stats["tweets_processed"] += 1
-                
-                # Pausa entre usuários
-                time.sleep(3)
+                self.process_user_tweets(user_id, response.data)
                 
             except tweepy.TooManyRequests:
                 logger.warning(f"⚠️  Rate limit atingido para {username}")
@@ -343,25 +337,143 @@ class SmartXBot:
             except Exception as e:
                 logger.error(f"❌ Erro ao processar {username}: {e}")
                 continue
+    
+    def process_user_tweets(self, user_id: str, tweets: List) -> Optional[int]:
+        """
+        Filtra, gera e posta respostas para os tweets novos de um usuário
+
+        Retorna o maior ID tratado (respondido ou descartado de vez); os tweets
+        acima dele ficaram para depois (cota esgotada ou limite por ciclo).
+        """
+        username = USER_ID_TO_NAME_MAP.get(user_id, f"ID:{user_id}")
         
-        # Salva estado após cada ciclo
-        self.save_state()
-        self.cleanup_old_data()
+        # Processa tweets em ordem cronológica
+        tweets = sorted(tweets, key=lambda x: int(x.id))
+        processed_count = 0
+        handled_id = None
+        self.metrics.count_tweets(STATE_SCOPE, STAGE_FETCHED, len(tweets))
         
-        logger.info(f"✅ Ciclo completo. Stats: {self.stats['responses_sent']} respostas enviadas, {self.stats['tokens_used']} tokens usados")
+        for tweet in tweets:
+            # Verifica se já processamos este tweet
+            if tweet.id in self.processed_tweets:
+                self.advance_watermark(user_id, tweet.id)
+                handled_id = int(tweet.id)
+                continue
+            
+            # Pré-filtro em uma passada (conteúdo + palavras-chave)
+            with self.tracer.span(SPAN_FILTER, tweet_id=tweet.id, user_id=user_id) as span:
+                verdict = self.tweet_filter.evaluate(tweet.text)
+                span.set(accepted=verdict.accepted)
+            if not verdict.accepted:
+                logger.info("⏭️  Tweet %s filtrado (%s)", tweet.id, verdict.reason,
+                            extra={"tweet_id": tweet.id, "user_id": user_id})
+                self.metrics.count_tweets(STATE_SCOPE, STAGE_FILTERED)
+                self.mark_processed(tweet.id)
+                self.advance_watermark(user_id, tweet.id)
+                self.stats["tweets_processed"] += 1
+                handled_id = int(tweet.id)
+                continue
+            
+            # Filtro inteligente para economizar tokens
+            if not self.is_worth_responding(tweet.text, user_id):
+                logger.info("⏭️  Tweet %s filtrado (não vale a pena responder)", tweet.id,
+                            extra={"tweet_id": tweet.id, "user_id": user_id})
+                self.metrics.count_tweets(STATE_SCOPE, STAGE_FILTERED)
+                self.mark_processed(tweet.id)
+                self.advance_watermark(user_id, tweet.id)
+                handled_id = int(tweet.id)
+                continue
+            
+            # A conta pode responder? (reply_settings e conversas que já deram 403)
+            drop_reason = self.reply_gate.check(tweet)
+            if drop_reason:
+                logger.info("🔒 Tweet %s não aceita nossa resposta (%s)", tweet.id, drop_reason,
+                            extra={"tweet_id": tweet.id, "user_id": user_id})
+                self.metrics.count_tweets(STATE_SCOPE, STAGE_FILTERED)
+                self.mark_processed(tweet.id)
+                self.advance_watermark(user_id, tweet.id)
+                handled_id = int(tweet.id)
+                continue
+            
+            # Palavra-chave de maior prioridade
+            match = verdict.best_match
+            
+            if match:
+                logger.info("🎯 Palavra-chave '%s' encontrada em tweet de %s", match.keyword, username,
+                            extra={"tweet_id": tweet.id, "user_id": user_id, "keyword": match.keyword})
+                
+                # Reserva a vaga de postagem antes de gastar tokens
+                try:
+                    reservation = self.posting_quota.reserve(
+                        STATE_SCOPE,
+                        estimated_tokens=count_tokens(match.prompt.format(tweet_text=tweet.text)) + REPLY_MAX_TOKENS
+                    )
+                except QuotaExceeded as e:
+                    # Marca d'água fica no último tweet tratado: este e os seguintes voltam na próxima busca
+                    logger.info(f"⏸️ Cota de postagens: {e}, geração não iniciada")
+                    break
+                
+                # Gera e posta resposta
+                with self.tracer.span(SPAN_GENERATE, tweet_id=tweet.id, keyword=match.keyword):
+                    comment = self.generate_smart_comment(
+                        tweet.text, 
+                        match.prompt,
+                        user_id,
+                        keyword=match.keyword
+                    )
+                
+                self.metrics.count_tweets(STATE_SCOPE, STAGE_GENERATED, bool(comment))
+                posted = bool(comment) and self.post_reply(tweet.id, comment, reservation, tweet.conversation_id)
+                self.posting_quota.release(reservation)  # Nada a devolver se a postagem saiu
+                if posted:
+                    processed_count += 1
+                    self.increment_user_post_count(user_id)
+                    self.stats["responses_sent"] += 1
+                    
+                    # Limite de respostas por ciclo para evitar spam
+                    if processed_count >= 2:
+                        logger.info(f"🛑 Limite de respostas por ciclo atingido para {username}")
+                        self.mark_processed(tweet.id)
+                        self.advance_watermark(user_id, tweet.id)
+                        self.stats["tweets_processed"] += 1
+                        handled_id = int(tweet.id)
+                        break
+            
+            self.mark_processed(tweet.id)
+            self.advance_watermark(user_id, tweet.id)
+            self.stats["tweets_processed"] += 1
+            handled_id = int(tweet.id)
+        
+        return handled_id
+    
+    def advance_watermark(self, user_id: str, tweet_id) -> None:
+        """Avança o since_id do usuário só depois que o tweet foi respondido ou descartado de vez"""
+        self.last_seen_ids[user_id] = max(self.last_seen_ids.get(user_id, 0), int(tweet_id))
     
-    def post_reply(self, tweet_id: str, comment: str) -> bool:
-        """Posta resposta com tratamento de erro robusto"""
+    def post_reply(self, tweet_id: str, comment: str, reservation: Optional[Reservation] = None,
+                   conversation_id: Optional[str] = None) -> bool:
+        """Posta resposta com tratamento de erro robusto (na vaga reservada, se houver)"""
         try:
-            self.twitter_client.create_tweet(
-                text=comment,
-                in_reply_to_tweet_id=tweet_id
-            )
-            logger.info(f"✅ Resposta postada ao tweet {tweet_id}")
+            with self.tracer.span(SPAN_POST, tweet_id=tweet_id):
+                self.posting_quota.post(
+                    self.request_scheduler.call,
+                    self.twitter_client.create_tweet,
+                    text=comment,
+                    in_reply_to_tweet_id=tweet_id,
+                    bot=STATE_SCOPE,
+                    reservation=reservation
+                )
+            logger.info("✅ Resposta postada ao tweet %s", tweet_id, extra={"tweet_id": tweet_id})
+            self.metrics.count_tweets(STATE_SCOPE, STAGE_POSTED)
             return True
             
+        except QuotaExceeded as e:
+            logger.warning(f"⏸️ Cota de postagens: {e}")
+            return False
+            
         except tweepy.Forbidden as e:
             logger.error(f"🚫 Resposta proibida ao tweet {tweet_id}: {e}")
+            self.reply_gate.record_forbidden(conversation_id=conversation_id or tweet_id)
             return False
             
         except tweepy.TooManyRequests:
@@ -385,15 +497,8 @@ class SmartXBot:
     def cleanup_old_data(self):
         """Limpa dados antigos para manter performance"""
         # Remove tweets processados há mais de 7 dias
-        cutoff = datetime.now() - timedelta(days=7)
-        
-        # Limpa cache de respostas antigas
-        old_keys = [
-            key for key, timestamp in self.response_cache.items()
-            if timestamp < cutoff
-        ]
-        for key in old_keys:
-            del self.response_cache[key]
+        self.processed_tweets.evict_expired()
+        self.processed_tweets.prune_store()
         
         # Limpa contadores diários antigos
         if "daily_responses" in self.stats:
@@ -405,19 +510,107 @@ class SmartXBot:
             for key in old_dates:
                 del self.stats["daily_responses"][key]
     
+    def handle_stream_tweet(self, tweet):
+        """
+        Tweet entregue pelo filtered stream (ou pelo backfill após uma queda)
+
+        Roda na thread do leitor: só enfileira. Filtro, LLM e postagem ficam
+        com o worker, que confirma o tweet ao StreamManager no fim.
+        """
+        verdict = self.tweet_filter.evaluate(tweet.text)
+        priority = verdict.best_match.priority if verdict.best_match else None
+        if not self.work_queue.put(tweet, priority):
+            logger.info(f"🚦 Fila cheia: tweet {tweet.id} volta no próximo backfill")
+            return False
+        return DELIVERY_DEFERRED
+    
+    def process_stream_tweet(self, tweet) -> bool:
+        """
+        Processa um tweet do stream (no worker)
+
+        False se ficou para depois (cota esgotada): o StreamManager não avança
+        o watermark sobre ele e o entrega de novo no próximo backfill.
+        """
+        with self.tracer.cycle(STATE_SCOPE, tweet_id=tweet.id):
+            handled_id = self.process_user_tweets(str(tweet.author_id), [tweet])
+            self.save_state()
+        return handled_id is not None and handled_id >= int(tweet.id)
+    
+    def stream_worker(self, tweet):
+        """Handler do WorkerPool: processa e confirma o tweet ao StreamManager"""
+        handled = True
+        try:
+            handled = self.process_stream_tweet(tweet)
+        except Exception as e:
+            # Erro não é recusa: reentregar só repetiria o erro
+            logger.error(f"❌ Erro ao processar tweet {tweet.id} do stream: {e}")
+        if handled:
+            self.stream_manager.ack(tweet.id)
+        else:
+            self.stream_manager.refuse(tweet.id)
+    
+    def on_stream_drop(self, tweet, reason: str):
+        """Tweet que saiu da fila sem ser processado"""
+        if reason == DROP_EXPIRED:
+            # Velho demais para valer os tokens: descartado de vez, como no bot.py
+            self.mark_processed(tweet.id)
+            self.stream_manager.ack(tweet.id)
+        else:
+            self.stream_manager.refuse(tweet.id)
+    
+    def run_stream(self):
+        """Ingestão por filtered stream: sem polling, sem custo de leitura por ciclo"""
+        self.stream_manager = StreamManager(
+            X_BEARER_TOKEN, self.handle_stream_tweet,
+            keywords=self.keyword_prompts.keys(), user_ids=TARGET_USER_IDS,
+            search_client=self.twitter_client, api_call=self.request_scheduler.call,
+            state_store=self.state_store, scope=STATE_SCOPE
+        )
+        self.work_queue = work_queue_from_config(on_drop=self.on_stream_drop)
+        # Um worker: process_user_tweets altera o estado do bot sem travas
+        workers = WorkerPool(self.work_queue, self.stream_worker, 1, name=STATE_SCOPE).start()
+        logger.info(f"📡 Filtered stream com {len(self.stream_manager.rules)} regra(s)")
+        try:
+            self.stream_manager.run()
+        except KeyboardInterrupt:
+            logger.info("👋 Bot encerrado pelo usuário")
+            self.stream_manager.stop()
+        workers.stop()
+        self.save_state()
+        logger.info(f"📡 Stream: {self.stream_manager.get_stats()}")
+        logger.info(f"👷 Fila: {workers.get_stats()}")
+    
     def run(self):
         """Loop principal do bot"""
         logger.info("🚀 Bot inteligente iniciado!")
+        start_metrics_server(BOT_CONFIG.get("metrics_ports", {}).get(STATE_SCOPE, 0))
+        if BOT_CONFIG.get("ingestion_mode") == "stream":
+            self.run_stream()
+            return
         
         while True:
             try:
-                self.check_and_reply_smart()
+                # Apenas as contas cujo poll venceu; no modo por usuário cada
+                # conta custa uma requisição, então o orçamento limita a lista
+                budget = self.poll_scheduler.budget_remaining()
+                if BOT_CONFIG.get("ingestion_mode") == "search":
+                    due = self.poll_scheduler.due() if budget != 0 else []
+                else:
+                    due = self.poll_scheduler.due(limit=budget)
                 
-                # Intervalo inteligente baseado na atividade
-                next_check = datetime.now() + timedelta(minutes=10)
-                logger.info(f"😴 Próxima verificação às {next_check.strftime('%H:%M:%S')}")
-                
-                time.sleep(600)  # 10 minutos
+                # Um trace por ciclo, incluindo o sleep até o próximo
+                with self.tracer.cycle(STATE_SCOPE, accounts=len(due)):
+                    if due:
+                        self.check_and_reply_smart(due)
+                        logger.info(f"📊 Agendador: {self.poll_scheduler.get_stats()}")
+                    
+                    # Intervalo inteligente baseado na atividade de cada conta
+                    wait = max(1.0, self.poll_scheduler.seconds_until_next())
+                    next_check = datetime.now() + timedelta(seconds=wait)
+                    logger.info(f"😴 Próxima verificação às {next_check.strftime('%H:%M:%S')}")
+                    
+                    with self.tracer.span(SPAN_SLEEP, seconds=round(wait, 1)):
+                        time.sleep(wait)
                 
             except KeyboardInterrupt:
                 logger.info("👋 Bot encerrado pelo usuário")
@@ -127,28 +127,23 @@ class BotManager:
                     except:
                         pass
                 
-                # Verifica arquivos de estado
-                if bot_id == "mention_bot":
-                    stats_file = "model_usage_stats.json"
-                    if os.path.exists(stats_file):
-                        try:
-                            with open(stats_file, 'r') as f:
-                                stats = json.load(f)
-                                total = stats.get('chatgpt_uses', 0) + stats.get('xai_uses', 0)
-                                print(f"   Respostas enviadas: {total}")
-                        except:
-                            pass
-                
-                elif bot_id == "keyword_bot":
-                    stats_file = "bot_stats.json"
-                    if os.path.exists(stats_file):
-                        try:
-                            with open(stats_file, 'r') as f:
-                                stats = json.load(f)
-                                print(f"   Tweets processados: {stats.get('tweets_processed', 0)}")
-                                print(f"   Respostas enviadas: {stats.get('responses_sent', 0)}")
-                        except:
-                            pass
+                # Verifica estado persistido (bot_state.db)
+                if os.path.exists("bot_state.db"):
+                    try:
+                        from state_store import get_state_store
+                        store = get_state_store()
+                        
+                        if bot_id == "mention_bot":
+                            usage = store.load_usage("mention_bot")
+                            total = sum(model["uses"] for model in usage.values())
+                            print(f"   Respostas enviadas: {total}")
+                        
+                        elif bot_id == "keyword_bot":
+                            stats = store.load_counters("smart_bot")
+                            print(f"   Tweets processados: {stats.get('tweets_processed', 0)}")
+                            print(f"   Respostas enviadas: {stats.get('responses_sent', 0)}")
+                    except:
+                        pass
             else:
                 print("   Status: ❌ Arquivo não encontrado")
     
@@ -241,6 +236,19 @@ class BotManager:
             "processed_mentions.json",
             "last_mention_id.json",
             
+            # Estado unificado (SQLite)
+            "bot_state.db",
+            "bot_state.db-wal",
+            "bot_state.db-shm",
+            
+            # Ledger de tokens e custo
+            "token_ledger.jsonl",
+            
+            # Cache de completions do LLM
+            "completion_cache.db",
+            "completion_cache.db-wal",
+            "completion_cache.db-shm",
+            
             # Logs
             "bot.log",
             "mention_bot.log",
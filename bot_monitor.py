@@ -7,14 +7,25 @@ import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, List
 import os
+from state_store import get_state_store
+from token_ledger import get_token_ledger
 
 class BotMonitor:
     def __init__(self):
         self.stats_file = "bot_stats.json"
+        self.token_ledger = get_token_ledger()
         self.load_stats()
     
     def load_stats(self):
-        """Carrega estatísticas do bot"""
+        """Carrega estatísticas do bot (store SQLite, com fallback para o JSON antigo)"""
+        self.state_store = get_state_store()
+        self.stored_keys = set()
+        stored_stats = self.state_store.load_counters("smart_bot")
+        if stored_stats:
+            self.stored_keys = set(stored_stats)
+            self.stats = {**self.create_empty_stats(), **stored_stats}
+            return
+        
         try:
             with open(self.stats_file, "r") as f:
                 self.stats = json.load(f)
@@ -41,6 +52,10 @@ class BotMonitor:
     
     def generate_report(self) -> str:
         """Gera relatório detalhado do bot"""
+        # Tokens e custo vêm do ledger (uso real informado pelos provedores)
+        ledger = self.token_ledger.summarize()
+        totals = ledger["totals"]
+        
         report = []
         report.append("=" * 50)
         report.append("RELATÓRIO DO BOT X.COM")
@@ -50,7 +65,12 @@ class BotMonitor:
         report.append(f"\n📊 ESTATÍSTICAS GERAIS:")
         report.append(f"• Tweets processados: {self.stats['tweets_processed']:,}")
         report.append(f"• Respostas enviadas: {self.stats['responses_sent']:,}")
-        report.append(f"• Tokens utilizados: {self.stats['tokens_used']:,}")
+        report.append(f"• Chamadas ao LLM: {totals['calls']:,}")
+        report.append(f"• Tokens utilizados: {totals['total_tokens']:,} "
+                      f"({totals['prompt_tokens']:,} entrada / {totals['completion_tokens']:,} saída)")
+        report.append(f"• Custo estimado: US$ {totals['cost_usd']:.4f}")
+        if totals['estimated_calls']:
+            report.append(f"• Chamadas com uso estimado localmente: {totals['estimated_calls']:,}")
         
         # Taxa de sucesso
         if self.stats['tweets_processed'] > 0:
@@ -59,14 +79,17 @@ class BotMonitor:
         
         # Eficiência de tokens
         if self.stats['responses_sent'] > 0:
-            tokens_per_response = self.stats['tokens_used'] / self.stats['responses_sent']
+            tokens_per_response = self.calculate_token_efficiency(totals)
             report.append(f"• Tokens por resposta: {tokens_per_response:.1f}")
+            report.append(f"• Custo por resposta: US$ {totals['cost_usd'] / self.stats['responses_sent']:.5f}")
         
         # Atividade diária
         report.append(f"\n📅 ATIVIDADE DOS ÚLTIMOS 7 DIAS:")
         daily_data = self.get_last_7_days_activity()
         for date, count in daily_data.items():
-            report.append(f"• {date}: {count} respostas")
+            day = ledger["by_day"].get(date)
+            usage = f" | {day['total_tokens']:,} tokens, US$ {day['cost_usd']:.4f}" if day else ""
+            report.append(f"• {date}: {count} respostas{usage}")
         
         # Top keywords
         report.append(f"\n🔥 PALAVRAS-CHAVE MAIS ATIVAS:")
@@ -74,10 +97,18 @@ class BotMonitor:
         for keyword, count in top_keywords:
             report.append(f"• {keyword}: {count} ativações")
         
+        # Custo por palavra-chave
+        report.append(f"\n💰 CUSTO POR PALAVRA-CHAVE:")
+        by_cost = sorted(ledger["by_keyword"].items(), key=lambda x: x[1]["cost_usd"], reverse=True)
+        for keyword, usage in by_cost[:5]:
+            report.append(f"• {keyword}: {usage['calls']} chamadas, {usage['total_tokens']:,} tokens, "
+                          f"US$ {usage['cost_usd']:.4f}")
+        
         # Uso de modelos
         report.append(f"\n🤖 USO DE MODELOS IA:")
-        for model, count in self.stats.get('model_usage', {}).items():
-            report.append(f"• {model}: {count} usos")
+        for model, usage in ledger["by_model"].items():
+            report.append(f"• {model}: {usage['calls']} usos, {usage['total_tokens']:,} tokens, "
+                          f"US$ {usage['cost_usd']:.4f}")
         
         # Erros recentes
         recent_errors = self.get_recent_errors(5)
@@ -118,12 +149,13 @@ class BotMonitor:
         errors = self.stats.get('error_log', [])
         return errors[-limit:] if errors else []
     
-    def calculate_token_efficiency(self) -> float:
-        """Calcula eficiência de uso de tokens"""
+    def calculate_token_efficiency(self, totals: Dict = None) -> float:
+        """Calcula eficiência de uso de tokens (tokens do ledger por resposta enviada)"""
         if self.stats['responses_sent'] == 0:
             return 0
         
-        return self.stats['tokens_used'] / self.stats['responses_sent']
+        totals = totals or self.token_ledger.summarize()["totals"]
+        return totals['total_tokens'] / self.stats['responses_sent']
     
     def suggest_optimizations(self) -> List[str]:
         """Sugere otimizações baseadas nas estatísticas"""
@@ -143,7 +175,7 @@ class BotMonitor:
                 suggestions.append("⚡ Taxa de resposta alta - considere filtros mais rigorosos")
         
         # Verifica uso de modelos
-        model_usage = self.stats.get('model_usage', {})
+        model_usage = {model: usage["calls"] for model, usage in self.token_ledger.summarize()["by_model"].items()}
         if model_usage:
             total_uses = sum(model_usage.values())
             gpt4_usage = model_usage.get('gpt-4o', 0) / total_uses * 100 if total_uses > 0 else 0
@@ -159,14 +191,17 @@ class BotMonitor:
     
     def export_data_for_analysis(self, filename: str = "bot_data_export.json"):
         """Exporta dados para análise externa"""
+        ledger = self.token_ledger.summarize()
         export_data = {
             "export_date": datetime.now().isoformat(),
             "stats": self.stats,
             "summary": {
                 "total_tweets_processed": self.stats['tweets_processed'],
                 "total_responses_sent": self.stats['responses_sent'],
-                "total_tokens_used": self.stats['tokens_used'],
-                "token_efficiency": self.calculate_token_efficiency(),
+                "total_tokens_used": ledger["totals"]["total_tokens"],
+                "total_cost_usd": ledger["totals"]["cost_usd"],
+                "token_efficiency": self.calculate_token_efficiency(ledger["totals"]),
+                "token_ledger": ledger,
                 "top_keywords": self.get_top_keywords(10),
                 "last_7_days": self.get_last_7_days_activity()
             }
@@ -193,8 +228,13 @@ class BotMonitor:
                 del self.stats['daily_responses'][key]
         
         # Salva estatísticas
-        with open(self.stats_file, 'w') as f:
-            json.dump(self.stats, f, indent=2)
+        if self.stored_keys:
+            self.state_store.save_counters("smart_bot", {
+                key: self.stats[key] for key in self.stored_keys
+            })
+        else:
+            with open(self.stats_file, 'w') as f:
+                json.dump(self.stats, f, indent=2)
         
         print(f"🔄 Estatísticas diárias resetadas para {today}")
 
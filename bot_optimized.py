@@ -2,35 +2,50 @@
 # BOT OTIMIZADO COM RATE LIMITING ADAPTATIVO E CICLO DE SLEEP INTELIGENTE
 
 import tweepy
-import openai
-import requests
 import time
-import json
 import logging
+from log_setup import setup_logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from adaptive_rate_limiter import AdaptiveRateLimiter
+from request_scheduler import TWEEPY_ENDPOINTS, endpoint_for
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot_optimized.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configuração de logging: fila + JSON lines com rotação (log_setup.py)
+setup_logging('bot_optimized.log')
 logger = logging.getLogger(__name__)
 
 # Importações locais
 from keys import *
-from keyword_prompts_improved import prompts_com_aliases, TARGET_USER_IDS, USER_ID_TO_NAME_MAP
+from keyword_prompts_improved import prompts_com_aliases, TARGET_USER_IDS, USER_ID_TO_NAME_MAP, BOT_CONFIG
+from state_store import get_state_store
+from dedup_cache import ProcessedIdCache
+from tweet_filter import TweetFilter
+from timeline_ingest import SearchTimelineIngestor
+from llm_client import chat_completion
+from token_ledger import count_tokens
+from model_router import get_model_router, ROUTE_PREMIUM
+from posting_quota import QuotaExceeded, get_posting_quota
+from reply_gate import REPLY_TWEET_FIELDS, account_identity, get_reply_gate
+from tracing import SPAN_FETCH, SPAN_FILTER, SPAN_GENERATE, SPAN_POST, SPAN_SLEEP, get_tracer
+from metrics import STAGE_FETCHED, STAGE_FILTERED, STAGE_GENERATED, STAGE_POSTED, get_metrics, install_metrics_hook, start_metrics_server
+from cassette import install_cassette_hook
+
+STATE_SCOPE = "optimized_bot"
+
+# Watermark compartilhado da busca em lote (convive com os IDs por usuário)
+SEARCH_WATERMARK_KEY = "__search__"
 
 class OptimizedXBot:
     def __init__(self):
         self.setup_clients()
         self.setup_prompts()
         self.load_state()
+        self.timeline_ingestor = SearchTimelineIngestor(
+            self.twitter_client,
+            TARGET_USER_IDS,
+            max_query_length=BOT_CONFIG.get("search_query_max_length", 512),
+            api_call=self.make_optimized_api_call
+        )
         
         # Inicializa rate limiter adaptativo
         self.rate_limiter = AdaptiveRateLimiter(self.twitter_client)
@@ -49,8 +64,6 @@ class OptimizedXBot:
     def setup_clients(self):
         """Inicializa clientes das APIs"""
         try:
-            self.openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-            
             self.twitter_client = tweepy.Client(
                 bearer_token=X_BEARER_TOKEN,
                 consumer_key=X_API_KEY,
@@ -59,6 +72,9 @@ class OptimizedXBot:
                 access_token_secret=X_ACCESS_TOKEN_SECRET,
                 wait_on_rate_limit=True
             )
+            # Latência de cada chamada por endpoint (histograma, não só a média)
+            install_metrics_hook(self.twitter_client)
+            install_cassette_hook(self.twitter_client)
             
             logger.info("✅ Clientes de API inicializados")
             
@@ -73,31 +89,44 @@ class OptimizedXBot:
             for keyword in keywords_tuple:
                 self.keyword_prompts[keyword.lower()] = prompt_data
         
+        # Pré-filtro compilado uma vez: conteúdo e palavras-chave em uma passada
+        self.tweet_filter = TweetFilter(prompts_com_aliases)
+        self.model_router = get_model_router()
+        self.posting_quota = get_posting_quota()
+        self.reply_gate = get_reply_gate(*account_identity(self.twitter_client))
+        self.metrics = get_metrics()
+        self.tracer = get_tracer()
+        
         logger.info(f"📝 {len(self.keyword_prompts)} prompts carregados")
     
     def load_state(self):
         """Carrega estado do bot"""
-        try:
-            with open("bot_optimized_state.json", "r") as f:
-                self.state = json.load(f)
-        except FileNotFoundError:
-            self.state = {
-                "last_seen_ids": {},
-                "processed_tweets": [],
-                "performance_metrics": {
-                    "total_requests": 0,
-                    "successful_requests": 0,
-                    "rate_limit_hits": 0,
-                    "avg_response_time": 0,
-                    "last_optimization": None
-                },
-                "optimization_history": []
-            }
+        self.state_store = get_state_store()
+        counters = self.state_store.load_counters(STATE_SCOPE)
+        
+        # Tweets já processados: consulta O(1) com teto fixo de memória
+        self.processed_tweets = ProcessedIdCache.from_state_store(self.state_store, STATE_SCOPE)
+        
+        self.state = {
+            "last_seen_ids": self.state_store.load_watermarks(STATE_SCOPE),
+            "performance_metrics": counters.get("performance_metrics") or {
+                "total_requests": 0,
+                "successful_requests": 0,
+                "rate_limit_hits": 0,
+                "avg_response_time": 0,
+                "last_optimization": None
+            },
+            "optimization_history": self.state_store.load_document(STATE_SCOPE, "optimization_history", [])
+        }
     
     def save_state(self):
-        """Salva estado do bot"""
-        with open("bot_optimized_state.json", "w") as f:
-            json.dump(self.state, f, indent=2)
+        """Salva estado do bot (upserts incrementais no SQLite)"""
+        with self.state_store.transaction():
+            self.state_store.save_watermarks(STATE_SCOPE, self.state["last_seen_ids"])
+            self.state_store.save_counters(STATE_SCOPE, {
+                "performance_metrics": self.state["performance_metrics"]
+            })
+            self.state_store.flush()
     
     def make_optimized_api_call(self, api_method, *args, **kwargs):
         """
@@ -106,6 +135,9 @@ class OptimizedXBot:
         start_time = time.time()
         
         try:
+            # Espera exatamente o que o saldo do endpoint exige (zero se houver saldo)
+            self.rate_limiter.scheduler.acquire(endpoint_for(api_method))
+            
             # Incrementa contador de requests
             self.state["performance_metrics"]["total_requests"] += 1
             
@@ -134,11 +166,8 @@ class OptimizedXBot:
             logger.warning("⚠️  Rate limit atingido")
             self.state["performance_metrics"]["rate_limit_hits"] += 1
             
-            # Ajusta rate limiter para ser mais conservador
-            self.rate_limiter.current_sleep_time = min(
-                self.rate_limiter.current_sleep_time * 1.2, 
-                300
-            )
+            # O 429 já zerou o saldo do endpoint no registro: a próxima chamada espera o reinício
+            self.rate_limiter.update_rate_limit_from_response()
             
             raise
             
@@ -146,9 +175,12 @@ class OptimizedXBot:
             logger.error(f"❌ Erro na API call: {e}")
             raise
     
-    def intelligent_tweet_filtering(self, tweets: List) -> List:
+    def intelligent_tweet_filtering(self, tweets: List) -> List[Tuple]:
         """
         Filtra tweets de forma inteligente para otimizar processamento
+        
+        Retorna pares (tweet, match) com o match de maior prioridade, para que
+        o texto não precise ser varrido de novo na hora de escolher o prompt.
         """
         if not tweets:
             return []
@@ -156,60 +188,52 @@ class OptimizedXBot:
         filtered_tweets = []
         
         for tweet in tweets:
-            # Filtros de qualidade
-            if len(tweet.text.strip()) < 20:
-                continue
-                
-            if tweet.text.startswith("RT @") and ":" not in tweet.text:
-                continue
-                
-            if tweet.text.count("#") > 5:
-                continue
-                
-            if tweet.text.count("@") > 3:
-                continue
-            
             # Verifica se já foi processado recentemente
-            if tweet.id in self.state["processed_tweets"]:
+            if tweet.id in self.processed_tweets:
                 continue
             
-            # Verifica se contém palavras-chave relevantes
-            has_keyword = any(
-                keyword in tweet.text.lower() 
-                for keyword in self.keyword_prompts.keys()
-            )
-            
-            if has_keyword:
-                filtered_tweets.append(tweet)
-        
+            with self.tracer.span(SPAN_FILTER, tweet_id=tweet.id, user_id=tweet.author_id) as span:
+                # Filtros de qualidade, blacklist e palavras-chave em uma passada
+                verdict = self.tweet_filter.evaluate(tweet.text)
+                
+                # Descarta tweets que a conta não pode responder, antes de gastar tokens
+                accepted = verdict.accepted and self.reply_gate.allows(tweet)
+                span.set(accepted=accepted)
+            if accepted:
+                filtered_tweets.append((tweet, verdict.best_match))
+        
+        self.metrics.count_tweets(STATE_SCOPE, STAGE_FETCHED, len(tweets))
+        self.metrics.count_tweets(STATE_SCOPE, STAGE_FILTERED, len(tweets) - len(filtered_tweets))
         logger.info(f"🔍 Filtrados {len(filtered_tweets)} de {len(tweets)} tweets")
         return filtered_tweets
     
-    def generate_optimized_response(self, tweet_text: str, prompt_template: str) -> Optional[str]:
+    def generate_optimized_response(self, tweet_text: str, prompt_template: str,
+                                    keyword: Optional[str] = None) -> Optional[str]:
         """
         Gera resposta otimizada com escolha inteligente de modelo
         """
-        # Escolhe modelo baseado na complexidade do tweet
-        if len(tweet_text) > 200 or any(word in tweet_text.lower() for word in ["dados", "pesquisa", "estudo"]):
-            model = "gpt-4o"
-            max_tokens = 80
-        else:
-            model = "gpt-4o-mini"  # Modelo mais barato para tweets simples
-            max_tokens = 60
+        # Escolhe modelo por orçamento, saúde dos provedores e prioridade do tema
+        route = self.model_router.choose(tweet_text, keyword)
+        model = route.model
+        max_tokens = 80 if route.reason == ROUTE_PREMIUM else 60
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model=model,
-                messages=[
+            response = chat_completion(
+                model,
+                [
                     {"role": "system", "content": "Você é um assistente especializado em gerar respostas concisas e inteligentes para X/Twitter."},
                     {"role": "user", "content": prompt_template.format(tweet_text=tweet_text)}
                 ],
                 max_tokens=max_tokens,
-                temperature=0.7
+                temperature=0.7,
+                bot=STATE_SCOPE,
+                keyword=keyword,
+                route=route.reason
             )
             
-            comment = response.choices[0].message.content.strip()
-            logger.info(f"💬 Resposta gerada com {model} ({response.usage.total_tokens} tokens)")
+            comment = response.content
+            logger.info("💬 Resposta gerada com %s (%s tokens)", model, response.total_tokens,
+                        extra={"keyword": keyword, "model": model, "latency_ms": round(response.latency * 1000)})
             
             return comment
             
@@ -217,81 +241,101 @@ class OptimizedXBot:
             logger.error(f"❌ Erro ao gerar resposta: {e}")
             return None
     
-    def process_user_tweets_optimized(self, user_id: str) -> int:
+    def process_user_tweets_optimized(self, user_id: str, tweets: Optional[List] = None) -> int:
         """
         Processa tweets de um usuário de forma otimizada
+        
+        Se `tweets` vier da busca em lote, não faz chamada à API para o usuário.
         """
         username = USER_ID_TO_NAME_MAP.get(user_id, f"ID:{user_id}")
         last_id = self.state["last_seen_ids"].get(user_id)
         
         try:
-            # Busca tweets com rate limiting adaptativo
-            response = self.make_optimized_api_call(
-                self.twitter_client.get_users_tweets,
-                id=user_id,
-                since_id=last_id,
-                max_results=10,
-                tweet_fields=["created_at", "text", "public_metrics"],
-                exclude=["retweets", "replies"]
-            )
+            if tweets is None:
+                # Busca tweets com rate limiting adaptativo
+                with self.tracer.span(SPAN_FETCH, method="get_users_tweets", user_id=user_id):
+                    response = self.make_optimized_api_call(
+                        self.twitter_client.get_users_tweets,
+                        id=user_id,
+                        since_id=last_id,
+                        max_results=10,
+                        tweet_fields=REPLY_TWEET_FIELDS,
+                        exclude=["retweets", "replies"]
+                    )
+                tweets = response.data
             
-            if not response.data:
-                logger.debug(f"📭 Nenhum tweet novo de {username}")
+            if not tweets:
+                logger.debug("📭 Nenhum tweet novo de %s", username)
                 return 0
             
             # Filtra tweets inteligentemente
-            filtered_tweets = self.intelligent_tweet_filtering(response.data)
+            filtered_tweets = self.intelligent_tweet_filtering(tweets)
+            matches = {tweet.id: match for tweet, match in filtered_tweets}
             
             if not filtered_tweets:
-                logger.debug(f"🔍 Nenhum tweet relevante de {username}")
-                return 0
+                logger.debug("🔍 Nenhum tweet relevante de %s", username)
             
             processed_count = 0
             
-            for tweet in filtered_tweets:
-                # Atualiza último ID visto
-                self.state["last_seen_ids"][user_id] = max(
-                    self.state["last_seen_ids"].get(user_id, 0),
-                    int(tweet.id)
-                )
-                
-                # Procura palavras-chave
-                keyword_found = None
-                for keyword, prompt_data in self.keyword_prompts.items():
-                    if keyword in tweet.text.lower():
-                        keyword_found = keyword
+            # Ordem cronológica: a marca d'água só avança sobre tweets já tratados
+            for tweet in sorted(tweets, key=lambda tweet: int(tweet.id)):
+                match = matches.get(tweet.id)
+                if match:
+                    logger.info("🎯 Palavra-chave '%s' em tweet de %s", match.keyword, username,
+                                extra={"tweet_id": tweet.id, "user_id": user_id, "keyword": match.keyword})
+                    
+                    # Reserva a vaga de postagem antes de gastar tokens
+                    try:
+                        reservation = self.posting_quota.reserve(
+                            STATE_SCOPE,
+                            estimated_tokens=count_tokens(match.prompt.format(tweet_text=tweet.text)) + 60
+                        )
+                    except QuotaExceeded as e:
+                        # Marca d'água fica no último tweet tratado: este e os seguintes voltam na próxima busca
+                        logger.info(f"⏸️ Cota de postagens: {e}, geração não iniciada")
                         break
-                
-                if keyword_found:
-                    logger.info(f"🎯 Palavra-chave '{keyword_found}' em tweet de {username}")
                     
                     # Gera resposta otimizada
-                    comment = self.generate_optimized_response(
-                        tweet.text,
-                        self.keyword_prompts[keyword_found]["prompt"]
-                    )
+                    with self.tracer.span(SPAN_GENERATE, tweet_id=tweet.id, keyword=match.keyword):
+                        comment = self.generate_optimized_response(
+                            tweet.text,
+                            match.prompt,
+                            keyword=match.keyword
+                        )
                     
                     if comment:
-                        # Posta resposta com rate limiting
+                        self.metrics.count_tweets(STATE_SCOPE, STAGE_GENERATED)
+                        # Posta resposta com rate limiting (commit da vaga se sair)
                         try:
-                            self.make_optimized_api_call(
-                                self.twitter_client.create_tweet,
-                                text=comment,
-                                in_reply_to_tweet_id=tweet.id
-                            )
+                            with self.tracer.span(SPAN_POST, tweet_id=tweet.id):
+                                self.posting_quota.post(
+                                    self.make_optimized_api_call,
+                                    self.twitter_client.create_tweet,
+                                    text=comment,
+                                    in_reply_to_tweet_id=tweet.id,
+                                    bot=STATE_SCOPE,
+                                    reservation=reservation
+                                )
                             
-                            logger.info(f"✅ Resposta postada para {username}")
+                            logger.info("✅ Resposta postada para %s", username, extra={"tweet_id": tweet.id, "user_id": user_id})
+                            self.metrics.count_tweets(STATE_SCOPE, STAGE_POSTED)
                             processed_count += 1
                             
+                        except tweepy.Forbidden as e:
+                            logger.error(f"🚫 Resposta proibida ao tweet {tweet.id}: {e}")
+                            self.reply_gate.record_forbidden(tweet)
+                            
                         except Exception as e:
                             logger.error(f"❌ Erro ao postar resposta: {e}")
+                    
+                    self.posting_quota.release(reservation)  # Nada a devolver se a postagem saiu
                 
-                # Adiciona à lista de processados
-                self.state["processed_tweets"].append(tweet.id)
+                # Respondido, sem palavra-chave ou descartado pelo filtro: tratado de vez
+                if tweet.id not in self.processed_tweets:
+                    self.processed_tweets.add(tweet.id)
                 
-                # Mantém apenas últimos 1000 tweets processados
-                if len(self.state["processed_tweets"]) > 1000:
-                    self.state["processed_tweets"] = self.state["processed_tweets"][-1000:]
+                # Só então avança o último ID visto
+                self.advance_watermark(user_id, tweet.id)
             
             return processed_count
             
@@ -299,6 +343,10 @@ class OptimizedXBot:
             logger.error(f"❌ Erro ao processar {username}: {e}")
             return 0
     
+    def advance_watermark(self, user_id: str, tweet_id) -> None:
+        """Avança o since_id do usuário só depois que o tweet foi respondido ou descartado de vez"""
+        self.state["last_seen_ids"][user_id] = max(self.state["last_seen_ids"].get(user_id, 0), int(tweet_id))
+    
     def optimize_performance(self):
         """
         Otimiza performance baseado no histórico
@@ -340,6 +388,8 @@ class OptimizedXBot:
         # Mantém apenas últimas 50 otimizações
         if len(self.state["optimization_history"]) > 50:
             self.state["optimization_history"] = self.state["optimization_history"][-50:]
+        
+        self.state_store.save_document(STATE_SCOPE, "optimization_history", self.state["optimization_history"])
     
     def run_optimized_cycle(self):
         """
@@ -350,27 +400,13 @@ class OptimizedXBot:
         
         logger.info("🔄 Iniciando ciclo otimizado...")
         
-        # Processa usuários em ordem de prioridade
-        for user_id in TARGET_USER_IDS:
-            try:
-                processed = self.process_user_tweets_optimized(user_id)
-                total_processed += processed
-                
-                # Sleep adaptativo entre usuários
-                if processed > 0:
-                    self.rate_limiter.adaptive_sleep("between_users")
-                else:
-                    time.sleep(2)  # Sleep mínimo entre usuários
-                    
-            except tweepy.TooManyRequests:
-                logger.warning("⚠️  Rate limit global atingido, pausando ciclo")
-                break
-                
-            except Exception as e:
-                logger.error(f"❌ Erro no processamento: {e}")
-                continue
+        if BOT_CONFIG.get("ingestion_mode") == "search":
+            total_processed = self.run_batched_ingestion()
+        else:
+            total_processed = self.run_per_user_ingestion()
         
         cycle_time = time.time() - cycle_start
+        self.metrics.observe_cycle(STATE_SCOPE, cycle_time)
         
         logger.info(f"✅ Ciclo completo: {total_processed} respostas em {cycle_time:.1f}s")
         
@@ -383,14 +419,65 @@ class OptimizedXBot:
         
         return total_processed
     
-    def find_optimal_refresh_rate(self, test_duration_minutes: int = 15):
+    def run_batched_ingestion(self) -> int:
+        """Busca todas as contas em poucas queries de busca e processa por autor"""
+        total_processed = 0
+        since_id = self.state["last_seen_ids"].get(SEARCH_WATERMARK_KEY)
+        
+        try:
+            with self.tracer.span(SPAN_FETCH, method="search_recent_tweets"):
+                tweets_by_author = self.timeline_ingestor.fetch(since_id=since_id)
+        except tweepy.TooManyRequests:
+            logger.warning("⚠️  Rate limit atingido na busca em lote, pausando ciclo")
+            return 0
+        
+        # Até onde a busca cobriu sem buracos (não avança se foi truncada)
+        covered_id = self.timeline_ingestor.watermark(tweets_by_author, since_id)
+        
+        for user_id, tweets in tweets_by_author.items():
+            total_processed += self.process_user_tweets_optimized(user_id, tweets)
+        
+        # Tweets recusados pela cota seguram o watermark logo abaixo deles
+        settled_id = self.timeline_ingestor.settled_watermark(
+            covered_id, tweets_by_author, self.state["last_seen_ids"]
+        )
+        if settled_id:
+            self.state["last_seen_ids"][SEARCH_WATERMARK_KEY] = max(int(since_id or 0), settled_id)
+        
+        return total_processed
+    
+    def run_per_user_ingestion(self) -> int:
+        """Modo antigo: um get_users_tweets por conta monitorada"""
+        total_processed = 0
+        
+        # Processa usuários em ordem de prioridade
+        for user_id in TARGET_USER_IDS:
+            try:
+                # O agendador espera entre chamadas só quando o saldo acaba
+                total_processed += self.process_user_tweets_optimized(user_id)
+                    
+            except tweepy.TooManyRequests:
+                logger.warning("⚠️  Rate limit global atingido, pausando ciclo")
+                break
+                
+            except Exception as e:
+                logger.error(f"❌ Erro no processamento: {e}")
+                continue
+        
+        return total_processed
+    
+    def cycle_read_load(self) -> Tuple[str, int]:
+        """Endpoint de leitura do ciclo e quantas chamadas (mínimas) ele faz nele"""
+        if BOT_CONFIG.get("ingestion_mode") == "search":
+            return TWEEPY_ENDPOINTS["search_recent_tweets"], len(self.timeline_ingestor.queries)
+        return TWEEPY_ENDPOINTS["get_users_tweets"], len(TARGET_USER_IDS)
+    
+    def find_optimal_refresh_rate(self, days: float = 7):
         """
-        Encontra o rate de refresh otimizado
+        Encontra o rate de refresh otimizado (simulação offline, sem gastar quota)
         """
-        logger.info(f"🧪 Iniciando teste de otimização por {test_duration_minutes} minutos...")
-        
-        # Usa o rate limiter para encontrar o mínimo
-        results = self.rate_limiter.find_minimum_refresh_rate(test_duration_minutes)
+        endpoint, calls = self.cycle_read_load()
+        results = self.rate_limiter.find_minimum_refresh_rate(endpoint, calls, days)
         
         logger.info(f"🎯 Rate otimizado encontrado: {results['optimal_sleep_time']}s")
         
@@ -412,6 +499,9 @@ class OptimizedXBot:
                 "avg_response_time": metrics["avg_response_time"],
                 "last_optimization": metrics["last_optimization"]
             },
+            "filter_metrics": self.tweet_filter.get_stats(),
+            "posting_quota": self.posting_quota.get_status(),
+            "reply_gate": self.reply_gate.get_stats(),
             "rate_limiter_metrics": rate_limiter_summary,
             "optimization_history": self.state["optimization_history"][-10:],  # Últimas 10
             "current_config": self.optimization_config
@@ -422,11 +512,10 @@ class OptimizedXBot:
         Loop principal otimizado
         """
         logger.info("🚀 Bot otimizado iniciado!")
+        start_metrics_server(BOT_CONFIG.get("metrics_ports", {}).get(STATE_SCOPE, 0))
         
-        # Executa teste inicial para encontrar rate ótimo
-        if self.optimization_config["learning_enabled"]:
-            logger.info("🧪 Executando calibração inicial...")
-            self.find_optimal_refresh_rate(test_duration_minutes=5)
+        # Calibração fora do caminho de inicialização: python rate_limit_simulator.py
+        # (ou find_optimal_refresh_rate(), que simula sem chamar a API)
         
         cycle_count = 0
         
@@ -434,11 +523,15 @@ class OptimizedXBot:
             try:
                 cycle_count += 1
                 
-                # Executa ciclo otimizado
-                processed = self.run_optimized_cycle()
-                
-                # Sleep adaptativo baseado na performance
-                self.rate_limiter.adaptive_sleep(f"cycle_{cycle_count}")
+                # Um trace por ciclo, incluindo o sleep até o próximo
+                with self.tracer.cycle(STATE_SCOPE, cycle=cycle_count):
+                    # Executa ciclo otimizado
+                    processed = self.run_optimized_cycle()
+                    
+                    # Cadência do ciclo, estendida se o saldo de leitura não comportar o próximo
+                    endpoint, calls = self.cycle_read_load()
+                    with self.tracer.span(SPAN_SLEEP):
+                        self.rate_limiter.adaptive_sleep(f"cycle_{cycle_count}", endpoint, calls)
                 
                 # Relatório de performance a cada 20 ciclos
                 if cycle_count % 20 == 0:
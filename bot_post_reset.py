@@ -2,23 +2,52 @@
 # BOT ULTRA-CONSERVADOR PARA USAR APÓS RESET DOS LIMITES
 
 import tweepy
-import openai
 import time
 import json
 from datetime import datetime, timedelta
 from rate_limit_manager import RateLimitManager
+from posting_quota import PostingQuota, QuotaExceeded, QuotaRule, rules_from_config
+from state_store import get_state_store
+from tweet_filter import TweetFilter
+from poll_scheduler import PollScheduler, tweet_times
+from completion_cache import get_completion_cache
+from llm_client import chat_completion
+from rate_limit_registry import install_rate_limit_hook
+from reply_gate import REPLY_TWEET_FIELDS, account_identity, get_reply_gate
 
 # Importações locais
 from keys import *
 from keyword_prompts import prompts_com_aliases, TARGET_USER_IDS, USER_ID_TO_NAME_MAP
 
+STATE_SCOPE = "post_reset_bot"
+
 class PostResetBot:
     def __init__(self):
         self.setup_clients()
-        self.rate_manager = RateLimitManager()
+        self.tweet_filter = TweetFilter(prompts_com_aliases)
+        self.reply_gate = get_reply_gate(*account_identity(self.twitter_client))
+        self.completion_cache = get_completion_cache()
         self.load_config()
         self.load_state()
         
+        # Limites da conta mais os deste bot (só as postagens dele), sobre o mesmo ledger dos outros bots
+        self.posting_quota = PostingQuota(rules_from_config() + [
+            QuotaRule("horário do bot", self.config["max_posts_per_hour"], window_seconds=3600, bot=STATE_SCOPE),
+            QuotaRule("diário do bot", self.config["max_posts_per_day"], window_seconds=86400, bot=STATE_SCOPE)
+        ])
+        self.rate_manager = RateLimitManager(self.posting_quota)
+        
+        # Cada conta a cada sleep_between_cycles; com poll_adaptive, nunca com
+        # mais frequência que isso e contas quietas esperam até 4x esse intervalo
+        cycle = self.config["sleep_between_cycles"]
+        self.poll_scheduler = PollScheduler(
+            TARGET_USER_IDS[:5],  # Apenas primeiros 5
+            base_interval=cycle,
+            min_interval=cycle,
+            max_interval=4 * cycle,
+            fixed_interval=cycle
+        )
+        
         print("🛡️  Bot Ultra-Conservador Inicializado")
         print(f"   • Máximo {self.config['max_posts_per_day']} posts por dia")
         print(f"   • Máximo {self.config['max_posts_per_hour']} posts por hora")
@@ -26,7 +55,6 @@ class PostResetBot:
     
     def setup_clients(self):
         """Configura clientes das APIs"""
-        self.openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
         self.twitter_client = tweepy.Client(
             bearer_token=X_BEARER_TOKEN,
             consumer_key=X_API_KEY,
@@ -35,6 +63,7 @@ class PostResetBot:
             access_token_secret=X_ACCESS_TOKEN_SECRET,
             wait_on_rate_limit=True
         )
+        install_rate_limit_hook(self.twitter_client)
     
     def load_config(self):
         """Carrega configuração ultra-conservadora"""
@@ -54,72 +83,54 @@ class PostResetBot:
     
     def load_state(self):
         """Carrega estado do bot"""
-        try:
-            with open("post_reset_bot_state.json", "r") as f:
-                self.state = json.load(f)
-        except FileNotFoundError:
-            self.state = {
-                "last_seen_ids": {},
-                "posts_today": 0,
-                "posts_this_hour": 0,
-                "last_post_time": None,
-                "daily_reset_time": datetime.now().date().isoformat()
-            }
+        self.state_store = get_state_store()
+        self.state = {
+            "last_seen_ids": {},
+            "last_post_time": None
+        }
+        self.state.update(self.state_store.load_counters(STATE_SCOPE))
+        self.state["last_seen_ids"] = self.state_store.load_watermarks(STATE_SCOPE)
     
     def save_state(self):
-        """Salva estado do bot"""
-        with open("post_reset_bot_state.json", "w") as f:
-            json.dump(self.state, f, indent=2)
+        """Salva estado do bot (upserts incrementais no SQLite)"""
+        with self.state_store.transaction():
+            self.state_store.save_watermarks(STATE_SCOPE, self.state["last_seen_ids"])
+            self.state_store.save_counters(STATE_SCOPE, {
+                key: value for key, value in self.state.items() if key != "last_seen_ids"
+            })
     
     def can_post_now(self) -> tuple[bool, str]:
-        """Verifica se pode postar considerando todos os limites"""
-        # Verifica rate limits da API
-        api_can_post, api_reason = self.rate_manager.can_post()
-        if not api_can_post:
-            return False, f"API: {api_reason}"
-        
-        # Reset diário
-        today = datetime.now().date().isoformat()
-        if self.state["daily_reset_time"] != today:
-            self.state["posts_today"] = 0
-            self.state["posts_this_hour"] = 0
-            self.state["daily_reset_time"] = today
-        
-        # Verifica limite diário
-        if self.state["posts_today"] >= self.config["max_posts_per_day"]:
-            return False, f"Limite diário atingido ({self.state['posts_today']}/{self.config['max_posts_per_day']})"
-        
-        # Reset horário
-        if self.state["last_post_time"]:
-            last_post = datetime.fromisoformat(self.state["last_post_time"])
-            if (datetime.now() - last_post).total_seconds() >= 3600:
-                self.state["posts_this_hour"] = 0
-        
-        # Verifica limite horário
-        if self.state["posts_this_hour"] >= self.config["max_posts_per_hour"]:
-            return False, f"Limite horário atingido ({self.state['posts_this_hour']}/{self.config['max_posts_per_hour']})"
-        
-        return True, "OK para postar"
+        """Verifica se pode postar considerando todos os limites (ledger compartilhado)"""
+        return self.posting_quota.can_post(STATE_SCOPE)
     
     def is_priority_keyword(self, text: str) -> bool:
         """Verifica se contém palavra-chave prioritária"""
         text_lower = text.lower()
         return any(keyword in text_lower for keyword in self.config["priority_keywords"])
     
-    def generate_response(self, tweet_text: str, prompt_template: str) -> str:
+    def generate_response(self, tweet_text: str, prompt_template: str, keyword: str = None) -> str:
         """Gera resposta usando modelo mais barato"""
+        cached = self.completion_cache.get(tweet_text, prompt_template, "gpt-4o-mini", 0.6)
+        if cached:
+            return cached
+        
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",  # Modelo mais barato
-                messages=[
+            response = chat_completion(
+                "gpt-4o-mini",  # Modelo mais barato
+                [
                     {"role": "system", "content": "Gere comentário conciso para Twitter. Máximo 100 caracteres."},
                     {"role": "user", "content": prompt_template.format(tweet_text=tweet_text)}
                 ],
                 max_tokens=40,  # Muito limitado para economizar
-                temperature=0.6
+                temperature=0.6,
+                bot=STATE_SCOPE,
+                keyword=keyword
             )
             
-            return response.choices[0].message.content.strip()
+            comment = response.content
+            self.completion_cache.put(tweet_text, prompt_template, "gpt-4o-mini", 0.6,
+                                      comment, response.total_tokens)
+            return comment
             
         except Exception as e:
             print(f"❌ Erro ao gerar resposta: {e}")
@@ -138,8 +149,10 @@ class PostResetBot:
                 id=user_id,
                 since_id=last_id,
                 max_results=3,
-                tweet_fields=["created_at"]
+                tweet_fields=REPLY_TWEET_FIELDS
             )
+            self.poll_scheduler.record_requests(1)
+            self.poll_scheduler.record_poll(user_id, tweet_times(response.data or [], time.time()))
             
             if not response.data:
                 print(f"   📭 Nenhum tweet novo")
@@ -162,37 +175,48 @@ class PostResetBot:
                 print(f"   🚫 Não pode postar: {reason}")
                 return False
             
-            # Procura palavra-chave
-            keyword_found = None
-            for keywords_tuple, prompt_data in prompts_com_aliases.items():
-                for keyword in keywords_tuple:
-                    if keyword.lower() in tweet.text.lower():
-                        keyword_found = keyword
-                        break
-                if keyword_found:
-                    break
+            # Pré-filtro (conteúdo, blacklist e palavra-chave) antes de gastar tokens
+            verdict = self.tweet_filter.evaluate(tweet.text)
+            if not verdict.accepted:
+                print(f"   ⏭️  Descartado pelo pré-filtro: {verdict.reason}")
+                return False
+            
+            # A conta pode responder? (reply_settings e conversas que já deram 403)
+            drop_reason = self.reply_gate.check(tweet)
+            if drop_reason:
+                print(f"   🔒 Tweet não aceita nossa resposta ({drop_reason})")
+                return False
+            
+            match = verdict.best_match
             
-            if keyword_found:
-                print(f"   🎯 Palavra-chave encontrada: {keyword_found}")
+            if match:
+                print(f"   🎯 Palavra-chave encontrada: {match.keyword}")
                 
                 # Gera resposta
                 comment = self.generate_response(
                     tweet.text, 
-                    prompts_com_aliases[keywords_tuple]["prompt"]
+                    match.prompt,
+                    keyword=match.keyword
                 )
                 
                 if comment:
-                    # Posta resposta
-                    self.twitter_client.create_tweet(
-                        text=comment,
-                        in_reply_to_tweet_id=tweet.id
-                    )
+                    # Posta resposta (a cota registra o post no ledger)
+                    try:
+                        self.posting_quota.post(
+                            self.twitter_client.create_tweet,
+                            text=comment,
+                            in_reply_to_tweet_id=tweet.id,
+                            bot=STATE_SCOPE
+                        )
+                    except QuotaExceeded as e:
+                        print(f"   🚫 Não pode postar: {e}")
+                        return False
+                    except tweepy.Forbidden as e:
+                        print(f"   🔒 Resposta proibida: {e}")
+                        self.reply_gate.record_forbidden(tweet)
+                        return False
                     
-                    # Registra post
-                    self.state["posts_today"] += 1
-                    self.state["posts_this_hour"] += 1
                     self.state["last_post_time"] = datetime.now().isoformat()
-                    self.rate_manager.record_post()
                     
                     print(f"   ✅ RESPOSTA POSTADA: {comment[:30]}...")
                     return True
@@ -203,8 +227,8 @@ class PostResetBot:
             print(f"   ❌ Erro ao processar {username}: {e}")
             return False
     
-    def run_conservative_cycle(self):
-        """Executa um ciclo ultra-conservador"""
+    def run_conservative_cycle(self, users_to_check=None):
+        """Executa um ciclo ultra-conservador com as contas vencidas no agendador"""
         print(f"\n🔄 CICLO CONSERVADOR - {datetime.now().strftime('%H:%M:%S')}")
         
         # Verifica status geral
@@ -214,7 +238,8 @@ class PostResetBot:
         responses_sent = 0
         
         # Processa apenas alguns usuários por ciclo
-        users_to_check = TARGET_USER_IDS[:5]  # Apenas primeiros 5
+        if users_to_check is None:
+            users_to_check = self.poll_scheduler.due(limit=self.poll_scheduler.budget_remaining())
         
         for user_id in users_to_check:
             if self.process_user_conservatively(user_id):
@@ -246,22 +271,24 @@ class PostResetBot:
                 cycle_count += 1
                 
                 # Verifica se ainda pode operar
-                can_post, reason = self.can_post_now()
-                if not can_post:
-                    print(f"⏸️  Bot pausado: {reason}")
-                    print("😴 Aguardando 1 hora...")
-                    time.sleep(3600)
+                decision = self.posting_quota.check(STATE_SCOPE)
+                if not decision.allowed:
+                    wait = min(3600, max(60, decision.wait_seconds))
+                    print(f"⏸️  Bot pausado: {decision.reason}")
+                    print(f"😴 Aguardando {wait / 60:.0f} min...")
+                    time.sleep(wait)
                     continue
                 
                 # Executa ciclo
                 self.run_conservative_cycle()
                 
-                # Sleep longo entre ciclos
-                sleep_minutes = self.config["sleep_between_cycles"] / 60
-                next_cycle = datetime.now() + timedelta(seconds=self.config["sleep_between_cycles"])
+                # Sleep até a próxima conta vencer (ritmo de cada conta)
+                wait = max(1.0, self.poll_scheduler.seconds_until_next())
+                next_cycle = datetime.now() + timedelta(seconds=wait)
                 
-                print(f"😴 Próximo ciclo às {next_cycle.strftime('%H:%M:%S')} ({sleep_minutes} min)")
-                time.sleep(self.config["sleep_between_cycles"])
+                print(f"😴 Próximo ciclo às {next_cycle.strftime('%H:%M:%S')} ({wait / 60:.1f} min)")
+                print(f"📊 Polls vazios: {self.poll_scheduler.wasted_call_ratio:.0%}")
+                time.sleep(wait)
                 
             except KeyboardInterrupt:
                 print("\n👋 Bot encerrado pelo usuário")
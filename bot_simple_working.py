@@ -2,24 +2,27 @@
 # BOT SIMPLES E FUNCIONAL - VERSÃO QUE FUNCIONA GARANTIDO
 
 import tweepy
-import openai
-import requests
 import time
 import json
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Importações locais
 from keys import *
 from keyword_prompts import prompts_com_aliases, TARGET_USER_IDS, USER_ID_TO_NAME_MAP
+from tweet_filter import TweetFilter
+from poll_scheduler import PollScheduler, tweet_times
+from completion_cache import get_completion_cache
+from llm_client import chat_completion
+from rate_limit_registry import install_rate_limit_hook
+from request_scheduler import get_request_scheduler
+from posting_quota import QuotaExceeded, get_posting_quota
+from reply_gate import REPLY_TWEET_FIELDS, account_identity, get_reply_gate
 
 print("🚀 Iniciando Bot Simples e Funcional...")
 
 # Configuração dos clientes
 try:
-    # Cliente OpenAI
-    openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    
     # Cliente Twitter/X (apenas o que funciona)
     client = tweepy.Client(
         bearer_token=X_BEARER_TOKEN,
@@ -29,6 +32,10 @@ try:
         access_token_secret=X_ACCESS_TOKEN_SECRET,
         wait_on_rate_limit=True
     )
+    install_rate_limit_hook(client)
+    request_scheduler = get_request_scheduler()
+    posting_quota = get_posting_quota()
+    reply_gate = get_reply_gate(*account_identity(client))
     
     print("✅ Clientes configurados com sucesso")
     
@@ -42,6 +49,12 @@ for keywords_tuple, prompt_data in prompts_com_aliases.items():
     for keyword in keywords_tuple:
         keyword_prompts[keyword.lower()] = prompt_data
 
+tweet_filter = TweetFilter(prompts_com_aliases)
+completion_cache = get_completion_cache()
+
+# Agenda de polling por conta (contas ativas a cada 2 min, quietas bem menos)
+poll_scheduler = PollScheduler(TARGET_USER_IDS, min_interval=120, fixed_interval=120)
+
 print(f"📝 {len(keyword_prompts)} palavras-chave carregadas")
 
 # Carrega último ID visto
@@ -57,20 +70,29 @@ def save_last_ids(ids):
         json.dump(ids, f, indent=2)
 
 # Gera comentário
-def generate_comment(tweet_text, prompt_template):
+def generate_comment(tweet_text, prompt_template, keyword=None):
+    cached = completion_cache.get(tweet_text, prompt_template, "gpt-4o-mini", 0.7)
+    if cached:
+        print(f"💬 Comentário do cache: {cached[:50]}...")
+        return cached
+    
     try:
         # Usa sempre GPT-4o-mini para economizar
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+        response = chat_completion(
+            "gpt-4o-mini",
+            [
                 {"role": "system", "content": "Você é um assistente que gera comentários concisos para Twitter/X. Seja direto e relevante."},
                 {"role": "user", "content": prompt_template.format(tweet_text=tweet_text)}
             ],
             max_tokens=60,
-            temperature=0.7
+            temperature=0.7,
+            bot="simple_bot",
+            keyword=keyword
         )
         
-        comment = response.choices[0].message.content.strip()
+        comment = response.content
+        completion_cache.put(tweet_text, prompt_template, "gpt-4o-mini", 0.7,
+                             comment, response.total_tokens)
         print(f"💬 Comentário gerado: {comment[:50]}...")
         return comment
         
@@ -79,13 +101,13 @@ def generate_comment(tweet_text, prompt_template):
         return None
 
 # Função principal
-def check_and_reply():
+def check_and_reply(user_ids=None):
     print(f"\n🔍 Verificando tweets... {datetime.now().strftime('%H:%M:%S')}")
     
     last_ids = load_last_ids()
     responses_sent = 0
     
-    for user_id in TARGET_USER_IDS:
+    for user_id in user_ids or TARGET_USER_IDS:
         username = USER_ID_TO_NAME_MAP.get(user_id, f"ID:{user_id}")
         last_id = last_ids.get(user_id)
         
@@ -93,12 +115,15 @@ def check_and_reply():
             print(f"👤 Verificando {username}...")
             
             # Busca tweets recentes
-            tweets = client.get_users_tweets(
+            tweets = request_scheduler.call(
+                client.get_users_tweets,
                 id=user_id,
                 since_id=last_id,
                 max_results=5,
-                tweet_fields=["created_at"]
+                tweet_fields=REPLY_TWEET_FIELDS
             )
+            poll_scheduler.record_requests(1)
+            poll_scheduler.record_poll(user_id, tweet_times(tweets.data or [], time.time()))
             
             if not tweets.data:
                 print(f"   📭 Nenhum tweet novo")
@@ -111,40 +136,45 @@ def check_and_reply():
                 
                 print(f"   📝 Tweet: {tweet.text[:50]}...")
                 
-                # Verifica palavras-chave
-                found_keyword = None
-                for keyword in keyword_prompts.keys():
-                    if keyword in tweet.text.lower():
-                        found_keyword = keyword
-                        break
+                # Pré-filtro: conteúdo, blacklist e palavras-chave em uma passada
+                verdict = tweet_filter.evaluate(tweet.text)
+                match = verdict.best_match if verdict.accepted else None
                 
-                if found_keyword:
-                    print(f"   🎯 Palavra-chave encontrada: {found_keyword}")
+                # A conta pode responder? (reply_settings e conversas que já deram 403)
+                drop_reason = reply_gate.check(tweet) if match else None
+                if drop_reason:
+                    print(f"   🔒 Tweet não aceita nossa resposta ({drop_reason})")
+                elif match:
+                    print(f"   🎯 Palavra-chave encontrada: {match.keyword}")
                     
                     # Gera resposta
-                    comment = generate_comment(tweet.text, keyword_prompts[found_keyword]["prompt"])
+                    comment = generate_comment(tweet.text, match.prompt, match.keyword)
                     
                     if comment:
                         try:
                             # Posta resposta
-                            client.create_tweet(
+                            posting_quota.post(
+                                request_scheduler.call,
+                                client.create_tweet,
                                 text=comment,
-                                in_reply_to_tweet_id=tweet.id
+                                in_reply_to_tweet_id=tweet.id,
+                                bot="simple_bot"
                             )
                             
                             print(f"   ✅ RESPOSTA POSTADA!")
                             responses_sent += 1
                             
-                            # Pausa entre respostas
-                            time.sleep(5)
+                        except QuotaExceeded as e:
+                            print(f"   ⏸️  Cota de postagens: {e}")
+                            
+                        except tweepy.Forbidden as e:
+                            print(f"   🔒 Resposta proibida: {e}")
+                            reply_gate.record_forbidden(tweet)
                             
                         except Exception as e:
                             print(f"   ❌ Erro ao postar: {e}")
                 else:
-                    print(f"   ⏭️  Nenhuma palavra-chave encontrada")
-            
-            # Pausa entre usuários
-            time.sleep(3)
+                    print(f"   ⏭️  Descartado pelo pré-filtro ({verdict.reason})")
             
         except Exception as e:
             print(f"   ❌ Erro ao processar {username}: {e}")
@@ -168,16 +198,18 @@ if __name__ == "__main__":
             cycle_count += 1
             print(f"\n🔄 CICLO {cycle_count}")
             
-            # Executa verificação
-            responses = check_and_reply()
+            # Executa verificação só das contas vencidas (dentro do orçamento)
+            due = poll_scheduler.due(limit=poll_scheduler.budget_remaining())
+            if due:
+                responses = check_and_reply(due)
+                print(f"📊 Polls vazios: {poll_scheduler.wasted_call_ratio:.0%}")
             
-            # Próxima verificação em 2 minutos
-            next_check = datetime.now()
-            next_check = next_check.replace(second=0, microsecond=0)
-            next_check = next_check.replace(minute=next_check.minute + 2)
+            # Próxima verificação quando a próxima conta vencer
+            wait = max(1.0, poll_scheduler.seconds_until_next())
+            next_check = datetime.now() + timedelta(seconds=wait)
             
             print(f"😴 Próxima verificação às {next_check.strftime('%H:%M:%S')}")
-            time.sleep(120)  # 2 minutos
+            time.sleep(wait)
             
         except KeyboardInterrupt:
             print("\n👋 Bot encerrado pelo usuário")
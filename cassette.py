@@ -0,0 +1,230 @@
+# cassette.py
+# GRAVAÇÃO DE TRÁFEGO REAL (X E LLMs) EM CASSETES JSONL COMPRIMIDOS, COM SEGREDOS REMOVIDOS (REPLAY EM fake_api.py)
+
+import argparse
+import atexit
+import gzip
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from keyword_prompts_improved import BOT_CONFIG
+from rate_limit_registry import endpoint_template
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+REDACTED = "[REDACTED]"
+SERVICE_X = "x"
+# Host real da API do X (gravação aqui; redirecionamento e replay em fake_api.py)
+X_API_HOST = "https://api.twitter.com"
+
+# Cabeçalhos que nunca vão para o cassete (OAuth 1.0a e Bearer vão no Authorization)
+SENSITIVE_HEADERS = frozenset({"authorization", "proxy-authorization", "cookie", "set-cookie",
+                               "x-api-key", "openai-organization", "openai-project"})
+FLUSH_EVERY = 50
+
+
+def secret_values() -> List[str]:
+    """Valores das chaves em keys.py (*KEY*, *TOKEN*, *SECRET*), para apagar de URLs e corpos"""
+    try:
+        import keys
+    except ImportError:
+        return []
+    secrets = {value for name, value in vars(keys).items()
+               if name.isupper() and isinstance(value, str) and len(value) >= 8
+               and any(marker in name for marker in ("KEY", "TOKEN", "SECRET"))}
+    return sorted(secrets, key=len, reverse=True)
+
+
+def split_service(url: str) -> Tuple[str, str]:
+    """
+    URL -> (serviço, caminho): "x" para a API do X, o nome do provedor para
+    os LLMs. Aceita tanto o host real quanto o caminho dos stand-ins locais
+    ("/openai/v1/...", ver fake_api.route_to_local).
+    """
+    import llm_client
+
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    head, _, rest = path.lstrip("/").partition("/")
+    if head in llm_client.PROVIDER_BASE_URLS and rest.startswith("v1"):
+        return head, f"/{rest}"
+    if parts.netloc == urlsplit(X_API_HOST).netloc or path.startswith("/2/"):
+        return SERVICE_X, path
+    for name, base_url in llm_client.PROVIDER_BASE_URLS.items():
+        if urlsplit(base_url).netloc == parts.netloc:
+            return name, path
+    return parts.netloc, path
+
+
+def replay_key(method: str, url: str) -> Tuple[str, str]:
+    """Chave de pareamento no replay: serviço e endpoint com IDs normalizados"""
+    service, path = split_service(url)
+    return service, endpoint_template(method, path)
+
+
+class CassetteRecorder:
+    """
+    Grava cada par requisição/resposta como uma linha JSON num arquivo gzip:
+    instante relativo ao início da gravação, latência, status, cabeçalhos
+    (inclusive os de rate limit) e corpos. Authorization, cookies e os
+    valores de keys.py são trocados por [REDACTED] antes de gravar.
+
+    Funciona como hook de resposta do requests, na mesma sessão em que o
+    rate_limit_registry e as métricas já escutam; cada gravação abre uma nova
+    sessão no arquivo (gzip com vários membros), sem apagar as anteriores.
+    """
+
+    def __init__(self, path: str, secrets: Optional[Iterable[str]] = None, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.secrets = secret_values() if secrets is None else sorted(secrets, key=len, reverse=True)
+        self.started = clock()
+        self.entries = 0
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._write({"cassette": CASSETTE_VERSION, "started": self.started})
+
+    def redact(self, text: Optional[str]) -> Optional[str]:
+        if not text:
+            return text
+        for secret in self.secrets:
+            text = text.replace(secret, REDACTED)
+        return text
+
+    def _headers(self, headers) -> Dict[str, str]:
+        return {name: REDACTED if name.lower() in SENSITIVE_HEADERS else self.redact(value)
+                for name, value in headers.items()}
+
+    def entry(self, response) -> Dict:
+        request = response.request
+        elapsed = response.elapsed.total_seconds()
+        body = request.body.decode("utf-8", "replace") if isinstance(request.body, bytes) else request.body
+        service, _ = split_service(request.url)
+        return {
+            "t": round(self.clock() - elapsed - self.started, 4),   # Momento do envio
+            "elapsed": round(elapsed, 4),
+            "service": service,
+            "method": request.method,
+            "url": self.redact(request.url),
+            "request_headers": self._headers(request.headers),
+            "request_body": self.redact(body),
+            "status": response.status_code,
+            "headers": {name: value for name, value in self._headers(response.headers).items()
+                        if name.lower() not in SENSITIVE_HEADERS},
+            "size": len(response.content),
+            "body": self.redact(response.text)
+        }
+
+    def hook(self, response, *args, **kwargs):
+        """Hook de resposta do requests; falha na gravação só gera aviso"""
+        try:
+            self._write(self.entry(response))
+        except Exception as e:
+            logger.warning(f"⚠️ Cassete: resposta não gravada ({e})")
+        return response
+
+    def _write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + "\n")
+            if "cassette" not in record:
+                self.entries += 1
+                if self.entries % FLUSH_EVERY == 0:
+                    self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def load_cassette(path: str) -> List[Dict]:
+    """
+    Entradas do cassete em ordem de envio. Sessões gravadas em sequência
+    ficam uma após a outra ("t" contínuo); "_shift" converte horários da
+    gravação (ex.: x-rate-limit-reset) para a mesma escala de "t".
+    """
+    entries, offset, shift, last_t = [], 0.0, 0.0, 0.0
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "cassette" in record:
+                offset = last_t
+                shift = offset - record["started"]
+                continue
+            record["t"] += offset
+            record["_shift"] = shift
+            last_t = max(last_t, record["t"] + record["elapsed"])
+            entries.append(record)
+    entries.sort(key=lambda entry: entry["t"])
+    return entries
+
+
+_recorder: Optional[CassetteRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_cassette_recorder() -> Optional[CassetteRecorder]:
+    """Gravador do processo, se BOT_CONFIG["cassette_record_file"] estiver definido"""
+    global _recorder
+    path = BOT_CONFIG.get("cassette_record_file")
+    if not path:
+        return None
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = CassetteRecorder(path)
+            atexit.register(_recorder.close)
+            logger.info(f"📼 Gravando tráfego do X e dos LLMs em {path}")
+        return _recorder
+
+
+def install_cassette_hook(client) -> Optional[CassetteRecorder]:
+    """Grava as respostas da sessão HTTP do cliente (tweepy.Client.session ou requests.Session); sem arquivo configurado, não faz nada"""
+    recorder = get_cassette_recorder()
+    if recorder is None:
+        return None
+    session = getattr(client, "session", client)
+    hooks = session.hooks.setdefault("response", [])
+    if recorder.hook not in hooks:
+        hooks.append(recorder.hook)
+    return recorder
+
+
+def describe(path: str):
+    """Resumo do cassete: duração, chamadas, tamanho e latência por endpoint, e o maior pico por minuto"""
+    entries = load_cassette(path)
+    if not entries:
+        print(f"📭 {path} não tem chamadas gravadas")
+        return
+    by_endpoint = defaultdict(list)
+    per_minute = defaultdict(int)
+    for entry in entries:
+        by_endpoint[" ".join(replay_key(entry["method"], entry["url"]))].append(entry)
+        per_minute[int(entry["t"] // 60)] += 1
+    duration = entries[-1]["t"] + entries[-1]["elapsed"]
+    print(f"📼 {path}: {len(entries)} chamadas em {duration / 60:.1f} min, pico de {max(per_minute.values())}/min")
+    print(f"{'endpoint':<48} | {'chamadas':>8} | {'KB médio':>8} | {'ms médio':>8} | {'status'}")
+    print("-" * 100)
+    for endpoint, group in sorted(by_endpoint.items()):
+        statuses = defaultdict(int)
+        for entry in group:
+            statuses[entry["status"]] += 1
+        print(f"{endpoint:<48} | {len(group):>8} | {sum(e['size'] for e in group) / len(group) / 1024:>8.1f} | "
+              f"{sum(e['elapsed'] for e in group) / len(group) * 1000:>8.0f} | {dict(statuses)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cassetes de tráfego do X e dos LLMs")
+    parser.add_argument("cassette", help="Mostra o resumo de um cassete .jsonl.gz")
+    describe(parser.parse_args().cassette)
@@ -0,0 +1,222 @@
+# completion_cache.py
+# CACHE PERSISTENTE DE COMPLETIONS DO LLM - CHAVE POR CONTEÚDO, LRU + TTL, LIMITE DE ENTRADAS E BYTES
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from keyword_prompts_improved import BOT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "completion_cache.db"
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024   # 5 MB de texto de completions
+DEFAULT_TTL_SECONDS = 72 * 3600       # 3 dias
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    completion TEXT NOT NULL,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_completions_last_used ON completions (last_used);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def normalize_input(text: str) -> str:
+    """Ignora diferenças de caixa e de espaços em branco no texto de entrada"""
+    return " ".join(text.split()).casefold()
+
+
+def make_key(text: str, template: str, model: str, temperature: float) -> str:
+    """Endereço da completion: hash do texto normalizado, template, modelo e temperatura"""
+    material = json.dumps(
+        [normalize_input(text), template, model, round(float(temperature), 3)],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    Completions já geradas, gravadas em SQLite para sobreviver a restarts.
+
+    Uma completion é reaproveitada quando o mesmo texto (normalizado) chega com o
+    mesmo template, modelo e temperatura. Entradas expiram após o TTL e, quando
+    o cache passa de max_entries ou max_bytes, as menos usadas recentemente são
+    removidas primeiro (LRU). Contadores de hits e tokens economizados são
+    acumulados no próprio arquivo.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 clock: Callable[[], float] = time.time):
+        self.db_path = db_path
+        self.max_entries = max_entries or BOT_CONFIG.get("completion_cache_max_entries", DEFAULT_MAX_ENTRIES)
+        self.max_bytes = max_bytes or BOT_CONFIG.get("completion_cache_max_bytes", DEFAULT_MAX_BYTES)
+        self.ttl_seconds = ttl_seconds or BOT_CONFIG.get("completion_cache_ttl_hours", DEFAULT_TTL_SECONDS / 3600) * 3600
+        self.clock = clock
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+
+        self.stats = {"hits": 0, "misses": 0, "tokens_saved": 0}
+        self.stats.update(dict(self._conn.execute("SELECT name, value FROM cache_stats")))
+
+        # Totais mantidos em memória para checar os limites sem varrer a tabela
+        self._entries, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def _bump(self, **deltas):
+        for name, delta in deltas.items():
+            self.stats[name] += delta
+            self._conn.execute(
+                "INSERT INTO cache_stats (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, delta)
+            )
+
+    def _delete(self, keys):
+        for key in keys:
+            row = self._conn.execute("DELETE FROM completions WHERE key = ? RETURNING size", (key,)).fetchone()
+            if row:
+                self._entries -= 1
+                self._bytes -= row[0]
+
+    def get(self, text: str, template: str, model: str, temperature: float) -> Optional[str]:
+        """Completion em cache, ou None (conta hit/miss e tokens economizados)"""
+        key = make_key(text, template, model, temperature)
+        now = self.clock()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT completion, tokens, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row and now - row[2] > self.ttl_seconds:
+                self._delete([key])
+                row = None
+
+            if not row:
+                self._bump(misses=1)
+                return None
+
+            completion, tokens, _ = row
+            self._conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (now, key))
+            self._bump(hits=1, tokens_saved=tokens)
+
+        logger.info(f"♻️  Completion reaproveitada do cache ({tokens} tokens economizados)")
+        return completion
+
+    def put(self, text: str, template: str, model: str, temperature: float,
+            completion: str, tokens: int = 0):
+        """Grava a completion gerada e aplica os limites de entradas e bytes"""
+        if not completion:
+            return
+
+        key = make_key(text, template, model, temperature)
+        size = len(completion.encode("utf-8"))
+        now = self.clock()
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete([key])
+                self._conn.execute(
+                    "INSERT INTO completions (key, model, completion, tokens, size, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, model, completion, int(tokens or 0), size, now, now)
+                )
+                self._entries += 1
+                self._bytes += size
+                self._enforce_bounds(now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _enforce_bounds(self, now: float):
+        """Remove expiradas e, se ainda acima dos limites, as menos usadas recentemente"""
+        if self._entries > self.max_entries or self._bytes > self.max_bytes:
+            self.evict_expired(now)
+
+        while self._entries > self.max_entries or self._bytes > self.max_bytes:
+            excess = max(self._entries - self.max_entries, 1)
+            keys = [row[0] for row in self._conn.execute(
+                "SELECT key FROM completions ORDER BY last_used LIMIT ?", (excess,)
+            )]
+            if not keys:
+                break
+            self._delete(keys)
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """Remove entradas mais velhas que o TTL"""
+        now = self.clock() if now is None else now
+        with self._lock:
+            keys = [row[0] for row in self._conn.execute(
+                "SELECT key FROM completions WHERE created_at < ?", (now - self.ttl_seconds,)
+            )]
+            self._delete(keys)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+            self._conn.execute("DELETE FROM cache_stats")
+            self._entries = self._bytes = 0
+            self.stats = {"hits": 0, "misses": 0, "tokens_saved": 0}
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.stats["tokens_saved"]
+
+    def get_stats(self) -> Dict:
+        return {
+            "entries": self._entries,
+            "bytes": self._bytes,
+            "hits": self.stats["hits"],
+            "misses": self.stats["misses"],
+            "hit_ratio": round(self.hit_ratio, 3),
+            "tokens_saved": self.stats["tokens_saved"]
+        }
+
+
+_default_cache: Optional[CompletionCache] = None
+
+
+def get_completion_cache() -> CompletionCache:
+    """Cache compartilhado por todos os bots do processo"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CompletionCache()
+    return _default_cache
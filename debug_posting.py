@@ -6,6 +6,7 @@ import openai
 import json
 from datetime import datetime
 from keys import *
+from posting_quota import get_posting_quota
 
 def test_twitter_posting():
     """Testa se consegue postar no Twitter"""
@@ -44,9 +45,11 @@ def test_twitter_posting():
                 test_message = f"🤖 Teste de bot - {datetime.now().strftime('%H:%M:%S')}"
                 
                 try:
-                    response = client.create_tweet(
+                    response = get_posting_quota().post(
+                        client.create_tweet,
                         text=test_message,
-                        in_reply_to_tweet_id=latest_tweet.id
+                        in_reply_to_tweet_id=latest_tweet.id,
+                        bot="debug_posting"
                     )
                     
                     print(f"✅ SUCESSO! Tweet de teste postado: {response.data['id']}")
@@ -0,0 +1,119 @@
+# dedup_cache.py
+# CACHE DE DEDUPLICAÇÃO DE TWEETS PROCESSADOS - O(1), MEMÓRIA LIMITADA E EXPIRAÇÃO POR IDADE
+
+import time
+from array import array
+from typing import Callable, Iterator, Optional, Tuple
+
+DEFAULT_CAPACITY = 10000
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600  # 7 dias
+
+
+class ProcessedIdCache:
+    """
+    Conjunto de IDs já processados com teto fixo de memória.
+
+    Combina um set (consulta O(1)) com um buffer circular ordenado por tempo de
+    inserção, guardando os IDs como int64 compactos. Quando o buffer enche, o ID
+    mais antigo é descartado; IDs mais velhos que o TTL também são removidos.
+    Opcionalmente espelha cada inserção no StateStore para sobreviver a restarts.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        if capacity <= 0:
+            raise ValueError("capacity deve ser positivo")
+
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+
+        # Buffer circular: ids e instantes de inserção, na ordem de chegada
+        self._ids = array("q", bytes(8 * capacity))
+        self._times = array("d", bytes(8 * capacity))
+        self._head = 0   # posição do mais antigo
+        self._size = 0
+        self._members = set()
+
+        self._store = None
+        self._scope = None
+
+    @classmethod
+    def from_state_store(cls, store, scope: str, capacity: int = DEFAULT_CAPACITY,
+                         ttl_seconds: float = DEFAULT_TTL_SECONDS) -> "ProcessedIdCache":
+        """Cria o cache a partir dos IDs recentes do StateStore e passa a espelhar novas inserções"""
+        cache = cls(capacity, ttl_seconds)
+        for tweet_id, seen_at in store.load_processed_ids(scope, max_age_seconds=ttl_seconds, limit=capacity):
+            cache._push(int(tweet_id), seen_at)
+        cache._store = store
+        cache._scope = scope
+        return cache
+
+    def __contains__(self, tweet_id) -> bool:
+        self.evict_expired()
+        return int(tweet_id) in self._members
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[int]:
+        for tweet_id, _ in self.items():
+            yield tweet_id
+
+    def items(self) -> Iterator[Tuple[int, float]]:
+        """(id, instante de inserção) do mais antigo para o mais recente"""
+        for offset in range(self._size):
+            index = (self._head + offset) % self.capacity
+            yield self._ids[index], self._times[index]
+
+    def add(self, tweet_id, now: Optional[float] = None) -> bool:
+        """Registra o ID; retorna False se ele já estava no cache"""
+        tweet_id = int(tweet_id)
+        now = self.clock() if now is None else now
+        self.evict_expired(now)
+
+        if tweet_id in self._members:
+            return False
+
+        self._push(tweet_id, now)
+        if self._store is not None:
+            self._store.add_processed_id(self._scope, tweet_id, now)
+        return True
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """Remove IDs mais velhos que o TTL (amortizado O(1) por inserção)"""
+        if not self.ttl_seconds:
+            return 0
+
+        cutoff = (self.clock() if now is None else now) - self.ttl_seconds
+        evicted = 0
+        while self._size and self._times[self._head] < cutoff:
+            self._pop_oldest()
+            evicted += 1
+        return evicted
+
+    def prune_store(self):
+        """Remove do StateStore os IDs que já expiraram"""
+        if self._store is not None and self.ttl_seconds:
+            self._store.prune_processed_ids(self._scope, self.ttl_seconds)
+
+    def memory_ceiling_bytes(self) -> int:
+        """Memória fixa dos buffers circulares (o set cresce no máximo até capacity)"""
+        return self._ids.itemsize * self.capacity + self._times.itemsize * self.capacity
+
+    def _push(self, tweet_id: int, seen_at: float):
+        if tweet_id in self._members:
+            return
+        if self._size == self.capacity:
+            self._pop_oldest()
+
+        index = (self._head + self._size) % self.capacity
+        self._ids[index] = tweet_id
+        self._times[index] = seen_at
+        self._size += 1
+        self._members.add(tweet_id)
+
+    def _pop_oldest(self):
+        self._members.discard(self._ids[self._head])
+        self._head = (self._head + 1) % self.capacity
+        self._size -= 1
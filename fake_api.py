@@ -0,0 +1,542 @@
+# fake_api.py
+# STAND-INS LOCAIS DA API DO X E DOS PROVEDORES LLM - LATÊNCIA, ERROS E RATE LIMIT CONFIGURÁVEIS, SEM GASTAR COTA, E REPLAY DE CASSETES
+
+import importlib
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+import types
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+from cassette import X_API_HOST, load_cassette, replay_key, split_service
+from rate_limit_registry import endpoint_template
+
+FIRST_TWEET_ID = 1_800_000_000_000_000_000
+
+# Conta do próprio bot devolvida por GET /2/users/me
+BENCH_USER = {"id": "9000000000000000001", "name": "Bot de Benchmark", "username": "bench"}
+
+# Credenciais falsas: com os stand-ins, as chaves reais nunca saem do processo
+FAKE_KEYS = {
+    "X_BEARER_TOKEN": "bench-bearer",
+    "X_API_KEY": "bench-key",
+    "X_API_SECRET": "bench-secret",
+    "X_ACCESS_TOKEN": "bench-access",
+    "X_ACCESS_TOKEN_SECRET": "bench-access-secret",
+    "OPENAI_API_KEY": "bench-openai",
+    "XAI_API_KEY": "bench-xai"
+}
+
+# Cabeçalhos de resposta devolvidos no replay de cassetes (o corpo é gravado já decodificado)
+REPLAY_HEADERS = ("content-type", "retry-after")
+RATE_LIMIT_PREFIXES = ("x-rate-limit-", "x-ratelimit-")
+
+# Textos dos tweets gerados; {n} deixa cada um único (sem acertos falsos nos caches)
+KEYWORD_TEMPLATES = [
+    "Os números de {keyword} divulgados hoje mostram um cenário bem diferente do anunciado na semana passada ({n})",
+    "Precisamos falar sério sobre {keyword}: a proposta em debate no Congresso muda muita coisa ({n})",
+    "Alguém viu a entrevista sobre {keyword} ontem à noite? Faltou dado concreto em quase todas as respostas ({n})",
+]
+NEUTRAL_TEMPLATES = [
+    "Bom dia a todos, o café ficou pronto mais cedo e a manhã começou tranquila por aqui ({n})",
+    "Terminei de ler um livro ótimo no fim de semana, depois conto o que achei do final ({n})",
+    "Obrigado pelas mensagens de hoje, respondo todo mundo com calma mais tarde ({n})",
+]
+REPLY_TEMPLATES = [
+    "Vale conferir os dados oficiais antes de tirar conclusões; a série histórica conta outra história.",
+    "Boa pergunta. Os números mais recentes apontam na direção contrária, e a fonte é pública.",
+    "Sem transparência nos critérios fica difícil avaliar. Quem publicou a metodologia?",
+]
+
+
+@dataclass
+class ServerProfile:
+    """Comportamento de um stand-in: latência, falhas e janela de rate limit por endpoint"""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0        # Acrescenta uniforme(0, jitter) a cada resposta
+    error_rate: float = 0.0       # Fração de respostas 503
+    rate_limit: int = 10000       # Chamadas por janela e endpoint antes do 429
+    window_seconds: float = 900.0
+
+
+def monitored_keywords(*modules: str) -> List[str]:
+    """Palavras-chave dos módulos de prompts (padrão: keyword_prompts, do bot_improved, e o improved, dos outros)"""
+    keywords = []
+    for name in modules or ("keyword_prompts", "keyword_prompts_improved"):
+        prompts = importlib.import_module(name).prompts_com_aliases
+        keywords.extend(keyword for group in prompts for keyword in group)
+    return keywords
+
+
+class LocalServer:
+    """
+    Base dos stand-ins: ThreadingHTTPServer numa thread daemon, latência,
+    erros e janelas de rate limit do ServerProfile, e contagem por endpoint
+    e status. As subclasses só implementam route() e os cabeçalhos de limite.
+    """
+    # Endpoints de inicialização, fora da injeção de falhas e do rate limit
+    fault_exempt = frozenset()
+
+    def __init__(self, profile: Optional[ServerProfile] = None, seed: int = 0):
+        self.profile = profile or ServerProfile()
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self._windows: Dict[str, List[float]] = {}   # endpoint -> [início da janela, chamadas]
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "LocalServer":
+        server_ref = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # Keep-alive, como as APIs reais
+            disable_nagle_algorithm = True
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, payload, headers = server_ref.serve(self.command, self.path, body)
+                data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", headers.pop("Content-Type", "application/json; charset=utf-8"))
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_DELETE = _dispatch
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _take(self, endpoint: str, now: float) -> Tuple[bool, int, float]:
+        """Consome uma chamada da janela do endpoint: (permitida, restantes, reinício em epoch)"""
+        window = self._windows.get(endpoint)
+        if window is None or now >= window[0] + self.profile.window_seconds:
+            window = self._windows[endpoint] = [now, 0]
+        window[1] += 1
+        remaining = self.profile.rate_limit - window[1]
+        return remaining >= 0, max(0, remaining), window[0] + self.profile.window_seconds
+
+    def serve(self, method: str, raw_path: str, body: bytes) -> Tuple[int, object, Dict[str, str]]:
+        parts = urlsplit(raw_path)
+        endpoint = endpoint_template(method, parts.path)
+        delay = self.profile.latency_ms + self.rng.uniform(0, self.profile.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+
+        now = time.time()
+        with self.lock:
+            allowed, remaining, reset = self._take(endpoint, now)
+            failed = self.rng.random() < self.profile.error_rate
+            if endpoint in self.fault_exempt:
+                allowed, failed = True, False
+        headers = self.rate_limit_headers(remaining, reset, now)
+
+        if not allowed:
+            status, payload = 429, {"title": "Too Many Requests", "status": 429}
+            headers["Retry-After"] = f"{reset - now:.2f}"
+        elif failed:
+            status, payload = 503, {"title": "Service Unavailable", "status": 503}
+        else:
+            query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+            payload_in = json.loads(body) if body else {}
+            with self.lock:
+                status, payload = self.route(method, parts.path, query, payload_in)
+
+        with self.lock:
+            self.requests[endpoint][status] += 1
+        return status, payload, headers
+
+    def route(self, method: str, path: str, query: Dict[str, str], body: Dict) -> Tuple[int, Dict]:
+        raise NotImplementedError
+
+    def rate_limit_headers(self, remaining: int, reset: float, now: float) -> Dict[str, str]:
+        return {}
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            by_endpoint = {endpoint: {str(status): count for status, count in sorted(statuses.items())}
+                           for endpoint, statuses in sorted(self.requests.items())}
+        return {
+            "requests": sum(sum(statuses.values()) for statuses in self.requests.values()),
+            "by_endpoint": by_endpoint
+        }
+
+
+class FakeXServer(LocalServer):
+    """
+    Endpoints v2 usados pelos bots: GET /2/users/me, /2/users/:id/tweets,
+    /2/users/:id/mentions, /2/tweets/search/recent e POST /2/tweets, com
+    cabeçalhos x-rate-limit-* por endpoint.
+
+    Cada leitura devolve `tweets_per_page` tweets novos (IDs crescentes,
+    acima de qualquer since_id já visto); `keyword_ratio` deles citam uma
+    das palavras-chave monitoradas e o resto é conversa que o filtro descarta.
+    """
+    fault_exempt = frozenset({"GET /2/users/me"})
+
+    def __init__(self, profile: Optional[ServerProfile] = None, keywords: Optional[List[str]] = None,
+                 tweets_per_page: int = 10, keyword_ratio: float = 0.5, seed: int = 0):
+        super().__init__(profile, seed)
+        self.keywords = list(keywords or monitored_keywords())
+        self.tweets_per_page = tweets_per_page
+        self.keyword_ratio = keyword_ratio
+        self._ids = itertools.count(FIRST_TWEET_ID)
+        self.readers = [{"id": str(7_000_000_000 + i), "username": f"leitor{i}", "name": f"Leitor {i}"}
+                        for i in range(20)]
+        self.tweets_served = 0
+        self.posts: List[Dict] = []
+
+    def rate_limit_headers(self, remaining: int, reset: float, now: float) -> Dict[str, str]:
+        return {
+            "x-rate-limit-limit": str(self.profile.rate_limit),
+            "x-rate-limit-remaining": str(remaining),
+            "x-rate-limit-reset": str(int(reset))
+        }
+
+    def _text(self, n: int) -> str:
+        if self.rng.random() < self.keyword_ratio:
+            return self.rng.choice(KEYWORD_TEMPLATES).format(keyword=self.rng.choice(self.keywords), n=n)
+        return self.rng.choice(NEUTRAL_TEMPLATES).format(n=n)
+
+    def _tweet(self, author_id: str, text: Optional[str] = None, **fields) -> Dict:
+        tweet_id = next(self._ids)
+        self.tweets_served += 1
+        return {
+            "id": str(tweet_id),
+            "text": text or self._text(tweet_id - FIRST_TWEET_ID),
+            "author_id": author_id,
+            "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "conversation_id": str(tweet_id),
+            "reply_settings": "everyone",
+            "edit_history_tweet_ids": [str(tweet_id)],
+            **fields
+        }
+
+    def _page(self, tweets: List[Dict], includes: Optional[Dict] = None) -> Dict:
+        payload = {"data": tweets, "meta": {"result_count": len(tweets)}}
+        if tweets:
+            payload["meta"].update(newest_id=tweets[-1]["id"], oldest_id=tweets[0]["id"])
+            tweets.reverse()   # A API devolve do mais novo para o mais antigo
+        else:
+            del payload["data"]
+        if includes:
+            payload["includes"] = includes
+        return payload
+
+    def _count(self, query: Dict[str, str]) -> int:
+        return min(self.tweets_per_page, int(query.get("max_results", self.tweets_per_page)))
+
+    def route(self, method: str, path: str, query: Dict[str, str], body: Dict) -> Tuple[int, Dict]:
+        if method == "GET" and path == "/2/users/me":
+            return 200, {"data": BENCH_USER}
+
+        if method == "GET" and path == "/2/tweets/search/recent":
+            authors = re.findall(r"from:(\w+)", query.get("query", "")) or [BENCH_USER["id"]]
+            return 200, self._page([self._tweet(self.rng.choice(authors)) for _ in range(self._count(query))])
+
+        match = re.fullmatch(r"/2/users/(\d+)/(tweets|mentions)", path)
+        if method == "GET" and match and match.group(2) == "tweets":
+            return 200, self._page([self._tweet(match.group(1)) for _ in range(self._count(query))])
+
+        if method == "GET" and match:
+            mentions, users, parents = [], {}, []
+            for _ in range(self._count(query)):
+                reader = self.rng.choice(self.readers)
+                users[reader["id"]] = reader
+                fields = {}
+                if self.rng.random() < 0.5:
+                    # Metade responde a um tweet do bot, que vem nos includes
+                    parent = self._tweet(BENCH_USER["id"])
+                    parents.append({key: parent[key] for key in ("id", "text", "author_id", "edit_history_tweet_ids")})
+                    fields = {"conversation_id": parent["id"], "in_reply_to_user_id": BENCH_USER["id"],
+                              "referenced_tweets": [{"type": "replied_to", "id": parent["id"]}]}
+                mention = self._tweet(reader["id"], **fields)
+                mention["text"] = f"@{BENCH_USER['username']} {mention['text']}"
+                mentions.append(mention)
+            return 200, self._page(mentions, {"users": list(users.values()), "tweets": parents})
+
+        if method == "POST" and path == "/2/tweets":
+            tweet_id = str(next(self._ids))
+            self.posts.append({"id": tweet_id, **body})
+            return 201, {"data": {"id": tweet_id, "text": body.get("text", ""),
+                                  "edit_history_tweet_ids": [tweet_id]}}
+
+        return 404, {"title": "Not Found Error", "status": 404, "detail": f"{method} {path}"}
+
+    def get_stats(self) -> Dict:
+        stats = super().get_stats()
+        stats.update(tweets_served=self.tweets_served, posts_created=len(self.posts))
+        return stats
+
+
+class FakeLLMServer(LocalServer):
+    """
+    POST /<provedor>/v1/chat/completions no formato da OpenAI (a xAI usa o
+    mesmo), com usage e cabeçalhos x-ratelimit-*-requests. O prefixo do
+    provedor separa as contagens de openai e xai no mesmo servidor.
+    """
+
+    def __init__(self, profile: Optional[ServerProfile] = None, seed: int = 0):
+        super().__init__(profile, seed)
+        self.completions = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def rate_limit_headers(self, remaining: int, reset: float, now: float) -> Dict[str, str]:
+        return {
+            "x-ratelimit-limit-requests": str(self.profile.rate_limit),
+            "x-ratelimit-remaining-requests": str(remaining),
+            "x-ratelimit-reset-requests": f"{max(0.0, reset - now):.2f}s"
+        }
+
+    def route(self, method: str, path: str, query: Dict[str, str], body: Dict) -> Tuple[int, Dict]:
+        if method != "POST" or not path.endswith("/v1/chat/completions"):
+            return 404, {"error": {"message": f"{method} {path}", "type": "invalid_request_error"}}
+
+        content = self.rng.choice(REPLY_TEMPLATES)
+        # ~4 caracteres por token, como a estimativa do token_ledger sem tiktoken
+        prompt_tokens = sum(len(message.get("content", "")) for message in body.get("messages", [])) // 4 + 1
+        completion_tokens = min(body.get("max_tokens", 60), len(content) // 4 + 1)
+        self.completions += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        return 200, {
+            "id": f"chatcmpl-bench-{self.completions}",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens}
+        }
+
+    def get_stats(self) -> Dict:
+        stats = super().get_stats()
+        stats.update(completions=self.completions, prompt_tokens=self.prompt_tokens,
+                     completion_tokens=self.completion_tokens)
+        return stats
+
+
+class CassetteServer(LocalServer):
+    """
+    Devolve um cassete (cassette.py) a qualquer bot apontado para cá (route_to_local).
+
+    As respostas de cada endpoint saem na ordem gravada. Com `speed` > 0 o
+    replay segue o relógio da gravação acelerado `speed` vezes: cada resposta
+    espera a latência gravada / speed, e uma leitura (GET) que chega antes do
+    seu momento recebe uma página vazia, como a API faria sem tweets novos.
+    `speed` = 0 serve tudo o mais rápido possível, na ordem, para comparar
+    mudanças de filtro, matcher, cache e agendador sobre a mesma entrada.
+    Os cabeçalhos x-rate-limit-reset são reposicionados no relógio do replay.
+    """
+
+    def __init__(self, path: str, speed: float = 0.0):
+        super().__init__(ServerProfile())
+        self.path = path
+        self.speed = speed
+        self.entries = load_cassette(path)
+        self._queues: Dict[Tuple[str, str], deque] = defaultdict(deque)
+        for entry in self.entries:
+            self._queues[replay_key(entry["method"], entry["url"])].append(entry)
+        self._last: Dict[Tuple[str, str], Dict] = {}
+        self._origin: Optional[float] = None
+        self._start = self.entries[0]["t"] if self.entries else 0.0
+        self.by_service: Dict[str, int] = defaultdict(int)
+        self.served = 0
+        self.empty_pages = 0
+        self.repeated = 0
+        self.unknown = 0
+
+    def _position(self, now: float) -> float:
+        """Ponto da gravação (em "t") do instante atual; o replay começa na primeira chamada gravada"""
+        if self._origin is None:
+            self._origin = now
+        return self._start + (now - self._origin) * self.speed
+
+    def _replay_time(self, recorded: float, entry: Dict) -> float:
+        """Horário da gravação (epoch) -> horário equivalente no replay"""
+        position = recorded + entry["_shift"]
+        return self._origin + ((position - self._start) / self.speed if self.speed else 0.0)
+
+    def _headers(self, entry: Dict) -> Dict[str, str]:
+        headers = {}
+        for name, value in entry["headers"].items():
+            lower = name.lower()
+            if lower == "x-rate-limit-reset":
+                value = str(int(self._replay_time(float(value), entry)))
+            elif lower == "retry-after":
+                value = f"{float(value) / self.speed:.2f}" if self.speed else "0"
+            elif lower not in REPLAY_HEADERS and not lower.startswith(RATE_LIMIT_PREFIXES):
+                continue
+            headers["Content-Type" if lower == "content-type" else name] = value
+        return headers
+
+    def serve(self, method: str, raw_path: str, body: bytes) -> Tuple[int, object, Dict[str, str]]:
+        key = replay_key(method, raw_path)
+        with self.lock:
+            position = self._position(time.time())
+            queue = self._queues.get(key)
+            entry = None
+            if queue and (method != "GET" or not self.speed or queue[0]["t"] <= position):
+                entry = queue.popleft()
+                self._last[key] = entry
+                self.served += 1
+            last = self._last.get(key) or (queue[0] if queue else None)
+            self.requests[f"{method} {split_service(raw_path)[1]}"][entry["status"] if entry else 0] += 1
+            self.by_service[key[0]] += 1
+
+        if entry is not None:
+            if self.speed:
+                time.sleep(entry["elapsed"] / self.speed)
+            return entry["status"], (entry["body"] or "").encode("utf-8"), self._headers(entry)
+
+        if last is None:
+            with self.lock:
+                self.unknown += 1
+            return 404, {"title": "Not Found Error", "detail": f"{method} {raw_path} não está no cassete"}, {}
+
+        data = json.loads(last["body"]) if last["body"] and last["body"].lstrip().startswith("{") else {}
+        headers = self._headers(last)
+        if isinstance(data.get("data"), list):
+            # Leitura adiantada ou cassete esgotado: nada novo, como a API sem resultados
+            with self.lock:
+                self.empty_pages += 1
+            return 200, {"meta": {"result_count": 0}}, headers
+        # Postagens e completions esgotadas: repete a última resposta do endpoint
+        with self.lock:
+            self.repeated += 1
+        return last["status"], (last["body"] or "").encode("utf-8"), headers
+
+    def get_stats(self) -> Dict:
+        stats = super().get_stats()
+        with self.lock:
+            stats.update(by_service=dict(self.by_service), recorded=len(self.entries), served=self.served,
+                         empty_pages=self.empty_pages,
+                         repeated=self.repeated, unknown=self.unknown,
+                         remaining=sum(len(queue) for queue in self._queues.values()))
+        return stats
+
+
+class RedirectAdapter(HTTPAdapter):
+    """Troca o prefixo da URL na hora do envio: o cliente continua achando que fala com o host real"""
+
+    def __init__(self, prefix: str, target: str, **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix
+        self.target = target.rstrip("/")
+
+    def send(self, request, **kwargs):
+        if request.url.startswith(self.prefix):
+            request.url = self.target + request.url[len(self.prefix):]
+        return super().send(request, **kwargs)
+
+
+def install_fake_keys():
+    """Registra um módulo keys com credenciais falsas (antes de importar os bots)"""
+    module = types.ModuleType("keys")
+    module.__dict__.update(FAKE_KEYS)
+    sys.modules["keys"] = module
+
+
+def route_to_local(x_url: str, llm_url: str):
+    """
+    Aponta, só neste processo, os tweepy.Client criados daqui em diante para
+    o stand-in do X e os provedores LLM para o stand-in de LLM, com chaves
+    falsas. Os bots rodam sem nenhuma mudança.
+    """
+    import tweepy
+
+    import llm_client
+
+    install_fake_keys()
+    base = tweepy.Client
+
+    class LocalClient(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.session.mount(X_API_HOST, RedirectAdapter(X_API_HOST, x_url))
+
+    tweepy.Client = LocalClient
+    with llm_client._providers_lock:
+        llm_client._providers.clear()
+        for name in llm_client.PROVIDER_BASE_URLS:
+            llm_client.PROVIDER_BASE_URLS[name] = f"{llm_url.rstrip('/')}/{name}/v1"
+
+
+if __name__ == "__main__":
+    # Verificação: tweepy e LLMProvider de verdade contra os stand-ins
+    import tweepy
+
+    from llm_client import get_provider
+    from tweet_filter import TweetFilter
+
+    x_server = FakeXServer(ServerProfile(rate_limit=3, window_seconds=60), keyword_ratio=1.0, seed=1).start()
+    llm_server = FakeLLMServer(ServerProfile(latency_ms=5)).start()
+    route_to_local(x_server.url, llm_server.url)
+
+    client = tweepy.Client(bearer_token="x", consumer_key="a", consumer_secret="b",
+                           access_token="c", access_token_secret="d")
+    assert client.get_me().data.username == BENCH_USER["username"]
+
+    page = client.search_recent_tweets("(from:111 OR from:222) -is:retweet", max_results=5,
+                                       tweet_fields=["author_id", "created_at", "reply_settings"])
+    assert len(page.data) == 5 and {str(t.author_id) for t in page.data} <= {"111", "222"}
+    assert int(page.data[0].id) > int(page.data[-1].id) and page.meta["newest_id"] == str(page.data[0].id)
+    assert all(TweetFilter().evaluate(tweet.text).accepted for tweet in page.data)
+
+    mentions = client.get_users_mentions(BENCH_USER["id"], max_results=4, expansions=["author_id"])
+    assert len(mentions.includes["users"]) >= 1 and mentions.data[0].text.startswith("@bench")
+
+    # Quarta chamada ao mesmo endpoint na janela de 3: 429 com os cabeçalhos da API
+    client.search_recent_tweets("from:111")
+    client.search_recent_tweets("from:111")
+    try:
+        client.search_recent_tweets("from:111")
+        raise AssertionError("esperava 429")
+    except tweepy.TooManyRequests as e:
+        assert e.response.headers["x-rate-limit-remaining"] == "0"
+
+    posted = client.create_tweet(text="resposta", in_reply_to_tweet_id=page.data[0].id)
+    assert x_server.posts[-1]["reply"]["in_reply_to_tweet_id"] == str(page.data[0].id)
+    assert posted.data["id"] == x_server.posts[-1]["id"]
+
+    neutral = FakeXServer(keyword_ratio=0.0)
+    assert not any(TweetFilter().evaluate(neutral._text(n)).accepted for n in range(30))
+
+    response = get_provider("xai").chat([{"role": "user", "content": "Comente: a inflação caiu."}], "grok-1")
+    assert response.content in REPLY_TEMPLATES and not response.usage_estimated
+    assert llm_server.get_stats()["by_endpoint"] == {"POST /xai/v1/chat/completions": {"200": 1}}
+    print(f"✅ fake_api: X {x_server.get_stats()['by_endpoint']}")
+    print(f"✅ fake_api: LLM {llm_server.get_stats()}")
+    x_server.stop()
+    llm_server.stop()
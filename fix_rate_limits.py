@@ -6,6 +6,7 @@ import time
 import json
 from datetime import datetime, timedelta
 from keys import *
+from posting_quota import get_posting_quota
 
 def check_rate_limit_status():
     """Verifica status detalhado dos rate limits"""
@@ -105,7 +106,7 @@ def test_posting_after_reset():
         if test_post == 's':
             test_message = f"🤖 Teste pós rate-limit - {datetime.now().strftime('%H:%M:%S')}"
             
-            response = client.create_tweet(text=test_message)
+            response = get_posting_quota().post(client.create_tweet, text=test_message, bot="fix_rate_limits")
             print(f"✅ SUCESSO! Tweet postado: {response.data['id']}")
             
             # Oferece para deletar
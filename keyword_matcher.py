@@ -0,0 +1,162 @@
+# keyword_matcher.py
+# DETECTOR DE PALAVRAS-CHAVE COM AUTÔMATO AHO-CORASICK (UMA PASSADA POR TWEET)
+
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Ordem de prioridade usada para ordenar os matches (menor = mais importante)
+PRIORITY_RANK = {
+    "critical": 0,
+    "high": 1,
+    "medium": 2,
+    "low": 3
+}
+DEFAULT_PRIORITY = "low"
+
+# Chave do prompt_data que desliga os limites de palavra (casa também plurais e flexões)
+MATCH_SUBSTRING = "match_substring"
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas e sem acentos ("Inflação" -> "inflacao")"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+@dataclass
+class KeywordMatch:
+    """Uma ocorrência de palavra-chave no texto normalizado"""
+    keyword: str
+    prompt_data: Dict
+    priority: str
+    start: int
+    end: int
+
+    @property
+    def prompt(self) -> str:
+        return self.prompt_data["prompt"]
+
+
+class KeywordMatcher:
+    """
+    Autômato Aho-Corasick compilado uma única vez a partir de prompts_com_aliases.
+
+    Encontra todos os aliases em uma única passada pelo texto (custo proporcional
+    ao tamanho do tweet, não ao número de aliases), respeita limites de palavra
+    ("jair" não dispara dentro de palavras maiores) e devolve os matches ordenados
+    por prioridade do prompt. Prompts marcados com MATCH_SUBSTRING casam em
+    qualquer posição ("morte" dispara em "mortes").
+    """
+
+    def __init__(self, prompts: Dict):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self._patterns: List[tuple] = []  # (keyword, tamanho, prompt_data, prioridade, palavra inteira)
+
+        aliases = {}
+        for keywords_tuple, prompt_data in prompts.items():
+            priority = prompt_data.get("priority", DEFAULT_PRIORITY)
+            for keyword in keywords_tuple:
+                normalized = normalize_text(keyword.strip())
+                if normalized:
+                    aliases[normalized] = (keyword.lower(), prompt_data, priority)
+
+        for normalized, (keyword, prompt_data, priority) in aliases.items():
+            self._add_pattern(normalized, keyword, prompt_data, priority)
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def _add_pattern(self, normalized: str, keyword: str, prompt_data: Dict, priority: str):
+        state = 0
+        for ch in normalized:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][ch] = next_state
+            state = next_state
+
+        self._output[state].append(len(self._patterns))
+        self._patterns.append((keyword, len(normalized), prompt_data, priority,
+                               not prompt_data.get(MATCH_SUBSTRING)))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def find_all_normalized(self, text: str, tally: Optional[Dict[str, int]] = None) -> List[KeywordMatch]:
+        """
+        Como find_all, mas para texto já normalizado com normalize_text.
+
+        Se `tally` for informado, conta na mesma passada as ocorrências dos
+        caracteres que são chaves do dicionário (ex: {"#": 0, "@": 0}).
+        """
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self._patterns
+        text_length = len(text)
+        seen = set()
+        matches = []
+        state = 0
+
+        for index, ch in enumerate(text):
+            if tally is not None and ch in tally:
+                tally[ch] += 1
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            for pattern_id in output[state]:
+                if pattern_id in seen:
+                    continue
+                keyword, length, prompt_data, priority, whole_word = patterns[pattern_id]
+                start = index - length + 1
+                end = index + 1
+                if whole_word:
+                    if start > 0 and is_word_char(text[start - 1]):
+                        continue
+                    if end < text_length and is_word_char(text[end]):
+                        continue
+                seen.add(pattern_id)
+                matches.append(KeywordMatch(keyword, prompt_data, priority, start, end))
+
+        matches.sort(key=lambda m: (PRIORITY_RANK.get(m.priority, len(PRIORITY_RANK)), m.start, m.start - m.end))
+        return matches
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """Todos os aliases presentes no texto, em ordem de prioridade"""
+        return self.find_all_normalized(normalize_text(text))
+
+    def best_match(self, text: str) -> Optional[KeywordMatch]:
+        """Match de maior prioridade, ou None"""
+        matches = self.find_all(text)
+        return matches[0] if matches else None
+
+
+_default_matcher: Optional[KeywordMatcher] = None
+
+
+def get_default_matcher() -> KeywordMatcher:
+    """Matcher compartilhado construído de keyword_prompts_improved.prompts_com_aliases"""
+    global _default_matcher
+    if _default_matcher is None:
+        from keyword_prompts_improved import prompts_com_aliases
+        _default_matcher = KeywordMatcher(prompts_com_aliases)
+    return _default_matcher
@@ -174,9 +174,13 @@ prompts_com_aliases = {
 # =================================================================================
 
 BOT_CONFIG = {
-    # Limites globais para economia de tokens
+    # Limites globais para economia de tokens (cota de postagens em
+    # posting_quota.py: hora e dia em janela deslizante, mês de calendário UTC
+    # reiniciando em monthly_reset_day, compartilhada por todos os bots)
     "max_responses_per_hour": 15,
     "max_responses_per_day": 100,
+    "max_posts_per_month": 100,
+    "monthly_reset_day": 19,
     "max_tokens_per_day": 5000,
     
     # Filtros de qualidade
@@ -189,10 +193,85 @@ BOT_CONFIG = {
     "premium_model": "gpt-4o",       # Para temas críticos
     "fallback_model": "grok-1",      # Backup
     
+    # Roteador de modelos (model_router.py): abaixo de router_budget_reserve do
+    # orçamento diário só temas críticos usam o premium, e com ele esgotado os
+    # demais vão para o modelo mais barato; provedor com p95 acima do SLO ou
+    # taxa de erro acima do limite cede lugar ao fallback. Os bots em
+    # router_budget_exempt_bots (que não respondem tweets) ficam fora do orçamento
+    "router_budget_reserve": 0.2,
+    "router_p95_slo_seconds": 8,
+    "router_max_error_rate": 0.3,
+    "router_budget_exempt_bots": ["sentiment_monitor", "benchmark"],
+    
+    # Ingestão: "search" agrupa vários from: por search_recent_tweets (poucas
+    # chamadas por ciclo); "per_user" faz um get_users_tweets por conta;
+    # "stream" usa o filtered stream (stream_manager.py) e dispensa o polling
+    "ingestion_mode": "search",
+    "search_query_max_length": 512,
+    
+    # Filtered stream (stream_manager.py): limites de regras do plano da API,
+    # backoff de reconexão em segundos e páginas do backfill por regra
+    "stream_rule_max_length": 512,
+    "stream_max_rules": 25,
+    "stream_backoff_base_seconds": 5,
+    "stream_backoff_max_seconds": 320,
+    "stream_backfill_max_pages": 3,
+    
+    # Fila entre o leitor do stream e a geração/postagem (work_queue.py):
+    # política ao encher: "drop_lowest", "drop_oldest", "drop_new" ou "block";
+    # itens mais velhos que work_queue_max_age_seconds são descartados
+    "work_queue_max_size": 100,
+    "work_queue_drop_policy": "drop_lowest",
+    "work_queue_max_age_seconds": 600,
+    "work_queue_workers": 2,
+    
+    # Endpoint local de métricas Prometheus (metrics.py), uma porta por bot
+    # para rodarem juntos na mesma máquina; 0 desativa
+    "metrics_ports": {"stream_bot": 9464, "smart_bot": 9465, "optimized_bot": 9466, "mention_bot": 9467},
+    
+    # Logs em JSON lines (log_setup.py): cada arquivo roda ao atingir
+    # log_max_bytes e guarda log_backup_count cópias comprimidas (.gz)
+    "log_max_bytes": 10 * 1024 * 1024,
+    "log_backup_count": 5,
+    
+    # Spans por tweet (tracing.py): busca, filtro, geração, postagem e sleep
+    # em JSONL; resumo por ciclo com python analyze_traces.py
+    "tracing_enabled": False,
+    "tracing_file": "traces.jsonl",
+    
+    # Cassete de tráfego (cassette.py): grava as chamadas ao X e aos LLMs,
+    # com tempos e sem segredos, num .jsonl.gz; None desliga. Replay com
+    # python benchmark_suite.py --cassette arquivo.jsonl.gz --speed 10
+    "cassette_record_file": None,
+    
+    # Cliente HTTP dos provedores LLM (llm_client.py), em segundos
+    "llm_connect_timeout": 5,
+    "llm_read_timeout": 30,
+    "llm_max_retries": 3,
+    
+    # Cache persistente de completions (completion_cache.py)
+    "completion_cache_max_entries": 5000,
+    "completion_cache_max_bytes": 5 * 1024 * 1024,
+    "completion_cache_ttl_hours": 72,
+    
     # Horários de maior atividade (para ajustar frequência)
     "peak_hours": [7, 8, 9, 12, 13, 18, 19, 20, 21],
     "off_peak_multiplier": 1.5,  # Aumenta intervalo fora do pico
     
+    # Agendador de polling (poll_scheduler.py): por padrão cada conta a cada
+    # poll_fixed_interval segundos. Com poll_adaptive, intervalo por conta =
+    # poll_fraction x média (EWMA) do tempo entre tweets, limitado ao intervalo
+    # [poll_min_interval, poll_max_interval] em segundos; desligado porque na
+    # simulação (benchmark_poll_scheduler.py) piora o p95 da defasagem
+    "poll_adaptive": False,
+    "poll_fixed_interval": 600,
+    "poll_fraction": 0.1,
+    "poll_min_interval": 300,
+    "poll_max_interval": 1200,
+    "poll_ewma_alpha": 0.3,
+    "poll_request_budget": 50,     # Requisições de leitura por janela
+    "poll_budget_window": 900,     # Janela de 15 minutos do X
+    
     # Blacklist de palavras (não responder)
     "blacklist_keywords": [
         "suicídio", "morte", "funeral", "luto", 
@@ -0,0 +1,278 @@
+# llm_client.py
+# CAMADA DE PROVEDORES LLM - SESSÃO HTTP PERSISTENTE POR PROVEDOR, TIMEOUTS EXPLÍCITOS E RETRY COM JITTER
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cassette import install_cassette_hook
+from keyword_prompts_improved import BOT_CONFIG
+from metrics import get_metrics
+from token_ledger import count_tokens, get_token_ledger
+
+logger = logging.getLogger(__name__)
+
+# Endpoints compatíveis com a API de chat completions da OpenAI
+PROVIDER_BASE_URLS = {
+    "openai": "https://api.openai.com/v1",
+    "xai": "https://api.x.ai/v1",
+}
+
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 8.0
+
+# Respostas que valem nova tentativa (rate limit e falhas do servidor)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class ChatResponse:
+    """Resposta única para qualquer provedor, com o uso real de tokens"""
+    content: str
+    model: str
+    provider: str
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    latency: float
+    attempts: int = 1
+    usage_estimated: bool = False
+    cached_tokens: int = 0  # Tokens do prompt servidos pelo cache de prefixo do provedor
+    raw: Dict = field(default_factory=dict, repr=False)
+
+
+class LLMError(Exception):
+    """Falha definitiva ao chamar o provedor (após esgotar as tentativas)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, attempts: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.attempts = attempts
+
+
+class ProviderHealth:
+    """Latência e taxa de erro das últimas `window` chamadas a um provedor"""
+
+    def __init__(self, window: int = 50):
+        self._samples = deque(maxlen=window)  # (latência em segundos, sucesso)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self._samples.append((latency, ok))
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile))]
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.latency_percentile(0.50)
+
+    @property
+    def p95(self) -> Optional[float]:
+        return self.latency_percentile(0.95)
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._samples:
+                return 0.0
+            return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    def snapshot(self) -> Dict:
+        return {"samples": len(self), "p50": self.p50, "p95": self.p95, "error_rate": round(self.error_rate, 3)}
+
+
+_health: Dict[str, ProviderHealth] = {}
+
+
+def get_provider_health(name: str) -> ProviderHealth:
+    """Saúde do provedor, compartilhada entre a sessão HTTP e o roteador de modelos"""
+    if name not in _health:
+        _health[name] = ProviderHealth()
+    return _health[name]
+
+
+def provider_for_model(model: str) -> str:
+    """Provedor que atende o modelo ("grok-*" -> xai, demais -> openai)"""
+    return "xai" if model.startswith("grok") else "openai"
+
+
+class LLMProvider:
+    """
+    Cliente de chat completions de um provedor.
+
+    Mantém uma única requests.Session com pool de conexões keep-alive, então o
+    handshake TCP/TLS acontece uma vez e é reaproveitado pelas chamadas seguintes.
+    Timeouts de conexão e leitura são explícitos, e respostas 429/5xx (ou falhas
+    de rede) são repetidas com backoff exponencial com jitter, respeitando
+    Retry-After quando o servidor informa.
+    """
+
+    def __init__(self, name: str, base_url: str, api_key: str,
+                 connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, backoff_base: float = DEFAULT_BACKOFF_BASE,
+                 backoff_max: float = DEFAULT_BACKOFF_MAX, pool_connections: int = 2,
+                 pool_maxsize: int = 8, verify=True, sleep: Callable[[float], None] = time.sleep):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout or BOT_CONFIG.get("llm_connect_timeout", DEFAULT_CONNECT_TIMEOUT)
+        self.read_timeout = read_timeout or BOT_CONFIG.get("llm_read_timeout", DEFAULT_READ_TIMEOUT)
+        self.max_retries = BOT_CONFIG.get("llm_max_retries", DEFAULT_MAX_RETRIES) if max_retries is None else max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+
+        self.session = requests.Session()
+        # Retries ficam a cargo de chat(); o adapter só cuida do pool
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.verify = verify
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+        install_cassette_hook(self.session)   # Só com BOT_CONFIG["cassette_record_file"]
+
+        self.requests_made = 0
+        self.retries = 0
+        self.health = get_provider_health(name)
+
+    def close(self):
+        self.session.close()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # "Full jitter": espalha as novas tentativas de vários bots no tempo
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def chat(self, messages: List[Dict], model: str, max_tokens: int = 60,
+             temperature: float = 0.7) -> ChatResponse:
+        """Executa uma chat completion e devolve o texto com o uso de tokens"""
+        start = time.perf_counter()
+        try:
+            response = self._chat_with_retries(messages, model, max_tokens, temperature)
+        except Exception:
+            self.health.record(time.perf_counter() - start, False)
+            get_metrics().observe_llm(model, time.perf_counter() - start, ok=False)
+            raise
+        self.health.record(response.latency, True)
+        get_metrics().observe_llm(model, response.latency)
+        return response
+
+    def _chat_with_retries(self, messages: List[Dict], model: str, max_tokens: int,
+                           temperature: float) -> ChatResponse:
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        url = f"{self.base_url}/chat/completions"
+        start = time.perf_counter()
+        last_error = None
+        status_code = None
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                self.requests_made += 1
+                # verify por chamada: a Session ignora session.verify se REQUESTS_CA_BUNDLE existir
+                response = self.session.post(url, json=payload, verify=self.verify,
+                                             timeout=(self.connect_timeout, self.read_timeout))
+                status_code = response.status_code
+                if status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    return self._parse(response.json(), model, messages, time.perf_counter() - start, attempt + 1)
+                retry_after = response.headers.get("Retry-After")
+                last_error = f"HTTP {status_code}"
+            except requests.exceptions.SSLError as e:
+                # Certificado inválido não se resolve com nova tentativa
+                raise LLMError(f"{self.name}: {e}", None, attempt + 1) from e
+            except (requests.ConnectionError, requests.Timeout) as e:
+                status_code = None
+                last_error = str(e)
+            except requests.HTTPError as e:
+                raise LLMError(f"{self.name}: {e}", status_code, attempt + 1) from e
+
+            if attempt < self.max_retries:
+                self.retries += 1
+                delay = self._backoff(attempt, retry_after)
+                logger.warning(f"🔁 {self.name}: {last_error}, nova tentativa em {delay:.1f}s")
+                self.sleep(delay)
+
+        raise LLMError(f"{self.name}: {last_error} após {self.max_retries + 1} tentativas",
+                       status_code, self.max_retries + 1)
+
+    def _parse(self, data: Dict, model: str, messages: List[Dict], latency: float, attempts: int) -> ChatResponse:
+        content = data["choices"][0]["message"]["content"].strip()
+        usage = data.get("usage") or {}
+        estimated = not usage
+        # Sem usage no payload, conta localmente (tiktoken ou estimativa)
+        prompt_tokens = usage.get("prompt_tokens") or count_tokens(" ".join(m["content"] for m in messages), model)
+        completion_tokens = usage.get("completion_tokens") or count_tokens(content, model)
+
+        return ChatResponse(
+            content=content,
+            model=data.get("model", model),
+            provider=self.name,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=usage.get("total_tokens") or prompt_tokens + completion_tokens,
+            latency=latency,
+            attempts=attempts,
+            usage_estimated=estimated,
+            cached_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0,
+            raw=data
+        )
+
+
+_providers: Dict[str, LLMProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def _api_key(name: str) -> str:
+    import keys
+    return keys.XAI_API_KEY if name == "xai" else keys.OPENAI_API_KEY
+
+
+def get_provider(name: str) -> LLMProvider:
+    """Provedor compartilhado do processo (uma sessão por provedor)"""
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = LLMProvider(name, PROVIDER_BASE_URLS[name], _api_key(name))
+        return _providers[name]
+
+
+def chat_completion(model: str, messages: List[Dict], max_tokens: int = 60, temperature: float = 0.7,
+                    bot: Optional[str] = None, keyword: Optional[str] = None,
+                    route: Optional[str] = None) -> ChatResponse:
+    """
+    Atalho: escolhe o provedor pelo nome do modelo e registra o uso no TokenLedger
+    (`bot`, `keyword` e o motivo de roteamento `route` alimentam as consolidações)
+    """
+    response = get_provider(provider_for_model(model)).chat(messages, model, max_tokens, temperature)
+    get_token_ledger().record_response(response, bot=bot, keyword=keyword, route=route)
+    return response
@@ -0,0 +1,154 @@
+# log_setup.py
+# LOGGING COMPARTILHADO SEM BLOQUEIO - QueueHandler NO CAMINHO QUENTE, JSON LINES E ROTAÇÃO COM GZIP NA THREAD DO LISTENER
+
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from keyword_prompts_improved import BOT_CONFIG
+
+# Campos estáveis das linhas JSON: passe-os em extra={...} nas chamadas de log
+STRUCTURED_FIELDS = ("tweet_id", "user_id", "keyword", "model", "latency_ms")
+
+CONSOLE_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Uma linha JSON por registro: ts, level, logger, msg, campos estruturados presentes e exc"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for name in STRUCTURED_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _gzip_namer(name: str) -> str:
+    return f"{name}.gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def rotating_file_handler(path: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                          backup_count: int = DEFAULT_BACKUP_COUNT) -> logging.Handler:
+    """Arquivo JSON lines que roda por tamanho; as cópias antigas viram bot.log.1.gz, bot.log.2.gz..."""
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                   encoding="utf-8", delay=True)
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(JsonLinesFormatter())
+    return handler
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que não formata na thread que loga.
+
+    O QueueHandler padrão resolve msg % args em prepare() para o registro
+    poder ser serializado; aqui a fila é do próprio processo, então o
+    registro segue intacto (sem cópia: é o único handler do logger raiz) e
+    a formatação acontece na thread do listener. Não passe como argumento
+    objetos que serão alterados logo depois.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _LoggingSetup:
+    def __init__(self):
+        self.queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self.handler = LazyQueueHandler(self.queue)
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self.console: Optional[logging.Handler] = None
+        self.files: Dict[str, logging.Handler] = {}
+        self.lock = threading.Lock()
+
+    def restart(self, handlers):
+        """O QueueListener tem handlers fixos: para, troca a lista e reinicia (só na configuração)"""
+        if self.listener:
+            self.listener.stop()
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
+        for handler in self.files.values():
+            handler.close()
+
+
+_setup = _LoggingSetup()
+
+
+def setup_logging(log_file: Optional[str] = None, level: int = logging.INFO, console: bool = True,
+                  logger_name: Optional[str] = None, config: Optional[Dict] = None) -> logging.Logger:
+    """
+    Configura o logger raiz do processo: um QueueHandler e, na thread do
+    listener, o console (texto) e os arquivos (JSON lines com rotação).
+
+    Pode ser chamada por vários módulos; cada `log_file` novo é somado aos
+    já configurados, em vez de a primeira chamada valer para todos como no
+    logging.basicConfig. Com `logger_name`, o arquivo recebe só os registros
+    daquele logger (ex.: rate_limiter.log só com o AdaptiveRateLimiter).
+    """
+    config = config or BOT_CONFIG
+    with _setup.lock:
+        root = logging.getLogger()
+        root.setLevel(min(level, root.level) if _setup.listener else level)
+        if _setup.handler not in root.handlers:
+            root.addHandler(_setup.handler)
+
+        changed = _setup.listener is None
+        if console and _setup.console is None:
+            _setup.console = logging.StreamHandler(sys.stderr)
+            _setup.console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+            changed = True
+        if log_file and log_file not in _setup.files:
+            _setup.files[log_file] = rotating_file_handler(
+                log_file,
+                config.get("log_max_bytes", DEFAULT_MAX_BYTES),
+                config.get("log_backup_count", DEFAULT_BACKUP_COUNT)
+            )
+            if logger_name:
+                _setup.files[log_file].addFilter(logging.Filter(logger_name))
+            changed = True
+
+        if changed:
+            _setup.restart(([_setup.console] if _setup.console else []) + list(_setup.files.values()))
+    return root
+
+
+def shutdown_logging():
+    """Esvazia a fila e fecha os arquivos (registrado no atexit)"""
+    with _setup.lock:
+        _setup.stop()
+
+
+atexit.register(shutdown_logging)
+
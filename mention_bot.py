@@ -2,28 +2,50 @@
 # BOT ESPECIALIZADO EM RESPONDER MENÇÕES COM DISTRIBUIÇÃO INTELIGENTE DE TOKENS
 
 import tweepy
-import openai
-import requests
 import time
 import json
 import logging
+from log_setup import setup_logging
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List
 import hashlib
+import os
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('mention_bot.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configuração de logging: fila + JSON lines com rotação (log_setup.py)
+setup_logging('mention_bot.log')
 logger = logging.getLogger(__name__)
 
 # Importações locais
 from keys import *
+from state_store import get_state_store
+from dedup_cache import ProcessedIdCache
+from completion_cache import get_completion_cache
+from llm_client import chat_completion
+from token_ledger import count_tokens
+from rate_limit_registry import install_rate_limit_hook
+from tracing import SPAN_FETCH, SPAN_FILTER, SPAN_GENERATE, SPAN_POST, SPAN_SLEEP, get_tracer
+from metrics import STAGE_FETCHED, STAGE_FILTERED, STAGE_GENERATED, STAGE_POSTED, get_metrics, install_metrics_hook, start_metrics_server
+from cassette import install_cassette_hook
+from keyword_prompts_improved import BOT_CONFIG
+from request_scheduler import TWEEPY_ENDPOINTS, get_request_scheduler
+from posting_quota import QuotaExceeded, get_posting_quota
+from reply_gate import ReplyGate
+from model_router import RouteDecision, get_model_router
+from mention_context import (ConversationCache, MENTION_EXPANSIONS, MENTION_TWEET_FIELDS,
+                             MENTION_USER_FIELDS, format_author, index_includes, thread_context)
+
+STATE_SCOPE = "mention_bot"
+
+# O prompt de menção já embute o template; este rótulo separa suas entradas no cache
+MENTION_CACHE_TEMPLATE = "mention_reply"
+REPLY_MAX_TOKENS = 100
+PROMPT_CONFIG_FILE = "mention_prompt_config.json"
+
+# Abertura do prefixo de sistema por provedor
+PROVIDER_PERSONAS = {
+    "chatgpt": "Você é um assistente especializado em responder menções no X de forma inteligente e contextual.",
+    "xai": "Você é Grok, respondendo menções de forma inteligente e com personalidade única."
+}
 
 class MentionBot:
     def __init__(self, my_username: str):
@@ -36,14 +58,22 @@ class MentionBot:
         self.my_username = my_username.lower().replace('@', '')
         self.setup_clients()
         self.load_state()
+        self._system_prefixes: Dict[str, str] = {}
+        self._prompt_config_mtime: Optional[float] = None
         self.load_prompt_config()
+        self.completion_cache = get_completion_cache()
+        self.model_router = get_model_router()
+        self.conversation_cache = ConversationCache()
+        self.request_scheduler = get_request_scheduler()
+        self.posting_quota = get_posting_quota()
+        # Menções em conversas restritas só aceitam resposta de quem foi mencionado
+        self.reply_gate = ReplyGate(self.my_user_id, self.my_username)
+        self.metrics = get_metrics()
+        self.tracer = get_tracer()
         
     def setup_clients(self):
         """Configura clientes das APIs"""
         try:
-            # Cliente OpenAI
-            self.openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-            
             # Cliente X/Twitter
             self.twitter_client = tweepy.Client(
                 bearer_token=X_BEARER_TOKEN,
@@ -53,6 +83,9 @@ class MentionBot:
                 access_token_secret=X_ACCESS_TOKEN_SECRET,
                 wait_on_rate_limit=True
             )
+            install_rate_limit_hook(self.twitter_client)
+            install_metrics_hook(self.twitter_client)
+            install_cassette_hook(self.twitter_client)
             
             # Pega informações da própria conta
             me = self.twitter_client.get_me()
@@ -67,57 +100,52 @@ class MentionBot:
     
     def load_state(self):
         """Carrega estado persistente do bot"""
+        self.state_store = get_state_store()
+        
         # Estatísticas de uso dos modelos
-        try:
-            with open("model_usage_stats.json", "r") as f:
-                self.model_stats = json.load(f)
-        except FileNotFoundError:
-            self.model_stats = {
-                "chatgpt_uses": 0,
-                "xai_uses": 0,
-                "chatgpt_tokens": 0,
-                "xai_tokens": 0,
-                "last_reset": datetime.now().isoformat()
-            }
+        usage = self.state_store.load_usage(STATE_SCOPE)
+        counters = self.state_store.load_counters(STATE_SCOPE)
+        self.model_stats = {
+            "chatgpt_uses": usage.get("chatgpt", {}).get("uses", 0),
+            "xai_uses": usage.get("xai", {}).get("uses", 0),
+            "chatgpt_tokens": usage.get("chatgpt", {}).get("tokens", 0),
+            "xai_tokens": usage.get("xai", {}).get("tokens", 0),
+            "last_reset": counters.get("last_reset", datetime.now().isoformat())
+        }
         
         # Menções já processadas
-        try:
-            with open("processed_mentions.json", "r") as f:
-                self.processed_mentions = set(json.load(f))
-        except FileNotFoundError:
-            self.processed_mentions = set()
+        self.processed_mentions = ProcessedIdCache.from_state_store(self.state_store, STATE_SCOPE)
         
         # Último ID de menção processado
-        try:
-            with open("last_mention_id.json", "r") as f:
-                data = json.load(f)
-                self.last_mention_id = data.get("last_id")
-        except FileNotFoundError:
-            self.last_mention_id = None
+        self.last_mention_id = self.state_store.load_watermarks(STATE_SCOPE).get("last_mention_id")
     
     def save_state(self):
-        """Salva estado persistente"""
-        # Salva estatísticas dos modelos
-        with open("model_usage_stats.json", "w") as f:
-            json.dump(self.model_stats, f, indent=2)
-        
-        # Salva menções processadas
-        with open("processed_mentions.json", "w") as f:
-            json.dump(list(self.processed_mentions), f)
+        """Salva estado persistente (upserts incrementais no SQLite)"""
+        with self.state_store.transaction():
+            # Salva estatísticas dos modelos
+            self.state_store.save_usage(STATE_SCOPE, {
+                "chatgpt": {"uses": self.model_stats["chatgpt_uses"], "tokens": self.model_stats["chatgpt_tokens"]},
+                "xai": {"uses": self.model_stats["xai_uses"], "tokens": self.model_stats["xai_tokens"]}
+            })
+            self.state_store.save_counters(STATE_SCOPE, {"last_reset": self.model_stats["last_reset"]})
+            
+            # Salva último ID e menções processadas pendentes
+            self.state_store.save_watermarks(STATE_SCOPE, {"last_mention_id": self.last_mention_id})
+            self.state_store.flush()
         
-        # Salva último ID
-        with open("last_mention_id.json", "w") as f:
-            json.dump({"last_id": self.last_mention_id}, f)
+        # Remove do disco menções que já expiraram do cache
+        self.processed_mentions.prune_store()
     
     def load_prompt_config(self):
         """Carrega configuração do prompt personalizado"""
         try:
-            with open("mention_prompt_config.json", "r", encoding='utf-8') as f:
+            with open(PROMPT_CONFIG_FILE, "r", encoding='utf-8') as f:
                 self.prompt_config = json.load(f)
         except FileNotFoundError:
             # Cria configuração padrão
             self.prompt_config = self.create_default_prompt_config()
             self.save_prompt_config()
+        self.compile_system_prefixes()
     
     def create_default_prompt_config(self) -> Dict:
         """Cria configuração padrão do prompt"""
@@ -160,44 +188,31 @@ class MentionBot:
     
     def save_prompt_config(self):
         """Salva configuração do prompt"""
-        with open("mention_prompt_config.json", "w", encoding='utf-8') as f:
+        with open(PROMPT_CONFIG_FILE, "w", encoding='utf-8') as f:
             json.dump(self.prompt_config, f, indent=2, ensure_ascii=False)
     
-    def choose_optimal_model(self) -> str:
+    def choose_optimal_model(self, mention_tweet: str) -> RouteDecision:
         """
-        Escolhe o modelo com base no uso anterior para distribuir tokens
+        Escolhe o modelo pelo roteador (orçamento diário e saúde dos provedores).
+        Menções são respostas diretas a quem nos marcou: prioridade alta.
         """
-        chatgpt_uses = self.model_stats["chatgpt_uses"]
-        xai_uses = self.model_stats["xai_uses"]
-        
-        # Se a diferença for muito grande, usa o menos utilizado
-        if abs(chatgpt_uses - xai_uses) > 5:
-            if chatgpt_uses < xai_uses:
-                return "chatgpt"
-            else:
-                return "xai"
-        
-        # Se estão equilibrados, alterna baseado no horário
-        hour = datetime.now().hour
-        if hour % 2 == 0:
-            return "chatgpt"
-        else:
-            return "xai"
+        return self.model_router.choose(mention_tweet, priority="high")
     
-    def build_context_prompt(self, mention_tweet: str, author_info: str, thread_context: str = "") -> str:
+    def compile_system_prefixes(self):
         """
-        Constrói o prompt completo com base na configuração
+        Compila a parte estática do prompt (personalidade, valores, diretrizes,
+        instruções e regras da tarefa) uma vez por provedor. O texto é idêntico
+        em todas as menções, o que permite o cache de prefixo do provedor.
         """
         config = self.prompt_config
-        
-        # Prompt base com personalidade
-        base_prompt = f"""
-Você é um assistente inteligente que representa @{self.my_username} no X (Twitter).
+        personality = config['base_personality']
+        static_block = f"""
+Você representa @{self.my_username} no X (Twitter).
 
 PERSONALIDADE E TOM:
-- Tom: {config['base_personality']['tone']}
-- Estilo: {config['base_personality']['style']}  
-- Emoção: {config['base_personality']['emotion']}
+- Tom: {personality['tone']}
+- Estilo: {personality['style']}
+- Emoção: {personality['emotion']}
 
 VALORES FUNDAMENTAIS:
 {chr(10).join(f"• {belief}" for belief in config['core_beliefs'])}
@@ -208,183 +223,220 @@ DIRETRIZES DE RESPOSTA:
 INSTRUÇÕES ESPECIAIS:
 {config['custom_instructions']}
 
-CONTEXTO DO TWEET:
-Autor: {author_info}
-Tweet que me mencionou: "{mention_tweet}"
-{f"Contexto da conversa: {thread_context}" if thread_context else ""}
-
 TAREFA:
-Responda à menção de forma {config['base_personality']['tone']}, seguindo suas diretrizes.
-Máximo de {config['base_personality']['max_length']} caracteres.
+Responda à menção de forma {personality['tone']}, seguindo suas diretrizes.
+Máximo de {personality['max_length']} caracteres.
 Seja relevante ao contexto e mantenha sua personalidade consistente.
-"""
+""".strip()
         
-        return base_prompt.strip()
+        self._system_prefixes = {
+            choice: f"{persona}\n\n{static_block}" for choice, persona in PROVIDER_PERSONAS.items()
+        }
+        # Versão do prefixo no rótulo do cache: mudar a configuração invalida as respostas antigas
+        self.prompt_version = hashlib.sha256(static_block.encode()).hexdigest()[:12]
+        try:
+            self._prompt_config_mtime = os.stat(PROMPT_CONFIG_FILE).st_mtime
+        except OSError:
+            self._prompt_config_mtime = None
+        logger.info(f"🧩 Prefixo do prompt compilado (versão {self.prompt_version})")
+    
+    def system_prefix(self, model_choice: str) -> str:
+        """Prefixo de sistema do provedor; recompila se o arquivo de configuração mudou"""
+        try:
+            mtime = os.stat(PROMPT_CONFIG_FILE).st_mtime
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime != self._prompt_config_mtime:
+            logger.info(f"🔄 {PROMPT_CONFIG_FILE} alterado, recarregando prompt")
+            self.load_prompt_config()
+        return self._system_prefixes[model_choice]
+    
+    def build_context_prompt(self, mention_tweet: str, author_info: str, thread_context: str = "") -> str:
+        """
+        Constrói a parte variável do prompt (vai depois do prefixo de sistema)
+        """
+        prompt = (
+            "CONTEXTO DO TWEET:\n"
+            f"Autor: {author_info}\n"
+            f'Tweet que me mencionou: "{mention_tweet}"'
+        )
+        if thread_context:
+            prompt += f"\nContexto da conversa: {thread_context}"
+        return prompt
     
     def generate_response(self, mention_tweet: str, author_info: str, thread_context: str = "") -> Optional[str]:
         """
         Gera resposta usando o modelo escolhido
         """
-        model_choice = self.choose_optimal_model()
+        route = self.choose_optimal_model(mention_tweet)
+        model_name = route.model
+        model_choice = "xai" if route.provider == "xai" else "chatgpt"
+        system_prompt = self.system_prefix(model_choice)
         prompt = self.build_context_prompt(mention_tweet, author_info, thread_context)
         
-        logger.info(f"🤖 Usando modelo: {model_choice}")
+        logger.info(f"🤖 Usando modelo: {model_name}")
+        
+        # O prompt variável traz menção, autor e thread; a versão do prefixo vai no rótulo
+        cache_template = f"{MENTION_CACHE_TEMPLATE}:{self.prompt_version}"
+        cached = self.completion_cache.get(prompt, cache_template, model_name, 0.7)
+        if cached:
+            return cached
         
         try:
-            if model_choice == "chatgpt":
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": "Você é um assistente especializado em responder menções no X de forma inteligente e contextual."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=100,
-                    temperature=0.7
-                )
-                
-                comment = response.choices[0].message.content.strip()
-                tokens_used = response.usage.total_tokens
-                
-                # Atualiza estatísticas
-                self.model_stats["chatgpt_uses"] += 1
-                self.model_stats["chatgpt_tokens"] += tokens_used
-                
-            else:  # xAI
-                headers = {
-                    "Authorization": f"Bearer {XAI_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-                payload = {
-                    "model": "grok-1",
-                    "messages": [
-                        {"role": "system", "content": "Você é Grok, respondendo menções de forma inteligente e com personalidade única."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "max_tokens": 100,
-                    "temperature": 0.7
-                }
-                
-                response = requests.post(
-                    "https://api.x.ai/v1/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=30
-                )
-                response.raise_for_status()
-                
-                result = response.json()
-                comment = result["choices"][0]["message"]["content"].strip()
-                tokens_used = 100  # Estimativa para xAI
-                
-                # Atualiza estatísticas
-                self.model_stats["xai_uses"] += 1
-                self.model_stats["xai_tokens"] += tokens_used
+            response = chat_completion(
+                model_name,
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=REPLY_MAX_TOKENS,
+                temperature=0.7,
+                bot=STATE_SCOPE,
+                route=route.reason
+            )
+            
+            comment = response.content
+            tokens_used = response.total_tokens  # Uso real informado pelo provedor
             
-            logger.info(f"💬 Resposta gerada ({tokens_used} tokens): {comment[:50]}...")
+            # Atualiza estatísticas
+            self.model_stats[f"{model_choice}_uses"] += 1
+            self.model_stats[f"{model_choice}_tokens"] += tokens_used
+            
+            self.completion_cache.put(prompt, cache_template, model_name, 0.7, comment, tokens_used)
+            logger.info("💬 Resposta gerada (%s tokens, %s do cache de prefixo): %.50s...", tokens_used,
+                        response.cached_tokens, comment,
+                        extra={"model": model_name, "latency_ms": round(response.latency * 1000)})
             return comment
             
         except Exception as e:
             logger.error(f"❌ Erro ao gerar resposta com {model_choice}: {e}")
             return None
     
-    def get_thread_context(self, tweet_id: str) -> str:
+    def get_thread_context(self, mention, includes: Dict) -> str:
         """
-        Obtém contexto da conversa (thread)
+        Obtém contexto da conversa (thread) dos includes ou do cache de conversas
         """
-        try:
-            # Busca o tweet original se for uma resposta
-            tweet = self.twitter_client.get_tweet(
-                tweet_id, 
-                tweet_fields=["conversation_id", "in_reply_to_user_id", "referenced_tweets"]
-            )
-            
-            if tweet.data.referenced_tweets:
-                # É uma resposta, busca o tweet original
-                original_id = tweet.data.referenced_tweets[0].id
-                original = self.twitter_client.get_tweet(original_id)
-                return f"Tweet original: {original.data.text[:100]}..."
-            
-            return ""
-            
-        except Exception as e:
-            logger.warning(f"⚠️  Não foi possível obter contexto: {e}")
-            return ""
+        return thread_context(mention, includes, self.conversation_cache)
     
     def check_mentions(self):
         """
         Verifica novas menções e responde
         """
         logger.info("🔍 Verificando novas menções...")
+        cycle_start = time.time()
         
         try:
-            # Busca menções recentes
-            mentions = self.twitter_client.get_users_mentions(
-                id=self.my_user_id,
-                since_id=self.last_mention_id,
-                max_results=10,
-                tweet_fields=["created_at", "author_id", "conversation_id", "in_reply_to_user_id"],
-                user_fields=["username", "name"]
-            )
+            # Busca menções recentes (espera no token bucket do endpoint se o saldo acabou)
+            with self.tracer.span(SPAN_FETCH, method="get_users_mentions"):
+                mentions = self.request_scheduler.call(
+                    self.twitter_client.get_users_mentions,
+                    id=self.my_user_id,
+                    since_id=self.last_mention_id,
+                    max_results=10,
+                    tweet_fields=MENTION_TWEET_FIELDS,
+                    expansions=MENTION_EXPANSIONS,
+                    user_fields=MENTION_USER_FIELDS
+                )
             
             if not mentions.data:
                 logger.info("📭 Nenhuma menção nova")
                 return
             
+            self.metrics.count_tweets(STATE_SCOPE, STAGE_FETCHED, len(mentions.data))
+            
+            # Autores e tweets pais vêm nos includes da mesma resposta
+            includes = index_includes(mentions.includes)
+            
             # Processa menções em ordem cronológica
             mentions_list = sorted(mentions.data, key=lambda x: x.created_at)
             
             for mention in mentions_list:
-                # Atualiza último ID processado
-                self.last_mention_id = mention.id
-                
                 # Verifica se já foi processado
                 if mention.id in self.processed_mentions:
+                    self.last_mention_id = mention.id
                     continue
                 
                 # Não responde a si mesmo
                 if str(mention.author_id) == self.my_user_id:
+                    self.last_mention_id = mention.id
                     continue
                 
-                # Obtém informações do autor
-                author = mentions.includes.get('users', [{}])[0]
-                author_info = f"@{author.username} ({author.name})"
+                # Autor da própria menção, pelo índice dos includes
+                author_info = format_author(includes["users"].get(str(mention.author_id)))
+                
+                logger.info("📨 Nova menção de %s: %s", author_info, mention.text,
+                            extra={"tweet_id": mention.id, "user_id": mention.author_id})
                 
-                logger.info(f"📨 Nova menção de {author_info}: {mention.text}")
+                # A conta pode responder? (reply_settings e conversas que já deram 403)
+                with self.tracer.span(SPAN_FILTER, tweet_id=mention.id, user_id=mention.author_id):
+                    drop_reason = self.reply_gate.check(mention)
+                if drop_reason:
+                    logger.info("🔒 Menção %s não aceita nossa resposta (%s)", mention.id, drop_reason,
+                                extra={"tweet_id": mention.id, "user_id": mention.author_id})
+                    self.metrics.count_tweets(STATE_SCOPE, STAGE_FILTERED)
+                    self.processed_mentions.add(mention.id)
+                    self.last_mention_id = mention.id
+                    continue
+                
+                # Contexto da conversa sem chamadas extras à API
+                thread_context = self.get_thread_context(mention, includes)
                 
-                # Obtém contexto da conversa
-                thread_context = self.get_thread_context(mention.id)
+                # Reserva a vaga de postagem antes de gastar tokens
+                try:
+                    estimated = count_tokens(self.system_prefix("chatgpt") + self.build_context_prompt(
+                        mention.text, author_info, thread_context)) + REPLY_MAX_TOKENS
+                    reservation = self.posting_quota.reserve(STATE_SCOPE, estimated_tokens=estimated)
+                except QuotaExceeded as e:
+                    # since_id fica na última menção tratada: esta e as seguintes voltam na próxima verificação
+                    logger.info(f"⏸️ Cota de postagens: {e}, geração não iniciada")
+                    break
                 
                 # Gera resposta
-                response = self.generate_response(
-                    mention.text, 
-                    author_info, 
-                    thread_context
-                )
+                with self.tracer.span(SPAN_GENERATE, tweet_id=mention.id):
+                    response = self.generate_response(
+                        mention.text, 
+                        author_info, 
+                        thread_context
+                    )
                 
                 if response:
-                    # Posta resposta
+                    self.metrics.count_tweets(STATE_SCOPE, STAGE_GENERATED)
+                    # Posta resposta (commit da vaga se sair)
                     try:
-                        self.twitter_client.create_tweet(
-                            text=response,
-                            in_reply_to_tweet_id=mention.id
-                        )
+                        with self.tracer.span(SPAN_POST, tweet_id=mention.id):
+                            self.posting_quota.post(
+                                self.request_scheduler.call,
+                                self.twitter_client.create_tweet,
+                                text=response,
+                                in_reply_to_tweet_id=mention.id,
+                                bot=STATE_SCOPE,
+                                reservation=reservation
+                            )
+                        
+                        logger.info("✅ Resposta enviada para %s", author_info,
+                                    extra={"tweet_id": mention.id, "user_id": mention.author_id})
+                        self.metrics.count_tweets(STATE_SCOPE, STAGE_POSTED)
                         
-                        logger.info(f"✅ Resposta enviada para {author_info}")
+                    except tweepy.Forbidden as e:
+                        logger.error(f"🚫 Resposta proibida à menção {mention.id}: {e}")
+                        self.reply_gate.record_forbidden(mention)
                         
                     except Exception as e:
                         logger.error(f"❌ Erro ao postar resposta: {e}")
                 
-                # Marca como processado
-                self.processed_mentions.add(mention.id)
+                self.posting_quota.release(reservation)  # Nada a devolver se a postagem saiu
                 
-                # Pausa entre respostas
-                time.sleep(5)
+                # Marca como processado e só então avança o since_id
+                self.processed_mentions.add(mention.id)
+                self.last_mention_id = mention.id
             
             # Salva estado
             self.save_state()
             
         except Exception as e:
             logger.error(f"❌ Erro ao verificar menções: {e}")
+        finally:
+            self.metrics.observe_cycle(STATE_SCOPE, time.time() - cycle_start)
     
     def get_usage_stats(self) -> Dict:
         """
@@ -409,7 +461,8 @@ Seja relevante ao contexto e mantenha sua personalidade consistente.
                 "tokens": self.model_stats["xai_tokens"],
                 "percentage": (self.model_stats["xai_uses"] / total_uses) * 100
             },
-            "balance": abs(self.model_stats["chatgpt_uses"] - self.model_stats["xai_uses"])
+            "balance": abs(self.model_stats["chatgpt_uses"] - self.model_stats["xai_uses"]),
+            "tokens_saved_by_quota": self.posting_quota.stats["tokens_saved"]
         }
     
     def run(self):
@@ -417,29 +470,35 @@ Seja relevante ao contexto e mantenha sua personalidade consistente.
         Loop principal do bot
         """
         logger.info(f"🚀 Bot de menções iniciado para @{self.my_username}")
+        start_metrics_server(BOT_CONFIG.get("metrics_ports", {}).get(STATE_SCOPE, 0))
         
         while True:
             try:
-                self.check_mentions()
-                
-                # Mostra estatísticas a cada 10 verificações
-                if hasattr(self, '_check_count'):
-                    self._check_count += 1
-                else:
-                    self._check_count = 1
-                
-                if self._check_count % 10 == 0:
-                    stats = self.get_usage_stats()
-                    if "total_responses" in stats:
-                        logger.info(f"📊 Stats: {stats['total_responses']} respostas, "
-                                  f"ChatGPT: {stats['chatgpt']['percentage']:.1f}%, "
-                                  f"xAI: {stats['xai']['percentage']:.1f}%")
-                
-                # Próxima verificação em 2 minutos
-                next_check = datetime.now() + timedelta(minutes=2)
-                logger.info(f"😴 Próxima verificação às {next_check.strftime('%H:%M:%S')}")
-                
-                time.sleep(120)  # 2 minutos
+                # Um trace por verificação, incluindo o sleep até a próxima
+                with self.tracer.cycle(STATE_SCOPE):
+                    self.check_mentions()
+                    
+                    # Mostra estatísticas a cada 10 verificações
+                    if hasattr(self, '_check_count'):
+                        self._check_count += 1
+                    else:
+                        self._check_count = 1
+                    
+                    if self._check_count % 10 == 0:
+                        stats = self.get_usage_stats()
+                        if "total_responses" in stats:
+                            logger.info(f"📊 Stats: {stats['total_responses']} respostas, "
+                                      f"ChatGPT: {stats['chatgpt']['percentage']:.1f}%, "
+                                      f"xAI: {stats['xai']['percentage']:.1f}%")
+                    
+                    # Próxima verificação em 2 minutos, ou mais se o saldo do endpoint
+                    # de menções não cobrir uma chamada a cada 2 minutos até o reinício
+                    wait = self.request_scheduler.cycle_wait(TWEEPY_ENDPOINTS["get_users_mentions"], 1, 120)
+                    next_check = datetime.now() + timedelta(seconds=wait)
+                    logger.info(f"😴 Próxima verificação às {next_check.strftime('%H:%M:%S')}")
+                    
+                    with self.tracer.span(SPAN_SLEEP, seconds=wait):
+                        time.sleep(wait)
                 
             except KeyboardInterrupt:
                 logger.info("👋 Bot encerrado pelo usuário")
@@ -0,0 +1,97 @@
+# mention_context.py
+# CONTEXTO DE MENÇÕES SEM CHAMADAS EXTRAS - ÍNDICE DOS INCLUDES POR ID E CACHE LRU DE CONVERSAS
+
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Campos e expansões para get_users_mentions trazer autores e tweets citados/respondidos na mesma resposta
+MENTION_TWEET_FIELDS = ["created_at", "author_id", "conversation_id", "in_reply_to_user_id", "referenced_tweets",
+                        "reply_settings"]
+MENTION_EXPANSIONS = ["author_id", "referenced_tweets.id"]
+MENTION_USER_FIELDS = ["username", "name"]
+
+DEFAULT_CONVERSATION_CACHE_SIZE = 512
+CONTEXT_SNIPPET_CHARS = 100
+
+
+def index_includes(includes: Optional[Dict]) -> Dict[str, Dict[str, object]]:
+    """
+    Indexa os includes de uma resposta da API por ID:
+    {"users": {"123": User}, "tweets": {"456": Tweet}}
+    """
+    index = {"users": {}, "tweets": {}}
+    for kind in index:
+        for item in (includes or {}).get(kind, []) or []:
+            index[kind][str(item.id)] = item
+    return index
+
+
+def format_author(user) -> str:
+    """Rótulo do autor usado no prompt"""
+    if user is None:
+        return "autor desconhecido"
+    return f"@{user.username} ({user.name})"
+
+
+class ConversationCache:
+    """
+    Cache LRU de contexto por conversation_id.
+
+    Menções na mesma thread reaproveitam o contexto já visto, mesmo quando o
+    tweet pai não veio nos includes da página atual.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CONVERSATION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, conversation_id) -> Optional[str]:
+        key = str(conversation_id)
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._entries[key]
+
+    def put(self, conversation_id, context: str):
+        key = str(conversation_id)
+        self._entries[key] = context
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+
+def thread_context(mention, index: Dict[str, Dict[str, object]], cache: ConversationCache) -> str:
+    """
+    Contexto da conversa de uma menção a partir dos includes já indexados.
+
+    Usa o primeiro tweet referenciado (resposta ou citação) quando veio nos
+    includes e guarda na conversa; senão recorre ao cache da conversa.
+    """
+    conversation_id = getattr(mention, "conversation_id", None)
+    for reference in getattr(mention, "referenced_tweets", None) or []:
+        parent = index["tweets"].get(str(reference.id))
+        if parent is not None:
+            context = f"Tweet original: {parent.text[:CONTEXT_SNIPPET_CHARS]}..."
+            if conversation_id is not None:
+                cache.put(conversation_id, context)
+            return context
+
+    if conversation_id is None or str(conversation_id) == str(mention.id):
+        return ""  # Tweet raiz: não há thread anterior
+    return cache.get(conversation_id) or ""
@@ -0,0 +1,280 @@
+# metrics.py
+# MÉTRICAS DO PROCESSO EM FORMATO PROMETHEUS - HISTOGRAMAS DE LATÊNCIA, CONTADORES E GAUGES NUM ENDPOINT HTTP LOCAL
+
+import bisect
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from rate_limit_registry import endpoint_template, get_rate_limit_registry
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_HOST = "127.0.0.1"   # Só local: o endpoint não tem autenticação
+
+# Baldes em segundos: API do X fica em centenas de ms, LLM em segundos, ciclos em dezenas de segundos
+API_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LLM_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+CYCLE_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600)
+
+# Etapas do funil de tweets
+STAGE_FETCHED = "fetched"
+STAGE_FILTERED = "filtered"     # Descartado pelo pré-filtro ou pelo portão de resposta
+STAGE_GENERATED = "generated"
+STAGE_POSTED = "posted"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Histograma cumulativo: contagem por balde ("le"), soma e total por combinação de labels"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float]):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, List] = {}   # labels -> [contagens por balde, soma, total]
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(_label_key(labels))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((key, list(series[0]), series[1], series[2]) for key, series in self._series.items())
+        lines = self.header()
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas do processo (sem dependências externas).
+
+    Métricas são criadas sob demanda pelo nome; `add_collector` registra
+    funções chamadas a cada leitura, para valores que já vivem em outro
+    objeto (saldo de rate limit, profundidade da fila).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+        self.api_latency = self.histogram("x_api_request_duration_seconds",
+                                          "Latência das chamadas à API do X por endpoint", API_LATENCY_BUCKETS)
+        self.api_requests = self.counter("x_api_requests_total", "Chamadas à API do X por endpoint e status")
+        self.llm_latency = self.histogram("llm_request_duration_seconds",
+                                          "Latência das completions por modelo (com novas tentativas)",
+                                          LLM_LATENCY_BUCKETS)
+        self.llm_requests = self.counter("llm_requests_total", "Completions por modelo e resultado")
+        self.tweets = self.counter("bot_tweets_total", "Tweets por bot e etapa (fetched, filtered, generated, posted)")
+        self.cycle_duration = self.histogram("bot_cycle_duration_seconds",
+                                             "Duração de cada ciclo (ou item processado) por bot", CYCLE_BUCKETS)
+        self.rate_limit_remaining = self.gauge("x_rate_limit_remaining",
+                                               "Chamadas restantes na janela de rate limit por endpoint")
+        self.rate_limit_reset = self.gauge("x_rate_limit_reset_seconds",
+                                           "Segundos até o reinício da janela de rate limit por endpoint")
+        self.add_collector(self._collect_rate_limits)
+
+    def _get_or_create(self, cls, name: str, *args) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args)
+            elif type(metric) is not cls:
+                raise ValueError(f"Métrica {name} já registrada como {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._get_or_create(Counter, name, documentation)
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation)
+
+    def histogram(self, name: str, documentation: str, buckets: Iterable[float]) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, buckets)
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def _collect_rate_limits(self):
+        now = time.time()
+        for window in get_rate_limit_registry().windows():
+            self.rate_limit_remaining.set(window.remaining, endpoint=window.endpoint)
+            self.rate_limit_reset.set(window.seconds_until_reset(now), endpoint=window.endpoint)
+
+    # ------------------------------------------------------------------
+    # Atalhos usados pelos bots
+    # ------------------------------------------------------------------
+
+    def api_hook(self, response, *args, **kwargs):
+        """Hook de resposta do requests: latência e status por endpoint da API do X"""
+        endpoint = endpoint_template(response.request.method, response.request.url)
+        self.api_latency.observe(response.elapsed.total_seconds(), endpoint=endpoint)
+        self.api_requests.inc(endpoint=endpoint, status=response.status_code)
+        return response
+
+    def observe_llm(self, model: str, seconds: float, ok: bool = True):
+        self.llm_latency.observe(seconds, model=model)
+        self.llm_requests.inc(model=model, result="ok" if ok else "error")
+
+    def count_tweets(self, bot: str, stage: str, amount: int = 1):
+        if amount:
+            self.tweets.inc(amount, bot=bot, stage=stage)
+
+    def observe_cycle(self, bot: str, seconds: float):
+        self.cycle_duration.observe(seconds, bot=bot)
+
+    # ------------------------------------------------------------------
+    # Exposição
+    # ------------------------------------------------------------------
+
+    def render(self) -> str:
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"⚠️ Coletor de métricas falhou: {e}")
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+def install_metrics_hook(client, registry: Optional[MetricsRegistry] = None) -> MetricsRegistry:
+    """Registra a latência de cada resposta na sessão HTTP do cliente (tweepy.Client.session ou requests.Session)"""
+    registry = registry or get_metrics()
+    session = getattr(client, "session", client)
+    hooks = session.hooks.setdefault("response", [])
+    if registry.api_hook not in hooks:
+        hooks.append(registry.api_hook)
+    return registry
+
+
+def start_metrics_server(port: int, host: str = DEFAULT_HOST,
+                         registry: Optional[MetricsRegistry] = None) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics numa thread daemon; porta 0 desativa, porta ocupada só gera aviso"""
+    if not port:
+        return None
+    registry = registry or get_metrics()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logger.warning(f"⚠️ Métricas indisponíveis em {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"📈 Métricas em http://{host}:{server.server_port}/metrics")
+    return server
+
+
+_default_metrics: Optional[MetricsRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Registro compartilhado do processo"""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = MetricsRegistry()
+        return _default_metrics
+
@@ -0,0 +1,139 @@
+# model_router.py
+# ROTEADOR DE MODELOS - ESCOLHA POR ORÇAMENTO DIÁRIO, LATÊNCIA/ERROS DOS PROVEDORES E PRIORIDADE DO TEMA
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from keyword_prompts_improved import BOT_CONFIG, get_prompt_priority, should_use_premium_model
+from llm_client import get_provider_health, provider_for_model
+from token_ledger import get_token_ledger, model_prices
+
+logger = logging.getLogger(__name__)
+
+# Motivos registrados no ledger (campo "r") para medir custo e latência por decisão
+ROUTE_DEFAULT = "default"
+ROUTE_PREMIUM = "premium"
+ROUTE_BUDGET_DOWNGRADE = "budget_downgrade"
+ROUTE_BUDGET_EXHAUSTED = "budget_exhausted"
+ROUTE_FALLBACK_ERRORS = "fallback_errors"
+ROUTE_FALLBACK_LATENCY = "fallback_latency"
+
+DEFAULT_BUDGET_RESERVE = 0.2      # Últimos 20% do orçamento só para temas críticos no premium
+DEFAULT_P95_SLO_SECONDS = 8.0
+DEFAULT_MAX_ERROR_RATE = 0.3
+DEFAULT_MIN_SAMPLES = 5           # Amostras mínimas antes de julgar um provedor
+
+# Bots que chamam o LLM mas não respondem tweets: não gastam o orçamento das respostas
+DEFAULT_BUDGET_EXEMPT_BOTS = ("sentiment_monitor", "benchmark")
+
+
+@dataclass
+class RouteDecision:
+    """Modelo escolhido e o motivo"""
+    model: str
+    provider: str
+    reason: str
+    detail: str
+
+
+class ModelRouter:
+    """
+    Escolhe o modelo de cada geração a partir de BOT_CONFIG:
+
+    1. prioridade do tema / complexidade do tweet -> premium_model ou default_model
+    2. orçamento diário (max_tokens_per_day, gasto dos bots de resposta medido
+       pelo TokenLedger): perto do limite o premium é rebaixado; esgotado, temas
+       não críticos usam o modelo mais barato em vez de ficarem sem resposta
+    3. saúde do provedor (p95 e taxa de erro recentes): se degradado, usa o
+       fallback_model de outro provedor
+
+    Cada decisão é logada com o motivo e gravada no ledger (campo "r").
+    """
+
+    def __init__(self, config: Optional[Dict] = None, ledger=None):
+        config = config or BOT_CONFIG
+        self.default_model = config.get("default_model", "gpt-4o-mini")
+        self.premium_model = config.get("premium_model", "gpt-4o")
+        self.fallback_model = config.get("fallback_model", "grok-1")
+        self.max_tokens_per_day = config.get("max_tokens_per_day", 5000)
+        self.budget_reserve = config.get("router_budget_reserve", DEFAULT_BUDGET_RESERVE)
+        self.p95_slo = config.get("router_p95_slo_seconds", DEFAULT_P95_SLO_SECONDS)
+        self.max_error_rate = config.get("router_max_error_rate", DEFAULT_MAX_ERROR_RATE)
+        self.min_samples = config.get("router_min_samples", DEFAULT_MIN_SAMPLES)
+        self.budget_exempt_bots = tuple(config.get("router_budget_exempt_bots", DEFAULT_BUDGET_EXEMPT_BOTS))
+        self.ledger = ledger or get_token_ledger()
+
+    def health_problem(self, model: str) -> Optional[str]:
+        """Motivo de fallback se o provedor do modelo estiver degradado, senão None"""
+        health = get_provider_health(provider_for_model(model))
+        if len(health) < self.min_samples:
+            return None
+        if health.error_rate > self.max_error_rate:
+            return ROUTE_FALLBACK_ERRORS
+        p95 = health.p95
+        if p95 is not None and p95 > self.p95_slo:
+            return ROUTE_FALLBACK_LATENCY
+        return None
+
+    def cheapest_model(self) -> str:
+        """Modelo configurado de menor preço (entrada + saída por milhão de tokens)"""
+        candidates = (self.default_model, self.fallback_model, self.premium_model)
+        return min(candidates, key=lambda model: sum(model_prices(model) or (float("inf"),)))
+
+    def tokens_spent_today(self) -> int:
+        """Tokens de hoje que contam para o orçamento (só os bots de resposta)"""
+        return self.ledger.tokens_today(exclude_bots=self.budget_exempt_bots)
+
+    def choose(self, tweet_text: str, keyword: Optional[str] = None,
+               priority: Optional[str] = None) -> RouteDecision:
+        """Decide o modelo para gerar a resposta a `tweet_text`"""
+        priority = priority or (get_prompt_priority(keyword) if keyword else "low")
+        spent = self.tokens_spent_today()
+        remaining = self.max_tokens_per_day - spent
+        budget = f"{spent}/{self.max_tokens_per_day} tokens hoje"
+
+        wants_premium = priority in ("critical", "high") or should_use_premium_model(tweet_text, keyword or "")
+        if remaining <= 0 and priority != "critical":
+            # Orçamento esgotado: responde com o mais barato em vez de descartar o tweet
+            model, reason = self.cheapest_model(), ROUTE_BUDGET_EXHAUSTED
+        elif wants_premium and priority != "critical" and remaining < self.budget_reserve * self.max_tokens_per_day:
+            model, reason = self.default_model, ROUTE_BUDGET_DOWNGRADE
+        elif wants_premium:
+            model, reason = self.premium_model, ROUTE_PREMIUM
+        else:
+            model, reason = self.default_model, ROUTE_DEFAULT
+        detail = f"prioridade {priority}, {budget}"
+
+        problem = self.health_problem(model)
+        if problem:
+            same_provider = provider_for_model(self.fallback_model) == provider_for_model(model)
+            if not same_provider and not self.health_problem(self.fallback_model):
+                health = get_provider_health(provider_for_model(model)).snapshot()
+                detail = f"{detail}, {model} degradado (p95={health['p95']}, erros={health['error_rate']})"
+                model, reason = self.fallback_model, problem
+
+        decision = RouteDecision(model, provider_for_model(model), reason, detail)
+        logger.info(f"🧭 Modelo {model} [{reason}] ({detail})")
+        return decision
+
+    def get_stats(self) -> Dict:
+        return {
+            "tokens_today": self.tokens_spent_today(),
+            "max_tokens_per_day": self.max_tokens_per_day,
+            "providers": {
+                name: get_provider_health(name).snapshot()
+                for name in {provider_for_model(m) for m in (self.default_model, self.premium_model, self.fallback_model)}
+            }
+        }
+
+
+_default_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    """Roteador compartilhado do processo"""
+    global _default_router
+    if _default_router is None:
+        _default_router = ModelRouter()
+    return _default_router
@@ -0,0 +1,228 @@
+# poll_scheduler.py
+# AGENDADOR ADAPTATIVO DE POLLING POR CONTA - EWMA DO RITMO DE POSTAGEM, HORÁRIO DE PICO E ORÇAMENTO GLOBAL
+
+import heapq
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from keyword_prompts_improved import BOT_CONFIG
+
+DEFAULT_FIXED_INTERVAL = 600.0   # Cadência padrão (poll_adaptive desligado): a do SmartXBot original
+DEFAULT_BASE_INTERVAL = 600.0    # Intervalo assumido entre tweets antes de observar a conta
+DEFAULT_MIN_INTERVAL = 300.0
+DEFAULT_MAX_INTERVAL = 1200.0    # Teto de defasagem para contas quietas
+DEFAULT_ALPHA = 0.3
+DEFAULT_POLL_FRACTION = 0.1      # Poll a cada 1/10 do intervalo médio entre tweets
+DEFAULT_BUDGET_WINDOW = 900.0    # Janela de rate limit do X (15 min)
+
+
+@dataclass
+class AccountPollState:
+    """Ritmo observado e agenda de uma conta monitorada"""
+    user_id: str
+    ewma_interval: float
+    last_tweet_at: Optional[float] = None
+    next_poll_at: float = 0.0
+    polls: int = 0
+    empty_polls: int = 0
+    tweets_seen: int = 0
+
+
+def tweet_times(tweets: Iterable, default: float) -> List[float]:
+    """Timestamps (epoch) dos tweets a partir de created_at, ou `default` se ausente"""
+    times = []
+    for tweet in tweets:
+        created_at = getattr(tweet, "created_at", None)
+        times.append(created_at.timestamp() if created_at else default)
+    return times
+
+
+class PollScheduler:
+    """
+    Fila de prioridade com o próximo instante de poll de cada conta.
+
+    Por padrão toda conta é consultada a cada fixed_interval segundos. Com
+    BOT_CONFIG["poll_adaptive"], o intervalo de cada conta segue a média
+    móvel exponencial (EWMA) do tempo entre seus tweets: contas que postam
+    muito são consultadas com frequência, contas quietas esparsamente (até
+    max_interval), e fora de BOT_CONFIG["peak_hours"] o intervalo é
+    multiplicado por off_peak_multiplier. No tráfego de
+    benchmark_poll_scheduler.py o modo adaptativo economiza poucas chamadas
+    e piora o p95 da defasagem, por isso fica desligado. Em ambos os modos o
+    ritmo é aprendido e nenhuma janela de budget_window segundos recebe mais
+    que request_budget requisições.
+    """
+
+    def __init__(self, user_ids: Sequence[str], config: Optional[Dict] = None,
+                 base_interval: Optional[float] = None, min_interval: Optional[float] = None,
+                 max_interval: Optional[float] = None, request_budget: Optional[int] = None,
+                 fixed_interval: Optional[float] = None, clock: Callable[[], float] = time.time):
+        config = config or BOT_CONFIG
+        self.clock = clock
+
+        self.adaptive = config.get("poll_adaptive", False)
+        self.fixed_interval = fixed_interval or config.get("poll_fixed_interval", DEFAULT_FIXED_INTERVAL)
+
+        self.base_interval = base_interval or config.get("poll_base_interval", DEFAULT_BASE_INTERVAL)
+        self.min_interval = min_interval or config.get("poll_min_interval", DEFAULT_MIN_INTERVAL)
+        self.max_interval = max_interval or config.get("poll_max_interval", DEFAULT_MAX_INTERVAL)
+        self.alpha = config.get("poll_ewma_alpha", DEFAULT_ALPHA)
+        self.poll_fraction = config.get("poll_fraction", DEFAULT_POLL_FRACTION)
+        self.peak_hours = set(config.get("peak_hours", []))
+        self.off_peak_multiplier = config.get("off_peak_multiplier", 1.0)
+        self.request_budget = request_budget or config.get("poll_request_budget")
+        self.budget_window = config.get("poll_budget_window", DEFAULT_BUDGET_WINDOW)
+
+        if self.min_interval > self.max_interval:
+            raise ValueError("poll_min_interval maior que poll_max_interval")
+
+        now = self.clock()
+        self.accounts: Dict[str, AccountPollState] = {}
+        self._heap: List[tuple] = []
+        self._requests = deque()
+
+        # Todas as contas começam vencidas: o primeiro ciclo consulta todo mundo
+        for user_id in user_ids:
+            state = AccountPollState(str(user_id), self.base_interval, next_poll_at=now)
+            self.accounts[state.user_id] = state
+            heapq.heappush(self._heap, (now, state.user_id))
+
+    # ------------------------------------------------------------------ agenda
+
+    def is_peak(self, now: Optional[float] = None) -> bool:
+        if not self.peak_hours:
+            return True
+        now = self.clock() if now is None else now
+        return time.localtime(now).tm_hour in self.peak_hours
+
+    def poll_interval(self, user_id: str, now: Optional[float] = None) -> float:
+        """Intervalo até o próximo poll da conta, dado o ritmo observado e o horário"""
+        if not self.adaptive:
+            return self.fixed_interval
+        interval = self.accounts[user_id].ewma_interval * self.poll_fraction
+        if not self.is_peak(now):
+            interval *= self.off_peak_multiplier
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _schedule(self, state: AccountPollState, at: float):
+        state.next_poll_at = at
+        heapq.heappush(self._heap, (at, state.user_id))
+
+    def _pop_stale(self):
+        """Descarta entradas do heap que foram substituídas por um reagendamento"""
+        while self._heap:
+            at, user_id = self._heap[0]
+            if self.accounts[user_id].next_poll_at == at:
+                return
+            heapq.heappop(self._heap)
+
+    def due(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[str]:
+        """
+        Contas cujo poll venceu, da mais atrasada para a mais recente.
+
+        As contas retornadas são reagendadas provisoriamente (caso o poll falhe);
+        record_poll() define o instante definitivo com base no resultado.
+        """
+        now = self.clock() if now is None else now
+        selected = []
+        self._pop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            if limit is not None and len(selected) >= limit:
+                break
+            _, user_id = heapq.heappop(self._heap)
+            state = self.accounts[user_id]
+            selected.append(user_id)
+            self._schedule(state, now + self.poll_interval(user_id, now))
+            self._pop_stale()
+        return selected
+
+    def record_poll(self, user_id: str, new_tweet_times: Sequence[float], now: Optional[float] = None):
+        """Registra o resultado do poll de uma conta e calcula o próximo instante"""
+        now = self.clock() if now is None else now
+        state = self.accounts[str(user_id)]
+        state.polls += 1
+
+        if new_tweet_times:
+            state.tweets_seen += len(new_tweet_times)
+            for tweet_at in sorted(new_tweet_times):
+                if state.last_tweet_at is not None and tweet_at > state.last_tweet_at:
+                    gap = tweet_at - state.last_tweet_at
+                    state.ewma_interval += self.alpha * (gap - state.ewma_interval)
+                if state.last_tweet_at is None or tweet_at > state.last_tweet_at:
+                    state.last_tweet_at = tweet_at
+        else:
+            state.empty_polls += 1
+            # Silêncio maior que a média já é evidência de que a conta desacelerou
+            if state.last_tweet_at is not None:
+                silence = now - state.last_tweet_at
+                if silence > state.ewma_interval:
+                    state.ewma_interval += self.alpha * (silence - state.ewma_interval)
+
+        self._schedule(state, now + self.poll_interval(state.user_id, now))
+
+    # --------------------------------------------------------------- orçamento
+
+    def _expire_requests(self, now: float):
+        while self._requests and self._requests[0] <= now - self.budget_window:
+            self._requests.popleft()
+
+    def record_requests(self, count: int = 1, now: Optional[float] = None):
+        """Contabiliza requisições feitas à API no orçamento global"""
+        now = self.clock() if now is None else now
+        self._requests.extend([now] * count)
+
+    def budget_remaining(self, now: Optional[float] = None) -> Optional[int]:
+        """Requisições ainda disponíveis na janela atual (None = sem orçamento)"""
+        if not self.request_budget:
+            return None
+        now = self.clock() if now is None else now
+        self._expire_requests(now)
+        return max(0, self.request_budget - len(self._requests))
+
+    def seconds_until_next(self, now: Optional[float] = None) -> float:
+        """Quanto dormir até a próxima conta vencer (respeitando o orçamento)"""
+        now = self.clock() if now is None else now
+        self._pop_stale()
+        wait = max(0.0, self._heap[0][0] - now) if self._heap else self.max_interval
+
+        if self.budget_remaining(now) == 0:
+            wait = max(wait, self._requests[0] + self.budget_window - now)
+        return wait
+
+    # ----------------------------------------------------------- persistência
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Ritmo aprendido de cada conta, para salvar no StateStore"""
+        return {
+            user_id: {"ewma_interval": state.ewma_interval, "last_tweet_at": state.last_tweet_at}
+            for user_id, state in self.accounts.items()
+        }
+
+    def restore(self, snapshot: Optional[Dict[str, Dict]]):
+        """Recarrega o ritmo salvo (contas desconhecidas são ignoradas)"""
+        for user_id, data in (snapshot or {}).items():
+            state = self.accounts.get(str(user_id))
+            if state:
+                state.ewma_interval = data.get("ewma_interval", state.ewma_interval)
+                state.last_tweet_at = data.get("last_tweet_at")
+
+    # ------------------------------------------------------------ estatística
+
+    @property
+    def wasted_call_ratio(self) -> float:
+        """Fração de polls que não trouxeram nenhum tweet novo"""
+        polls = sum(state.polls for state in self.accounts.values())
+        empty = sum(state.empty_polls for state in self.accounts.values())
+        return empty / polls if polls else 0.0
+
+    def get_stats(self) -> Dict:
+        polls = sum(state.polls for state in self.accounts.values())
+        return {
+            "polls": polls,
+            "empty_polls": sum(state.empty_polls for state in self.accounts.values()),
+            "wasted_call_ratio": round(self.wasted_call_ratio, 3),
+            "requests_in_window": len(self._requests),
+            "budget_remaining": self.budget_remaining()
+        }
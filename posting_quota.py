@@ -0,0 +1,418 @@
+# posting_quota.py
+# COTA DE POSTAGENS COMPARTILHADA - JANELAS DESLIZANTES E DE CALENDÁRIO SOBRE UM ÚNICO LEDGER EM SQLITE
+
+import calendar
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from keyword_prompts_improved import BOT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "posting_quota.db"
+LEGACY_USAGE_FILE = "rate_limit_usage.json"   # Contador mensal do RateLimitManager antigo
+LEGACY_BOT = "legacy"
+RETENTION_SECONDS = 62 * 86400   # Cobre a maior janela (mês de calendário) com folga
+RESERVATION_TTL_SECONDS = 600    # Reserva sem commit/release (processo morreu) expira e devolve a vaga
+
+STATUS_RESERVED = "reserved"
+STATUS_POSTED = "posted"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS post_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    posted_at REAL NOT NULL,
+    bot TEXT NOT NULL,
+    tweet_id TEXT,
+    status TEXT NOT NULL DEFAULT 'posted'
+);
+CREATE INDEX IF NOT EXISTS idx_post_events_posted_at ON post_events (posted_at);
+CREATE INDEX IF NOT EXISTS idx_post_events_bot ON post_events (bot, posted_at);
+CREATE TABLE IF NOT EXISTS quota_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    applied_at TEXT NOT NULL
+);
+"""
+
+CALENDAR_DAY = "day"
+CALENDAR_MONTH = "month"
+
+
+@dataclass(frozen=True)
+class QuotaRule:
+    """
+    Limite de postagens: janela deslizante de `window_seconds` ou período de
+    calendário em UTC ("day", ou "month" reiniciando em `reset_day`). Com
+    `bot`, conta só as postagens desse bot e só recusa as reservas dele.
+    """
+    name: str
+    limit: int
+    window_seconds: float = 0.0
+    calendar: Optional[str] = None
+    reset_day: int = 1
+    bot: Optional[str] = None
+
+
+@dataclass
+class QuotaDecision:
+    allowed: bool
+    wait_seconds: float = 0.0
+    rule: Optional[str] = None
+
+    @property
+    def reason(self) -> str:
+        if self.allowed:
+            return "OK para postar"
+        return f"Limite {self.rule} atingido, libera em {format_wait(self.wait_seconds)}"
+
+
+@dataclass
+class Reservation:
+    """Vaga ocupada no ledger antes da geração; termina em commit() ou release()"""
+    event_id: int
+    bot: str
+    reserved_at: float
+    done: bool = False
+
+
+class QuotaExceeded(Exception):
+    """Postagem recusada pela cota antes de chegar à API"""
+
+    def __init__(self, decision: QuotaDecision):
+        super().__init__(decision.reason)
+        self.decision = decision
+
+
+def format_wait(seconds: float) -> str:
+    if seconds >= 86400:
+        return f"{seconds / 86400:.1f} dias"
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f}h"
+    return f"{seconds / 60:.0f} min"
+
+
+def calendar_period(rule: QuotaRule, now: float) -> Tuple[float, float]:
+    """Início e fim (epoch) do período de calendário UTC que contém `now`"""
+    current = datetime.fromtimestamp(now, timezone.utc)
+    if rule.calendar == CALENDAR_DAY:
+        start = current.replace(hour=0, minute=0, second=0, microsecond=0)
+        return start.timestamp(), start.timestamp() + 86400
+
+    def reset_in(year: int, month: int) -> datetime:
+        day = min(rule.reset_day, calendar.monthrange(year, month)[1])
+        return datetime(year, month, day, tzinfo=timezone.utc)
+
+    def shift(year: int, month: int, delta: int) -> Tuple[int, int]:
+        index = year * 12 + month - 1 + delta
+        return index // 12, index % 12 + 1
+
+    start = reset_in(current.year, current.month)
+    if start > current:
+        start = reset_in(*shift(current.year, current.month, -1))
+    end = reset_in(*shift(start.year, start.month, 1))
+    return start.timestamp(), end.timestamp()
+
+
+def rules_from_config(config: Optional[Dict] = None) -> List[QuotaRule]:
+    """Limites da conta definidos no BOT_CONFIG"""
+    config = BOT_CONFIG if config is None else config
+    rules = []
+    if config.get("max_responses_per_hour"):
+        rules.append(QuotaRule("horário", config["max_responses_per_hour"], window_seconds=3600))
+    if config.get("max_responses_per_day"):
+        rules.append(QuotaRule("diário", config["max_responses_per_day"], window_seconds=86400))
+    if config.get("max_posts_per_month"):
+        rules.append(QuotaRule("mensal", config["max_posts_per_month"], calendar=CALENDAR_MONTH,
+                               reset_day=config.get("monthly_reset_day", 1)))
+    return rules
+
+
+class PostingQuota:
+    """
+    Ledger único de postagens da conta, compartilhado por todos os bots e
+    processos através de um arquivo SQLite (WAL).
+
+    Cada regra só precisa saber quando foi a N-ésima postagem mais recente
+    (N = limite): se ela ainda está dentro da janela, a cota está esgotada e
+    libera exatamente quando ela sair. Por isso basta manter em memória as
+    últimas max(limite) postagens (da conta, e de cada bot com regra própria);
+    outro processo que grave no ledger é detectado por PRAGMA data_version e
+    só então as listas são recarregadas.
+    check() é O(1) por regra; reserve() ocupa a vaga numa transação
+    BEGIN IMMEDIATE, então dois processos nunca passam da cota juntos.
+
+    Protocolo dos bots: reserve() antes de chamar o LLM (sem vaga, não
+    gera), post(..., reservation=...) faz commit se a postagem sair e
+    release() se falhar ou a geração vier vazia.
+    """
+
+    def __init__(self, rules: Optional[List[QuotaRule]] = None, db_path: str = DEFAULT_DB_PATH,
+                 clock: Callable[[], float] = time.time):
+        self.rules = rules if rules is not None else rules_from_config()
+        self.db_path = db_path
+        self.clock = clock
+        self.depth = max((rule.limit for rule in self.rules if rule.bot is None), default=0)
+        self.bot_depths: Dict[str, int] = {}
+        for rule in self.rules:
+            if rule.bot is not None:
+                self.bot_depths[rule.bot] = max(self.bot_depths.get(rule.bot, 0), rule.limit)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(post_events)")}
+        if "status" not in columns:   # Ledger criado antes das reservas
+            self._conn.execute("ALTER TABLE post_events ADD COLUMN status TEXT NOT NULL DEFAULT 'posted'")
+
+        self.stats = {"refused": 0, "tokens_saved": 0}
+        self.stats.update(dict(self._conn.execute("SELECT name, value FROM quota_stats")))
+
+        self._recent: List[float] = []     # Últimas `depth` postagens, em ordem cronológica
+        self._recent_by_bot: Dict[str, List[float]] = {bot: [] for bot in self.bot_depths}
+        self._data_version = None
+        self._periods: Dict[str, Tuple[float, float]] = {}
+        self._seed_legacy_usage(os.path.join(os.path.dirname(os.path.abspath(db_path)), LEGACY_USAGE_FILE))
+        self._refresh()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _seed_legacy_usage(self, path: str):
+        """
+        Importa uma única vez o contador mensal do RateLimitManager antigo: as
+        postagens do mês corrente viram eventos no início do período mensal,
+        para a cota não recomeçar do zero contra o limite real do X.
+        """
+        migration_name = "legacy_monthly_usage_v1"
+        monthly = next((rule for rule in self.rules if rule.calendar == CALENDAR_MONTH and rule.bot is None), None)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._conn.execute("SELECT 1 FROM migrations WHERE name = ?", (migration_name,)).fetchone():
+                    self._conn.execute("COMMIT")
+                    return
+                seeded = 0
+                try:
+                    with open(path, "r") as f:
+                        usage = json.load(f)
+                    next_reset = datetime.fromisoformat(usage["next_monthly_reset"]).timestamp()
+                except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                    if not isinstance(e, FileNotFoundError):
+                        logger.warning(f"⚠️  {path} inválido, contador mensal não importado: {e}")
+                    usage, next_reset = {}, 0.0
+                now = self.clock()
+                if monthly and next_reset > now:   # Contador ainda do período corrente
+                    seeded = int(usage.get("monthly_posts", 0))
+                    start = self._period(monthly, now)[0]
+                    self._conn.executemany(
+                        "INSERT INTO post_events (posted_at, bot, status) VALUES (?, ?, ?)",
+                        [(start, LEGACY_BOT, STATUS_POSTED)] * seeded
+                    )
+                self._conn.execute("INSERT INTO migrations (name, applied_at) VALUES (?, ?)",
+                                   (migration_name, datetime.now().isoformat()))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if seeded:
+            logger.info(f"📦 {seeded} postagens do mês importadas de {path} para o ledger de cota")
+
+    def _refresh(self, force: bool = False):
+        """Recarrega as postagens recentes se outro processo gravou no ledger"""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if not force and version == self._data_version:
+            return
+        rows = self._conn.execute(
+            "SELECT posted_at FROM post_events ORDER BY posted_at DESC LIMIT ?", (self.depth,)
+        ).fetchall()
+        self._recent = [row[0] for row in reversed(rows)]
+        for bot, depth in self.bot_depths.items():
+            rows = self._conn.execute(
+                "SELECT posted_at FROM post_events WHERE bot = ? ORDER BY posted_at DESC LIMIT ?", (bot, depth)
+            ).fetchall()
+            self._recent_by_bot[bot] = [row[0] for row in reversed(rows)]
+        self._data_version = version
+
+    def _timeline(self, rule: QuotaRule) -> List[float]:
+        """Postagens recentes que contam para a regra: da conta ou só do bot da regra"""
+        return self._recent if rule.bot is None else self._recent_by_bot[rule.bot]
+
+    def _period(self, rule: QuotaRule, now: float) -> Tuple[float, float]:
+        period = self._periods.get(rule.name)
+        if period is None or not period[0] <= now < period[1]:
+            period = self._periods[rule.name] = calendar_period(rule, now)
+        return period
+
+    def _decide(self, now: float, bot: Optional[str] = None) -> QuotaDecision:
+        blocking = QuotaDecision(True)
+        for rule in self.rules:
+            if rule.bot is not None and bot is not None and rule.bot != bot:
+                continue
+            recent = self._timeline(rule)
+            if len(recent) < rule.limit:
+                continue
+            oldest_counted = recent[-rule.limit] if rule.limit else now
+            if rule.calendar:
+                start, end = self._period(rule, now)
+                if oldest_counted < start:
+                    continue
+                wait = end - now
+            else:
+                if oldest_counted <= now - rule.window_seconds:
+                    continue
+                wait = oldest_counted + rule.window_seconds - now
+            if wait > blocking.wait_seconds:
+                blocking = QuotaDecision(False, wait, rule.name)
+        return blocking
+
+    def check(self, bot: Optional[str] = None) -> QuotaDecision:
+        """
+        Pode postar agora? Se não, em quantos segundos a regra mais restritiva
+        libera. Com `bot`, regras de outros bots não contam.
+        """
+        with self._lock:
+            self._refresh()
+            return self._decide(self.clock(), bot)
+
+    def can_post(self, bot: Optional[str] = None) -> Tuple[bool, str]:
+        decision = self.check(bot)
+        return decision.allowed, decision.reason
+
+    def _bump(self, **deltas):
+        for name, delta in deltas.items():
+            self.stats[name] += delta
+            self._conn.execute(
+                "INSERT INTO quota_stats (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, delta)
+            )
+
+    def reserve(self, bot: str = "", estimated_tokens: int = 0) -> Reservation:
+        """
+        Ocupa uma vaga de forma atômica entre processos, antes de gastar tokens.
+        Sem vaga levanta QuotaExceeded e contabiliza `estimated_tokens` (o custo
+        da geração que não será feita) em stats["tokens_saved"].
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = self.clock()
+                expired = self._conn.execute(
+                    "DELETE FROM post_events WHERE status = ? AND posted_at < ?",
+                    (STATUS_RESERVED, now - RESERVATION_TTL_SECONDS)
+                ).rowcount
+                self._refresh(force=bool(expired))
+                decision = self._decide(now, bot)
+                if decision.allowed:
+                    event_id = self._conn.execute(
+                        "INSERT INTO post_events (posted_at, bot, status) VALUES (?, ?, ?)",
+                        (now, bot, STATUS_RESERVED)
+                    ).lastrowid
+                    self._conn.execute("DELETE FROM post_events WHERE posted_at < ?", (now - RETENTION_SECONDS,))
+                else:
+                    self._bump(refused=1, tokens_saved=int(estimated_tokens))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                # Qualquer falha (não só do SQLite) fecha a transação: senão a trava
+                # de escrita fica com este processo e as reservas dos outros expiram
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+            if not decision.allowed:
+                raise QuotaExceeded(decision)
+            self._recent.append(now)
+            del self._recent[:-self.depth or None]
+            if bot in self._recent_by_bot:
+                self._recent_by_bot[bot].append(now)
+                del self._recent_by_bot[bot][:-self.bot_depths[bot] or None]
+            return Reservation(event_id, bot, now)
+
+    def commit(self, reservation: Reservation, tweet_id=None):
+        """Postagem saiu: a vaga passa a contar a partir de agora"""
+        if reservation.done:
+            return
+        with self._lock:
+            self._conn.execute(
+                "UPDATE post_events SET status = ?, posted_at = ?, tweet_id = ? WHERE id = ?",
+                (STATUS_POSTED, self.clock(), str(tweet_id) if tweet_id else None, reservation.event_id)
+            )
+            self._refresh(force=True)
+        reservation.done = True
+
+    def release(self, reservation: Reservation):
+        """Devolve a vaga de uma postagem que não saiu (geração vazia ou erro na API)"""
+        if reservation.done:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM post_events WHERE id = ?", (reservation.event_id,))
+            self._refresh(force=True)
+        reservation.done = True
+
+    def post(self, create_tweet, *args, bot: str = "", reservation: Optional[Reservation] = None, **kwargs):
+        """
+        Única porta para create_tweet: usa a vaga reservada (ou reserva agora),
+        posta, faz commit e devolve a vaga se a chamada falhar. Levanta
+        QuotaExceeded sem chamar a API se não houver vaga.
+        create_tweet pode ser o método do cliente ou um wrapper (ex: scheduler.call).
+        """
+        reservation = reservation or self.reserve(bot)
+        try:
+            response = create_tweet(*args, **kwargs)
+        except Exception:
+            self.release(reservation)
+            raise
+
+        data = getattr(response, "data", None)
+        self.commit(reservation, data.get("id") if isinstance(data, dict) else None)
+        return response
+
+    def usage(self, rule: QuotaRule) -> int:
+        """Postagens que contam para a regra agora (até o limite)"""
+        with self._lock:
+            self._refresh()
+            now = self.clock()
+            recent = self._timeline(rule)[-rule.limit:] if rule.limit else []
+            if rule.calendar:
+                start = self._period(rule, now)[0]
+                return sum(1 for posted_at in recent if posted_at >= start)
+            return sum(1 for posted_at in recent if posted_at > now - rule.window_seconds)
+
+    def get_status(self) -> Dict:
+        now = self.clock()
+        status = {}
+        for rule in self.rules:
+            entry = {"used": self.usage(rule), "limit": rule.limit}
+            if rule.calendar:
+                entry["resets_at"] = datetime.fromtimestamp(self._period(rule, now)[1], timezone.utc).isoformat()
+            status[rule.name] = entry
+        decision = self.check()
+        status["can_post_now"] = decision.allowed
+        status["wait_seconds"] = round(decision.wait_seconds)
+        status.update(self.stats)
+        return status
+
+
+_default_quota: Optional[PostingQuota] = None
+
+
+def get_posting_quota() -> PostingQuota:
+    """Cota da conta compartilhada pelos bots do processo (limites do BOT_CONFIG)"""
+    global _default_quota
+    if _default_quota is None:
+        _default_quota = PostingQuota()
+    return _default_quota
@@ -3,107 +3,55 @@
 
 import json
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 from typing import Dict, Optional
 
+from posting_quota import CALENDAR_MONTH, PostingQuota, get_posting_quota
+
 class RateLimitManager:
-    def __init__(self):
-        self.load_limits()
-        self.current_usage = self.load_usage()
-    
-    def load_limits(self):
-        """Carrega limites conhecidos da API do X"""
-        self.limits = {
-            "monthly_posts": 100,  # Seu limite atual
-            "daily_posts": 10,     # Estimativa conservadora
-            "hourly_posts": 5,     # Muito conservador
-            "posts_per_15min": 2   # Extremamente conservador
-        }
-    
-    def load_usage(self) -> Dict:
-        """Carrega uso atual"""
-        try:
-            with open("rate_limit_usage.json", "r") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {
-                "monthly_posts": 106,  # Você já usou 106
-                "daily_posts": 0,
-                "hourly_posts": 0,
-                "last_reset_check": datetime.now().isoformat(),
-                "next_monthly_reset": "2024-09-19T00:00:00"  # Seu reset
-            }
+    """
+    Visão dos limites de postagem da conta sobre o ledger compartilhado
+    (posting_quota.py). As postagens são registradas pelo próprio ledger
+    em PostingQuota.post, a única porta para create_tweet.
+    """
     
-    def save_usage(self):
-        """Salva uso atual"""
-        with open("rate_limit_usage.json", "w") as f:
-            json.dump(self.current_usage, f, indent=2)
+    def __init__(self, quota: Optional[PostingQuota] = None):
+        self.quota = quota or get_posting_quota()
+        self.limits = {rule.name: rule.limit for rule in self.quota.rules}
     
     def can_post(self) -> tuple[bool, str]:
         """Verifica se pode postar e retorna razão se não pode"""
-        now = datetime.now()
-        
-        # Verifica se passou do reset mensal
-        next_reset = datetime.fromisoformat(self.current_usage["next_monthly_reset"])
-        if now >= next_reset:
-            # Reset mensal aconteceu
-            self.current_usage["monthly_posts"] = 0
-            self.current_usage["daily_posts"] = 0
-            self.current_usage["hourly_posts"] = 0
-            
-            # Próximo reset (assumindo mensal)
-            next_month_reset = next_reset + timedelta(days=30)
-            self.current_usage["next_monthly_reset"] = next_month_reset.isoformat()
-            
-            self.save_usage()
-            return True, "Reset mensal aplicado"
-        
-        # Verifica limite mensal
-        if self.current_usage["monthly_posts"] >= self.limits["monthly_posts"]:
-            days_until_reset = (next_reset - now).days
-            hours_until_reset = int((next_reset - now).total_seconds() / 3600)
-            return False, f"Limite mensal atingido. Reset em {days_until_reset} dias ({hours_until_reset}h)"
-        
-        # Verifica limite diário (reset a cada 24h)
-        last_check = datetime.fromisoformat(self.current_usage["last_reset_check"])
-        if (now - last_check).total_seconds() >= 86400:  # 24 horas
-            self.current_usage["daily_posts"] = 0
-            self.current_usage["hourly_posts"] = 0
-        
-        if self.current_usage["daily_posts"] >= self.limits["daily_posts"]:
-            return False, "Limite diário atingido"
-        
-        # Verifica limite horário
-        if (now - last_check).total_seconds() >= 3600:  # 1 hora
-            self.current_usage["hourly_posts"] = 0
-        
-        if self.current_usage["hourly_posts"] >= self.limits["hourly_posts"]:
-            return False, "Limite horário atingido"
-        
-        return True, "OK para postar"
+        return self.quota.can_post()
     
-    def record_post(self):
-        """Registra que um post foi feito"""
-        self.current_usage["monthly_posts"] += 1
-        self.current_usage["daily_posts"] += 1
-        self.current_usage["hourly_posts"] += 1
-        self.current_usage["last_reset_check"] = datetime.now().isoformat()
-        self.save_usage()
+    def seconds_until_post(self) -> float:
+        """Segundos até a regra mais restritiva liberar uma postagem (0 se já pode)"""
+        return self.quota.check().wait_seconds
     
     def get_status(self) -> Dict:
         """Retorna status atual dos limites"""
-        now = datetime.now()
-        next_reset = datetime.fromisoformat(self.current_usage["next_monthly_reset"])
-        
-        return {
-            "monthly_usage": f"{self.current_usage['monthly_posts']}/{self.limits['monthly_posts']}",
-            "daily_usage": f"{self.current_usage['daily_posts']}/{self.limits['daily_posts']}",
-            "hourly_usage": f"{self.current_usage['hourly_posts']}/{self.limits['hourly_posts']}",
-            "next_monthly_reset": next_reset.strftime("%Y-%m-%d %H:%M"),
-            "days_until_reset": (next_reset - now).days,
-            "hours_until_reset": int((next_reset - now).total_seconds() / 3600),
-            "can_post_now": self.can_post()[0]
+        status = self.quota.get_status()
+        usage = {name: f"{entry['used']}/{entry['limit']}" for name, entry in status.items()
+                 if isinstance(entry, dict)}
+        
+        monthly = next((rule for rule in self.quota.rules if rule.calendar == CALENDAR_MONTH), None)
+        result = {
+            "monthly_usage": usage.get(monthly.name, "-") if monthly else "-",
+            "daily_usage": usage.get("diário", "-"),
+            "hourly_usage": usage.get("horário", "-"),
+            "can_post_now": status["can_post_now"],
+            "seconds_until_post": status["wait_seconds"],
+            "days_until_reset": 0,
+            "hours_until_reset": 0
         }
+        if monthly:
+            next_reset = datetime.fromisoformat(status[monthly.name]["resets_at"])
+            until_reset = (next_reset - datetime.now(timezone.utc)).total_seconds()
+            result.update({
+                "next_monthly_reset": next_reset.strftime("%Y-%m-%d %H:%M"),
+                "days_until_reset": int(until_reset // 86400),
+                "hours_until_reset": int(until_reset / 3600)
+            })
+        return result
 
 def create_waiting_bot():
     """Cria um bot que aguarda o reset dos limites"""
@@ -136,9 +84,10 @@ def create_waiting_bot():
         else:
             print(f"⏳ Aguardando: {reason}")
             
-            # Aguarda 1 hora antes de verificar novamente
-            print("😴 Verificando novamente em 1 hora...")
-            time.sleep(3600)
+            # Aguarda até a regra mais restritiva liberar (no máximo 1 hora)
+            wait = min(3600, max(60, manager.seconds_until_post()))
+            print(f"😴 Verificando novamente em {wait / 60:.0f} min...")
+            time.sleep(wait)
 
 def create_conservative_config():
     """Cria configuração ultra-conservadora para não estourar limites"""
@@ -190,8 +139,10 @@ def main():
     """Menu principal"""
     print("🚫 GERENCIADOR DE RATE LIMITS")
     print("=" * 40)
-    print("Você atingiu o limite mensal de posts (106/100)")
-    print("Reset previsto: 19 de Setembro às 00:00 UTC")
+    status = RateLimitManager().get_status()
+    print(f"Uso mensal de posts: {status['monthly_usage']}")
+    if "next_monthly_reset" in status:
+        print(f"Próximo reset: {status['next_monthly_reset']} UTC")
     print()
     
     while True:
@@ -0,0 +1,137 @@
+# rate_limit_registry.py
+# REGISTRO DE RATE LIMIT POR ENDPOINT - CABEÇALHOS x-rate-limit-* CAPTURADOS NA SESSÃO HTTP DO TWEEPY
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Segmentos variáveis dos caminhos da API v2 viram marcadores do template
+# (o primeiro segmento numérico é a versão: /2/...)
+_NUMERIC_SEGMENT = re.compile(r"(?<=.)/\d+(?=/|$)")
+_USERNAME_SEGMENT = re.compile(r"(/users/by/username)/[^/]+")
+
+
+@lru_cache(maxsize=1024)
+def endpoint_template(method: str, url: str) -> str:
+    """'GET https://api.twitter.com/2/users/123/tweets?x=1' -> 'GET /2/users/:id/tweets'"""
+    path = urlsplit(url).path or "/"
+    path = _USERNAME_SEGMENT.sub(r"\1/:username", path)
+    path = _NUMERIC_SEGMENT.sub("/:id", path)
+    return f"{method.upper()} {path}"
+
+
+@dataclass
+class RateLimitWindow:
+    """Última janela de rate limit observada para um endpoint"""
+    endpoint: str
+    limit: int
+    remaining: int
+    reset: float          # Epoch em que a janela reinicia
+    observed_at: float
+    throttled: int = 0    # Respostas 429 recebidas neste endpoint
+
+    @property
+    def remaining_ratio(self) -> float:
+        return self.remaining / self.limit if self.limit else 0.0
+
+    def seconds_until_reset(self, now: Optional[float] = None) -> float:
+        return max(0.0, self.reset - (now if now is not None else time.time()))
+
+    def to_dict(self) -> Dict:
+        return {
+            "endpoint": self.endpoint,
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset": self.reset,
+            "observed_at": self.observed_at,
+            "throttled": self.throttled
+        }
+
+
+class RateLimitRegistry:
+    """
+    Registro em memória de x-rate-limit-limit/remaining/reset por método e
+    template de endpoint, alimentado por um hook de resposta da sessão
+    requests usada pelo tweepy.Client. Qualquer bot do processo pode consultar.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._windows: Dict[str, RateLimitWindow] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, url: str, headers, status_code: int = 200) -> Optional[RateLimitWindow]:
+        """Registra os cabeçalhos de uma resposta; None se ela não trouxe rate limit"""
+        try:
+            limit = int(headers["x-rate-limit-limit"])
+            remaining = int(headers["x-rate-limit-remaining"])
+            reset = float(headers["x-rate-limit-reset"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return self.record_window(endpoint_template(method, url), limit, remaining, reset, status_code)
+
+    def record_window(self, endpoint: str, limit: int, remaining: int, reset: float,
+                      status_code: int = 200) -> RateLimitWindow:
+        """Registra uma janela já interpretada (usado também pelo simulador)"""
+        with self._lock:
+            previous = self._windows.get(endpoint)
+            throttled = previous.throttled if previous else 0
+            window = RateLimitWindow(endpoint, limit, remaining, reset, self.clock(),
+                                     throttled + (status_code == 429))
+            self._windows[endpoint] = window
+        return window
+
+    def hook(self, response, *args, **kwargs):
+        """Hook de resposta do requests (session.hooks['response'])"""
+        self.record(response.request.method, response.request.url, response.headers, response.status_code)
+        return response
+
+    def get(self, endpoint: str) -> Optional[RateLimitWindow]:
+        return self._windows.get(endpoint)
+
+    def windows(self, since: Optional[float] = None) -> List[RateLimitWindow]:
+        """Janelas conhecidas (opcionalmente só as observadas depois de `since`)"""
+        with self._lock:
+            windows = list(self._windows.values())
+        return [w for w in windows if since is None or w.observed_at > since]
+
+    def most_constrained(self) -> Optional[RateLimitWindow]:
+        """Endpoint com menor fração restante cuja janela ainda não reiniciou"""
+        now = self.clock()
+        active = [w for w in self.windows() if w.reset > now]
+        return min(active, key=lambda w: w.remaining_ratio) if active else None
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {w.endpoint: w.to_dict() for w in self.windows()}
+
+    def clear(self):
+        with self._lock:
+            self._windows.clear()
+
+
+def install_rate_limit_hook(client, registry: Optional["RateLimitRegistry"] = None) -> "RateLimitRegistry":
+    """Registra o hook na sessão HTTP do cliente (tweepy.Client.session ou requests.Session)"""
+    registry = registry or get_rate_limit_registry()
+    session = getattr(client, "session", client)
+    hooks = session.hooks.setdefault("response", [])
+    if registry.hook not in hooks:
+        hooks.append(registry.hook)
+    return registry
+
+
+_default_registry: Optional[RateLimitRegistry] = None
+
+
+def get_rate_limit_registry() -> RateLimitRegistry:
+    """Registro compartilhado do processo"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = RateLimitRegistry()
+    return _default_registry
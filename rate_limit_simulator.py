@@ -0,0 +1,298 @@
+# rate_limit_simulator.py
+# SIMULADOR DE RATE LIMIT EM TEMPO SIMULADO - CALIBRAÇÃO OFFLINE SEM GASTAR QUOTA DA API
+
+import argparse
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from rate_limit_registry import RateLimitRegistry
+from request_scheduler import DEFAULT_WINDOW_SECONDS, RequestScheduler
+
+SIMULATED_DAYS = 7
+CANDIDATE_INTERVALS = [10, 15, 20, 30, 45, 60, 90, 120, 180]
+
+# Limites de exemplo por janela de 15 minutos (variam por plano da API):
+# prefira os observados, via limits_from_registry() ou limits_from_history()
+SYNTHETIC_LIMITS = {
+    "GET /2/users/me": (75, DEFAULT_WINDOW_SECONDS),
+    "GET /2/users/:id/tweets": (900, DEFAULT_WINDOW_SECONDS),
+    "GET /2/users/:id/mentions": (180, DEFAULT_WINDOW_SECONDS),
+    "GET /2/tweets/search/recent": (180, DEFAULT_WINDOW_SECONDS),
+    "POST /2/tweets": (100, DEFAULT_WINDOW_SECONDS),
+}
+
+
+class SimClock:
+    """Relógio simulado: sleep() apenas avança o tempo"""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += max(0.0, seconds)
+
+
+class SimulatedAPI:
+    """
+    Servidor com janela fixa por endpoint, como a API do X: a janela abre na
+    primeira chamada após o reinício e aceita `limit` chamadas até `reset`.
+    Cada resposta alimenta o RateLimitRegistry como o hook da sessão faria.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, float]], clock: SimClock, registry: RateLimitRegistry):
+        self.limits = limits
+        self.clock = clock
+        self.registry = registry
+        self._windows: Dict[str, List[float]] = {}   # endpoint -> [restantes, reset]
+
+    def request(self, endpoint: str) -> bool:
+        """Executa uma chamada; False se o servidor respondeu 429"""
+        limit, window_seconds = self.limits[endpoint]
+        now = self.clock()
+        window = self._windows.get(endpoint)
+        if window is None or now >= window[1]:
+            window = [limit, math.ceil(now + window_seconds)]
+            self._windows[endpoint] = window
+
+        accepted = window[0] > 0
+        if accepted:
+            window[0] -= 1
+
+        self.registry.record_window(endpoint, limit, window[0], window[1], 200 if accepted else 429)
+        return accepted
+
+
+class FixedIntervalPolicy:
+    """Sleep fixo entre ciclos; após um 429 espera o reinício (comportamento das calibrações ao vivo)"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.name = "fixo"
+
+    def bind(self, clock: SimClock, registry: RateLimitRegistry):
+        self.clock = clock
+        self.registry = registry
+
+    def before_call(self, endpoint: str):
+        pass
+
+    def on_rejected(self, endpoint: str):
+        window = self.registry.get(endpoint)
+        self.clock.sleep(min(window.seconds_until_reset(self.clock()), DEFAULT_WINDOW_SECONDS) if window else DEFAULT_WINDOW_SECONDS)
+
+    def cycle_sleep(self, endpoint: str, calls: int) -> float:
+        return self.interval
+
+
+class SchedulerPolicy:
+    """Cadência desejada + RequestScheduler (espera exata por endpoint), como o AdaptiveRateLimiter"""
+
+    def __init__(self, cadence: float):
+        self.interval = cadence
+        self.name = "agendador"
+
+    def bind(self, clock: SimClock, registry: RateLimitRegistry):
+        self.scheduler = RequestScheduler(registry, clock=clock, sleep=clock.sleep)
+
+    def before_call(self, endpoint: str):
+        self.scheduler.acquire(endpoint)
+
+    def on_rejected(self, endpoint: str):
+        pass  # O 429 já zerou o saldo no registro; a próxima acquire espera o reinício
+
+    def cycle_sleep(self, endpoint: str, calls: int) -> float:
+        return self.scheduler.cycle_wait(endpoint, calls, self.interval)
+
+
+@dataclass
+class SimulationResult:
+    policy: str
+    interval: float
+    cycles: int
+    requests: int
+    rejected: int
+    gaps: List[float] = field(repr=False, default_factory=list)   # Intervalo entre ciclos completos
+
+    @property
+    def success_rate(self) -> float:
+        return (self.requests - self.rejected) / self.requests if self.requests else 0.0
+
+    def gap_percentile(self, fraction: float) -> float:
+        if not self.gaps:
+            return 0.0
+        ordered = sorted(self.gaps)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def to_dict(self) -> Dict:
+        return {
+            "policy": self.policy,
+            "interval": self.interval,
+            "cycles": self.cycles,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "success_rate": self.success_rate,
+            "mean_gap": sum(self.gaps) / len(self.gaps) if self.gaps else 0.0,
+            "p95_gap": self.gap_percentile(0.95),
+            "max_gap": max(self.gaps) if self.gaps else 0.0
+        }
+
+
+def simulate(policy, endpoint: str, limits: Optional[Dict] = None, calls_per_cycle: int = 1,
+             days: float = SIMULATED_DAYS, start: float = 1_700_000_000.0) -> SimulationResult:
+    """Roda a política por `days` dias simulados; cada ciclo faz `calls_per_cycle` chamadas ao endpoint"""
+    limits = limits or SYNTHETIC_LIMITS
+    clock = SimClock(start)
+    registry = RateLimitRegistry(clock=clock)
+    api = SimulatedAPI(limits, clock, registry)
+    policy.bind(clock, registry)
+
+    result = SimulationResult(policy.name, policy.interval, 0, 0, 0)
+    end = start + days * 86400
+    last_cycle_end = None
+    while clock() < end:
+        for _ in range(calls_per_cycle):
+            policy.before_call(endpoint)
+            result.requests += 1
+            if not api.request(endpoint):
+                result.rejected += 1
+                policy.on_rejected(endpoint)
+        result.cycles += 1
+        if last_cycle_end is not None:
+            result.gaps.append(clock() - last_cycle_end)
+        last_cycle_end = clock()
+        clock.sleep(policy.cycle_sleep(endpoint, calls_per_cycle))
+    return result
+
+
+def replay_trace(trace: List[Tuple[float, str]], limits: Optional[Dict] = None) -> Dict:
+    """
+    Reproduz um trace de chamadas (instante, endpoint) pelo RequestScheduler:
+    quantas seriam recusadas sem ele e quanto atraso ele introduz para evitá-las
+    """
+    limits = limits or SYNTHETIC_LIMITS
+    trace = sorted(trace)
+    start = trace[0][0] if trace else 0.0
+
+    # Sem agendador: as chamadas saem nos instantes gravados
+    clock = SimClock(start)
+    api = SimulatedAPI(limits, clock, RateLimitRegistry(clock=clock))
+    rejected = 0
+    for at, endpoint in trace:
+        clock.now = max(clock.now, at)
+        rejected += not api.request(endpoint)
+
+    # Com agendador: cada chamada espera o necessário (atrasos se acumulam)
+    clock = SimClock(start)
+    registry = RateLimitRegistry(clock=clock)
+    api = SimulatedAPI(limits, clock, registry)
+    scheduler = RequestScheduler(registry, clock=clock, sleep=clock.sleep)
+    delays, scheduled_rejected = [], 0
+    for at, endpoint in trace:
+        clock.now = max(clock.now, at)
+        scheduler.acquire(endpoint)
+        delays.append(clock.now - at)
+        scheduled_rejected += not api.request(endpoint)
+
+    return {
+        "calls": len(trace),
+        "rejected_unscheduled": rejected,
+        "rejected_scheduled": scheduled_rejected,
+        "delayed_calls": sum(1 for d in delays if d > 0),
+        "max_delay": max(delays) if delays else 0.0
+    }
+
+
+def limits_from_registry(registry: RateLimitRegistry) -> Dict[str, Tuple[int, float]]:
+    """Limites observados ao vivo pelo hook da sessão"""
+    return {w.endpoint: (w.limit, DEFAULT_WINDOW_SECONDS) for w in registry.windows()}
+
+
+def limits_from_history(path: str = "rate_limiter_state.json") -> Dict[str, Tuple[int, float]]:
+    """Limites gravados no performance_history do AdaptiveRateLimiter"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        history = json.load(f).get("performance_history", [])
+    limits = {}
+    for record in history:
+        if record.get("endpoint", "").split(" ")[0] in ("GET", "POST", "DELETE", "PUT"):
+            limits[record["endpoint"]] = (max(record["limit"], limits.get(record["endpoint"], (0,))[0]),
+                                          DEFAULT_WINDOW_SECONDS)
+    return limits
+
+
+def recommendation(interval: float) -> str:
+    if interval <= 60:
+        return "speed"
+    return "balanced" if interval <= 120 else "conservative"
+
+
+def calibrate(endpoint: str, limits: Optional[Dict] = None, calls_per_cycle: int = 1,
+              candidates: Optional[List[int]] = None, days: float = SIMULATED_DAYS) -> Dict:
+    """
+    Substitui a calibração ao vivo: avalia cada intervalo candidato em tempo
+    simulado e escolhe o menor sem nenhum 429 (sleep fixo). Também mede a
+    cadência com o RequestScheduler onde o sleep fixo foi recusado.
+    """
+    limits = limits or SYNTHETIC_LIMITS
+    candidates = candidates or CANDIDATE_INTERVALS
+    started = time.perf_counter()
+    fixed = [simulate(FixedIntervalPolicy(i), endpoint, limits, calls_per_cycle, days) for i in candidates]
+    # Onde o sleep fixo não esgota o saldo o agendador nunca espera: só compara onde houve 429
+    scheduled = [simulate(SchedulerPolicy(r.interval), endpoint, limits, calls_per_cycle, days)
+                 for r in fixed if r.rejected]
+
+    safe = [r.interval for r in fixed if r.rejected == 0]
+    optimal_sleep = min(safe) if safe else max(candidates)
+
+    return {
+        "endpoint": endpoint,
+        "limit": limits[endpoint],
+        "calls_per_cycle": calls_per_cycle,
+        "optimal_sleep_time": optimal_sleep,
+        "recommendation": recommendation(optimal_sleep),
+        "simulated_days": days,
+        "test_results": [r.to_dict() for r in fixed + scheduled],
+        "test_duration": time.perf_counter() - started
+    }
+
+
+def print_report(results: Dict):
+    limit, window = results["limit"]
+    print(f"📊 CALIBRAÇÃO SIMULADA: {results['endpoint']} ({limit}/{window / 60:.0f} min), "
+          f"{results['calls_per_cycle']} chamada(s) por ciclo, {results['simulated_days']:g} dias")
+    print("=" * 86)
+    print(f"{'política':<10} | {'intervalo':>9} | {'ciclos':>7} | {'429':>6} | {'sucesso':>7} | "
+          f"{'média':>8} | {'p95':>8} | {'máx':>8}")
+    print("-" * 86)
+    for r in results["test_results"]:
+        print(f"{r['policy']:<10} | {r['interval']:>8g}s | {r['cycles']:>7} | {r['rejected']:>6} | "
+              f"{r['success_rate']:>7.1%} | {r['mean_gap']:>7.0f}s | {r['p95_gap']:>7.0f}s | {r['max_gap']:>7.0f}s")
+    print("-" * 86)
+    print("média/p95/máx = intervalo entre ciclos completos (defasagem de leitura).")
+    print(f"🎯 Menor intervalo fixo sem 429: {results['optimal_sleep_time']}s ({results['recommendation']})")
+    print(f"⏱️ {len(results['test_results'])} simulações em {results['test_duration']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibração de rate limit em tempo simulado")
+    parser.add_argument("--endpoint", default="GET /2/users/:id/tweets")
+    parser.add_argument("--calls", type=int, default=1, help="Chamadas ao endpoint por ciclo")
+    parser.add_argument("--days", type=float, default=SIMULATED_DAYS)
+    parser.add_argument("--history", default="rate_limiter_state.json",
+                        help="Usa limites gravados pelo AdaptiveRateLimiter quando existirem")
+    args = parser.parse_args()
+
+    limits = {**SYNTHETIC_LIMITS, **limits_from_history(args.history)}
+    print_report(calibrate(args.endpoint, limits, args.calls, days=args.days))
+
+
+if __name__ == "__main__":
+    main()
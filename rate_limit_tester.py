@@ -1,26 +1,35 @@
 # rate_limit_tester.py
-# FERRAMENTA PARA TESTAR E ENCONTRAR O RATE LIMIT MÍNIMO OTIMIZADO
+# FERRAMENTA PARA TESTAR E ENCONTRAR O RATE LIMIT MÍNIMO OTIMIZADO (EM TEMPO SIMULADO)
 
 import tweepy
 import time
 import json
 import logging
+from log_setup import setup_logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
 import matplotlib.pyplot as plt
 import pandas as pd
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Configuração de logging (só console)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 from keys import *
+from rate_limit_registry import RateLimitRegistry, install_rate_limit_hook
+from rate_limit_simulator import SYNTHETIC_LIMITS, FixedIntervalPolicy, limits_from_registry, simulate
+
+# Endpoint medido: get_me é leve e tem limite próprio
+TEST_ENDPOINT = "GET /2/users/me"
 
 class RateLimitTester:
+    """
+    Testa intervalos de polling em tempo simulado. Só a conexão inicial chama
+    a API (para observar os limites reais da conta); o resto não gasta quota.
+    """
+    
     def __init__(self):
+        self.registry = RateLimitRegistry()
         self.setup_client()
         self.test_results = []
         self.current_limits = {}
@@ -36,152 +45,82 @@ class RateLimitTester:
                 access_token_secret=X_ACCESS_TOKEN_SECRET,
                 wait_on_rate_limit=False  # Não aguarda automaticamente
             )
+            install_rate_limit_hook(self.client, self.registry)
             
-            # Testa conexão
+            # Testa conexão (e captura os cabeçalhos de rate limit)
+            start = time.time()
             me = self.client.get_me()
+            self.measured_response_time = time.time() - start
             logger.info(f"✅ Conectado como @{me.data.username}")
             
         except Exception as e:
             logger.error(f"❌ Erro na conexão: {e}")
             raise
     
+    def get_limits(self) -> Dict:
+        """Limites observados na conexão, com os de exemplo para o que não foi observado"""
+        return {**SYNTHETIC_LIMITS, **limits_from_registry(self.registry)}
+    
     def get_rate_limit_status(self) -> Dict:
-        """Obtém status atual dos rate limits"""
-        try:
-            # Faz uma chamada simples para obter headers
-            response = self.client.get_me()
-            
-            # Tenta extrair informações de rate limit dos headers
-            if hasattr(response, 'meta') and hasattr(response.meta, 'headers'):
-                headers = response.meta.headers
-            else:
-                headers = {}
-            
-            limit_info = {
-                'limit': headers.get('x-rate-limit-limit', 'unknown'),
-                'remaining': headers.get('x-rate-limit-remaining', 'unknown'),
-                'reset': headers.get('x-rate-limit-reset', 'unknown'),
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            if limit_info['reset'] != 'unknown':
-                reset_time = datetime.fromtimestamp(int(limit_info['reset']))
-                limit_info['reset_time'] = reset_time.isoformat()
-                limit_info['minutes_until_reset'] = (reset_time - datetime.now()).total_seconds() / 60
-            
-            return limit_info
-            
-        except Exception as e:
-            logger.error(f"❌ Erro ao obter rate limit status: {e}")
+        """Status dos rate limits observado na última resposta (sem nova chamada)"""
+        window = self.registry.get(TEST_ENDPOINT)
+        if window is None:
             return {}
+        
+        reset_time = datetime.fromtimestamp(window.reset)
+        return {
+            'limit': window.limit,
+            'remaining': window.remaining,
+            'reset': int(window.reset),
+            'timestamp': datetime.now().isoformat(),
+            'reset_time': reset_time.isoformat(),
+            'minutes_until_reset': window.seconds_until_reset() / 60
+        }
     
     def test_single_interval(self, sleep_seconds: int, test_duration_minutes: int = 5) -> Dict:
         """
-        Testa um intervalo específico de sleep
+        Testa um intervalo específico de sleep em tempo simulado
         """
-        logger.info(f"🧪 Testando intervalo de {sleep_seconds}s por {test_duration_minutes} minutos...")
+        logger.info(f"🧪 Simulando intervalo de {sleep_seconds}s por {test_duration_minutes} minutos...")
         
-        start_time = datetime.now()
-        end_time = start_time + timedelta(minutes=test_duration_minutes)
+        started = time.perf_counter()
+        simulation = simulate(FixedIntervalPolicy(sleep_seconds), TEST_ENDPOINT, self.get_limits(),
+                              days=test_duration_minutes / 1440)
         
+        successful = simulation.requests - simulation.rejected
         results = {
             'sleep_seconds': sleep_seconds,
-            'start_time': start_time.isoformat(),
-            'requests_made': 0,
-            'successful_requests': 0,
-            'rate_limit_hits': 0,
-            'errors': 0,
-            'avg_response_time': 0,
-            'total_response_time': 0,
-            'rate_limit_info': []
+            'start_time': datetime.now().isoformat(),
+            'requests_made': simulation.requests,
+            'successful_requests': successful,
+            'rate_limit_hits': simulation.rejected,
+            'errors': simulation.rejected,
+            'avg_response_time': self.measured_response_time,
+            'rate_limit_info': [self.get_rate_limit_status()],
+            'end_time': datetime.now().isoformat(),
+            'actual_duration': test_duration_minutes,
+            'simulation_seconds': time.perf_counter() - started,
+            'success_rate': simulation.success_rate,
+            'requests_per_minute': successful / test_duration_minutes
         }
         
-        while datetime.now() < end_time:
-            request_start = time.time()
-            
-            try:
-                # Faz uma chamada de teste (get_me é leve)
-                response = self.client.get_me()
-                
-                # Registra tempo de resposta
-                response_time = time.time() - request_start
-                results['total_response_time'] += response_time
-                results['requests_made'] += 1
-                results['successful_requests'] += 1
-                
-                # Obtém informações de rate limit
-                rate_info = self.get_rate_limit_status()
-                if rate_info:
-                    results['rate_limit_info'].append(rate_info)
-                
-                logger.debug(f"✅ Request {results['requests_made']}: {response_time:.2f}s")
-                
-                # Sleep do teste
-                time.sleep(sleep_seconds)
-                
-            except tweepy.TooManyRequests as e:
-                logger.warning(f"⚠️  Rate limit atingido após {results['requests_made']} requests")
-                results['rate_limit_hits'] += 1
-                results['requests_made'] += 1
-                
-                # Pausa até o reset (ou máximo 15 minutos)
-                reset_time = getattr(e.response.headers, 'x-rate-limit-reset', None)
-                if reset_time:
-                    wait_time = min(int(reset_time) - int(time.time()), 900)  # Máximo 15 min
-                    logger.info(f"⏳ Aguardando {wait_time}s para reset do rate limit...")
-                    time.sleep(wait_time)
-                else:
-                    time.sleep(900)  # 15 minutos padrão
-                
-            except Exception as e:
-                logger.error(f"❌ Erro na request: {e}")
-                results['errors'] += 1
-                results['requests_made'] += 1
-                time.sleep(sleep_seconds)
-        
-        # Calcula estatísticas finais
-        if results['successful_requests'] > 0:
-            results['avg_response_time'] = results['total_response_time'] / results['successful_requests']
-        
-        results['end_time'] = datetime.now().isoformat()
-        results['actual_duration'] = (datetime.now() - start_time).total_seconds() / 60
-        results['success_rate'] = results['successful_requests'] / max(results['requests_made'], 1)
-        results['requests_per_minute'] = results['successful_requests'] / results['actual_duration']
-        
         logger.info(f"📊 Resultado: {results['successful_requests']}/{results['requests_made']} sucessos "
                    f"({results['success_rate']:.2%}), {results['requests_per_minute']:.1f} req/min")
         
         return results
     
-    def run_comprehensive_test(self, test_intervals: List[int] = None) -> List[Dict]:
+    def run_comprehensive_test(self, test_intervals: List[int] = None,
+                               test_duration_minutes: int = 24 * 60) -> List[Dict]:
         """
-        Executa teste abrangente com múltiplos intervalos
+        Executa teste abrangente com múltiplos intervalos (um dia simulado cada)
         """
         if test_intervals is None:
             test_intervals = [10, 15, 20, 30, 45, 60, 90, 120, 180]
         
         logger.info(f"🚀 Iniciando teste abrangente com intervalos: {test_intervals}")
         
-        all_results = []
-        
-        for interval in test_intervals:
-            try:
-                result = self.test_single_interval(interval, test_duration_minutes=3)
-                all_results.append(result)
-                
-                # Salva resultados parciais
-                self.save_results(all_results, f"partial_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-                
-                # Pausa entre testes
-                logger.info("😴 Pausa de 30s entre testes...")
-                time.sleep(30)
-                
-            except KeyboardInterrupt:
-                logger.info("⏹️  Teste interrompido pelo usuário")
-                break
-            except Exception as e:
-                logger.error(f"❌ Erro no teste do intervalo {interval}s: {e}")
-                continue
+        all_results = [self.test_single_interval(interval, test_duration_minutes) for interval in test_intervals]
+        self.save_results(all_results, f"partial_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
         
         return all_results
     
@@ -364,7 +303,7 @@ def main():
     elif choice == "4":
         try:
             interval = int(input("Digite o intervalo em segundos: "))
-            duration = int(input("Digite a duração do teste em minutos (padrão 5): ") or "5")
+            duration = int(input("Digite a duração simulada em minutos (padrão 1440): ") or "1440")
             result = tester.test_single_interval(interval, duration)
             results = [result]
         except ValueError:
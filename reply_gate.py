@@ -0,0 +1,143 @@
+# reply_gate.py
+# PORTÃO DE RESPOSTA ANTES DO LLM - reply_settings DO TWEET E CACHE NEGATIVO DE CONVERSAS QUE DERAM 403
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Campos pedidos na ingestão para decidir se dá para responder sem chamada extra
+REPLY_TWEET_FIELDS = ["created_at", "author_id", "conversation_id", "in_reply_to_user_id", "reply_settings"]
+
+REPLY_EVERYONE = "everyone"
+REPLY_MENTIONED_USERS = "mentionedUsers"
+
+# Motivos de descarte
+DROP_REPLY_SETTINGS = "reply_settings"
+DROP_FORBIDDEN_CONVERSATION = "forbidden_conversation"
+
+DEFAULT_FORBIDDEN_TTL_SECONDS = 24 * 3600
+DEFAULT_FORBIDDEN_MAX_ENTRIES = 2048
+
+_MENTION_PATTERN = re.compile(r"@(\w{1,15})")
+
+
+class ReplyGate:
+    """
+    Decide, antes de gastar tokens, se a conta consegue responder ao tweet.
+
+    - reply_settings "everyone" (ou ausente): pode responder;
+    - "mentionedUsers": só se a conta foi mencionada no tweet;
+    - "following", "subscribers", "verified" etc.: a conta não tem como
+      saber sem outra chamada, então o tweet é descartado.
+
+    Conversas em que uma resposta já voltou 403 (autor bloqueou, conversa
+    restrita na raiz, tweet apagado) entram num cache negativo com TTL e
+    não são tentadas de novo.
+    """
+
+    def __init__(self, my_user_id: Optional[str] = None, my_username: Optional[str] = None,
+                 ttl_seconds: float = DEFAULT_FORBIDDEN_TTL_SECONDS,
+                 max_entries: int = DEFAULT_FORBIDDEN_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.time):
+        self.my_user_id: Optional[str] = None
+        self.my_username: Optional[str] = None
+        self.set_identity(my_user_id, my_username)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._forbidden: "OrderedDict[str, float]" = OrderedDict()   # conversation_id -> expira em
+        self._lock = threading.Lock()   # Leitor do stream e workers consultam o mesmo cache
+        self.checked = 0
+        self.drops = Counter()
+
+    def set_identity(self, my_user_id: Optional[str] = None, my_username: Optional[str] = None):
+        """Conta que responde: libera os próprios tweets e "mentionedUsers" que a mencionam"""
+        if my_user_id:
+            self.my_user_id = str(my_user_id)
+        if my_username:
+            self.my_username = my_username.lower().lstrip("@")
+
+    @staticmethod
+    def conversation_key(tweet) -> str:
+        return str(getattr(tweet, "conversation_id", None) or tweet.id)
+
+    def _mentions_me(self, tweet) -> bool:
+        if not self.my_username:
+            return False
+        return any(name.lower() == self.my_username for name in _MENTION_PATTERN.findall(tweet.text or ""))
+
+    def _is_forbidden(self, key: str) -> bool:
+        expires_at = self._forbidden.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= self.clock():
+            del self._forbidden[key]
+            return False
+        return True
+
+    def check(self, tweet) -> Optional[str]:
+        """Motivo para não responder ao tweet, ou None se a resposta é possível"""
+        reason = None
+        settings = getattr(tweet, "reply_settings", None)
+        if self.my_user_id and str(getattr(tweet, "author_id", "")) == self.my_user_id:
+            reason = None   # Sempre dá para responder aos próprios tweets
+        elif settings not in (None, REPLY_EVERYONE) and not (
+                settings == REPLY_MENTIONED_USERS and self._mentions_me(tweet)):
+            reason = DROP_REPLY_SETTINGS
+        with self._lock:
+            self.checked += 1
+            if reason is None and self._is_forbidden(self.conversation_key(tweet)):
+                reason = DROP_FORBIDDEN_CONVERSATION
+            if reason:
+                self.drops[reason] += 1
+        return reason
+
+    def allows(self, tweet) -> bool:
+        return self.check(tweet) is None
+
+    def record_forbidden(self, tweet=None, conversation_id=None):
+        """Registra um 403 ao responder: a conversa fica bloqueada até o TTL"""
+        key = str(conversation_id) if conversation_id else self.conversation_key(tweet)
+        with self._lock:
+            self._forbidden[key] = self.clock() + self.ttl_seconds
+            self._forbidden.move_to_end(key)
+            while len(self._forbidden) > self.max_entries:
+                self._forbidden.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        return {
+            "checked": self.checked,
+            "dropped": sum(self.drops.values()),
+            "drops_by_reason": dict(self.drops),
+            "forbidden_conversations": len(self._forbidden)
+        }
+
+
+_default_gate: Optional[ReplyGate] = None
+
+
+def account_identity(client) -> Tuple[Optional[str], Optional[str]]:
+    """(id, username) da conta autenticada, por get_me; (None, None) se a consulta falhar"""
+    try:
+        me = client.get_me()
+        return str(me.data.id), me.data.username
+    except Exception as e:
+        logger.warning(f"⚠️  get_me falhou, tweets \"mentionedUsers\" serão descartados: {e}")
+        return None, None
+
+
+def get_reply_gate(my_user_id: Optional[str] = None, my_username: Optional[str] = None) -> ReplyGate:
+    """
+    Portão compartilhado do processo (o cache negativo vale para todos os bots).
+    Os bots passam a identidade da conta; sem ela, "mentionedUsers" é sempre descartado.
+    """
+    global _default_gate
+    if _default_gate is None:
+        _default_gate = ReplyGate()
+    _default_gate.set_identity(my_user_id, my_username)
+    return _default_gate
@@ -0,0 +1,171 @@
+# request_scheduler.py
+# AGENDADOR DE REQUISIÇÕES POR TOKEN BUCKET - ESPERA EXATA POR ENDPOINT A PARTIR DOS LIMITES CONHECIDOS
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from rate_limit_registry import RateLimitRegistry, get_rate_limit_registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SECONDS = 900   # Janela de 15 minutos da API do X
+RESET_MARGIN_SECONDS = 1.0     # x-rate-limit-reset tem resolução de 1s
+
+# Métodos do tweepy.Client usados pelos bots -> template registrado pelo hook da sessão
+TWEEPY_ENDPOINTS = {
+    "get_users_tweets": "GET /2/users/:id/tweets",
+    "get_users_mentions": "GET /2/users/:id/mentions",
+    "search_recent_tweets": "GET /2/tweets/search/recent",
+    "get_tweet": "GET /2/tweets/:id",
+    "get_tweets": "GET /2/tweets",
+    "get_me": "GET /2/users/me",
+    "get_user": "GET /2/users/:id",
+    "get_users": "GET /2/users",
+    "create_tweet": "POST /2/tweets",
+}
+
+
+def endpoint_for(api_method) -> Optional[str]:
+    """Template do endpoint de um método do tweepy.Client (ou None se desconhecido)"""
+    return TWEEPY_ENDPOINTS.get(getattr(api_method, "__name__", ""))
+
+
+@dataclass
+class EndpointBucket:
+    """Balde de um endpoint: capacidade da janela, saldo e instante de reinício"""
+    endpoint: str
+    capacity: int
+    remaining: int
+    reset_at: float
+    window_seconds: float = DEFAULT_WINDOW_SECONDS
+    synced_at: float = 0.0   # observed_at da última janela lida do registro
+
+
+class RequestScheduler:
+    """
+    Modela cada endpoint como um balde com a capacidade e o reinício
+    informados pelo servidor (x-rate-limit-* via RateLimitRegistry).
+
+    Antes de cada chamada, wait_time() devolve a espera mínima que garante
+    que ela não será recusada: zero enquanto há saldo, senão o tempo até o
+    reinício da janela. acquire() espera exatamente isso e consome uma vaga.
+    Endpoints ainda sem cabeçalhos observados não esperam.
+    """
+
+    def __init__(self, registry: Optional[RateLimitRegistry] = None,
+                 clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], None] = time.sleep,
+                 reset_margin: float = RESET_MARGIN_SECONDS):
+        self.registry = registry or get_rate_limit_registry()
+        self.clock = clock
+        self.sleep = sleep
+        self.reset_margin = reset_margin
+        self._buckets: Dict[str, EndpointBucket] = {}
+        self._lock = threading.Lock()
+        self.total_waited = 0.0
+        self.waits = 0
+
+    def configure(self, endpoint: str, capacity: int, window_seconds: float = DEFAULT_WINDOW_SECONDS):
+        """Declara um limite conhecido antes de qualquer resposta do servidor"""
+        with self._lock:
+            self._buckets[endpoint] = EndpointBucket(endpoint, capacity, capacity,
+                                                     self.clock() + window_seconds, window_seconds)
+
+    def _sync(self, endpoint: str, now: float) -> Optional[EndpointBucket]:
+        """Atualiza o balde com a janela mais recente do registro e reabastece se reiniciou"""
+        bucket = self._buckets.get(endpoint)
+        window = self.registry.get(endpoint)
+        if window is not None and (bucket is None or window.observed_at > bucket.synced_at):
+            window_seconds = bucket.window_seconds if bucket else DEFAULT_WINDOW_SECONDS
+            bucket = EndpointBucket(endpoint, window.limit, window.remaining, window.reset,
+                                    window_seconds, window.observed_at)
+            self._buckets[endpoint] = bucket
+
+        if bucket is not None and now >= bucket.reset_at + self.reset_margin:
+            bucket.remaining = bucket.capacity
+            bucket.reset_at = now + bucket.window_seconds
+        return bucket
+
+    def wait_time(self, endpoint: Optional[str]) -> float:
+        """Espera mínima (s) para que a próxima chamada ao endpoint não seja recusada"""
+        if not endpoint:
+            return 0.0
+        with self._lock:
+            now = self.clock()
+            bucket = self._sync(endpoint, now)
+            if bucket is None or bucket.remaining > 0:
+                return 0.0
+            return max(0.0, bucket.reset_at + self.reset_margin - now)
+
+    def acquire(self, endpoint: Optional[str]) -> float:
+        """Espera o necessário e consome uma vaga do endpoint; devolve a espera feita"""
+        waited = 0.0
+        while endpoint:
+            with self._lock:
+                now = self.clock()
+                bucket = self._sync(endpoint, now)
+                if bucket is None or bucket.remaining > 0:
+                    if bucket is not None:
+                        bucket.remaining -= 1
+                    break
+                wait = bucket.reset_at + self.reset_margin - now
+            logger.info(f"⏳ {endpoint}: saldo esgotado, aguardando {wait:.0f}s até o reinício da janela")
+            self.sleep(wait)
+            waited += wait
+
+        if waited:
+            self.total_waited += waited
+            self.waits += 1
+        return waited
+
+    def call(self, api_method, *args, **kwargs):
+        """Executa um método do tweepy.Client após a espera exigida pelo seu endpoint"""
+        self.acquire(endpoint_for(api_method))
+        return api_method(*args, **kwargs)
+
+    def pace(self, endpoint: Optional[str], calls: int = 1) -> float:
+        """Intervalo que distribui o saldo restante até o reinício, para `calls` chamadas por ciclo"""
+        if not endpoint:
+            return 0.0
+        with self._lock:
+            now = self.clock()
+            bucket = self._sync(endpoint, now)
+            if bucket is None:
+                return 0.0
+            until_reset = max(0.0, bucket.reset_at + self.reset_margin - now)
+            if bucket.remaining <= 0:
+                return until_reset
+            return until_reset * calls / bucket.remaining
+
+    def cycle_wait(self, endpoint: Optional[str], calls: int, cadence: float) -> float:
+        """
+        Intervalo até o próximo ciclo: a cadência desejada, estendida o mínimo
+        necessário para que `calls` chamadas por ciclo caibam no saldo até o reinício
+        """
+        return max(cadence, math.ceil(self.pace(endpoint, calls)))
+
+    def remaining(self, endpoint: str) -> Optional[int]:
+        with self._lock:
+            bucket = self._sync(endpoint, self.clock())
+            return bucket.remaining if bucket else None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            buckets = {name: {"capacity": b.capacity, "remaining": b.remaining, "reset_at": b.reset_at}
+                       for name, b in self._buckets.items()}
+        return {"buckets": buckets, "waits": self.waits, "total_waited_seconds": round(self.total_waited, 1)}
+
+
+_default_scheduler: Optional[RequestScheduler] = None
+
+
+def get_request_scheduler() -> RequestScheduler:
+    """Agendador compartilhado do processo (usa o registro compartilhado)"""
+    global _default_scheduler
+    if _default_scheduler is None:
+        _default_scheduler = RequestScheduler()
+    return _default_scheduler
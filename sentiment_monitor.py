@@ -2,28 +2,23 @@
 # MONITOR DE SENTIMENTO - DETECTA CRÍTICAS NEGATIVAS E ADICIONA COMO TARGETS
 
 import tweepy
-import openai
-import requests
 import time
 import json
 import logging
+from log_setup import setup_logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import re
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('sentiment_monitor.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configuração de logging: fila + JSON lines com rotação (log_setup.py)
+setup_logging('sentiment_monitor.log')
 logger = logging.getLogger(__name__)
 
 # Importações locais
 from keys import *
+from llm_client import chat_completion
+from rate_limit_registry import install_rate_limit_hook
+from request_scheduler import get_request_scheduler
 
 class SentimentMonitor:
     def __init__(self, my_username: str):
@@ -41,9 +36,6 @@ class SentimentMonitor:
     def setup_clients(self):
         """Configura clientes das APIs"""
         try:
-            # Cliente OpenAI para análise de sentimento
-            self.openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-            
             # Cliente X/Twitter
             self.twitter_client = tweepy.Client(
                 bearer_token=X_BEARER_TOKEN,
@@ -53,6 +45,8 @@ class SentimentMonitor:
                 access_token_secret=X_ACCESS_TOKEN_SECRET,
                 wait_on_rate_limit=True
             )
+            install_rate_limit_hook(self.twitter_client)
+            self.request_scheduler = get_request_scheduler()
             
             # Pega informações da própria conta
             me = self.twitter_client.get_me()
@@ -188,17 +182,18 @@ Responda APENAS em formato JSON:
 """
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
+            response = chat_completion(
+                "gpt-4o",
+                [
                     {"role": "system", "content": "Você é um especialista em análise de sentimento e detecção de toxicidade em redes sociais. Seja preciso e objetivo."},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=200,
-                temperature=0.1  # Baixa temperatura para consistência
+                temperature=0.1,  # Baixa temperatura para consistência
+                bot="sentiment_monitor"
             )
             
-            result_text = response.choices[0].message.content.strip()
+            result_text = response.content
             
             # Tenta extrair JSON da resposta
             try:
@@ -373,7 +368,8 @@ Responda APENAS em formato JSON:
         
         try:
             # Busca meus tweets recentes
-            my_tweets = self.twitter_client.get_users_tweets(
+            my_tweets = self.request_scheduler.call(
+                self.twitter_client.get_users_tweets,
                 id=self.my_user_id,
                 since_id=self.last_own_tweet_id,
                 max_results=10,
@@ -396,9 +392,6 @@ Responda APENAS em formato JSON:
                 
                 # Busca respostas a este tweet
                 self.analyze_replies_to_tweet(my_tweet.id, my_tweet.text)
-                
-                # Pausa entre tweets
-                time.sleep(2)
             
         except Exception as e:
             logger.error(f"❌ Erro ao verificar meus tweets: {e}")
@@ -411,7 +404,8 @@ Responda APENAS em formato JSON:
             # Busca respostas usando search
             query = f"conversation_id:{tweet_id} -from:{self.my_username}"
             
-            replies = self.twitter_client.search_recent_tweets(
+            replies = self.request_scheduler.call(
+                self.twitter_client.search_recent_tweets,
                 query=query,
                 max_results=self.sentiment_config["monitoring_settings"]["max_replies_per_check"],
                 tweet_fields=["created_at", "author_id", "conversation_id", "in_reply_to_user_id"],
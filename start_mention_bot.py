@@ -125,8 +125,17 @@ def test_twitter_connection(username):
 def show_usage_stats():
     """Mostra estatísticas de uso dos modelos"""
     try:
-        with open("model_usage_stats.json", "r") as f:
-            stats = json.load(f)
+        from state_store import get_state_store
+        usage = get_state_store().load_usage("mention_bot")
+        if not usage:
+            raise FileNotFoundError
+        
+        stats = {
+            "chatgpt_uses": usage.get("chatgpt", {}).get("uses", 0),
+            "xai_uses": usage.get("xai", {}).get("uses", 0),
+            "chatgpt_tokens": usage.get("chatgpt", {}).get("tokens", 0),
+            "xai_tokens": usage.get("xai", {}).get("tokens", 0)
+        }
         
         total_uses = stats["chatgpt_uses"] + stats["xai_uses"]
         total_tokens = stats["chatgpt_tokens"] + stats["xai_tokens"]
@@ -164,8 +173,8 @@ def show_usage_stats():
 def show_recent_mentions():
     """Mostra menções recentes processadas"""
     try:
-        with open("processed_mentions.json", "r") as f:
-            mentions = json.load(f)
+        from state_store import get_state_store
+        mentions = [mention_id for mention_id, _ in get_state_store().load_processed_ids("mention_bot")]
         
         if not mentions:
             print("📭 Nenhuma menção processada ainda")
@@ -256,6 +265,10 @@ def main_menu():
             
             confirm = input("\nTem certeza? (digite 'CONFIRMO'): ").strip()
             if confirm == "CONFIRMO":
+                from state_store import get_state_store
+                get_state_store().clear_scope("mention_bot")
+                print("🗑️  Estado do bot de menções removido de bot_state.db")
+                
                 files_to_clean = [
                     "model_usage_stats.json",
                     "processed_mentions.json", 
@@ -0,0 +1,489 @@
+# state_store.py
+# ARMAZENAMENTO UNIFICADO DE ESTADO EM SQLITE (WAL) - SUBSTITUI OS JSONs POR BOT
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "bot_state.db"
+
+# Separador usado para "achatar" dicionários aninhados na tabela de contadores
+KEY_SEPARATOR = "/"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watermarks (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value INTEGER,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (scope, key)
+);
+CREATE TABLE IF NOT EXISTS processed_ids (
+    scope TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (scope, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_processed_ids_seen ON processed_ids (scope, seen_at);
+CREATE TABLE IF NOT EXISTS counters (
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value,
+    PRIMARY KEY (scope, name)
+);
+CREATE TABLE IF NOT EXISTS usage_stats (
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (scope, name)
+);
+CREATE TABLE IF NOT EXISTS documents (
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (scope, name)
+);
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    applied_at TEXT NOT NULL
+);
+"""
+
+
+def flatten_dict(data: Dict, prefix: str = "") -> Dict:
+    """Achata dicionários aninhados em chaves 'a/b/c' com valores escalares"""
+    flat = {}
+    for key, value in data.items():
+        full_key = f"{prefix}{KEY_SEPARATOR}{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten_dict(value, full_key))
+        else:
+            flat[full_key] = value
+    return flat
+
+
+def unflatten_dict(flat: Dict) -> Dict:
+    """Operação inversa de flatten_dict"""
+    data = {}
+    for key, value in flat.items():
+        parts = key.split(KEY_SEPARATOR)
+        node = data
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return data
+
+
+class StateStore:
+    """
+    Estado persistente de todos os bots em um único arquivo SQLite.
+
+    Cada bot usa um "scope" próprio (ex: "smart_bot", "mention_bot"). As escritas
+    são upserts incrementais: apenas valores que mudaram desde o último save são
+    gravados, e IDs processados são apenas inseridos (nunca regravados), então o
+    custo do save não cresce com o histórico acumulado.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+
+        # Últimos valores gravados, para escrever apenas o que mudou
+        self._watermark_cache: Dict[str, Dict[str, int]] = {}
+        self._counter_cache: Dict[str, Dict] = {}
+        self._usage_cache: Dict[str, Dict[str, Tuple[int, int]]] = {}
+
+        # IDs processados aguardando o próximo flush
+        self._pending_ids: List[Tuple[str, int, float]] = []
+
+        # Ações adiadas até o fim da transação mais externa: os caches só
+        # refletem o que foi de fato gravado (COMMIT) e nada do que foi desfeito
+        self._on_commit: List[Callable[[], None]] = []
+        self._on_rollback: List[Callable[[], None]] = []
+
+    @contextmanager
+    def transaction(self):
+        """Agrupa várias escritas em uma única transação (reentrante)"""
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self._conn
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                    self._finish_transaction(self._on_rollback)
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        self._conn.execute("COMMIT")
+                    except BaseException:
+                        if self._conn.in_transaction:
+                            self._conn.execute("ROLLBACK")
+                        self._finish_transaction(self._on_rollback)
+                        raise
+                    self._finish_transaction(self._on_commit)
+
+    def _finish_transaction(self, actions: List[Callable[[], None]]):
+        """Executa as ações adiadas do desfecho e descarta as do outro"""
+        actions = list(actions)
+        self._on_commit.clear()
+        self._on_rollback.clear()
+        for action in actions:
+            action()
+
+    def _after_commit(self, action: Callable[[], None], on_rollback: Optional[Callable[[], None]] = None):
+        """Adia uma ação até o COMMIT da transação mais externa (chamar dentro de transaction())"""
+        self._on_commit.append(action)
+        if on_rollback is not None:
+            self._on_rollback.append(on_rollback)
+
+    def close(self):
+        """Grava pendências e fecha a conexão"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Watermarks (último ID visto por usuário / menção)
+    # ------------------------------------------------------------------
+
+    def load_watermarks(self, scope: str) -> Dict[str, int]:
+        """Carrega os watermarks de um scope"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM watermarks WHERE scope = ?", (scope,)
+            ).fetchall()
+        watermarks = {key: value for key, value in rows}
+        self._watermark_cache[scope] = dict(watermarks)
+        return watermarks
+
+    def save_watermarks(self, scope: str, watermarks: Dict[str, Optional[int]]):
+        """Grava apenas os watermarks que mudaram"""
+        cache = self._watermark_cache.setdefault(scope, {})
+        now = time.time()
+        changed = []
+        for key, value in watermarks.items():
+            value = int(value) if value is not None else None
+            if str(key) not in cache or cache[str(key)] != value:
+                changed.append((scope, str(key), value, now))
+        if not changed:
+            return
+
+        def update_cache():
+            for _, key, value, _ in changed:
+                cache[key] = value
+
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO watermarks (scope, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(scope, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                changed
+            )
+            self._after_commit(update_cache)
+
+    # ------------------------------------------------------------------
+    # IDs processados
+    # ------------------------------------------------------------------
+
+    def add_processed_id(self, scope: str, tweet_id, seen_at: Optional[float] = None):
+        """Enfileira um ID processado para o próximo flush"""
+        with self._lock:
+            self._pending_ids.append((scope, int(tweet_id), seen_at or time.time()))
+
+    def load_processed_ids(self, scope: str, max_age_seconds: Optional[float] = None,
+                           limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Retorna (id, seen_at) em ordem cronológica, opcionalmente limitado por idade/quantidade"""
+        self.flush()
+        cutoff = time.time() - max_age_seconds if max_age_seconds else 0
+        query = "SELECT id, seen_at FROM processed_ids WHERE scope = ? AND seen_at >= ? ORDER BY seen_at DESC"
+        params: Tuple = (scope, cutoff)
+        if limit:
+            query += " LIMIT ?"
+            params += (limit,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        rows.reverse()
+        return rows
+
+    def prune_processed_ids(self, scope: str, older_than_seconds: float) -> int:
+        """Remove IDs processados mais antigos que o limite"""
+        cutoff = time.time() - older_than_seconds
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM processed_ids WHERE scope = ? AND seen_at < ?", (scope, cutoff)
+            )
+        return cursor.rowcount
+
+    def flush(self):
+        """Grava os IDs processados pendentes"""
+        with self._lock:
+            if not self._pending_ids:
+                return
+            pending, self._pending_ids = self._pending_ids, []
+            restored = False
+
+            def restore_pending():
+                # Devolve os IDs à fila para o próximo flush, na ordem original
+                nonlocal restored
+                if not restored:
+                    restored = True
+                    self._pending_ids[:0] = pending
+
+            try:
+                with self.transaction() as conn:
+                    # Se esta transação ou uma externa for desfeita, os IDs voltam à fila
+                    self._after_commit(lambda: None, on_rollback=restore_pending)
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO processed_ids (scope, id, seen_at) VALUES (?, ?, ?)",
+                        pending
+                    )
+            except BaseException:
+                restore_pending()
+                raise
+
+    # ------------------------------------------------------------------
+    # Contadores (estatísticas escalares, dicionários aninhados são achatados)
+    # ------------------------------------------------------------------
+
+    def load_counters(self, scope: str) -> Dict:
+        """Carrega os contadores de um scope como dicionário aninhado"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, value FROM counters WHERE scope = ?", (scope,)
+            ).fetchall()
+        flat = {name: value for name, value in rows}
+        self._counter_cache[scope] = dict(flat)
+        return unflatten_dict(flat)
+
+    def save_counters(self, scope: str, counters: Dict):
+        """Upsert dos contadores que mudaram e remoção dos que sumiram"""
+        flat = flatten_dict(counters)
+        cache = self._counter_cache.setdefault(scope, {})
+
+        changed = [(scope, name, value) for name, value in flat.items()
+                   if name not in cache or cache[name] != value]
+        removed = [(scope, name) for name in cache if name not in flat]
+        if not changed and not removed:
+            return
+
+        def update_cache():
+            for _, name, value in changed:
+                cache[name] = value
+            for _, name in removed:
+                cache.pop(name, None)
+
+        with self.transaction() as conn:
+            if changed:
+                conn.executemany(
+                    "INSERT INTO counters (scope, name, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT(scope, name) DO UPDATE SET value = excluded.value",
+                    changed
+                )
+            if removed:
+                conn.executemany("DELETE FROM counters WHERE scope = ? AND name = ?", removed)
+            self._after_commit(update_cache)
+
+    # ------------------------------------------------------------------
+    # Uso de modelos (usos e tokens por modelo/provedor)
+    # ------------------------------------------------------------------
+
+    def load_usage(self, scope: str) -> Dict[str, Dict[str, int]]:
+        """Carrega {nome: {"uses": n, "tokens": n}}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, uses, tokens FROM usage_stats WHERE scope = ?", (scope,)
+            ).fetchall()
+        self._usage_cache[scope] = {name: (uses, tokens) for name, uses, tokens in rows}
+        return {name: {"uses": uses, "tokens": tokens} for name, uses, tokens in rows}
+
+    def save_usage(self, scope: str, usage: Dict[str, Dict[str, int]]):
+        """Upsert dos totais de uso que mudaram"""
+        cache = self._usage_cache.setdefault(scope, {})
+        changed = [
+            (scope, name, int(values.get("uses", 0)), int(values.get("tokens", 0)), time.time())
+            for name, values in usage.items()
+            if cache.get(name) != (values.get("uses", 0), values.get("tokens", 0))
+        ]
+        if not changed:
+            return
+
+        def update_cache():
+            for _, name, uses, tokens, _ in changed:
+                cache[name] = (uses, tokens)
+
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO usage_stats (scope, name, uses, tokens, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(scope, name) DO UPDATE SET uses = excluded.uses, tokens = excluded.tokens, "
+                "updated_at = excluded.updated_at",
+                changed
+            )
+            self._after_commit(update_cache)
+
+    # ------------------------------------------------------------------
+    # Documentos (estruturas pequenas que não são escalares, ex: históricos)
+    # ------------------------------------------------------------------
+
+    def load_document(self, scope: str, name: str, default=None):
+        """Carrega um documento JSON pequeno"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM documents WHERE scope = ? AND name = ?", (scope, name)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def save_document(self, scope: str, name: str, value):
+        """Grava um documento JSON pequeno"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO documents (scope, name, value) VALUES (?, ?, ?) "
+                "ON CONFLICT(scope, name) DO UPDATE SET value = excluded.value",
+                (scope, name, json.dumps(value, ensure_ascii=False))
+            )
+
+    def clear_scope(self, scope: str):
+        """Remove todo o estado de um scope"""
+        with self.transaction() as conn:
+            for table in ("watermarks", "processed_ids", "counters", "usage_stats", "documents"):
+                conn.execute(f"DELETE FROM {table} WHERE scope = ?", (scope,))
+            self._after_commit(lambda: self._drop_scope_caches(scope))
+
+    def _drop_scope_caches(self, scope: str):
+        for cache in (self._watermark_cache, self._counter_cache, self._usage_cache):
+            cache.pop(scope, None)
+
+    # ------------------------------------------------------------------
+    # Migração única dos arquivos JSON antigos
+    # ------------------------------------------------------------------
+
+    def is_migrated(self, name: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone()
+        return row is not None
+
+    def migrate_legacy_json(self, base_dir: str = ".") -> bool:
+        """
+        Importa uma única vez os JSONs antigos (last_seen_ids.json, processed_tweets.json,
+        bot_stats.json, bot_optimized_state.json, processed_mentions.json,
+        model_usage_stats.json, last_mention_id.json e post_reset_bot_state.json).
+        Os arquivos originais são mantidos como estão.
+        """
+        migration_name = "legacy_json_v1"
+        if self.is_migrated(migration_name):
+            return False
+
+        def read_json(filename):
+            path = os.path.join(base_dir, filename)
+            try:
+                with open(path, "r") as f:
+                    return json.load(f), os.path.getmtime(path)
+            except (FileNotFoundError, json.JSONDecodeError) as e:
+                if not isinstance(e, FileNotFoundError):
+                    logger.warning(f"⚠️  {filename} corrompido, ignorando na migração: {e}")
+                return None, None
+
+        imported = []
+        with self.transaction():
+            # SmartXBot (bot_improved.py)
+            data, _ = read_json("last_seen_ids.json")
+            if data:
+                self.save_watermarks("smart_bot", data)
+                imported.append("last_seen_ids.json")
+
+            data, mtime = read_json("processed_tweets.json")
+            if data:
+                for tweet_id in data:
+                    self.add_processed_id("smart_bot", tweet_id, mtime)
+                imported.append("processed_tweets.json")
+
+            data, _ = read_json("bot_stats.json")
+            if data:
+                self.save_counters("smart_bot", data)
+                imported.append("bot_stats.json")
+
+            # OptimizedXBot (bot_optimized.py)
+            data, mtime = read_json("bot_optimized_state.json")
+            if data:
+                self.save_watermarks("optimized_bot", data.get("last_seen_ids", {}))
+                for tweet_id in data.get("processed_tweets", []):
+                    self.add_processed_id("optimized_bot", tweet_id, mtime)
+                self.save_counters("optimized_bot", {
+                    "performance_metrics": data.get("performance_metrics", {})
+                })
+                self.save_document("optimized_bot", "optimization_history",
+                                   data.get("optimization_history", []))
+                imported.append("bot_optimized_state.json")
+
+            # MentionBot (mention_bot.py)
+            data, mtime = read_json("processed_mentions.json")
+            if data:
+                for mention_id in data:
+                    self.add_processed_id("mention_bot", mention_id, mtime)
+                imported.append("processed_mentions.json")
+
+            data, _ = read_json("model_usage_stats.json")
+            if data:
+                self.save_usage("mention_bot", {
+                    "chatgpt": {"uses": data.get("chatgpt_uses", 0), "tokens": data.get("chatgpt_tokens", 0)},
+                    "xai": {"uses": data.get("xai_uses", 0), "tokens": data.get("xai_tokens", 0)},
+                })
+                if data.get("last_reset"):
+                    self.save_counters("mention_bot", {"last_reset": data["last_reset"]})
+                imported.append("model_usage_stats.json")
+
+            data, _ = read_json("last_mention_id.json")
+            if data and data.get("last_id"):
+                self.save_watermarks("mention_bot", {"last_mention_id": int(data["last_id"])})
+                imported.append("last_mention_id.json")
+
+            # PostResetBot (bot_post_reset.py)
+            data, _ = read_json("post_reset_bot_state.json")
+            if data:
+                self.save_watermarks("post_reset_bot", data.get("last_seen_ids", {}))
+                self.save_counters("post_reset_bot", {
+                    key: value for key, value in data.items() if key != "last_seen_ids"
+                })
+                imported.append("post_reset_bot_state.json")
+
+            self.flush()
+            self._conn.execute(
+                "INSERT INTO migrations (name, applied_at) VALUES (?, ?)",
+                (migration_name, datetime.now().isoformat())
+            )
+
+        if imported:
+            logger.info(f"📦 Estado migrado para {self.db_path}: {', '.join(imported)}")
+        return True
+
+
+_default_store: Optional[StateStore] = None
+
+
+def get_state_store(db_path: str = DEFAULT_DB_PATH) -> StateStore:
+    """Retorna o store compartilhado do processo, migrando os JSONs na primeira abertura"""
+    global _default_store
+    if _default_store is None or _default_store.db_path != db_path:
+        _default_store = StateStore(db_path)
+        _default_store.migrate_legacy_json(os.path.dirname(os.path.abspath(db_path)))
+    return _default_store
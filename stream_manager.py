@@ -0,0 +1,360 @@
+# stream_manager.py
+# INGESTÃO POR FILTERED STREAM - REGRAS DIVIDIDAS NO LIMITE DE TAMANHO, SINCRONIZADAS POR DIFERENÇA, RECONEXÃO COM BACKOFF E BACKFILL
+
+import logging
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import tweepy
+
+from dedup_cache import ProcessedIdCache
+from keyword_prompts_improved import BOT_CONFIG
+from reply_gate import REPLY_TWEET_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Limites do plano básico da API v2 (Pro: 1024 caracteres e 1000 regras)
+DEFAULT_MAX_RULE_LENGTH = 512
+DEFAULT_MAX_RULES = 25
+
+# Retweets são descartados pelo pré-filtro: nem precisam chegar pelo stream
+RULE_SUFFIX = " -is:retweet"
+RULE_TAG = "auto-x"
+STREAM_WATERMARK_KEY = "__stream__"
+
+# Retorno de on_tweet: o tweet foi entregue a uma fila e será confirmado
+# depois com ack()/refuse(); False recusa na hora (ex: cota esgotada)
+DELIVERY_DEFERRED = "deferred"
+
+DEFAULT_BACKOFF_BASE_SECONDS = 5
+DEFAULT_BACKOFF_MAX_SECONDS = 320
+RATE_LIMITED_BACKOFF_BASE_SECONDS = 60   # 429: conexões demais, recomendação do X é começar em 1 min
+STABLE_CONNECTION_SECONDS = 60           # Conexão que durou isso zera o backoff
+
+_PLAIN_KEYWORD = re.compile(r"^\w+$")
+
+
+def quote_keyword(keyword: str) -> str:
+    """Palavras simples vão como estão; frases e termos com pontuação vão entre aspas"""
+    keyword = keyword.strip().lower()
+    return keyword if _PLAIN_KEYWORD.match(keyword) else f'"{keyword}"'
+
+
+def _pack(clauses: List[str], budget: int) -> Optional[List[List[str]]]:
+    """First-fit decreasing: agrupa cláusulas em "(a OR b ...)" de até `budget` caracteres"""
+    groups: List[List[str]] = []
+    lengths: List[int] = []
+    for clause in sorted(clauses, key=len, reverse=True):
+        if len(clause) + 2 > budget:
+            return None
+        for index, length in enumerate(lengths):
+            if length + 4 + len(clause) <= budget:   # " OR "
+                groups[index].append(clause)
+                lengths[index] += 4 + len(clause)
+                break
+        else:
+            groups.append([clause])
+            lengths.append(len(clause) + 2)          # "(" + ")"
+    return groups
+
+
+def build_stream_rules(keywords: Iterable[str], user_ids: Iterable[str],
+                       max_length: int = DEFAULT_MAX_RULE_LENGTH, suffix: str = RULE_SUFFIX) -> List[str]:
+    """
+    Menor número de regras "(kw1 OR kw2 ...) (from:a OR from:b ...) -is:retweet"
+    que cobre todas as combinações palavra-chave x conta dentro do limite de tamanho.
+
+    Cada regra combina um grupo de palavras com um grupo de contas, então o
+    total é (grupos de palavras) x (grupos de contas); testa todas as divisões
+    do espaço da regra entre os dois lados e fica com a de menor produto.
+    """
+    keyword_clauses = sorted({quote_keyword(keyword) for keyword in keywords if keyword.strip()})
+    author_clauses = sorted({f"from:{user_id}" for user_id in user_ids})
+    if not keyword_clauses or not author_clauses:
+        return []
+
+    available = max_length - 1 - len(suffix)   # Espaço entre os dois grupos
+    best = None
+    for author_budget in range(max(len(c) for c in author_clauses) + 2, available):
+        author_groups = _pack(author_clauses, author_budget)
+        keyword_groups = _pack(keyword_clauses, available - author_budget)
+        if author_groups is None or keyword_groups is None:
+            continue
+        total = len(author_groups) * len(keyword_groups)
+        if best is None or total < best[0]:
+            best = (total, keyword_groups, author_groups)
+
+    if best is None:
+        raise ValueError(f"Palavra-chave ou conta não cabe em uma regra de {max_length} caracteres")
+
+    _, keyword_groups, author_groups = best
+    return [f"({' OR '.join(kws)}) ({' OR '.join(authors)}){suffix}"
+            for authors in author_groups for kws in keyword_groups]
+
+
+def diff_rules(desired: List[str], installed: List) -> Tuple[List[str], List[str]]:
+    """(valores a adicionar, IDs a remover) para levar as regras instaladas às desejadas"""
+    installed_by_value = {rule.value: rule.id for rule in installed}
+    to_add = [value for value in desired if value not in installed_by_value]
+    wanted = set(desired)
+    to_delete = [rule_id for value, rule_id in installed_by_value.items() if value not in wanted]
+    return to_add, to_delete
+
+
+class ExponentialBackoff:
+    """Espera exponencial com teto e jitter total: random(0, min(teto, base * 2^n))"""
+
+    def __init__(self, base: float = DEFAULT_BACKOFF_BASE_SECONDS, cap: float = DEFAULT_BACKOFF_MAX_SECONDS,
+                 rng: Optional[random.Random] = None):
+        self.base = base
+        self.cap = cap
+        self.attempts = 0
+        self.rng = rng or random.Random()
+
+    def next(self, base: Optional[float] = None) -> float:
+        ceiling = min(self.cap, (base or self.base) * 2 ** self.attempts)
+        self.attempts += 1
+        return self.rng.uniform(ceiling / 2, ceiling)
+
+    def reset(self):
+        self.attempts = 0
+
+
+class _ManagedStream(tweepy.StreamingClient):
+    """StreamingClient que repassa eventos ao StreamManager (sem retries internos do tweepy)"""
+
+    def __init__(self, manager: "StreamManager", bearer_token: str):
+        super().__init__(bearer_token, max_retries=0)
+        self.manager = manager
+
+    def on_connect(self):
+        self.manager.on_connect()
+
+    def on_tweet(self, tweet):
+        self.manager.deliver(tweet, source="stream")
+
+    def on_request_error(self, status_code):
+        self.manager.on_request_error(status_code)
+        if status_code in (401, 403):
+            self.disconnect()
+
+    def on_connection_error(self):
+        logger.warning("⚠️ Stream: erro de conexão")
+
+
+class StreamManager:
+    """
+    Ingestão por filtered stream no lugar dos loops de polling.
+
+    - As palavras-chave e contas viram o menor número de regras válidas, e
+      só a diferença para as regras já instaladas é aplicada;
+    - quedas reconectam com backoff exponencial com teto;
+    - o watermark fica no StateStore; a cada (re)conexão a lacuna desde ele
+      é preenchida por search_recent_tweets com as mesmas regras.
+
+    `on_tweet(tweet)` recebe cada tweet uma única vez, em ordem de ID no backfill.
+    Se retornar False o tweet foi recusado (ex: cota esgotada) e o watermark
+    para logo abaixo dele, para que o próximo backfill o entregue de novo; se
+    retornar DELIVERY_DEFERRED, quem o recebeu confirma depois com ack()/refuse().
+    """
+
+    def __init__(self, bearer_token: str, on_tweet: Callable, keywords: Iterable[str], user_ids: Iterable[str],
+                 search_client: Optional[tweepy.Client] = None, api_call: Optional[Callable] = None,
+                 state_store=None, scope: str = "stream_bot",
+                 tweet_fields: Optional[List[str]] = None, config: Optional[Dict] = None,
+                 sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.time,
+                 stream_factory: Optional[Callable] = None):
+        config = config or BOT_CONFIG
+        self.on_tweet = on_tweet
+        self.search_client = search_client
+        self.api_call = api_call or (lambda method, **params: method(**params))
+        self.state_store = state_store
+        self.scope = scope
+        self.tweet_fields = tweet_fields or REPLY_TWEET_FIELDS
+        self.sleep = sleep
+        self.clock = clock
+
+        self.max_rules = config.get("stream_max_rules", DEFAULT_MAX_RULES)
+        self.max_backfill_pages = config.get("stream_backfill_max_pages", 3)
+        self.rules = build_stream_rules(keywords, user_ids, config.get("stream_rule_max_length", DEFAULT_MAX_RULE_LENGTH))
+        if len(self.rules) > self.max_rules:
+            raise ValueError(f"{len(self.rules)} regras necessárias, o plano permite {self.max_rules}")
+
+        self.backoff = ExponentialBackoff(config.get("stream_backoff_base_seconds", DEFAULT_BACKOFF_BASE_SECONDS),
+                                          config.get("stream_backoff_max_seconds", DEFAULT_BACKOFF_MAX_SECONDS))
+        self.stream = (stream_factory or _ManagedStream)(self, bearer_token)
+        # Sobrevive a reinícios: o backfill após uma queda não reentrega o que já foi processado
+        self.delivered = (ProcessedIdCache.from_state_store(state_store, f"{scope}:stream")
+                          if state_store else ProcessedIdCache())
+        watermarks = state_store.load_watermarks(scope) if state_store else {}
+        self.last_id: Optional[int] = watermarks.get(STREAM_WATERMARK_KEY)
+        # Maior ID recebido; o watermark só chega nele quando nada abaixo está pendente
+        self._highest_id: Optional[int] = self.last_id
+        self._in_flight = set()   # Entregues e aguardando ack()/refuse()
+        self._refused = set()     # Recusados: voltam no próximo backfill
+        self._lock = threading.RLock()
+
+        self.running = False
+        self.fatal = False
+        self.last_status: Optional[int] = None
+        self.stats = {"connections": 0, "reconnects": 0, "stream_tweets": 0, "backfill_tweets": 0,
+                      "backfill_requests": 0, "refused_tweets": 0, "rules_added": 0, "rules_deleted": 0}
+
+    # ------------------------------------------------------------------
+    # Regras
+    # ------------------------------------------------------------------
+
+    def sync_rules(self) -> Tuple[int, int]:
+        """Aplica só a diferença entre as regras desejadas e as instaladas"""
+        installed = self.stream.get_rules().data or []
+        to_add, to_delete = diff_rules(self.rules, installed)
+        if to_delete:
+            self.stream.delete_rules(to_delete)
+        if to_add:
+            self.stream.add_rules([tweepy.StreamRule(value=value, tag=RULE_TAG) for value in to_add])
+        self.stats["rules_added"] += len(to_add)
+        self.stats["rules_deleted"] += len(to_delete)
+        logger.info(f"📜 Regras do stream: {len(self.rules)} desejadas, +{len(to_add)} -{len(to_delete)} "
+                    f"({len(installed) - len(to_delete)} já instaladas mantidas)")
+        return len(to_add), len(to_delete)
+
+    # ------------------------------------------------------------------
+    # Entrega
+    # ------------------------------------------------------------------
+
+    def deliver(self, tweet, source: str = "stream"):
+        """Entrega um tweet uma única vez; o watermark só avança sobre o que foi tratado"""
+        tweet_id = int(tweet.id)
+        with self._lock:
+            if tweet_id in self.delivered or tweet_id in self._in_flight:
+                return
+            self._in_flight.add(tweet_id)
+            self._refused.discard(tweet_id)
+            if self._highest_id is None or tweet_id > self._highest_id:
+                self._highest_id = tweet_id
+            self.stats[f"{source}_tweets"] += 1
+        try:
+            result = self.on_tweet(tweet)
+        except Exception as e:
+            # Erro do handler não é recusa: reentregar só repetiria o erro
+            logger.error(f"❌ Erro ao processar tweet {tweet.id} do {source}: {e}")
+            result = None
+        if result is False:
+            self.refuse(tweet_id)
+        elif result != DELIVERY_DEFERRED:
+            self.ack(tweet_id)
+
+    def ack(self, tweet_id):
+        """O tweet foi tratado (respondido ou descartado de vez)"""
+        with self._lock:
+            self._in_flight.discard(int(tweet_id))
+            self.delivered.add(int(tweet_id))
+            self._advance_watermark()
+
+    def refuse(self, tweet_id):
+        """O tweet não pôde ser tratado agora: o watermark fica abaixo dele"""
+        with self._lock:
+            self._in_flight.discard(int(tweet_id))
+            self._refused.add(int(tweet_id))
+            self.stats["refused_tweets"] += 1
+            self._advance_watermark()
+
+    def _advance_watermark(self):
+        pending = self._in_flight | self._refused
+        watermark = min(pending) - 1 if pending else self._highest_id
+        if watermark is not None and self._highest_id is not None:
+            watermark = min(watermark, self._highest_id)
+        if watermark == self.last_id:
+            return
+        self.last_id = watermark
+        if self.state_store and watermark is not None:
+            self.state_store.save_watermarks(self.scope, {STREAM_WATERMARK_KEY: watermark})
+
+    def backfill(self) -> int:
+        """Busca o que foi publicado desde o último ID entregue (lacuna da desconexão)"""
+        if self.last_id is None or self.search_client is None:
+            return 0
+        since_id = self.last_id
+        found = {}
+        for rule in self.rules:
+            next_token = None
+            for _ in range(self.max_backfill_pages):
+                params = {"query": rule, "since_id": since_id, "max_results": 100, "tweet_fields": self.tweet_fields}
+                if next_token:
+                    params["next_token"] = next_token
+                try:
+                    response = self.api_call(self.search_client.search_recent_tweets, **params)
+                except tweepy.TweepyException as e:
+                    logger.warning(f"⚠️ Backfill interrompido: {e}")
+                    return self._deliver_backfill(found, since_id)
+                self.stats["backfill_requests"] += 1
+                for tweet in response.data or []:
+                    found[int(tweet.id)] = tweet
+                next_token = (response.meta or {}).get("next_token")
+                if not next_token:
+                    break
+        return self._deliver_backfill(found, since_id)
+
+    def _deliver_backfill(self, found: Dict[int, object], since_id: int) -> int:
+        for tweet_id in sorted(found):
+            self.deliver(found[tweet_id], source="backfill")
+        if found:
+            logger.info(f"🧩 Backfill: {len(found)} tweets recuperados desde {since_id}")
+        return len(found)
+
+    # ------------------------------------------------------------------
+    # Conexão
+    # ------------------------------------------------------------------
+
+    def on_connect(self):
+        self.stats["connections"] += 1
+        self.last_status = None
+        logger.info("🔌 Conectado ao filtered stream")
+
+    def on_request_error(self, status_code: int):
+        self.last_status = status_code
+        logger.warning(f"⚠️ Stream: HTTP {status_code}")
+        if status_code in (401, 403):
+            self.fatal = True
+
+    def reconnect_delay(self) -> float:
+        base = RATE_LIMITED_BACKOFF_BASE_SECONDS if self.last_status == 429 else None
+        return self.backoff.next(base)
+
+    def run(self):
+        """Sincroniza regras e mantém o stream conectado até stop() ou erro de autenticação"""
+        self.running = True
+        self.sync_rules()
+        while self.running:
+            self.backfill()
+            connected_at = self.clock()
+            try:
+                self.stream.filter(tweet_fields=self.tweet_fields)
+            except Exception as e:
+                logger.error(f"❌ Stream caiu: {e}")
+            if not self.running or self.fatal:
+                break
+
+            if self.clock() - connected_at >= STABLE_CONNECTION_SECONDS:
+                self.backoff.reset()
+            delay = self.reconnect_delay()
+            self.stats["reconnects"] += 1
+            logger.info(f"🔁 Reconectando ao stream em {delay:.0f}s (tentativa {self.backoff.attempts})")
+            self.sleep(delay)
+
+        if self.fatal:
+            logger.error(f"🛑 Stream encerrado: credenciais recusadas (HTTP {self.last_status})")
+        self.running = False
+
+    def stop(self):
+        self.running = False
+        self.stream.disconnect()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            pending = {"in_flight": len(self._in_flight), "refused": len(self._refused)}
+        return {**self.stats, **pending, "rules": len(self.rules), "last_id": self.last_id}
+
@@ -0,0 +1,28 @@
+# tests/conftest.py
+# FIXTURES COMPARTILHADAS - RELÓGIO FALSO E MÓDULOS DA RAIZ NO PATH
+
+import os
+import sys
+
+import pytest
+
+# Os módulos do bot ficam na raiz do repositório (sem pacote)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeClock:
+    """Relógio determinístico: chamável como time.time e com sleep que só avança o tempo"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
@@ -0,0 +1,107 @@
+# tests/test_cassette.py
+# CASSETES - GRAVAÇÃO SEM SEGREDOS CONTRA OS STAND-INS E REPLAY EM ORDEM E NO TEMPO
+
+import gzip
+import time
+
+import pytest
+import tweepy
+
+import llm_client
+from cassette import REDACTED, CassetteRecorder, install_cassette_hook, load_cassette
+from fake_api import FAKE_KEYS, CassetteServer, FakeLLMServer, FakeXServer, route_to_local
+
+
+def new_client() -> tweepy.Client:
+    return tweepy.Client(bearer_token=FAKE_KEYS["X_BEARER_TOKEN"], consumer_key=FAKE_KEYS["X_API_KEY"],
+                         consumer_secret=FAKE_KEYS["X_API_SECRET"], access_token=FAKE_KEYS["X_ACCESS_TOKEN"],
+                         access_token_secret=FAKE_KEYS["X_ACCESS_TOKEN_SECRET"])
+
+
+@pytest.fixture
+def local_routing(monkeypatch):
+    # route_to_local troca o tweepy.Client e as URLs dos provedores do processo
+    monkeypatch.setattr(tweepy, "Client", tweepy.Client)
+    monkeypatch.setattr(llm_client, "PROVIDER_BASE_URLS", dict(llm_client.PROVIDER_BASE_URLS))
+    servers = []
+    yield servers
+    for server in servers:
+        server.stop()
+    with llm_client._providers_lock:
+        llm_client._providers.clear()
+
+
+@pytest.fixture
+def recorded(local_routing, tmp_path, clock):
+    """Grava duas buscas (0,3 s de intervalo no relógio falso), uma completion e uma postagem"""
+    x_server = FakeXServer(keyword_ratio=1.0, seed=3).start()
+    llm_server = FakeLLMServer().start()
+    local_routing += [x_server, llm_server]
+    route_to_local(x_server.url, llm_server.url)
+    path = str(tmp_path / "check.jsonl.gz")
+
+    recorder = CassetteRecorder(path, secrets=FAKE_KEYS.values(), clock=clock)
+    client = new_client()
+    install_cassette_hook(client)   # Sem arquivo no BOT_CONFIG: não instala nada
+    assert not client.session.hooks["response"]
+    client.session.hooks["response"].append(recorder.hook)
+    provider = llm_client.get_provider("openai")
+    provider.session.hooks["response"].append(recorder.hook)
+
+    first = client.search_recent_tweets("from:111", max_results=3)
+    clock.sleep(0.3)
+    second = client.search_recent_tweets("from:111", max_results=3)
+    clock.sleep(0.1)
+    completion = provider.chat([{"role": "user", "content": "Comente."}], "gpt-4o-mini")
+    clock.sleep(0.1)
+    client.create_tweet(text="resposta", in_reply_to_tweet_id=first.data[0].id)
+    recorder.close()
+    return path, first, second, completion
+
+
+def replay_server(local_routing, path, speed=0.0):
+    replay = CassetteServer(path, speed=speed).start()
+    local_routing.append(replay)
+    route_to_local(replay.url, replay.url)
+    return replay
+
+
+def test_recording_redacts_secrets_and_keeps_rate_limit_headers(recorded):
+    path = recorded[0]
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        raw = f.read()
+    assert not any(secret in raw for secret in FAKE_KEYS.values())
+
+    entries = load_cassette(path)
+    assert [e["service"] for e in entries] == ["x", "x", "openai", "x"]
+    assert entries[0]["request_headers"]["Authorization"] == REDACTED
+    assert "x-rate-limit-remaining" in entries[0]["headers"]
+    assert entries[1]["t"] - entries[0]["t"] >= 0.25
+
+
+def test_fast_replay_serves_recorded_responses_in_order(recorded, local_routing):
+    path, first, second, completion = recorded
+    replay = replay_server(local_routing, path)
+    client = new_client()
+
+    assert [t.id for t in client.search_recent_tweets("from:999").data] == [t.id for t in first.data]
+    assert [t.id for t in client.search_recent_tweets("from:999").data] == [t.id for t in second.data]
+    assert client.search_recent_tweets("from:999").data is None   # Esgotado: página vazia
+    chat = llm_client.get_provider("openai").chat([{"role": "user", "content": "x"}], "gpt-4o-mini")
+    assert chat.content == completion.content
+    client.create_tweet(text="outra", in_reply_to_tweet_id=1)
+    client.create_tweet(text="mais uma", in_reply_to_tweet_id=1)   # Esgotado: repete a última
+
+    stats = replay.get_stats()
+    assert (stats["served"], stats["empty_pages"], stats["repeated"]) == (4, 1, 1), stats
+
+
+def test_timed_replay_holds_reads_until_their_recorded_moment(recorded, local_routing):
+    path, _, second, _ = recorded
+    replay_server(local_routing, path, speed=1.0)
+    client = new_client()
+
+    assert client.search_recent_tweets("from:999").data is not None
+    assert client.search_recent_tweets("from:999").data is None   # A segunda busca só existe ~0,3 s depois
+    time.sleep(0.35)
+    assert [t.id for t in client.search_recent_tweets("from:999").data] == [t.id for t in second.data]
@@ -0,0 +1,87 @@
+# tests/test_completion_cache.py
+# CACHE DE COMPLETIONS - CHAVE NORMALIZADA, TTL, LRU POR ENTRADAS E BYTES E PERSISTÊNCIA
+
+import pytest
+
+from completion_cache import CompletionCache, make_key
+
+TEMPLATE = "Comente o tweet: {text}"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "completion_cache.db")
+
+
+def open_cache(db_path, clock, **limits):
+    limits = {"max_entries": 100, "max_bytes": 10 ** 6, "ttl_seconds": 3600, **limits}
+    return CompletionCache(db_path, clock=clock, **limits)
+
+
+def test_key_ignores_case_and_whitespace_but_not_model_or_temperature():
+    key = make_key("O  Banco Central\nsubiu os juros", TEMPLATE, "gpt-4o-mini", 0.7)
+
+    assert key == make_key("o banco central subiu os juros ", TEMPLATE, "gpt-4o-mini", 0.7)
+    assert key != make_key("o banco central subiu os juros", TEMPLATE, "gpt-4o", 0.7)
+    assert key != make_key("o banco central subiu os juros", TEMPLATE, "gpt-4o-mini", 0.9)
+    assert key != make_key("o banco central subiu os juros", "Responda: {text}", "gpt-4o-mini", 0.7)
+
+
+def test_hit_counts_tokens_saved_and_miss_is_recorded(db_path, clock):
+    cache = open_cache(db_path, clock)
+    assert cache.get("Pix fora do ar", TEMPLATE, "gpt-4o-mini", 0.7) is None
+    cache.put("Pix fora do ar", TEMPLATE, "gpt-4o-mini", 0.7, "Instabilidade de novo?", tokens=120)
+
+    assert cache.get("pix  FORA do ar", TEMPLATE, "gpt-4o-mini", 0.7) == "Instabilidade de novo?"
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["tokens_saved"], stats["hit_ratio"]) == (1, 1, 120, 0.5)
+    cache.close()
+
+
+def test_expired_entry_is_a_miss_and_is_removed(db_path, clock):
+    cache = open_cache(db_path, clock, ttl_seconds=60)
+    cache.put("inflação", TEMPLATE, "gpt-4o-mini", 0.7, "resposta")
+    clock.sleep(61)
+
+    assert cache.get("inflação", TEMPLATE, "gpt-4o-mini", 0.7) is None
+    assert len(cache) == 0
+    cache.close()
+
+
+def test_entry_limit_evicts_least_recently_used(db_path, clock):
+    cache = open_cache(db_path, clock, max_entries=2)
+    for text in ("a", "b"):
+        cache.put(text, TEMPLATE, "gpt-4o-mini", 0.7, f"resposta {text}")
+        clock.sleep(1)
+    cache.get("a", TEMPLATE, "gpt-4o-mini", 0.7)   # "a" passa a ser o mais recente
+    clock.sleep(1)
+    cache.put("c", TEMPLATE, "gpt-4o-mini", 0.7, "resposta c")
+
+    assert len(cache) == 2
+    assert cache.get("b", TEMPLATE, "gpt-4o-mini", 0.7) is None
+    assert cache.get("a", TEMPLATE, "gpt-4o-mini", 0.7) == "resposta a"
+    cache.close()
+
+
+def test_byte_limit_evicts_until_under_budget(db_path, clock):
+    cache = open_cache(db_path, clock, max_bytes=25)
+    for text in ("a", "b", "c"):
+        cache.put(text, TEMPLATE, "gpt-4o-mini", 0.7, "x" * 10)
+        clock.sleep(1)
+
+    assert cache.get_stats()["bytes"] == 20 and len(cache) == 2
+    assert cache.get("a", TEMPLATE, "gpt-4o-mini", 0.7) is None
+    cache.close()
+
+
+def test_entries_and_counters_survive_reopening(db_path, clock):
+    cache = open_cache(db_path, clock)
+    cache.put("selic", TEMPLATE, "gpt-4o-mini", 0.7, "Mais um corte?", tokens=80)
+    cache.get("selic", TEMPLATE, "gpt-4o-mini", 0.7)
+    cache.close()
+
+    reopened = open_cache(db_path, clock)
+    assert len(reopened) == 1 and reopened.tokens_saved == 80
+    assert reopened.get("selic", TEMPLATE, "gpt-4o-mini", 0.7) == "Mais um corte?"
+    assert reopened.get_stats()["hits"] == 2
+    reopened.close()
@@ -0,0 +1,88 @@
+# tests/test_log_setup.py
+# LOGGING SEM BLOQUEIO - LINHAS JSON COM CAMPOS ESTRUTURADOS, FORMATAÇÃO PREGUIÇOSA E ROTAÇÃO COMPRIMIDA
+
+import glob
+import gzip
+import json
+import logging
+
+import pytest
+
+import log_setup
+from log_setup import JsonLinesFormatter, setup_logging, shutdown_logging
+
+
+@pytest.fixture
+def isolated_setup(monkeypatch):
+    # O logging é do processo: cada teste ganha listener e handlers próprios
+    setup = log_setup._LoggingSetup()
+    monkeypatch.setattr(log_setup, "_setup", setup)
+    root = logging.getLogger()
+    level = root.level
+    yield setup
+    setup.stop()
+    root.removeHandler(setup.handler)
+    root.setLevel(level)
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_json_lines_lazy_formatting_and_gzip_rotation(isolated_setup, tmp_path):
+    path = str(tmp_path / "check.log")
+    setup_logging(path, console=False, config={"log_max_bytes": 2048, "log_backup_count": 2})
+    logger = logging.getLogger("check")
+
+    class Expensive:
+        formatted = 0
+
+        def __str__(self):
+            Expensive.formatted += 1
+            return "caro"
+
+    logger.debug("não formatado: %s", Expensive())
+    for i in range(60):
+        logger.info("linha %d de enchimento para forçar a rotação", i)
+    logger.info("Resposta postada ao tweet %s", 123, extra={"tweet_id": "123", "model": "gpt-4o-mini",
+                                                              "latency_ms": 812})
+    try:
+        raise ValueError("falha")
+    except ValueError:
+        logger.exception("erro com traceback")
+    shutdown_logging()
+
+    lines = read_lines(path)
+    rotated = sorted(glob.glob(f"{path}.*.gz"))
+    with gzip.open(rotated[0], "rt", encoding="utf-8") as f:
+        newest_rotated = [json.loads(line) for line in f]
+
+    posted = lines[-2]
+    assert Expensive.formatted == 0
+    assert posted["msg"] == "Resposta postada ao tweet 123" and posted["tweet_id"] == "123"
+    assert posted["latency_ms"] == 812 and "user_id" not in posted
+    assert "ValueError" in lines[-1]["exc"]
+    assert len(rotated) == 2 and newest_rotated[-1]["msg"].startswith("linha")
+
+
+def test_named_file_only_receives_its_logger(isolated_setup, tmp_path):
+    general, limiter = str(tmp_path / "bot.log"), str(tmp_path / "rate_limiter.log")
+    setup_logging(general, console=False)
+    setup_logging(limiter, console=False, logger_name="rate_limiter")
+
+    logging.getLogger("rate_limiter").info("janela ajustada")
+    logging.getLogger("bot").info("ciclo concluído")
+    shutdown_logging()
+
+    assert [line["msg"] for line in read_lines(limiter)] == ["janela ajustada"]
+    assert [line["msg"] for line in read_lines(general)] == ["janela ajustada", "ciclo concluído"]
+
+
+def test_formatter_omits_absent_structured_fields():
+    record = logging.LogRecord("bot", logging.INFO, __file__, 1, "olá %s", ("mundo",), None)
+    record.keyword = "pix"
+
+    entry = json.loads(JsonLinesFormatter().format(record))
+    assert entry["msg"] == "olá mundo" and entry["keyword"] == "pix"
+    assert set(entry) == {"ts", "level", "logger", "msg", "keyword"}
@@ -0,0 +1,66 @@
+# tests/test_mention_context.py
+# CONTEXTO DE MENÇÕES - ÍNDICE DOS INCLUDES, CONTEXTO DA THREAD E CACHE LRU DE CONVERSAS
+
+from types import SimpleNamespace
+
+from mention_context import (CONTEXT_SNIPPET_CHARS, ConversationCache, format_author, index_includes,
+                             thread_context)
+
+
+def user(user_id, username):
+    return SimpleNamespace(id=user_id, username=username, name=username.title())
+
+
+def mention(mention_id, conversation_id, parent_id=None):
+    references = [SimpleNamespace(id=parent_id, type="replied_to")] if parent_id else None
+    return SimpleNamespace(id=mention_id, conversation_id=conversation_id, referenced_tweets=references)
+
+
+def test_index_includes_by_string_id():
+    parent = SimpleNamespace(id=456, text="original")
+    index = index_includes({"users": [user(123, "ana")], "tweets": [parent]})
+
+    assert index["users"]["123"].username == "ana"
+    assert index["tweets"]["456"] is parent
+    assert index_includes(None) == {"users": {}, "tweets": {}}
+    assert index_includes({"users": None}) == {"users": {}, "tweets": {}}
+
+
+def test_format_author_handles_missing_user():
+    assert format_author(user(1, "ana")) == "@ana (Ana)"
+    assert format_author(None) == "autor desconhecido"
+
+
+def test_parent_in_includes_is_used_and_remembered_for_the_thread():
+    cache = ConversationCache()
+    text = "x" * (CONTEXT_SNIPPET_CHARS + 50)
+    index = index_includes({"tweets": [SimpleNamespace(id=10, text=text)]})
+
+    context = thread_context(mention(11, 10, parent_id=10), index, cache)
+    assert context == f"Tweet original: {'x' * CONTEXT_SNIPPET_CHARS}..."
+
+    # Próxima página: o pai não veio nos includes, mas a conversa já é conhecida
+    assert thread_context(mention(12, 10, parent_id=11), index_includes({}), cache) == context
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_root_tweet_and_unknown_conversation_have_no_context():
+    cache = ConversationCache()
+    empty = index_includes({})
+
+    assert thread_context(mention(20, 20), empty, cache) == ""
+    assert thread_context(mention(21, None), empty, cache) == ""
+    assert thread_context(mention(22, 99, parent_id=98), empty, cache) == ""
+    assert cache.get_stats() == {"entries": 0, "hits": 0, "misses": 1, "hit_ratio": 0.0}
+
+
+def test_conversation_cache_evicts_least_recently_used():
+    cache = ConversationCache(max_entries=2)
+    cache.put(1, "um")
+    cache.put(2, "dois")
+    assert cache.get("1") == "um"   # IDs inteiros e strings são a mesma conversa
+    cache.put(3, "três")
+
+    assert len(cache) == 2
+    assert cache.get(2) is None
+    assert cache.get(1) == "um" and cache.get(3) == "três"
@@ -0,0 +1,65 @@
+# tests/test_metrics.py
+# MÉTRICAS PROMETHEUS - HISTOGRAMAS CUMULATIVOS, FORMATO DE TEXTO E SCRAPE POR HTTP
+
+import socket
+import time
+from urllib.request import urlopen
+
+import pytest
+
+import rate_limit_registry
+from metrics import DEFAULT_HOST, STAGE_FETCHED, STAGE_POSTED, MetricsRegistry, start_metrics_server
+from rate_limit_registry import RateLimitRegistry
+
+ENDPOINT = 'endpoint="GET /2/users/:id/tweets"'
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # Registro de rate limit próprio do teste (o do processo é global)
+    monkeypatch.setattr(rate_limit_registry, "_default_registry", RateLimitRegistry())
+    registry = MetricsRegistry()
+    for seconds in (0.04, 0.2, 0.2, 3.0, 12.0):
+        registry.api_latency.observe(seconds, endpoint="GET /2/users/:id/tweets")
+    registry.observe_llm("gpt-4o-mini", 1.5)
+    registry.observe_llm("gpt-4o-mini", 9.0, ok=False)
+    registry.count_tweets("smart_bot", STAGE_FETCHED, 10)
+    registry.count_tweets("smart_bot", STAGE_POSTED)
+    registry.observe_cycle("smart_bot", 42)
+    rate_limit_registry.get_rate_limit_registry().record_window("GET /2/users/:id/tweets", 900, 899,
+                                                                time.time() + 600)
+    return registry
+
+
+def free_port() -> int:
+    with socket.socket() as probe:   # Porta livre qualquer (0 desativa o servidor)
+        probe.bind((DEFAULT_HOST, 0))
+        return probe.getsockname()[1]
+
+
+def test_scrape_returns_cumulative_histograms_counters_and_gauges(registry):
+    port = free_port()
+    server = start_metrics_server(port, registry=registry)
+    try:
+        text = urlopen(f"http://{DEFAULT_HOST}:{port}/metrics", timeout=5).read().decode()
+    finally:
+        server.shutdown()
+
+    expected = [
+        f'x_api_request_duration_seconds_bucket{{{ENDPOINT},le="0.05"}} 1',
+        f'x_api_request_duration_seconds_bucket{{{ENDPOINT},le="0.25"}} 3',
+        f'x_api_request_duration_seconds_bucket{{{ENDPOINT},le="10"}} 4',
+        f'x_api_request_duration_seconds_bucket{{{ENDPOINT},le="+Inf"}} 5',
+        f'x_api_request_duration_seconds_count{{{ENDPOINT}}} 5',
+        'llm_requests_total{model="gpt-4o-mini",result="error"} 1',
+        'bot_tweets_total{bot="smart_bot",stage="fetched"} 10',
+        'bot_cycle_duration_seconds_bucket{bot="smart_bot",le="60"} 1',
+        f'x_rate_limit_remaining{{{ENDPOINT}}} 899',
+        "# TYPE llm_request_duration_seconds histogram",
+    ]
+    lines = text.splitlines()
+    assert [line for line in expected if line not in lines] == []
+
+
+def test_port_zero_disables_the_server(registry):
+    assert start_metrics_server(0, registry=registry) is None
@@ -0,0 +1,70 @@
+# tests/test_model_router.py
+# ROTEADOR DE MODELOS - PREMIUM POR PRIORIDADE, REBAIXAMENTO PELO ORÇAMENTO E BOTS FORA DO ORÇAMENTO
+
+import pytest
+
+from model_router import (ROUTE_BUDGET_DOWNGRADE, ROUTE_BUDGET_EXHAUSTED, ROUTE_DEFAULT, ROUTE_PREMIUM,
+                          ModelRouter)
+from token_ledger import TokenLedger
+
+TEXT = "Bom dia, tudo tranquilo por aqui"
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return TokenLedger(str(tmp_path / "token_ledger.jsonl"))
+
+
+@pytest.fixture
+def router(ledger):
+    config = {
+        "default_model": "gpt-4o-mini",
+        "premium_model": "gpt-4o",
+        "fallback_model": "grok-1",
+        "max_tokens_per_day": 1000,
+        "router_budget_reserve": 0.2,
+        "router_min_samples": 10 ** 9,   # Saúde dos provedores fora destes testes
+        "router_budget_exempt_bots": ["sentiment_monitor"],
+    }
+    return ModelRouter(config, ledger=ledger)
+
+
+def test_priority_picks_premium_or_default(router):
+    assert router.choose(TEXT, priority="high").model == "gpt-4o"
+    assert router.choose(TEXT, priority="high").reason == ROUTE_PREMIUM
+    decision = router.choose(TEXT, priority="low")
+    assert (decision.model, decision.reason) == ("gpt-4o-mini", ROUTE_DEFAULT)
+    assert decision.provider == "openai"
+
+
+def test_premium_downgraded_inside_budget_reserve(router, ledger):
+    ledger.record("gpt-4o", 700, 150, bot="smart_bot")   # Restam 150 < 20% de 1000
+
+    assert router.choose(TEXT, priority="high").reason == ROUTE_BUDGET_DOWNGRADE
+    assert router.choose(TEXT, priority="high").model == "gpt-4o-mini"
+    assert router.choose(TEXT, priority="critical").model == "gpt-4o"
+
+
+def test_exhausted_budget_falls_back_to_cheapest_model_instead_of_skipping(router, ledger):
+    ledger.record("gpt-4o", 900, 200, bot="mention_bot")
+
+    for priority in ("low", "medium", "high"):
+        decision = router.choose(TEXT, priority=priority)
+        assert decision.model == "gpt-4o-mini"
+        assert decision.reason == ROUTE_BUDGET_EXHAUSTED
+    assert router.choose(TEXT, priority="critical").model == "gpt-4o"
+
+
+def test_exempt_bots_do_not_spend_the_reply_budget(router, ledger):
+    ledger.record("gpt-4o", 5000, 1000, bot="sentiment_monitor")
+    ledger.record("gpt-4o-mini", 100, 20, bot="smart_bot")
+
+    assert router.tokens_spent_today() == 120
+    assert ledger.tokens_today() == 6120
+    assert router.choose(TEXT, priority="high").reason == ROUTE_PREMIUM
+
+
+def test_cheapest_model_follows_price_table(router):
+    assert router.cheapest_model() == "gpt-4o-mini"
+    router.default_model = "gpt-4o"
+    assert router.cheapest_model() == "gpt-4o"
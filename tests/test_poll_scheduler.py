@@ -0,0 +1,30 @@
+# tests/test_poll_scheduler.py
+# AGENDADOR DE POLLING - CADÊNCIA FIXA POR PADRÃO E EWMA SÓ COM poll_adaptive
+
+from keyword_prompts_improved import BOT_CONFIG
+from poll_scheduler import PollScheduler
+
+CONFIG = dict(BOT_CONFIG, peak_hours=[], poll_fixed_interval=600, poll_fraction=0.1,
+              poll_min_interval=300, poll_max_interval=1200, poll_request_budget=None)
+
+
+def test_fixed_interval_is_the_default(clock):
+    scheduler = PollScheduler(["1"], config=CONFIG, clock=clock)
+    assert scheduler.due() == ["1"]
+    scheduler.record_poll("1", [clock.now - 60, clock.now - 30])
+    assert scheduler.seconds_until_next() == 600
+    clock.now += 600
+    assert scheduler.due() == ["1"]
+
+
+def test_fixed_mode_still_learns_the_rate(clock):
+    scheduler = PollScheduler(["1"], config=CONFIG, clock=clock)
+    scheduler.record_poll("1", [clock.now - 7200, clock.now - 3600])
+    assert scheduler.snapshot()["1"]["ewma_interval"] != scheduler.base_interval
+
+
+def test_adaptive_flag_follows_the_ewma_within_bounds(clock):
+    scheduler = PollScheduler(["quiet", "busy"], config=dict(CONFIG, poll_adaptive=True), clock=clock)
+    scheduler.restore({"quiet": {"ewma_interval": 86400}, "busy": {"ewma_interval": 1000}})
+    assert scheduler.poll_interval("quiet") == 1200
+    assert scheduler.poll_interval("busy") == 300
@@ -0,0 +1,159 @@
+# tests/test_posting_quota.py
+# COTA DE POSTAGENS - JANELAS, CALENDÁRIO, RESERVAS E LEDGER COMPARTILHADO ENTRE PROCESSOS
+
+from datetime import datetime, timezone
+
+import pytest
+
+from posting_quota import (CALENDAR_MONTH, RESERVATION_TTL_SECONDS, PostingQuota, QuotaExceeded, QuotaRule,
+                           calendar_period)
+
+START = datetime(2024, 9, 18, 20, 0, tzinfo=timezone.utc).timestamp()
+MONTH_RESET = datetime(2024, 9, 19, tzinfo=timezone.utc).timestamp()
+HOURLY = QuotaRule("horário", 2, window_seconds=3600)
+MONTHLY = QuotaRule("mensal", 3, calendar=CALENDAR_MONTH, reset_day=19)
+
+
+def noop():
+    pass
+
+
+@pytest.fixture
+def ledger(tmp_path, clock):
+    """Duas cotas no mesmo arquivo, como dois processos de bot"""
+    clock.now = START
+    path = str(tmp_path / "quota.db")
+    quota = PostingQuota([HOURLY, MONTHLY], path, clock)
+    other = PostingQuota([HOURLY, MONTHLY], path, clock)
+    yield quota, other
+    quota.close()
+    other.close()
+
+
+def test_sliding_window_frees_exactly_when_oldest_post_leaves(ledger, clock):
+    quota, other = ledger
+    quota.post(noop, bot="a")
+    clock.now += 600
+    other.post(noop, bot="b")
+
+    decision = quota.check()
+    assert not decision.allowed
+    assert decision.rule == "horário" and decision.wait_seconds == 3000
+    clock.now += 3000
+    assert quota.check().allowed
+
+
+def test_failed_api_call_gives_the_slot_back(ledger):
+    quota, other = ledger
+
+    def failing():
+        raise RuntimeError("403")
+
+    with pytest.raises(RuntimeError):
+        quota.post(failing, bot="a")
+    assert quota.usage(HOURLY) == 0 and other.usage(HOURLY) == 0
+
+
+def test_monthly_calendar_quota_resets_on_reset_day(ledger, clock):
+    quota, other = ledger
+    for bot in "ab":
+        quota.post(noop, bot=bot)
+    clock.now += 3600
+    other.post(noop, bot="b")
+    clock.now += 3600
+
+    with pytest.raises(QuotaExceeded) as refused:
+        quota.post(noop, bot="a")
+    assert refused.value.decision.rule == "mensal"
+    assert refused.value.decision.wait_seconds == MONTH_RESET - clock.now
+
+    clock.now = MONTH_RESET
+    assert quota.check().allowed and quota.usage(MONTHLY) == 0
+
+
+def test_reservation_holds_a_slot_and_refusal_counts_saved_tokens(ledger):
+    quota, other = ledger
+    quota.post(noop, bot="a")
+    reservation = quota.reserve("a")
+    assert other.usage(HOURLY) == 2
+
+    with pytest.raises(QuotaExceeded):
+        other.reserve("b", estimated_tokens=120)
+    assert other.stats == {"refused": 1, "tokens_saved": 120}
+
+    quota.release(reservation)
+    quota.release(reservation)   # Idempotente
+    assert other.check().allowed
+
+
+def test_abandoned_reservation_expires(ledger, clock):
+    quota, other = ledger
+    quota.post(noop, bot="a")
+    quota.reserve("a")   # Processo morreu sem commit/release
+    clock.now += RESERVATION_TTL_SECONDS + 1
+    other.commit(other.reserve("b"), tweet_id=123)
+    assert other.usage(HOURLY) == 2   # A postagem e o commit; a reserva expirada não conta
+    assert not quota.check().allowed
+
+
+def test_reset_day_past_month_end_falls_on_last_day():
+    period = calendar_period(QuotaRule("m", 1, calendar=CALENDAR_MONTH, reset_day=31),
+                             datetime(2025, 3, 10, tzinfo=timezone.utc).timestamp())
+    assert period == (datetime(2025, 2, 28, tzinfo=timezone.utc).timestamp(),
+                      datetime(2025, 3, 31, tzinfo=timezone.utc).timestamp())
+
+
+def test_bot_rules_count_only_that_bot(tmp_path, clock):
+    clock.now = START
+    path = str(tmp_path / "quota.db")
+    account = PostingQuota([HOURLY], path, clock)
+    strict = PostingQuota([QuotaRule("horário do bot", 1, window_seconds=3600, bot="post_reset_bot")], path, clock)
+
+    account.post(noop, bot="smart_bot")
+    assert strict.check("post_reset_bot").allowed   # A postagem de outro bot não conta
+    strict.post(noop, bot="post_reset_bot")
+    assert strict.usage(strict.rules[0]) == 1
+    assert not strict.check("post_reset_bot").allowed
+    assert strict.check("smart_bot").allowed        # A regra do bot não barra os outros
+    account.close()
+    strict.close()
+
+
+def test_any_error_inside_reserve_releases_the_write_lock(ledger, monkeypatch):
+    quota, other = ledger
+
+    def broken(*args):
+        raise KeyError("bug entre BEGIN e COMMIT")
+
+    monkeypatch.setattr(quota, "_decide", broken)
+    with pytest.raises(KeyError):
+        quota.reserve("a")
+    assert not quota._conn.in_transaction
+    other._conn.execute("PRAGMA busy_timeout=100")
+    other.release(other.reserve("b"))   # Sem a trava presa, não espera nem falha
+
+
+def write_legacy_usage(tmp_path, monthly_posts, next_reset):
+    with open(tmp_path / "rate_limit_usage.json", "w") as f:
+        f.write('{"monthly_posts": %d, "next_monthly_reset": "%s"}' % (monthly_posts, next_reset))
+
+
+def test_legacy_monthly_counter_is_seeded_once(tmp_path, clock):
+    clock.now = START - 86400
+    write_legacy_usage(tmp_path, 2, "2024-09-19T00:00:00+00:00")
+    path = str(tmp_path / "quota.db")
+    quota = PostingQuota([HOURLY, MONTHLY], path, clock)
+    assert quota.usage(MONTHLY) == 2 and quota.usage(HOURLY) == 0
+    quota.close()
+
+    quota = PostingQuota([HOURLY, MONTHLY], path, clock)   # Reabrir não importa de novo
+    assert quota.usage(MONTHLY) == 2
+    quota.close()
+
+
+def test_stale_legacy_counter_is_ignored(tmp_path, clock):
+    clock.now = START + 86400   # Já passou do reset registrado no arquivo antigo
+    write_legacy_usage(tmp_path, 106, "2024-09-19T00:00:00+00:00")
+    quota = PostingQuota([MONTHLY], str(tmp_path / "quota.db"), clock)
+    assert quota.usage(MONTHLY) == 0
+    quota.close()
@@ -0,0 +1,81 @@
+# tests/test_rate_limit_registry.py
+# CABEÇALHOS x-rate-limit-* CAPTURADOS POR ENDPOINT PELO HOOK DA SESSÃO
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from rate_limit_registry import RateLimitRegistry, endpoint_template, install_rate_limit_hook
+
+RESET = 1900000000
+LIMITS = {
+    "/2/users/42/tweets": ("1500", "1499", 200),
+    "/2/tweets/search/recent": ("450", "3", 200),
+    "/2/users/by/username/fulano": ("900", "0", 429),
+}
+
+
+class FakeXHandler(BaseHTTPRequestHandler):
+    """API falsa que devolve cabeçalhos de limite conhecidos por rota"""
+
+    def do_GET(self):
+        limit, remaining, status = LIMITS.get(self.path.split("?")[0], (None, None, 404))
+        data = json.dumps({"data": []}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if limit:
+            self.send_header("x-rate-limit-limit", limit)
+            self.send_header("x-rate-limit-remaining", remaining)
+            self.send_header("x-rate-limit-reset", str(RESET))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_x():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeXHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_ids_and_usernames_collapse_into_templates():
+    assert endpoint_template("GET", "https://api.twitter.com/2/users/42/tweets?max_results=10") == \
+        "GET /2/users/:id/tweets"
+    assert endpoint_template("get", "https://api.twitter.com/2/users/by/username/fulano") == \
+        "GET /2/users/by/username/:username"
+
+
+def test_hook_is_idempotent():
+    registry = RateLimitRegistry()
+    session = requests.Session()
+    install_rate_limit_hook(session, registry)
+    install_rate_limit_hook(session, registry)
+    assert session.hooks["response"].count(registry.hook) == 1
+
+
+def test_headers_are_captured_per_endpoint(fake_x, clock):
+    clock.now = RESET - 60
+    registry = RateLimitRegistry(clock=clock)
+    session = requests.Session()
+    install_rate_limit_hook(session, registry)
+    for path in list(LIMITS) + ["/2/sem/limite"]:
+        session.get(f"{fake_x}{path}?max_results=10")
+
+    tweets = registry.get("GET /2/users/:id/tweets")
+    assert (tweets.limit, tweets.remaining, tweets.reset) == (1500, 1499, RESET)
+    search = registry.get("GET /2/tweets/search/recent")
+    assert (search.limit, search.remaining) == (450, 3)
+    lookup = registry.get("GET /2/users/by/username/:username")
+    assert lookup.remaining == 0 and lookup.throttled == 1
+    assert len(registry.windows()) == 3   # A rota sem cabeçalhos não entra
+    assert registry.most_constrained().endpoint == "GET /2/users/by/username/:username"
+    assert lookup.seconds_until_reset(clock()) == 60
@@ -0,0 +1,41 @@
+# tests/test_reply_gate.py
+# PORTÃO DE RESPOSTA - reply_settings COM A IDENTIDADE DA CONTA NO PORTÃO COMPARTILHADO
+
+from types import SimpleNamespace
+
+import pytest
+
+import reply_gate
+from reply_gate import DROP_REPLY_SETTINGS, REPLY_MENTIONED_USERS, account_identity, get_reply_gate
+
+ME = SimpleNamespace(id=42, username="MeuBot")
+
+
+def tweet(text, author_id="7", reply_settings=REPLY_MENTIONED_USERS):
+    return SimpleNamespace(id="100", conversation_id="100", author_id=author_id, text=text,
+                           reply_settings=reply_settings)
+
+
+@pytest.fixture(autouse=True)
+def fresh_gate(monkeypatch):
+    monkeypatch.setattr(reply_gate, "_default_gate", None)
+
+
+def test_shared_gate_without_identity_drops_mentioned_users():
+    assert get_reply_gate().check(tweet("@meubot o que acha?")) == DROP_REPLY_SETTINGS
+
+
+def test_shared_gate_with_identity_allows_mentions_and_own_tweets():
+    gate = get_reply_gate(*account_identity(SimpleNamespace(get_me=lambda: SimpleNamespace(data=ME))))
+    assert gate.check(tweet("@meubot o que acha?")) is None
+    assert gate.check(tweet("@outro o que acha?")) == DROP_REPLY_SETTINGS
+    assert gate.check(tweet("só seguidores", author_id="42", reply_settings="following")) is None
+    assert get_reply_gate() is gate and gate.my_username == "meubot"   # Chamadas sem identidade não a apagam
+
+
+def test_failed_get_me_leaves_the_gate_conservative():
+    def get_me():
+        raise RuntimeError("401")
+
+    gate = get_reply_gate(*account_identity(SimpleNamespace(get_me=get_me)))
+    assert gate.check(tweet("@meubot o que acha?")) == DROP_REPLY_SETTINGS
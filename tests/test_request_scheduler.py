@@ -0,0 +1,76 @@
+# tests/test_request_scheduler.py
+# TOKEN BUCKET POR ENDPOINT - ESPERAS EXATAS COM RELÓGIO FALSO
+
+import pytest
+
+from rate_limit_registry import RateLimitRegistry
+from request_scheduler import RESET_MARGIN_SECONDS, RequestScheduler, endpoint_for
+
+TWEETS = "GET /2/users/:id/tweets"
+POST = "POST /2/tweets"
+SEARCH = "GET /2/tweets/search/recent"
+
+
+@pytest.fixture
+def registry(clock):
+    return RateLimitRegistry(clock=clock)
+
+
+@pytest.fixture
+def scheduler(registry, clock):
+    return RequestScheduler(registry, clock=clock, sleep=clock.sleep)
+
+
+def record_window(registry, url, limit, remaining, reset_at, status_code=200):
+    registry.record("GET", url, {"x-rate-limit-limit": str(limit), "x-rate-limit-remaining": str(remaining),
+                                 "x-rate-limit-reset": str(int(reset_at))}, status_code=status_code)
+
+
+def test_unknown_endpoint_never_waits(scheduler):
+    assert scheduler.wait_time(TWEETS) == 0.0
+    assert scheduler.acquire(TWEETS) == 0.0
+
+
+def test_server_balance_is_consumed_locally_and_waits_exactly_until_reset(scheduler, registry, clock):
+    record_window(registry, "https://api.twitter.com/2/users/1/tweets", 3, 2, clock.now + 600)
+    assert scheduler.wait_time(TWEETS) == 0.0
+    assert scheduler.acquire(TWEETS) == 0.0
+    assert scheduler.acquire(TWEETS) == 0.0
+    assert scheduler.remaining(TWEETS) == 0
+    assert scheduler.wait_time(TWEETS) == 600 + RESET_MARGIN_SECONDS
+
+    start = clock.now
+    assert scheduler.acquire(TWEETS) == 600 + RESET_MARGIN_SECONDS
+    assert clock.now - start == 600 + RESET_MARGIN_SECONDS
+    assert scheduler.remaining(TWEETS) == 2  # Janela nova (3) menos a chamada feita
+
+
+def test_observed_429_empties_the_bucket(scheduler, registry, clock):
+    record_window(registry, "https://api.twitter.com/2/users/1/tweets", 3, 2, clock.now + 600)
+    scheduler.acquire(TWEETS)
+    clock.now += 1
+    record_window(registry, "https://api.twitter.com/2/users/7/tweets", 3, 0, clock.now + 120, status_code=429)
+    clock.now += 0.5
+    assert scheduler.wait_time(TWEETS) == 120 - 0.5 + RESET_MARGIN_SECONDS
+
+
+def test_configured_limit_before_first_header_and_independent_endpoints(scheduler):
+    scheduler.configure(POST, capacity=2, window_seconds=900)
+    assert scheduler.acquire(POST) == 0.0 and scheduler.acquire(POST) == 0.0
+    assert scheduler.wait_time(POST) == 900 + RESET_MARGIN_SECONDS
+    assert scheduler.wait_time("GET /2/users/:id/mentions") == 0.0
+
+
+def test_pace_spreads_the_balance_until_reset(registry, clock):
+    scheduler = RequestScheduler(registry, clock=clock, sleep=clock.sleep, reset_margin=0.0)
+    record_window(registry, "https://api.twitter.com/2/tweets/search/recent", 60, 30, clock.now + 900)
+    assert scheduler.pace(SEARCH) == 30.0
+    assert scheduler.pace(SEARCH, calls=3) == 90.0
+
+
+def test_tweepy_methods_map_to_templates():
+    def get_users_tweets():
+        pass
+
+    assert endpoint_for(get_users_tweets) == TWEETS
+    assert endpoint_for(print) is None
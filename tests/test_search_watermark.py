@@ -0,0 +1,208 @@
+# tests/test_search_watermark.py
+# BUSCA EM LOTE - O WATERMARK COMPARTILHADO NÃO PASSA POR TWEETS RECUSADOS PELA COTA
+
+import importlib
+from types import SimpleNamespace
+
+import pytest
+
+from dedup_cache import ProcessedIdCache
+from fake_api import install_fake_keys
+from posting_quota import QuotaDecision, QuotaExceeded
+from reply_gate import ReplyGate
+from timeline_ingest import SearchTimelineIngestor
+from tracing import Tracer
+from tweet_filter import TweetFilter
+
+AUTHOR_A, AUTHOR_B = "111", "222"
+
+
+class FakeSearchClient:
+    """search_recent_tweets de uma página só, do mais novo para o mais antigo"""
+
+    def __init__(self, tweets):
+        self.tweets = tweets
+
+    def search_recent_tweets(self, query, since_id=None, **params):
+        data = [t for t in self.tweets if since_id is None or int(t.id) > since_id]
+        return SimpleNamespace(data=sorted(data, key=lambda t: int(t.id), reverse=True) or None, meta={})
+
+
+class SwitchableQuota:
+    """Recusa reservas enquanto `open` for False"""
+
+    def __init__(self):
+        self.open = False
+        self.reserved = []
+
+    def reserve(self, bot, estimated_tokens=0):
+        if not self.open:
+            raise QuotaExceeded(QuotaDecision(False, 3600, "1/hora"))
+        self.reserved.append(bot)
+        return SimpleNamespace(bot=bot)
+
+    def release(self, reservation):
+        pass
+
+
+@pytest.fixture(scope="module")
+def bots(tmp_path_factory):
+    # Os bots configuram o log em arquivo relativo ao diretório de trabalho na importação
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(tmp_path_factory.mktemp("bots"))
+        install_fake_keys()
+        yield importlib.import_module("bot_improved"), importlib.import_module("bot_optimized")
+
+
+def make_tweet(tweet_id, author_id, text):
+    return SimpleNamespace(id=tweet_id, author_id=author_id, text=text, conversation_id=tweet_id,
+                           reply_settings="everyone", in_reply_to_user_id=None, created_at=None)
+
+
+def keyword_text(module):
+    keyword = next(iter(module.prompts_com_aliases))[0]
+    return f"Os números de {keyword} divulgados hoje mostram um cenário bem diferente do anunciado na semana passada"
+
+
+NEUTRAL = "Bom dia a todos, o café ficou pronto mais cedo e a manhã começou tranquila por aqui"
+
+
+def timeline(module):
+    text = keyword_text(module)
+    return [make_tweet(10, AUTHOR_A, text + " (1)"), make_tweet(11, AUTHOR_A, text + " (2)"),
+            make_tweet(12, AUTHOR_B, NEUTRAL)]
+
+
+def smart_bot(module, tweets, quota, tmp_path):
+    bot = module.SmartXBot.__new__(module.SmartXBot)
+    bot.setup_prompts()
+    bot.last_seen_ids = {}
+    bot.processed_tweets = ProcessedIdCache()
+    bot.stats = {"tweets_processed": 0, "responses_sent": 0, "tokens_used": 0}
+    bot.posting_quota = quota
+    bot.reply_gate = ReplyGate("1", "bot")
+    bot.tracer = Tracer(str(tmp_path / "trace.jsonl"), enabled=False)
+    bot.metrics = module.get_metrics()
+    bot.poll_scheduler = module.PollScheduler([AUTHOR_A, AUTHOR_B])
+    bot.timeline_ingestor = SearchTimelineIngestor(FakeSearchClient(tweets), [AUTHOR_A, AUTHOR_B])
+    bot.generate_smart_comment = lambda *args, **kwargs: "resposta"
+    bot.posted = []
+    bot.post_reply = lambda tweet_id, *args: bot.posted.append(tweet_id) or True
+    return bot
+
+
+def optimized_bot(module, tweets, quota, tmp_path):
+    bot = module.OptimizedXBot.__new__(module.OptimizedXBot)
+    bot.tweet_filter = TweetFilter(module.prompts_com_aliases)
+    bot.state = {"last_seen_ids": {}}
+    bot.processed_tweets = ProcessedIdCache()
+    bot.posting_quota = quota
+    bot.reply_gate = ReplyGate("1", "bot")
+    bot.tracer = Tracer(str(tmp_path / "trace.jsonl"), enabled=False)
+    bot.metrics = module.get_metrics()
+    bot.timeline_ingestor = SearchTimelineIngestor(FakeSearchClient(tweets), [AUTHOR_A, AUTHOR_B])
+    bot.generate_optimized_response = lambda *args, **kwargs: "resposta"
+    bot.posted = []
+    bot.twitter_client = SimpleNamespace(create_tweet=lambda **params: bot.posted.append(params["in_reply_to_tweet_id"]))
+    quota.post = lambda api_call, method, bot=None, reservation=None, **params: method(**params)
+    bot.make_optimized_api_call = lambda method, **params: method(**params)
+    return bot
+
+
+def test_settled_watermark_stops_below_oldest_pending_tweet():
+    tweets = {"a": [SimpleNamespace(id=10), SimpleNamespace(id=11)], "b": [SimpleNamespace(id=12)]}
+    settle = SearchTimelineIngestor.settled_watermark
+
+    assert settle(12, tweets, {"a": 11, "b": 12}) == 12
+    assert settle(12, tweets, {"a": 10, "b": 12}) == 10
+    assert settle(12, tweets, {"b": 12}) == 9
+    assert settle(None, {}, {}) is None
+
+
+def test_smart_bot_search_mode_retries_tweets_the_quota_refused(bots, tmp_path, monkeypatch):
+    bot_improved, _ = bots
+    monkeypatch.setattr(bot_improved, "TARGET_USER_IDS", [AUTHOR_A, AUTHOR_B])
+    quota = SwitchableQuota()
+    bot = smart_bot(bot_improved, timeline(bot_improved), quota, tmp_path)
+
+    bot.check_timelines_batched([AUTHOR_A, AUTHOR_B])
+
+    # A cota recusou os dois tweets de A: o watermark compartilhado para antes deles
+    assert bot.posted == []
+    assert bot.last_seen_ids[bot_improved.SEARCH_WATERMARK_KEY] == 9
+    assert AUTHOR_A not in bot.last_seen_ids
+    assert bot.last_seen_ids[AUTHOR_B] == 12
+    assert 10 not in bot.processed_tweets and 11 not in bot.processed_tweets
+
+    quota.open = True
+    bot.check_timelines_batched([AUTHOR_A, AUTHOR_B])
+
+    assert bot.posted == [10, 11]
+    assert bot.last_seen_ids[bot_improved.SEARCH_WATERMARK_KEY] == 12
+    assert bot.last_seen_ids[AUTHOR_A] == 12
+
+
+def test_smart_bot_stream_refusal_is_reported(bots, tmp_path):
+    bot_improved, _ = bots
+    quota = SwitchableQuota()
+    bot = smart_bot(bot_improved, [], quota, tmp_path)
+    bot.save_state = lambda: None
+    tweet, neutral = timeline(bot_improved)[0], timeline(bot_improved)[2]
+
+    assert bot.process_stream_tweet(tweet) is False
+    assert bot.process_stream_tweet(neutral) is True   # Sem palavra-chave: descartado de vez
+    quota.open = True
+    assert bot.process_stream_tweet(tweet) is True
+    assert bot.posted == [10]
+
+
+def test_optimized_bot_search_mode_retries_tweets_the_quota_refused(bots, tmp_path):
+    _, bot_optimized = bots
+    quota = SwitchableQuota()
+    bot = optimized_bot(bot_optimized, timeline(bot_optimized), quota, tmp_path)
+    watermarks = bot.state["last_seen_ids"]
+
+    bot.run_batched_ingestion()
+
+    assert bot.posted == []
+    assert watermarks[bot_optimized.SEARCH_WATERMARK_KEY] == 9
+    assert watermarks[AUTHOR_B] == 12   # Tweet neutro descartado pelo filtro também é tratado
+
+    quota.open = True
+    assert bot.run_batched_ingestion() == 2
+    assert bot.posted == [10, 11]
+    assert watermarks[bot_optimized.SEARCH_WATERMARK_KEY] == 12
+
+
+def test_smart_bot_stream_reader_only_enqueues(bots, tmp_path):
+    bot_improved, _ = bots
+    from stream_manager import StreamManager
+    from work_queue import work_queue_from_config
+
+    class IdleStream:
+        def __init__(self, manager, bearer_token):
+            pass
+
+    quota = SwitchableQuota()
+    bot = smart_bot(bot_improved, [], quota, tmp_path)
+    bot.save_state = lambda: None
+    bot.stream_manager = StreamManager("token", bot.handle_stream_tweet, ["pix"], ["1"], stream_factory=IdleStream)
+    bot.work_queue = work_queue_from_config(on_drop=bot.on_stream_drop)
+    first, _, neutral = timeline(bot_improved)
+
+    for tweet in (first, neutral):
+        bot.stream_manager.deliver(tweet)
+    # Nada foi gerado nem postado na thread do leitor
+    assert len(bot.work_queue) == 2 and bot.stream_manager.last_id is None
+
+    while len(bot.work_queue):
+        bot.stream_worker(bot.work_queue.get(0).payload)
+    # A cota recusou o tweet 10: o watermark fica abaixo dele
+    assert bot.stream_manager.last_id == 9
+    assert bot.stream_manager.get_stats()["refused"] == 1
+
+    quota.open = True
+    bot.stream_manager.deliver(first)
+    bot.stream_worker(bot.work_queue.get(0).payload)
+    assert bot.posted == [10]
+    assert bot.stream_manager.last_id == 12
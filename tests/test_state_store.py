@@ -0,0 +1,87 @@
+# tests/test_state_store.py
+# STATE STORE - CACHES SÓ REFLETEM O QUE FOI GRAVADO E FLUSH NÃO PERDE IDS
+
+import sqlite3
+
+import pytest
+
+from state_store import StateStore
+
+
+class Boom(Exception):
+    pass
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    yield store
+    store.close()
+
+
+def reopen(store):
+    return StateStore(store.db_path)
+
+
+def test_watermark_rolled_back_by_outer_transaction_is_saved_again(store):
+    with pytest.raises(Boom):
+        with store.transaction():
+            store.save_watermarks("bot", {"u1": 10})   # Transação aninhada
+            raise Boom()
+
+    assert reopen(store).load_watermarks("bot") == {}
+    # O cache não pode "lembrar" do valor desfeito e pular o save
+    store.save_watermarks("bot", {"u1": 10})
+    assert reopen(store).load_watermarks("bot") == {"u1": 10}
+
+
+def test_counters_and_usage_rolled_back_are_saved_again(store):
+    with pytest.raises(Boom):
+        with store.transaction():
+            store.save_counters("bot", {"stats": {"replies": 3}})
+            store.save_usage("bot", {"gpt-4o-mini": {"uses": 2, "tokens": 50}})
+            raise Boom()
+
+    store.save_counters("bot", {"stats": {"replies": 3}})
+    store.save_usage("bot", {"gpt-4o-mini": {"uses": 2, "tokens": 50}})
+    other = reopen(store)
+    assert other.load_counters("bot") == {"stats": {"replies": 3}}
+    assert other.load_usage("bot") == {"gpt-4o-mini": {"uses": 2, "tokens": 50}}
+
+
+def test_committed_values_are_cached(store):
+    with store.transaction():
+        store.save_watermarks("bot", {"u1": 10})
+    assert store._watermark_cache["bot"] == {"u1": 10}
+
+    store.save_counters("bot", {"a": 1})
+    store.save_counters("bot", {})   # Removido do dicionário -> removido da tabela
+    assert reopen(store).load_counters("bot") == {}
+
+
+def test_flush_keeps_pending_ids_when_insert_fails(store):
+    store.add_processed_id("bot", 1, seen_at=1.0)
+    store.add_processed_id("bot", 2, seen_at=2.0)
+
+    # Outra conexão segura a trava de escrita: o BEGIN IMMEDIATE falha
+    store._conn.execute("PRAGMA busy_timeout=0")
+    blocker = sqlite3.connect(store.db_path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    blocker.execute("ROLLBACK")
+    blocker.close()
+
+    assert [i for _, i, _ in store._pending_ids] == [1, 2]
+    store.flush()
+    assert store.load_processed_ids("bot") == [(1, 1.0), (2, 2.0)]
+
+
+def test_flush_inside_rolled_back_transaction_requeues_ids(store):
+    store.add_processed_id("bot", 7, seen_at=7.0)
+    with pytest.raises(Boom):
+        with store.transaction():
+            store.flush()
+            raise Boom()
+
+    assert store.load_processed_ids("bot") == [(7, 7.0)]
@@ -0,0 +1,195 @@
+# tests/test_stream_manager.py
+# FILTERED STREAM - REGRAS, DIFERENÇA, BACKOFF, BACKFILL E WATERMARK SÓ SOBRE TWEETS TRATADOS
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from keyword_prompts_improved import prompts_com_aliases as improved_prompts
+from state_store import StateStore
+from stream_manager import (DELIVERY_DEFERRED, RATE_LIMITED_BACKOFF_BASE_SECONDS, STREAM_WATERMARK_KEY,
+                            ExponentialBackoff, StreamManager, build_stream_rules, diff_rules, quote_keyword)
+
+
+class IdleStream:
+    """Stream falso sem conexão: os testes chamam deliver() direto"""
+
+    def __init__(self, manager, bearer_token):
+        self.manager = manager
+
+    def get_rules(self):
+        return SimpleNamespace(data=[])
+
+    def disconnect(self):
+        pass
+
+
+class FakeSearch:
+    """search_recent_tweets com os tweets publicados acima do since_id"""
+
+    def __init__(self, published):
+        self.published = published
+        self.calls = []
+
+    def search_recent_tweets(self, query, since_id, **params):
+        self.calls.append(since_id)
+        return SimpleNamespace(data=[tweet(i) for i in self.published if i > since_id], meta={})
+
+
+class FlakyStream:
+    """Stream falso com três sessões: cai depois da primeira e (com 429) depois da segunda"""
+
+    def __init__(self, manager, bearer_token):
+        self.manager = manager
+        self.installed = [SimpleNamespace(id="9", value="(velha) (from:1)")]
+        self.sessions = [[101, 102], [104], []]
+
+    def get_rules(self):
+        return SimpleNamespace(data=list(self.installed))
+
+    def add_rules(self, new_rules):
+        self.installed += [SimpleNamespace(id=r.value, value=r.value) for r in new_rules]
+
+    def delete_rules(self, ids):
+        self.installed = [r for r in self.installed if r.id not in ids]
+
+    def filter(self, tweet_fields):
+        self.manager.on_connect()
+        tweets = self.sessions.pop(0)
+        for tweet_id in tweets:
+            self.manager.deliver(tweet(tweet_id), source="stream")
+        if not self.sessions:
+            self.manager.running = False
+        elif tweets == [104]:
+            self.manager.on_request_error(429)
+
+    def disconnect(self):
+        pass
+
+
+def tweet(tweet_id):
+    return SimpleNamespace(id=tweet_id, author_id=1)
+
+
+def make_manager(on_tweet, **kwargs):
+    return StreamManager("token", on_tweet, ["pix"], ["1"], stream_factory=IdleStream, **kwargs)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    yield store
+    store.close()
+
+
+def test_rules_cover_every_keyword_and_account_within_length_limit():
+    # 73 palavras-chave x 19 contas
+    keywords = sorted({kw.lower() for group in improved_prompts for kw in group})
+    authors = [str(1_000_000_000 + i * 7919) for i in range(19)]
+    rules = build_stream_rules(keywords, authors, 512)
+
+    assert all(len(rule) <= 512 for rule in rules), [len(rule) for rule in rules]
+    covered = {(kw, author) for rule in rules for kw in keywords for author in authors
+               if quote_keyword(kw) in rule.split(") (")[0] and f"from:{author}" in rule}
+    assert len(covered) == len(keywords) * len(authors)
+    assert quote_keyword("Nikolas Ferreira") == '"nikolas ferreira"'
+
+
+def test_diff_keeps_installed_rules_and_removes_stale_ones():
+    rules = build_stream_rules(["pix", "inflação", "banco central"], ["1", "2"], 50)
+    assert len(rules) > 1
+    installed = [SimpleNamespace(id="1", value=rules[0]), SimpleNamespace(id="2", value="(velha) (from:1)")]
+
+    to_add, to_delete = diff_rules(rules, installed)
+    assert to_add == rules[1:] and to_delete == ["2"]
+
+
+def test_backoff_grows_to_cap_and_429_starts_at_a_minute():
+    backoff = ExponentialBackoff(5, 320, random.Random(1))
+    ceilings = [min(320, 5 * 2 ** n) for n in range(8)]
+    assert all(c / 2 <= backoff.next() <= c for c in ceilings)
+    backoff.reset()
+    assert 30 <= backoff.next(RATE_LIMITED_BACKOFF_BASE_SECONDS) <= 60
+
+
+def test_reconnects_backfill_the_gap_without_duplicates():
+    waits, received = [], []
+    # 103 e 105 só existem na lacuna entre as sessões
+    manager = StreamManager("token", lambda t: received.append(t.id), ["pix"], ["1"],
+                            search_client=FakeSearch([102, 103, 104, 105]), sleep=waits.append,
+                            clock=lambda: 0.0, stream_factory=FlakyStream)
+    manager.run()
+
+    assert [r.value for r in manager.stream.installed] == manager.rules
+    assert received == [101, 102, 103, 104, 105]
+    assert manager.last_id == 105 and len(waits) == 2
+    assert 2.5 <= waits[0] <= 5 and 60 <= waits[1] <= 120, waits   # 2ª queda: 429, base de 60s
+    assert manager.stats["backfill_tweets"] == 3 and manager.stats["stream_tweets"] == 2
+
+
+def test_restart_with_rules_already_installed_syncs_nothing():
+    manager = StreamManager("token", lambda t: None, ["pix"], ["1"], stream_factory=FlakyStream)
+    manager.stream.installed = [SimpleNamespace(id="r", value=rule) for rule in manager.rules]
+    assert manager.sync_rules() == (0, 0)
+
+
+def test_refused_tweet_holds_watermark_and_comes_back_in_backfill(store):
+    refuse = {102}
+    handled = []
+
+    def on_tweet(t):
+        if t.id in refuse:
+            return False   # Ex: cota esgotada
+        handled.append(t.id)
+
+    manager = make_manager(on_tweet, search_client=FakeSearch([101, 102, 103]),
+                           state_store=store, scope="smart_bot")
+    for tweet_id in (101, 102, 103):
+        manager.deliver(tweet(tweet_id))
+
+    assert handled == [101, 103]
+    assert manager.last_id == 101
+    assert store.load_watermarks("smart_bot") == {STREAM_WATERMARK_KEY: 101}
+    assert manager.get_stats()["refused"] == 1
+
+    # Reconexão: o backfill parte do watermark e reentrega só o recusado
+    refuse.clear()
+    manager.backfill()
+    assert manager.search_client.calls == [101]
+    assert handled == [101, 103, 102]
+    assert manager.last_id == 103
+
+
+def test_deferred_tweets_advance_watermark_only_when_acked():
+    manager = make_manager(lambda t: DELIVERY_DEFERRED)
+    manager.deliver(tweet(5))
+    manager.deliver(tweet(6))
+    manager.deliver(tweet(6))   # Ainda na fila: não é entregue de novo
+
+    assert manager.last_id is None
+    manager.ack(6)
+    assert manager.last_id == 4
+    manager.ack(5)
+    assert manager.last_id == 6
+
+    manager.deliver(tweet(7))
+    manager.refuse(7)
+    assert manager.last_id == 6
+    manager.deliver(tweet(7))
+    manager.ack(7)
+    assert manager.last_id == 7
+
+
+def test_handler_error_is_not_retried():
+    calls = []
+
+    def on_tweet(t):
+        calls.append(t.id)
+        raise RuntimeError("falhou")
+
+    manager = make_manager(on_tweet)
+    manager.deliver(tweet(9))
+    manager.deliver(tweet(9))
+    assert calls == [9]
+    assert manager.last_id == 9
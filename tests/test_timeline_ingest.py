@@ -0,0 +1,87 @@
+# tests/test_timeline_ingest.py
+# INGESTÃO EM LOTE - QUERIES "from:", PAGINAÇÃO E WATERMARK SEM BURACOS
+
+from types import SimpleNamespace
+
+import pytest
+
+from timeline_ingest import QUERY_SUFFIX, SearchTimelineIngestor, build_from_queries
+
+
+def tweet(tweet_id, author_id):
+    return SimpleNamespace(id=tweet_id, author_id=author_id, text=f"tweet {tweet_id}")
+
+
+class FakeSearchClient:
+    """search_recent_tweets paginado, do mais novo para o mais antigo, como a API"""
+
+    def __init__(self, tweets, page_size=2):
+        self.tweets = sorted(tweets, key=lambda t: t.id, reverse=True)
+        self.page_size = page_size
+        self.calls = []
+
+    def search_recent_tweets(self, query, max_results, tweet_fields, since_id=None, next_token=None):
+        self.calls.append({"query": query, "since_id": since_id, "next_token": next_token})
+        authors = {clause.split(":")[1] for clause in query.split(")")[0].strip("(").split(" OR ")}
+        matching = [t for t in self.tweets
+                    if str(t.author_id) in authors and (since_id is None or t.id > since_id)]
+        start = int(next_token or 0)
+        page = matching[start:start + self.page_size]
+        meta = {"next_token": str(start + self.page_size)} if start + self.page_size < len(matching) else {}
+        return SimpleNamespace(data=page or None, meta=meta)
+
+
+def test_build_from_queries_respects_length_limit():
+    ids = [str(1000 + i) for i in range(10)]
+    queries = build_from_queries(ids, max_query_length=60)
+
+    assert all(len(q) <= 60 for q in queries)
+    assert len(queries) > 1
+    assert all(q.endswith(QUERY_SUFFIX) for q in queries)
+    joined = " ".join(queries)
+    assert all(f"from:{user_id}" in joined for user_id in ids)
+
+
+def test_build_from_queries_rejects_account_that_never_fits():
+    with pytest.raises(ValueError):
+        build_from_queries(["123456789"], max_query_length=20)
+
+
+def test_fetch_groups_by_author_in_chronological_order():
+    client = FakeSearchClient([tweet(5, "a"), tweet(3, "b"), tweet(4, "a"), tweet(1, "a")], page_size=10)
+    ingestor = SearchTimelineIngestor(client, ["a", "b"])
+
+    by_author = ingestor.fetch(since_id=2)
+
+    assert [t.id for t in by_author["a"]] == [4, 5]
+    assert [t.id for t in by_author["b"]] == [3]
+    assert ingestor.watermark(by_author, 2) == 5
+
+
+def test_fetch_pages_until_next_token_runs_out():
+    client = FakeSearchClient([tweet(i, "a") for i in range(1, 12)], page_size=2)
+    ingestor = SearchTimelineIngestor(client, ["a"])
+
+    by_author = ingestor.fetch(since_id=None)
+
+    assert [t.id for t in by_author["a"]] == list(range(1, 12))
+    assert ingestor.requests_made == 6
+    assert not ingestor.truncated
+    assert ingestor.watermark(by_author, None) == 11
+
+
+def test_truncated_fetch_does_not_advance_watermark():
+    client = FakeSearchClient([tweet(i, "a") for i in range(11, 21)], page_size=2)
+    ingestor = SearchTimelineIngestor(client, ["a"], max_pages_per_query=2)
+
+    by_author = ingestor.fetch(since_id=10)
+
+    # Só os 4 mais novos vieram; 11-16 ainda não foram buscados
+    assert [t.id for t in by_author["a"]] == [17, 18, 19, 20]
+    assert ingestor.truncated
+    assert ingestor.watermark(by_author, 10) == 10
+
+
+def test_empty_fetch_keeps_previous_watermark():
+    ingestor = SearchTimelineIngestor(FakeSearchClient([]), ["a"])
+    assert ingestor.watermark(ingestor.fetch(since_id=42), 42) == 42
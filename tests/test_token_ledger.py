@@ -0,0 +1,65 @@
+# tests/test_token_ledger.py
+# ORÇAMENTO DIÁRIO - TOKENS DE HOJE SOMADOS ENTRE PROCESSOS QUE GRAVAM O MESMO LOG
+
+import time
+
+import pytest
+
+from token_ledger import TokenLedger
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "token_ledger.jsonl")
+
+
+def test_tokens_today_sees_calls_recorded_by_other_processes(path):
+    smart, mention = TokenLedger(path), TokenLedger(path)   # Dois bots, mesmo arquivo
+    smart.record("gpt-4o-mini", 100, 20, bot="smart_bot")
+    assert smart.tokens_today() == 120
+    assert mention.tokens_today() == 120
+
+    mention.record("gpt-4o-mini", 300, 50, bot="mention_bot")
+    smart.record("gpt-4o-mini", 10, 5, bot="smart_bot")
+    assert smart.tokens_today() == mention.tokens_today() == 485
+
+
+def test_yesterday_is_ignored(path):
+    ledger = TokenLedger(path)
+    ledger.record("gpt-4o-mini", 1000, 1000, timestamp=time.time() - 2 * 86400)
+    ledger.record("gpt-4o-mini", 7, 3)
+    assert ledger.tokens_today() == 10
+
+
+def test_unchanged_log_is_not_read_again(path):
+    ledger = TokenLedger(path)
+    ledger.record("gpt-4o-mini", 40, 2)
+    assert ledger.tokens_today() == 42
+    offset = ledger._read_offset
+    assert ledger.tokens_today() == 42 and ledger._read_offset == offset
+
+
+def test_partial_line_waits_for_the_writer_and_truncation_restarts(path):
+    ledger = TokenLedger(path)
+    ledger.record("gpt-4o-mini", 5, 5)
+    now = int(time.time())
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"ts":%d,"m":"gpt-4o-mini","pt":30,' % now)   # Outro processo no meio da escrita
+    assert ledger.tokens_today() == 10
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('"ct":3,"usd":0}\n')
+    assert ledger.tokens_today() == 43
+
+    open(path, "w").close()   # Log truncado (rotação manual)
+    ledger.record("gpt-4o-mini", 1, 1)
+    assert ledger.tokens_today() == 2
+
+
+def test_tokens_today_can_exclude_bots(path):
+    ledger = TokenLedger(path)
+    ledger.record("gpt-4o", 500, 100, bot="sentiment_monitor")
+    ledger.record("gpt-4o-mini", 10, 5, bot="smart_bot")
+    ledger.record("gpt-4o-mini", 1, 1)
+
+    assert ledger.tokens_today() == 617
+    assert ledger.tokens_today(exclude_bots=["sentiment_monitor"]) == 17
@@ -0,0 +1,57 @@
+# tests/test_tracing.py
+# RASTREAMENTO POR TWEET - HIERARQUIA DOS SPANS, TWEET_ID, ERROS E TRACER DESLIGADO
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import tracing
+from tracing import SPAN_FETCH, SPAN_FILTER, SPAN_GENERATE, SPAN_POST, Tracer
+
+
+@pytest.fixture
+def fake_time(monkeypatch, clock):
+    # Span cronometra com time.time/perf_counter: os dois seguem o relógio falso
+    monkeypatch.setattr(tracing, "time", SimpleNamespace(time=clock, perf_counter=clock))
+    return clock
+
+
+def test_spans_share_the_cycle_trace_and_record_errors(fake_time, tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    tracer = Tracer(path)
+    with tracer.cycle("smart_bot") as cycle:
+        with tracer.span(SPAN_FETCH, endpoint="GET /2/users/:id/tweets"):
+            fake_time.sleep(0.25)
+        with tracer.span(SPAN_FILTER, tweet_id="42"):
+            pass
+        with tracer.span(SPAN_GENERATE, tweet_id="42") as span:
+            span.set(model="gpt-4o-mini")
+        with pytest.raises(RuntimeError):
+            with tracer.span(SPAN_POST, tweet_id="42"):
+                raise RuntimeError("403")
+    with tracer.cycle("smart_bot"):
+        pass
+    tracer.close()
+
+    with open(path, encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f]
+    by_name = {s["name"]: s for s in spans[:5]}
+    assert [s["name"] for s in spans] == ["fetch", "filter", "generate", "post", "cycle", "cycle"]
+    assert all(s["trace"] == cycle.span_id and s["parent"] == cycle.span_id for s in spans[:4])
+    assert spans[5]["trace"] != cycle.span_id and spans[5]["parent"] is None
+    assert by_name["fetch"]["dur_ms"] == 250 and by_name["cycle"]["dur_ms"] == 250
+    assert by_name["generate"]["model"] == "gpt-4o-mini"
+    assert by_name["post"]["error"] == "RuntimeError" and by_name["post"]["tweet_id"] == "42"
+    assert by_name["cycle"]["bot"] == "smart_bot"
+
+
+def test_disabled_tracer_reuses_one_noop_span_and_writes_nothing(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    disabled = Tracer(str(path), enabled=False)
+
+    with disabled.cycle("smart_bot") as cycle, disabled.span(SPAN_FILTER, tweet_id="42") as span:
+        span.set(model="x")
+    assert span is cycle is tracing._NOOP
+    disabled.close()
+    assert not path.exists()
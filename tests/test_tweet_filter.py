@@ -0,0 +1,47 @@
+# tests/test_tweet_filter.py
+# PRÉ-FILTRO - BLACKLIST POR SUBSTRING (PLURAIS E FLEXÕES) E PALAVRAS-CHAVE POR PALAVRA INTEIRA
+
+import pytest
+
+from keyword_matcher import MATCH_SUBSTRING, KeywordMatcher
+from keyword_prompts_improved import BOT_CONFIG
+from tweet_filter import REJECT_BLACKLIST, REJECT_NO_KEYWORD, TweetFilter
+
+PROMPTS = {("inflação", "jair"): {"prompt": "Comente: {tweet_text}", "priority": "high"}}
+
+
+@pytest.fixture
+def tweet_filter():
+    return TweetFilter(PROMPTS, BOT_CONFIG)
+
+
+@pytest.mark.parametrize("text", [
+    "A inflação e as crianças que passam fome no país",
+    "Mais mortes causadas pela inflação de alimentos",
+    "Inflação atinge menores de idade no mercado de trabalho",
+    "Suicidio e inflação, um debate que ninguém quer ter",
+])
+def test_blacklist_rejects_plurals_inflections_and_missing_accents(tweet_filter, text):
+    verdict = tweet_filter.evaluate(text)
+    assert not verdict.accepted
+    assert verdict.reason == REJECT_BLACKLIST
+
+
+def test_clean_tweet_with_keyword_is_accepted(tweet_filter):
+    verdict = tweet_filter.evaluate("A inflação de setembro veio acima do esperado")
+    assert verdict.accepted
+    assert verdict.best_match.keyword == "inflação"
+
+
+def test_keywords_still_require_whole_words(tweet_filter):
+    verdict = tweet_filter.evaluate("Jairzinho marcou três gols no clássico de ontem")
+    assert verdict.reason == REJECT_NO_KEYWORD
+
+
+def test_substring_flag_is_per_prompt():
+    matcher = KeywordMatcher({
+        ("jair",): {"prompt": "", "priority": "high"},
+        ("morte",): {"prompt": "", "priority": "critical", MATCH_SUBSTRING: True},
+    })
+    assert [m.keyword for m in matcher.find_all("jairzinho e as mortes")] == ["morte"]
+    assert [m.keyword for m in matcher.find_all("jair e a morte")] == ["morte", "jair"]
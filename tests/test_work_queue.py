@@ -0,0 +1,80 @@
+# tests/test_work_queue.py
+# FILA LIMITADA COM PRIORIDADE - POLÍTICAS DE DESCARTE, EXPIRAÇÃO E POOL DE WORKERS
+
+import time
+
+from work_queue import (DROP_EVICTED, DROP_EXPIRED, DROP_FULL, DROP_LOWEST, DROP_NEW, DROP_OLDEST,
+                        BoundedWorkQueue, WorkerPool)
+
+
+def drain(queue, count):
+    return [queue.get(0).payload for _ in range(count)]
+
+
+def test_priority_then_arrival_order(clock):
+    queue = BoundedWorkQueue(10, clock=clock)
+    for payload, priority in [("a", "low"), ("b", "critical"), ("c", "high"), ("d", "critical"), ("e", None)]:
+        assert queue.put(payload, priority)
+    assert drain(queue, 5) == ["b", "d", "c", "a", "e"]
+
+
+def test_drop_lowest_evicts_the_lower_priority_item(clock):
+    queue = BoundedWorkQueue(2, DROP_LOWEST, clock=clock)
+    queue.put("m", "medium")
+    queue.put("l", "low")
+    assert queue.put("h", "high")       # Expulsa o "low"
+    assert not queue.put("l2", "low")   # O novo "low" é que sai
+    assert drain(queue, 2) == ["h", "m"]
+    assert queue.get_stats()["drops_by_reason"] == {DROP_EVICTED: 1, DROP_FULL: 1}
+
+
+def test_drop_oldest_and_drop_new(clock):
+    queue = BoundedWorkQueue(2, DROP_OLDEST, clock=clock)
+    for payload in "xyz":
+        queue.put(payload, "critical" if payload == "x" else "low")
+    assert drain(queue, 2) == ["y", "z"]
+
+    queue = BoundedWorkQueue(1, DROP_NEW, clock=clock)
+    assert queue.put("1") and not queue.put("2", "critical")
+
+
+def test_stale_items_expire_on_get_and_lag_is_measured(clock):
+    queue = BoundedWorkQueue(5, max_age_seconds=60, clock=clock)
+    queue.put("velho")
+    clock.now += 61
+    queue.put("novo")
+    clock.now += 5
+    assert queue.get(0).payload == "novo"
+    assert queue.get(0) is None
+    stats = queue.get_stats()
+    assert stats["drops_by_reason"] == {DROP_EXPIRED: 1}
+    assert stats["lag_max_seconds"] == 5
+
+
+def test_pool_producer_does_not_wait_for_slow_handler_and_stop_drains():
+    done = []
+    pool = WorkerPool(BoundedWorkQueue(50), lambda payload: (time.sleep(0.05), done.append(payload)),
+                      workers=3).start()
+    started = time.perf_counter()
+    for i in range(30):
+        pool.queue.put(i)
+    enqueue_time = time.perf_counter() - started
+    pool.stop(timeout=5)
+
+    assert enqueue_time < 0.05
+    assert sorted(done) == list(range(30))
+    assert pool.get_stats()["processed"] == 30
+
+
+def test_on_drop_reports_evicted_and_expired_items(clock):
+    dropped = []
+    queue = BoundedWorkQueue(1, DROP_LOWEST, max_age_seconds=10, clock=clock,
+                             on_drop=lambda payload, reason: dropped.append((payload, reason)))
+    queue.put("low", "low")
+    assert queue.put("high", "high")        # "low" sai da fila: avisado
+    assert not queue.put("low2", "low")     # Recusado no put: só o retorno False
+    assert dropped == [("low", DROP_EVICTED)]
+
+    clock.sleep(11)
+    assert queue.get(0) is None
+    assert dropped == [("low", DROP_EVICTED), ("high", DROP_EXPIRED)]
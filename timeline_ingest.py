@@ -0,0 +1,185 @@
+# timeline_ingest.py
+# INGESTÃO EM LOTE: VÁRIOS "from:" POR BUSCA EM VEZ DE UMA CHAMADA POR CONTA MONITORADA
+
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+import tweepy
+
+from reply_gate import REPLY_TWEET_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Limite de caracteres da query do search_recent_tweets (512 no acesso básico)
+DEFAULT_MAX_QUERY_LENGTH = 512
+
+# Apenas os campos que o pipeline realmente lê (autor e os do portão de resposta)
+SEARCH_TWEET_FIELDS = REPLY_TWEET_FIELDS
+
+# Equivalente ao exclude=["retweets", "replies"] do get_users_tweets
+QUERY_SUFFIX = " -is:retweet -is:reply"
+
+
+def build_from_queries(user_ids: List[str], max_query_length: int = DEFAULT_MAX_QUERY_LENGTH,
+                       suffix: str = QUERY_SUFFIX) -> List[str]:
+    """
+    Agrupa as contas no menor número de queries "(from:a OR from:b ...) -is:retweet"
+    que cabem no limite de tamanho.
+    """
+    queries = []
+    clauses: List[str] = []
+    # "(" + ")" + sufixo
+    overhead = 2 + len(suffix)
+
+    def flush():
+        if clauses:
+            queries.append(f"({' OR '.join(clauses)}){suffix}")
+
+    length = overhead
+    for user_id in user_ids:
+        clause = f"from:{user_id}"
+        extra = len(clause) + (4 if clauses else 0)  # " OR "
+        if overhead + len(clause) > max_query_length:
+            raise ValueError(f"Conta {user_id} não cabe em uma query de {max_query_length} caracteres")
+        if length + extra > max_query_length:
+            flush()
+            clauses = []
+            length = overhead
+            extra = len(clause)
+        clauses.append(clause)
+        length += extra
+
+    flush()
+    return queries
+
+
+class SearchTimelineIngestor:
+    """
+    Busca os tweets novos de todas as contas monitoradas com poucas chamadas
+    a search_recent_tweets, usando um único since_id compartilhado.
+
+    Para 19 contas são 1-2 requisições por ciclo em vez de 19 get_users_tweets
+    com sleeps fixos entre elas.
+    """
+
+    def __init__(self, client: tweepy.Client, user_ids: List[str],
+                 max_query_length: int = DEFAULT_MAX_QUERY_LENGTH,
+                 max_pages_per_query: Optional[int] = None,
+                 api_call: Optional[Callable] = None):
+        """
+        Args:
+            max_pages_per_query: limite opcional de páginas por query; por padrão
+                pagina até o next_token acabar, para não deixar buracos atrás do since_id
+            api_call: wrapper opcional usado para executar as chamadas, com a
+                assinatura api_call(metodo, **params) (ex: make_optimized_api_call)
+        """
+        self.client = client
+        self.api_call = api_call or (lambda method, **params: method(**params))
+        self.user_ids = [str(user_id) for user_id in user_ids]
+        self.max_query_length = max_query_length
+        self.max_pages_per_query = max_pages_per_query
+        self.queries = build_from_queries(self.user_ids, max_query_length)
+
+        self.requests_made = 0
+        self.tweets_fetched = 0
+        # Última busca parou no limite de páginas com tweets mais antigos por buscar
+        self.truncated = False
+
+    def fetch(self, since_id: Optional[int] = None, user_ids: Optional[List[str]] = None) -> Dict[str, List]:
+        """
+        Retorna {user_id: [tweets em ordem cronológica]} com tudo que é mais
+        novo que since_id. `user_ids` restringe a busca a um subconjunto das contas.
+        """
+        queries = self.queries if user_ids is None else build_from_queries(
+            [str(user_id) for user_id in user_ids], self.max_query_length
+        )
+        by_author = defaultdict(list)
+        self.truncated = False
+
+        for query in queries:
+            for tweet in self._search(query, since_id):
+                by_author[str(tweet.author_id)].append(tweet)
+
+        for tweets in by_author.values():
+            tweets.sort(key=lambda tweet: int(tweet.id))
+
+        logger.info(f"📥 Busca em lote: {sum(len(t) for t in by_author.values())} tweets de "
+                    f"{len(by_author)} contas em {len(queries)} queries")
+        return dict(by_author)
+
+    def _search(self, query: str, since_id: Optional[int]):
+        next_token = None
+        pages = 0
+        while True:
+            if self.max_pages_per_query and pages >= self.max_pages_per_query:
+                # Resultados vêm do mais novo para o mais antigo: o que falta é
+                # justamente o trecho logo depois do since_id
+                self.truncated = True
+                logger.warning(f"⚠️  Busca truncada em {pages} páginas, tweets mais antigos ficaram "
+                               f"de fora; watermark mantido em {since_id}")
+                break
+            params = {
+                "query": query,
+                "max_results": 100,
+                "tweet_fields": SEARCH_TWEET_FIELDS,
+            }
+            if since_id:
+                params["since_id"] = since_id
+            if next_token:
+                params["next_token"] = next_token
+
+            try:
+                response = self.api_call(self.client.search_recent_tweets, **params)
+            except tweepy.BadRequest as e:
+                # since_id mais antigo que a janela de 7 dias da busca recente
+                if since_id and "since_id" in str(e):
+                    logger.warning("⚠️  since_id fora da janela da busca recente, buscando sem ele")
+                    since_id = None
+                    continue
+                raise
+            self.requests_made += 1
+            pages += 1
+
+            if response.data:
+                self.tweets_fetched += len(response.data)
+                yield from response.data
+
+            next_token = (response.meta or {}).get("next_token")
+            if not next_token:
+                break
+
+    def watermark(self, tweets_by_author: Dict[str, List], since_id: Optional[int]) -> Optional[int]:
+        """
+        Próximo since_id seguro para a última busca: o maior ID recebido, ou o
+        since_id anterior se a busca foi truncada (há tweets não buscados abaixo
+        do mais antigo recebido, então nada pode ser dado como visto).
+        """
+        if self.truncated:
+            return since_id
+        newest = self.newest_id(tweets_by_author)
+        return max(int(since_id or 0), newest) if newest else since_id
+
+    @staticmethod
+    def settled_watermark(covered_id: Optional[int], tweets_by_author: Dict[str, List],
+                          handled_through: Dict[str, int]) -> Optional[int]:
+        """
+        Since_id compartilhado depois do processamento: covered_id, limitado a
+        logo abaixo do tweet mais antigo que cada autor ainda não tratou (cota
+        esgotada, limite por ciclo, erro), para que ele volte na próxima busca.
+
+        `handled_through` é o watermark por autor após o processamento.
+        """
+        watermark = covered_id
+        for author_id, tweets in tweets_by_author.items():
+            done = int(handled_through.get(author_id) or 0)
+            pending = [int(tweet.id) for tweet in tweets if int(tweet.id) > done]
+            if pending and watermark is not None:
+                watermark = min(watermark, min(pending) - 1)
+        return watermark
+
+    @staticmethod
+    def newest_id(tweets_by_author: Dict[str, List]) -> Optional[int]:
+        """Maior ID entre os tweets recebidos (novo since_id compartilhado)"""
+        ids = [int(tweet.id) for tweets in tweets_by_author.values() for tweet in tweets]
+        return max(ids) if ids else None
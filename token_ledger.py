@@ -0,0 +1,239 @@
+# token_ledger.py
+# LIVRO-RAZÃO DE TOKENS E CUSTO - USO REAL POR CHAMADA, TABELA DE PREÇOS E CONSOLIDAÇÃO POR DIA/PALAVRA-CHAVE
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEDGER_PATH = "token_ledger.jsonl"
+
+# Preço em US$ por 1 milhão de tokens (entrada, saída). Valores de referência:
+# confira a página de preços de cada provedor ao ajustar.
+PRICE_TABLE = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "grok-1": (5.00, 15.00),
+}
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_encodings: Dict[str, object] = {}
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Conta tokens com tiktoken quando instalado; senão estima ~4 caracteres por token"""
+    if tiktoken is not None:
+        encoding = _encodings.get(model)
+        if encoding is None:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+            _encodings[model] = encoding
+        return len(encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def model_prices(model: str) -> Optional[tuple]:
+    """Preços do modelo; aceita nomes versionados ("gpt-4o-mini-2024-07-18")"""
+    if model in PRICE_TABLE:
+        return PRICE_TABLE[model]
+    prefixes = [name for name in PRICE_TABLE if model.startswith(name)]
+    return PRICE_TABLE[max(prefixes, key=len)] if prefixes else None
+
+
+def price_call(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Custo em US$ de uma chamada (0 para modelos fora da tabela)"""
+    input_price, output_price = model_prices(model) or (0.0, 0.0)
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+def _empty_rollup() -> Dict:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "total_tokens": 0, "cached_tokens": 0, "cost_usd": 0.0, "estimated_calls": 0}
+
+
+class TokenLedger:
+    """
+    Registro append-only de cada chamada ao LLM, uma linha JSON compacta por evento:
+
+        {"ts": 1718000000, "bot": "smart_bot", "m": "gpt-4o-mini", "kw": "lula",
+         "pt": 42, "ct": 18, "usd": 1.7e-05, "est": 0, "ms": 850, "r": "default"}
+
+    pt/ct vêm do payload de usage do provedor; est=1 marca chamadas cujo uso
+    foi estimado localmente; cpt (quando presente) são os tokens do prompt
+    servidos pelo cache de prefixo do provedor; ms é a latência e r o motivo
+    da escolha do modelo (model_router). As consolidações por dia, palavra-chave, modelo, bot e
+    motivo são calculadas a partir do log.
+    """
+
+    def __init__(self, path: str = DEFAULT_LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._unknown_models = set()
+        
+        # Tokens do dia corrente, para o orçamento diário sem reler o log a cada chamada:
+        # só os bytes acrescentados desde a última leitura (por qualquer processo) são lidos
+        self._today: Optional[date] = None
+        self._today_tokens = Counter()   # Por bot
+        self._read_offset = 0
+        self._read_signature: Optional[tuple] = None   # (inode, tamanho, mtime) na última leitura
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int,
+               bot: Optional[str] = None, keyword: Optional[str] = None,
+               estimated: bool = False, timestamp: Optional[float] = None,
+               latency: Optional[float] = None, route: Optional[str] = None,
+               cached_tokens: int = 0) -> Dict:
+        """Acrescenta uma chamada ao log e devolve o evento gravado"""
+        if model_prices(model) is None and model not in self._unknown_models:
+            self._unknown_models.add(model)
+            logger.warning(f"💲 Modelo {model} sem preço em PRICE_TABLE, custo registrado como 0")
+
+        event = {
+            "ts": int(timestamp or time.time()),
+            "bot": bot,
+            "m": model,
+            "kw": keyword,
+            "pt": int(prompt_tokens),
+            "ct": int(completion_tokens),
+            "cpt": int(cached_tokens) or None,
+            "usd": round(price_call(model, prompt_tokens, completion_tokens), 8),
+            "est": int(bool(estimated)),
+            "ms": int(latency * 1000) if latency is not None else None,
+            "r": route
+        }
+        # Campos vazios ficam fora da linha para manter o log compacto
+        event = {key: value for key, value in event.items() if value is not None}
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        return event
+
+    def record_response(self, response, bot: Optional[str] = None, keyword: Optional[str] = None,
+                        route: Optional[str] = None) -> Dict:
+        """Registra um llm_client.ChatResponse"""
+        return self.record(response.model, response.prompt_tokens, response.completion_tokens,
+                           bot=bot, keyword=keyword, estimated=response.usage_estimated,
+                           latency=response.latency, route=route,
+                           cached_tokens=response.cached_tokens)
+
+    def tokens_today(self, exclude_bots: Iterable[str] = ()) -> int:
+        """
+        Tokens gastos hoje pelos bots que gravam neste log, menos `exclude_bots`.
+
+        Com o arquivo inalterado (mesmo inode, tamanho e mtime) devolve o total
+        em memória; se outro processo acrescentou linhas, lê só o trecho novo.
+        Virada do dia, arquivo truncado ou substituído recomeçam do início.
+        """
+        today = date.today()
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+                signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            except FileNotFoundError:
+                signature = None
+            if self._today == today and signature == self._read_signature:
+                return self._sum_tokens(exclude_bots)
+
+            same_file = (signature is not None and self._read_signature is not None
+                         and signature[0] == self._read_signature[0] and signature[1] >= self._read_offset)
+            if self._today != today or not same_file:
+                self._today, self._today_tokens, self._read_offset = today, Counter(), 0
+            if signature is not None:
+                midnight = datetime.combine(today, datetime.min.time()).timestamp()
+                self._today_tokens.update(self._tail_tokens(since=midnight))
+            self._read_signature = signature
+            return self._sum_tokens(exclude_bots)
+
+    def _sum_tokens(self, exclude_bots: Iterable[str]) -> int:
+        excluded = set(exclude_bots)
+        return sum(tokens for bot, tokens in self._today_tokens.items() if bot not in excluded)
+
+    def _tail_tokens(self, since: float) -> Counter:
+        """Soma por bot os tokens das linhas completas após _read_offset e avança o offset"""
+        with open(self.path, "rb") as f:
+            f.seek(self._read_offset)
+            chunk = f.read()
+        complete = chunk[:chunk.rfind(b"\n") + 1]   # Linha pela metade fica para a próxima leitura
+        self._read_offset += len(complete)
+
+        tokens = Counter()
+        for line in complete.splitlines():
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if event["ts"] >= since:
+                tokens[event.get("bot")] += event["pt"] + event["ct"]
+        return tokens
+
+    def events(self, since: Optional[float] = None) -> Iterator[Dict]:
+        """Eventos do log em ordem de gravação (linhas corrompidas são ignoradas)"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if since is None or event["ts"] >= since:
+                    yield event
+
+    def summarize(self, since: Optional[float] = None) -> Dict:
+        """Totais e consolidações por dia, palavra-chave, modelo e bot"""
+        totals = _empty_rollup()
+        rollups = {name: defaultdict(_empty_rollup)
+                   for name in ("by_day", "by_keyword", "by_model", "by_bot", "by_route")}
+        model_latencies = defaultdict(list)
+
+        for event in self.events(since):
+            day = datetime.fromtimestamp(event["ts"]).date().isoformat()
+            buckets = (
+                totals,
+                rollups["by_day"][day],
+                rollups["by_keyword"][event.get("kw") or "(sem palavra-chave)"],
+                rollups["by_model"][event["m"]],
+                rollups["by_bot"][event.get("bot") or "(desconhecido)"],
+                rollups["by_route"][event.get("r") or "(sem roteador)"],
+            )
+            for bucket in buckets:
+                bucket["calls"] += 1
+                bucket["prompt_tokens"] += event["pt"]
+                bucket["completion_tokens"] += event["ct"]
+                bucket["total_tokens"] += event["pt"] + event["ct"]
+                bucket["cached_tokens"] += event.get("cpt", 0)
+                bucket["cost_usd"] += event["usd"]
+                bucket["estimated_calls"] += event.get("est", 0)
+            if "ms" in event:
+                model_latencies[event["m"]].append(event["ms"])
+
+        # Latência de cauda por modelo
+        for model, latencies in model_latencies.items():
+            latencies.sort()
+            rollups["by_model"][model]["p50_ms"] = latencies[len(latencies) // 2]
+            rollups["by_model"][model]["p95_ms"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+        return {"totals": totals, **{name: dict(rollup) for name, rollup in rollups.items()}}
+
+
+_default_ledger: Optional[TokenLedger] = None
+
+
+def get_token_ledger() -> TokenLedger:
+    """Ledger compartilhado do processo"""
+    global _default_ledger
+    if _default_ledger is None:
+        _default_ledger = TokenLedger()
+    return _default_ledger
@@ -0,0 +1,169 @@
+# tracing.py
+# RASTREAMENTO POR TWEET - SPANS DE BUSCA, FILTRO, GERAÇÃO, POSTAGEM E SLEEP EM JSONL COM ROTAÇÃO
+
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+from keyword_prompts_improved import BOT_CONFIG
+from log_setup import LazyQueueHandler, rotating_file_handler
+
+# Nomes dos spans (o analisador agrupa o caminho crítico por eles)
+SPAN_CYCLE = "cycle"
+SPAN_FETCH = "fetch"
+SPAN_FILTER = "filter"
+SPAN_GENERATE = "generate"
+SPAN_POST = "post"
+SPAN_SLEEP = "sleep"
+
+DEFAULT_TRACE_FILE = "traces.jsonl"
+
+# Span aberto na thread/contexto atual: (trace_id, span_id)
+_current: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    """Span do tracer desligado: um único objeto reutilizado, sem relógio nem escrita"""
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class SpanFormatter(logging.Formatter):
+    """O registro já é o dicionário do span: uma linha JSON por span"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, ensure_ascii=False, default=str)
+
+
+class Span:
+    """Um trecho cronometrado; filhos abertos dentro dele herdam o trace"""
+    __slots__ = ("tracer", "name", "attrs", "trace_id", "span_id", "parent_id", "started", "_start", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict, new_trace: bool):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        parent = None if new_trace else _current.get()
+        self.span_id = tracer.next_id()
+        self.trace_id = parent[0] if parent else self.span_id
+        self.parent_id = parent[1] if parent else None
+
+    def set(self, **attrs):
+        """Acrescenta atributos descobertos durante o span (ex.: modelo escolhido, tokens)"""
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set((self.trace_id, self.span_id))
+        self.started = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        _current.reset(self._token)
+        record = {
+            "trace": self.trace_id,
+            "span": self.span_id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "start": round(self.started, 6),
+            "dur_ms": round(duration_ms, 3),
+            **self.attrs
+        }
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        self.tracer.emit(record)
+        return False
+
+
+class Tracer:
+    """
+    Spans leves gravados em JSONL (uma linha por span, com trace, pai,
+    início, duração e atributos como tweet_id), pela mesma fila + arquivo
+    com rotação gzip dos logs: a thread do bot só enfileira o dicionário.
+
+    Desligado, span() devolve sempre o mesmo span vazio: uma checagem de
+    atributo e nenhum objeto criado.
+    """
+
+    def __init__(self, path: str = DEFAULT_TRACE_FILE, enabled: bool = True,
+                 max_bytes: Optional[int] = None, backup_count: Optional[int] = None):
+        self.enabled = enabled
+        self.path = path
+        self._ids = itertools.count(1)
+        self._prefix = f"{os.getpid():x}-{int(time.time()):x}"   # IDs únicos entre processos e reinícios
+        self._listener = None
+        self._logger = None
+        if enabled:
+            handler = rotating_file_handler(path, *(v for v in (max_bytes, backup_count) if v is not None))
+            handler.setFormatter(SpanFormatter())
+            log_queue = queue.SimpleQueue()
+            self._listener = logging.handlers.QueueListener(log_queue, handler)
+            self._listener.start()
+            self._handler = handler
+            self._logger = logging.getLogger(f"tracing.{id(self)}")
+            self._logger.handlers[:] = [LazyQueueHandler(log_queue)]
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False   # Spans não vão para o console nem para os logs
+
+    def next_id(self) -> str:
+        return f"{self._prefix}-{next(self._ids)}"
+
+    def span(self, name: str, **attrs):
+        """Context manager de um span filho do span atual (ou raiz, se não houver)"""
+        if not self.enabled:
+            return _NOOP
+        return Span(self, name, attrs, new_trace=False)
+
+    def cycle(self, bot: str, **attrs):
+        """Span raiz de um ciclo (ou item da fila): tudo que rodar dentro dele fica no mesmo trace"""
+        if not self.enabled:
+            return _NOOP
+        return Span(self, SPAN_CYCLE, {"bot": bot, **attrs}, new_trace=True)
+
+    def emit(self, record: Dict):
+        self._logger.info(record)
+
+    def close(self):
+        if self._listener:
+            self._listener.stop()
+            self._listener = None
+            self._handler.close()
+        self.enabled = False
+
+
+_default_tracer: Optional[Tracer] = None
+_default_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Tracer compartilhado do processo (BOT_CONFIG["tracing_enabled"] / ["tracing_file"])"""
+    global _default_tracer
+    with _default_lock:
+        if _default_tracer is None:
+            _default_tracer = Tracer(
+                BOT_CONFIG.get("tracing_file", DEFAULT_TRACE_FILE),
+                enabled=BOT_CONFIG.get("tracing_enabled", False),
+                max_bytes=BOT_CONFIG.get("log_max_bytes"),
+                backup_count=BOT_CONFIG.get("log_backup_count")
+            )
+        return _default_tracer
+
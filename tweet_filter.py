@@ -0,0 +1,123 @@
+# tweet_filter.py
+# PRÉ-FILTRO ÚNICO DE TWEETS - UMA PASSADA, VEREDITO ESTRUTURADO E CONTADORES DE REJEIÇÃO
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from keyword_matcher import MATCH_SUBSTRING, KeywordMatch, KeywordMatcher, normalize_text
+from keyword_prompts_improved import BOT_CONFIG
+
+# Motivos de rejeição, na ordem em que são avaliados
+REJECT_TOO_SHORT = "too_short"
+REJECT_RETWEET = "retweet_without_comment"
+REJECT_HASHTAGS = "too_many_hashtags"
+REJECT_MENTIONS = "too_many_mentions"
+REJECT_BLACKLIST = "blacklisted"
+REJECT_NO_KEYWORD = "no_keyword"
+
+# Marcador interno que distingue termos da blacklist das palavras-chave
+_BLACKLIST_MARKER = "__blacklist__"
+
+
+@dataclass
+class FilterVerdict:
+    """Resultado do pré-filtro para um tweet"""
+    accepted: bool
+    reason: Optional[str]
+    length: int
+    hashtag_count: int
+    mention_count: int
+    is_retweet: bool
+    blacklist_hits: List[str] = field(default_factory=list)
+    matches: List[KeywordMatch] = field(default_factory=list)
+
+    @property
+    def best_match(self) -> Optional[KeywordMatch]:
+        """Palavra-chave de maior prioridade encontrada"""
+        return self.matches[0] if self.matches else None
+
+
+class TweetFilter:
+    """
+    Pipeline de filtros compilado a partir do BOT_CONFIG.
+
+    Normaliza o texto uma única vez (minúsculas e sem acentos) e, em uma só
+    passada pelo autômato, obtém palavras-chave, termos da blacklist e as
+    contagens de hashtags e menções. Tweets são descartados aqui, antes de
+    qualquer token de LLM ser gasto.
+    """
+
+    def __init__(self, prompts: Optional[Dict] = None, config: Optional[Dict] = None):
+        if prompts is None:
+            from keyword_prompts_improved import prompts_com_aliases as prompts
+        self.config = config or BOT_CONFIG
+
+        self.min_length = self.config.get("min_tweet_length", 20)
+        self.max_hashtags = self.config.get("max_hashtags_allowed", 5)
+        self.max_mentions = self.config.get("max_mentions_allowed", 3)
+
+        # Blacklist entra no mesmo autômato (por último, para prevalecer em conflitos).
+        # Casa como substring, como o filtro original: "morte" também barra "mortes"
+        combined = dict(prompts)
+        blacklist = tuple(self.config.get("blacklist_keywords", []))
+        if blacklist:
+            combined[blacklist] = {"prompt": "", "priority": "critical", _BLACKLIST_MARKER: True,
+                                   MATCH_SUBSTRING: True}
+        self.matcher = KeywordMatcher(combined)
+
+        self.evaluated = 0
+        self.accepted_count = 0
+        self.rejections = Counter()
+
+    def evaluate(self, tweet_text: str, require_keyword: bool = True) -> FilterVerdict:
+        """Avalia o tweet e devolve o veredito com o motivo da rejeição, se houver"""
+        normalized = normalize_text(tweet_text)
+        tally = {"#": 0, "@": 0, ":": 0}
+        hits = self.matcher.find_all_normalized(normalized, tally)
+
+        matches = [hit for hit in hits if not hit.prompt_data.get(_BLACKLIST_MARKER)]
+        blacklist_hits = [hit.keyword for hit in hits if hit.prompt_data.get(_BLACKLIST_MARKER)]
+
+        stripped = normalized.strip()
+        verdict = FilterVerdict(
+            accepted=False,
+            reason=None,
+            length=len(stripped),
+            hashtag_count=tally["#"],
+            mention_count=tally["@"],
+            is_retweet=stripped.startswith("rt @"),
+            blacklist_hits=blacklist_hits,
+            matches=matches
+        )
+
+        if verdict.length < self.min_length:
+            verdict.reason = REJECT_TOO_SHORT
+        elif verdict.is_retweet and tally[":"] == 0:
+            verdict.reason = REJECT_RETWEET
+        elif verdict.hashtag_count > self.max_hashtags:
+            verdict.reason = REJECT_HASHTAGS
+        elif verdict.mention_count > self.max_mentions:
+            verdict.reason = REJECT_MENTIONS
+        elif blacklist_hits:
+            verdict.reason = REJECT_BLACKLIST
+        elif require_keyword and not matches:
+            verdict.reason = REJECT_NO_KEYWORD
+        else:
+            verdict.accepted = True
+
+        self.evaluated += 1
+        if verdict.accepted:
+            self.accepted_count += 1
+        else:
+            self.rejections[verdict.reason] += 1
+        return verdict
+
+    def get_stats(self) -> Dict:
+        """Contadores de avaliação e rejeição por filtro"""
+        return {
+            "evaluated": self.evaluated,
+            "accepted": self.accepted_count,
+            "rejected": sum(self.rejections.values()),
+            "rejections_by_filter": dict(self.rejections)
+        }
@@ -0,0 +1,243 @@
+# work_queue.py
+# FILA LIMITADA COM PRIORIDADE E POOL DE WORKERS - O LEITOR DO STREAM NUNCA ESPERA POR LLM OU POSTAGEM
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from keyword_matcher import PRIORITY_RANK
+from keyword_prompts_improved import BOT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Políticas quando a fila está cheia
+DROP_NEW = "drop_new"          # Descarta o item que chegou
+DROP_OLDEST = "drop_oldest"    # Descarta o item há mais tempo na fila
+DROP_LOWEST = "drop_lowest"    # Descarta o de menor prioridade (o novo, se for ele)
+BLOCK = "block"                # Produtor espera vaga até `timeout` (só para quem pode esperar)
+DROP_POLICIES = (DROP_NEW, DROP_OLDEST, DROP_LOWEST, BLOCK)
+
+# Motivos de descarte
+DROP_FULL = "queue_full"
+DROP_EVICTED = "evicted"
+DROP_EXPIRED = "expired"
+DROP_CLOSED = "closed"
+
+DEFAULT_MAX_SIZE = 100
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_AGE_SECONDS = 600
+LAG_SAMPLES = 512
+
+
+def priority_rank(priority: Optional[str]) -> int:
+    """Prioridade da palavra-chave ("critical", "high"...) em posição na fila (menor sai antes)"""
+    return PRIORITY_RANK.get(priority, len(PRIORITY_RANK))
+
+
+@dataclass(order=True)
+class WorkItem:
+    """Um tweet aguardando geração e postagem"""
+    rank: int
+    sequence: int
+    enqueued_at: float = field(compare=False)
+    payload: Any = field(compare=False)
+
+
+class BoundedWorkQueue:
+    """
+    Fila de prioridade limitada, segura entre threads.
+
+    `put` nunca bloqueia, exceto na política BLOCK: com a fila cheia, a
+    política decide quem é descartado e o produtor recebe False (pressão de
+    volta). Itens mais velhos que `max_age_seconds` são descartados na saída,
+    pois responder a um tweet de horas atrás não vale os tokens.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, drop_policy: str = DROP_LOWEST,
+                 max_age_seconds: Optional[float] = DEFAULT_MAX_AGE_SECONDS,
+                 clock: Callable[[], float] = time.time,
+                 on_drop: Optional[Callable[[Any, str], None]] = None):
+        """
+        Args:
+            on_drop: chamado com (payload, motivo) quando um item que já estava
+                na fila é descartado (DROP_EVICTED ou DROP_EXPIRED), fora da trava;
+                recusas no put() o produtor já recebe como False
+        """
+        if max_size <= 0:
+            raise ValueError("max_size deve ser positivo")
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Política de descarte desconhecida: {drop_policy}")
+        self.max_size = max_size
+        self.drop_policy = drop_policy
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+        self.on_drop = on_drop
+
+        self._heap: List[WorkItem] = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.enqueued = 0
+        self.dequeued = 0
+        self.max_depth = 0
+        self.drops = Counter()
+        self._lags = deque(maxlen=LAG_SAMPLES)
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def _evict(self, victim: WorkItem) -> WorkItem:
+        self._heap.remove(victim)
+        heapq.heapify(self._heap)
+        self.drops[DROP_EVICTED] += 1
+        return victim
+
+    def _notify_drops(self, dropped: List[WorkItem], reason: str):
+        if self.on_drop:
+            for item in dropped:
+                self.on_drop(item.payload, reason)
+
+    def put(self, payload, priority: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """Enfileira; False se o item foi descartado (fila cheia ou fechada)"""
+        item = WorkItem(priority_rank(priority), next(self._sequence), self.clock(), payload)
+        evicted = []
+        with self._cond:
+            if self._closed:
+                self.drops[DROP_CLOSED] += 1
+                return False
+            if len(self._heap) >= self.max_size:
+                if self.drop_policy == BLOCK:
+                    self._cond.wait_for(lambda: len(self._heap) < self.max_size or self._closed, timeout)
+                if len(self._heap) >= self.max_size or self._closed:
+                    if self.drop_policy == DROP_OLDEST:
+                        evicted.append(self._evict(min(self._heap, key=lambda queued: queued.sequence)))
+                    elif self.drop_policy == DROP_LOWEST and max(self._heap) > item:
+                        evicted.append(self._evict(max(self._heap)))
+                    else:
+                        self.drops[DROP_FULL] += 1
+                        return False
+
+            heapq.heappush(self._heap, item)
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self._heap))
+            self._cond.notify_all()
+        self._notify_drops(evicted, DROP_EVICTED)
+        return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[WorkItem]:
+        """Próximo item por prioridade (e ordem de chegada); None se fechada e vazia ou no timeout"""
+        expired = []
+        try:
+            with self._cond:
+                while True:
+                    if not self._cond.wait_for(lambda: self._heap or self._closed, timeout):
+                        return None
+                    if not self._heap:
+                        return None
+                    item = heapq.heappop(self._heap)
+                    self._cond.notify_all()   # Vaga para produtores na política BLOCK
+                    lag = self.clock() - item.enqueued_at
+                    if self.max_age_seconds is not None and lag > self.max_age_seconds:
+                        self.drops[DROP_EXPIRED] += 1
+                        expired.append(item)
+                        continue
+                    self.dequeued += 1
+                    self._lags.append(lag)
+                    return item
+        finally:
+            self._notify_drops(expired, DROP_EXPIRED)
+
+    def close(self):
+        """Não aceita mais itens; os workers esvaziam o que restou e saem"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            lags = sorted(self._lags)
+            oldest = min((item.enqueued_at for item in self._heap), default=None)
+            return {
+                "depth": len(self._heap),
+                "max_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "dequeued": self.dequeued,
+                "dropped": sum(self.drops.values()),
+                "drops_by_reason": dict(self.drops),
+                "oldest_age_seconds": self.clock() - oldest if oldest is not None else 0.0,
+                "lag_p50_seconds": lags[len(lags) // 2] if lags else 0.0,
+                "lag_p95_seconds": lags[min(len(lags) - 1, int(len(lags) * 0.95))] if lags else 0.0,
+                "lag_max_seconds": lags[-1] if lags else 0.0
+            }
+
+
+class WorkerPool:
+    """Threads que consomem a fila e chamam `handler(payload)`; erros não derrubam o worker"""
+
+    def __init__(self, queue: BoundedWorkQueue, handler: Callable[[Any], None],
+                 workers: int = DEFAULT_WORKERS, name: str = "worker"):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.name = name
+        self._threads: List[threading.Thread] = []
+        self._stats_lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0
+
+    def start(self) -> "WorkerPool":
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"{self.name}-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"👷 {self.workers} worker(s) consumindo a fila (máx. {self.queue.max_size}, "
+                    f"política {self.queue.drop_policy})")
+        return self
+
+    def _loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            with self._stats_lock:
+                self.busy += 1
+            try:
+                self.handler(item.payload)
+                failed = False
+            except Exception as e:
+                logger.error(f"❌ Worker falhou ao processar item: {e}")
+                failed = True
+            with self._stats_lock:
+                self.busy -= 1
+                self.processed += 1
+                self.failed += failed
+
+    def stop(self, timeout: Optional[float] = None):
+        """Fecha a fila e espera os workers terminarem o que já estava enfileirado"""
+        self.queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            workers = {"workers": self.workers, "busy": self.busy, "processed": self.processed, "failed": self.failed}
+        return {**self.queue.get_stats(), **workers}
+
+
+def work_queue_from_config(config: Optional[Dict] = None,
+                           on_drop: Optional[Callable[[Any, str], None]] = None) -> BoundedWorkQueue:
+    config = config or BOT_CONFIG
+    return BoundedWorkQueue(
+        max_size=config.get("work_queue_max_size", DEFAULT_MAX_SIZE),
+        drop_policy=config.get("work_queue_drop_policy", DROP_LOWEST),
+        max_age_seconds=config.get("work_queue_max_age_seconds", DEFAULT_MAX_AGE_SECONDS),
+        on_drop=on_drop
+    )